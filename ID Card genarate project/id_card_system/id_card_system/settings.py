@@ -2,8 +2,11 @@
 Django settings for id_card_system project.
 """
 
+import os
 from pathlib import Path
 
+import django
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # =========================
@@ -22,7 +25,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    'idcard_app.staticfiles.StaticFilesConfig',   # django.contrib.staticfiles, minus uploads
 
     'idcard_app',
 ]
@@ -36,7 +39,9 @@ AUTH_USER_MODEL = 'idcard_app.User'
 # MIDDLEWARE
 # =========================
 MIDDLEWARE = [
+    'idcard_app.metrics.MetricsMiddleware',   # first, so it times everything below
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -72,11 +77,52 @@ TEMPLATES = [
 # =========================
 # DATABASE
 # =========================
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite unless DB_ENGINE=postgresql is set in the environment, together with
+# DB_NAME, DB_USER, DB_PASSWORD, DB_HOST and DB_PORT (pip install "psycopg[binary]").
+# Compare the options under concurrent writes with: manage.py bench_db_writes
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE in ('postgresql', 'postgres'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'id_card_system'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # keep each worker's connection across requests; checked before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        # a psycopg 3 pool per process instead (Django 5.1+, pip install "psycopg[pool]")
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {},
+        }
     }
+    if django.VERSION >= (5, 1):
+        # take the write lock at BEGIN: a deferred transaction that reads and then
+        # writes fails with "database is locked" without waiting for busy_timeout
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Applied to every new SQLite connection (idcard_app/signals.py)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',        # readers and the writer no longer block each other
+    'synchronous': 'NORMAL',      # fsync at checkpoints instead of every commit; durable with WAL
+    'busy_timeout': 20000,        # ms to wait for the write lock before "database is locked"
+    'mmap_size': 256 * 1024 * 1024,
 }
 
 # =========================
@@ -109,13 +155,81 @@ USE_TZ = True
 # STATIC & MEDIA FILES
 # =========================
 STATIC_URL = '/static/'
-STATICFILES_DIRS = [
-    BASE_DIR / "idcard_app" / "static",
+STATIC_ROOT = BASE_DIR / "staticfiles"     # manage.py collectstatic
+STATICFILES_FINDERS = [
+    "django.contrib.staticfiles.finders.FileSystemFinder",
+    "idcard_app.finders.AppDirectoriesFinder",   # skips uploads/ (MEDIA_ROOT)
 ]
 
+# collectstatic stores each asset under a content-hashed name with .gz and .br
+# (if Brotli is installed) copies; WhiteNoise serves those with far-future
+# immutable cache headers, so repeat page loads only fetch the HTML
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "idcard_app" / "static" / "uploads"
 
+# Media goes through a permission-checked view (students only get their own
+# photo and signature). Behind nginx set SENDFILE_BACKEND=x-accel-redirect and
+# alias SENDFILE_URL_PREFIX (an "internal" location) to MEDIA_ROOT; behind
+# Apache mod_xsendfile use x-sendfile. Unset, Django sends the file itself.
+SENDFILE_BACKEND = os.environ.get("SENDFILE_BACKEND", "")
+SENDFILE_URL_PREFIX = "/protected-media/"
+MEDIA_CACHE_SECONDS = 3600        # browsers revalidate with the ETag afterwards
+
+# =========================
+# EXPORT JOBS (manage.py run_export_worker)
+# =========================
+EXPORT_ROOT = BASE_DIR / "exports"
+EXPORT_CHUNK_SIZE = 50          # users per leased work item
+EXPORT_LEASE_SECONDS = 120      # a chunk is re-queued if its worker stops renewing
+EXPORT_MAX_ATTEMPTS = 3
+
+# =========================
+# CACHE
+# =========================
+# Shared by every worker process on this host (version stamps such as the
+# DashboardSettings one must be seen by all of them). Use Redis/Memcached
+# when running on more than one host.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "django",
+    }
+}
+
+# =========================
+# CARD RENDERING CACHE
+# =========================
+RENDER_CACHE_DIR = BASE_DIR / "cache" / "render"
+RENDER_COMPILED_CACHE_SIZE = 32   # compiled template sides kept in memory per process
+# finished card sides, keyed by content (RENDER_CACHE_DIR/cards); least recently
+# used entries are deleted past this many bytes; 0 turns the cache off
+RENDER_CARD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# =========================
+# BACKGROUND REMOVAL (optional: pip install rembg)
+# =========================
+REMBG_MODEL = "u2net"             # session is loaded once per process; cutouts live in MEDIA_ROOT/cutouts
+
+# =========================
+# METRICS (/metrics, Prometheus text format)
+# =========================
+# Every process writes its counts here and /metrics adds them up; all workers
+# of a host must share it. Files of finished processes are folded into one.
+METRICS_DIR = os.environ.get("METRICS_DIR", BASE_DIR / "cache" / "metrics")
+# /metrics is admin-only; a scraper can send "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# =========================
+# TESTS
+# =========================
+# keeps metrics recorded by the test run out of METRICS_DIR
+TEST_RUNNER = "idcard_app.tests.runner.TestRunner"
+
 # =========================
 # DEFAULT PRIMARY KEY
 # =========================
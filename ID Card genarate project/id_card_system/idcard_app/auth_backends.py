@@ -1,15 +1,24 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.db.models.functions import Lower
 
 User = get_user_model()
 
 class EmailBackend(ModelBackend):
     def authenticate(self, request, email=None, password=None, **kwargs):
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        if not email:
             return None
 
+        # LOWER(email) = ... is answered by user_email_lower_idx
+        matches = list(User.objects.alias(email_lower=Lower("email")).filter(email_lower=email.lower())
+                       .order_by("pk"))
+        # emails that differ only in case: only the exact spelling can tell them apart
+        user = next((u for u in matches if u.email == email), None)
+        if user is None:
+            if len(matches) != 1:
+                return None
+            user = matches[0]
+
         if user.check_password(password):
             return user
         return None
@@ -0,0 +1,15 @@
+from django.contrib.staticfiles import finders
+
+
+class AppDirectoriesFinder(finders.AppDirectoriesFinder):
+    """App static files, except MEDIA_ROOT (idcard_app/static/uploads).
+
+    Uploads must only be reachable through the permission-checked media view,
+    not as /static/uploads/... when static files are served from the source
+    tree (DEBUG, WhiteNoise autorefresh, runserver).
+    """
+
+    def find_in_app(self, app, path):
+        if path.replace("\\", "/").split("/", 1)[0] == "uploads":
+            return None
+        return super().find_in_app(app, path)
@@ -0,0 +1,264 @@
+"""Upload-time derivatives of User.photo and User.signature.
+
+Phone photos arrive as multi-megabyte JPEGs, but cards draw them into a
+~110x140 box and lists show 40px avatars. When a photo or signature is
+uploaded we decode it once (JPEG draft mode, EXIF orientation applied) and
+store downscaled copies under derivatives/, named after the whole original:
+
+    photos/IMG_123.jpg -> derivatives/photos/IMG_123.jpg__card.jpg, __preview.jpg, __avatar.jpg
+
+Storage only keeps originals unique, so keeping the original's extension (a.jpg
+and a.png get different derivatives) and a directory no upload is saved to (an
+upload named a.jpg__card.jpg cannot land on one) keeps derivatives unique too.
+
+Readers ask for the smallest derivative that covers the size they need and
+fall back to the original when none exists yet.
+
+Background-removed photos ("cutouts") are derivatives too, but keyed by the
+photo's content hash (cutouts/<sha256>.png) so a changed photo can never be
+served a stale cutout.
+"""
+import hashlib
+import io
+import math
+import os
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import metrics
+
+
+# Longest edge in pixels, largest first. "card" covers a 200px photo box at 300 DPI.
+DERIVATIVE_SIZES = (
+    ("card", 640),
+    ("preview", 320),
+    ("avatar", 96),
+)
+
+IMAGE_FIELDS = ("photo", "signature")
+
+DERIVATIVE_DIR = "derivatives"
+CUTOUT_DIR = "cutouts"
+REMBG_MODEL = getattr(settings, "REMBG_MODEL", "u2net")
+
+
+def _name(value):
+    return getattr(value, "name", value) or ""
+
+
+def derivative_name(original, size, ext):
+    return f"{DERIVATIVE_DIR}/{_name(original)}__{size}.{ext}"
+
+
+def _derivative_ext(img):
+    return "png" if img.mode in ("RGBA", "LA", "P") else "jpg"
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def decode_for_size(data, max_edge):
+    """Decode image bytes, using JPEG draft mode to skip detail beyond max_edge."""
+    img = Image.open(io.BytesIO(data))
+    if img.format == "JPEG" and max(img.size) > max_edge:
+        # draft() picks the smallest DCT scale that still covers the requested size;
+        # asking in the image's own aspect keeps the long edge >= max_edge whatever
+        # EXIF rotation is applied afterwards
+        scale = max_edge / max(img.size)
+        img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    return img
+
+
+def encode(img, ext, quality=85):
+    buffer = io.BytesIO()
+    if ext == "jpg":
+        img.convert("RGB").save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _replace(storage, name, data):
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        # remote storages: no rename, so delete-then-save is the best we can do
+        if storage.exists(name):
+            storage.delete(name)
+        return storage.save(name, ContentFile(data))
+    # write beside the target and rename, so concurrent readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    return name
+
+
+def build_derivatives(original, storage=None, data=None):
+    """Write every derivative of original (a FieldFile or storage name).
+
+    Returns (content hash of the original, {size: stored name}).
+    """
+    storage = storage or default_storage
+    name = _name(original)
+    if data is None:
+        with storage.open(name, "rb") as fh:
+            data = fh.read()
+
+    img = decode_for_size(data, DERIVATIVE_SIZES[0][1])
+    ext = _derivative_ext(img)
+    written = {}
+    for size, edge in DERIVATIVE_SIZES:
+        img.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=2.0)
+        written[size] = _replace(storage, derivative_name(name, size, ext), encode(img, ext))
+    return content_hash(data), written
+
+
+def derivative_for(original, size, storage=None):
+    """Stored name of a named derivative, or None if it has not been built."""
+    storage = storage or default_storage
+    if not _name(original):
+        return None
+    for ext in ("jpg", "png"):
+        name = derivative_name(original, size, ext)
+        if storage.exists(name):
+            return name
+    return None
+
+
+def best_source(original, width=0, height=0, storage=None):
+    """Smallest derivative whose longest edge covers width x height, else the original."""
+    needed = max(width, height)
+    if needed:
+        for size, edge in reversed(DERIVATIVE_SIZES):
+            if edge >= needed:
+                name = derivative_for(original, size, storage)
+                if name:
+                    return name
+    return _name(original) or None
+
+
+def derivative_url(fieldfile, size="preview"):
+    """URL of a named derivative of a FieldFile, or of the original if it has not been built."""
+    if not fieldfile:
+        return ""
+    try:
+        name = derivative_for(fieldfile, size, fieldfile.storage)
+    except SuspiciousFileOperation:
+        name = None
+    return fieldfile.storage.url(name) if name else fieldfile.url
+
+
+def user_media_names(user):
+    """Every stored name that belongs to a user: originals, derivatives and the cutout."""
+    names = set()
+    for field in IMAGE_FIELDS:
+        original = _name(getattr(user, field))
+        if not original:
+            continue
+        names.add(original)
+        names.update(derivative_name(original, size, ext) for size, _ in DERIVATIVE_SIZES for ext in ("jpg", "png"))
+    if user.photo_hash:
+        names.add(cutout_name(user.photo_hash))
+    return names
+
+
+def process_upload(user, field):
+    """Build derivatives for a freshly saved photo/signature and record its content hash."""
+    fieldfile = getattr(user, field)
+    if not fieldfile:
+        return None
+    try:
+        digest, _ = build_derivatives(fieldfile, fieldfile.storage)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    type(user).objects.filter(pk=user.pk).update(**{f"{field}_hash": digest})
+    setattr(user, f"{field}_hash", digest)
+    return digest
+
+
+def upload_hash(user, field):
+    """Content hash of a photo/signature, computing and storing it for older uploads."""
+    digest = getattr(user, f"{field}_hash")
+    fieldfile = getattr(user, field)
+    if digest or not fieldfile:
+        return digest or None
+    with fieldfile.open("rb") as fh:
+        digest = content_hash(fh.read())
+    type(user).objects.filter(pk=user.pk).update(**{f"{field}_hash": digest})
+    setattr(user, f"{field}_hash", digest)
+    return digest
+
+
+# =========================
+# BACKGROUND REMOVAL
+# =========================
+def cutout_name(digest):
+    return f"{CUTOUT_DIR}/{digest}.png"
+
+
+@lru_cache(maxsize=None)
+def rembg_session(model=REMBG_MODEL):
+    """One rembg model session per process; building it costs seconds."""
+    from rembg import new_session
+
+    return new_session(model)
+
+
+def remove_background(data):
+    """Cut the background out of photo bytes; returns PNG bytes.
+
+    The model works at 320px internally, so the photo is decoded at card
+    derivative size rather than full resolution.
+    """
+    from rembg import remove
+
+    try:
+        with metrics.BACKGROUND_REMOVAL_TIME.time():
+            img = decode_for_size(data, DERIVATIVE_SIZES[0][1])
+            img.thumbnail((DERIVATIVE_SIZES[0][1],) * 2, Image.LANCZOS)
+            cutout = encode(remove(img, session=rembg_session()), "png")
+    except Exception:
+        metrics.BACKGROUND_REMOVALS.inc(result="error")
+        raise
+    metrics.BACKGROUND_REMOVALS.inc(result="ok")
+    return cutout
+
+
+def cutout_for(user, storage=None, create=True):
+    """Stored name of the user's cutout, building it if needed (and create is set).
+
+    Returns None when the user has no photo, or when the cutout does not exist
+    and create is False. Raises ImportError if rembg is not installed.
+    """
+    if not user.photo:
+        return None
+    storage = storage or user.photo.storage
+    name = cutout_name(upload_hash(user, "photo"))
+    if storage.exists(name):
+        return name
+    if not create:
+        return None
+    with user.photo.open("rb") as fh:
+        data = fh.read()
+    return _replace(storage, name, remove_background(data))
+
+
+def discard_cutout(digest, storage=None):
+    """Delete the cutout of a photo that has been replaced or removed."""
+    if not digest:
+        return
+    storage = storage or default_storage
+    name = cutout_name(digest)
+    if storage.exists(name):
+        storage.delete(name)
@@ -0,0 +1,423 @@
+"""Bulk user import from CSV or XLSX.
+
+Rows are read one at a time (the csv module, or openpyxl in read-only mode),
+validated against the User fields, and upserted by email in batches: each
+batch is one transaction with one lookup query, one bulk_create and one
+executemany UPDATE, so an intake of tens of thousands of students takes seconds
+rather than a save() per row.
+
+Password hashing is the expensive part (Django's PBKDF2 costs a large fraction
+of a second per password), so per-row passwords are hashed in a thread pool;
+hashlib and the argon2/bcrypt bindings release the GIL while hashing. Rows
+without a password get default_password, hashed once per import, or an
+unusable password so the student sets one through "forgot password".
+
+Bulk writes skip model signals; imported rows carry no photo or signature.
+"""
+import codecs
+import csv
+import io
+import os
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from xml.etree.ElementTree import ParseError
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+
+from .models import User
+
+
+BATCH_SIZE = 1000
+# Excel saves "CSV" as Windows-1252 unless "CSV UTF-8" is picked
+CSV_ENCODINGS = ("utf-8-sig", "cp1252")
+READ_CHUNK = 64 * 1024
+BLOOD_GROUPS = ("A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-")
+DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y")
+
+# columns that can be imported, in export order; email is the upsert key
+COLUMNS = (
+    "email", "username", "password", "first_name", "last_name", "role",
+    "department", "roll_no", "phone", "emergency_mobile", "blood_group",
+    "age", "date_of_birth", "valid_upto", "residence_status", "address",
+)
+# other spellings accepted in header rows (after lower-casing, spaces -> _)
+ALIASES = {
+    "e-mail": "email",
+    "mail": "email",
+    "first": "first_name",
+    "firstname": "first_name",
+    "last": "last_name",
+    "lastname": "last_name",
+    "surname": "last_name",
+    "dept": "department",
+    "roll": "roll_no",
+    "roll_number": "roll_no",
+    "mobile": "phone",
+    "phone_number": "phone",
+    "emergency": "emergency_mobile",
+    "emergency_contact": "emergency_mobile",
+    "blood": "blood_group",
+    "dob": "date_of_birth",
+    "birth_date": "date_of_birth",
+    "valid_until": "valid_upto",
+    "expiry": "valid_upto",
+    "residence": "residence_status",
+}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be imported (unknown type, no email column...)."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.errors = []   # (row number, message)
+
+    @property
+    def failed(self):
+        return len({row for row, _ in self.errors})
+
+    def as_dict(self, max_errors=None):
+        errors = self.errors if max_errors is None else self.errors[:max_errors]
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": [{"row": row, "error": message} for row, message in errors],
+            "errors_truncated": max_errors is not None and len(self.errors) > max_errors,
+        }
+
+
+# =========================
+# READING
+# =========================
+def _column(header):
+    name = str(header or "").strip().lower().replace(" ", "_")
+    return ALIASES.get(name, name)
+
+
+def _header(cells):
+    columns = [_column(cell) for cell in cells]
+    if "email" not in columns:
+        raise ImportFormatError("The header row has no email column")
+    return columns
+
+
+def _csv_encoding(fileobj):
+    """The first of CSV_ENCODINGS that decodes the whole file.
+
+    Checked before any row is read, so a file cannot fail to decode halfway
+    through, after earlier batches have been written.
+    """
+    start = fileobj.tell()
+    for encoding in CSV_ENCODINGS:
+        fileobj.seek(start)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            for chunk in iter(lambda: fileobj.read(READ_CHUNK), b""):
+                decoder.decode(chunk)
+            decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            continue
+        fileobj.seek(start)
+        return encoding
+    raise ImportFormatError("The CSV file is neither UTF-8 nor Windows-1252 text")
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding=_csv_encoding(fileobj), newline="")
+    reader = csv.reader(text)
+    try:
+        columns = _header(next(reader, []))
+        for number, cells in enumerate(reader, 2):
+            if any(cell.strip() for cell in cells):
+                yield number, dict(zip(columns, cells))
+    except csv.Error as e:
+        raise ImportFormatError(f"The CSV file cannot be read past line {reader.line_num}: {e}")
+    finally:
+        text.detach()   # leave the caller's file open
+
+
+def _xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("XLSX import needs openpyxl (pip install openpyxl)")
+
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError, ParseError, zlib.error) as e:
+        raise ImportFormatError(f"Not a readable .xlsx file: {e}")
+    number = 1
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        columns = _header(next(rows, ()))
+        for number, cells in enumerate(rows, 2):
+            if any(cell not in (None, "") for cell in cells):
+                yield number, dict(zip(columns, cells))
+    except (zipfile.BadZipFile, KeyError, ParseError, zlib.error) as e:
+        # read-only workbooks parse the sheet as rows are asked for
+        raise ImportFormatError(f"The sheet cannot be read past row {number}: {e}")
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    """Yield (row number, {column: raw value}) for each non-empty data row."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext == ".csv":
+        return _csv_rows(fileobj)
+    if ext in (".xlsx", ".xlsm"):
+        return _xlsx_rows(fileobj)
+    raise ImportFormatError("Upload a .csv or .xlsx file")
+
+
+# =========================
+# VALIDATION
+# =========================
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)   # spreadsheets store phone and roll numbers as floats
+    return str(value).strip()
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"'{value}' is not a date (use YYYY-MM-DD or DD-MM-YYYY)")
+
+
+def _choice(value, choices):
+    lowered = value.lower()
+    for key, label in choices:
+        if lowered in (key, label.lower()):
+            return key
+    raise ValueError(f"'{value}' is not one of {', '.join(key for key, _ in choices)}")
+
+
+def _blood_group(value):
+    value = value.upper().replace(" ", "").replace("VE", "")
+    value = value.replace("POS", "+").replace("NEG", "-")
+    if value not in BLOOD_GROUPS:
+        raise ValueError(f"must be one of {', '.join(BLOOD_GROUPS)}")
+    return value
+
+
+def _age(value):
+    # whole numbers only: int(float()) would truncate 25.5 and overflow on "1e400"
+    try:
+        age = int(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a whole number")
+    if not 0 < age < 150:
+        raise ValueError(f"{age} is out of range")
+    return age
+
+
+CLEANERS = {
+    "role": lambda value: _choice(value, User.ROLE_CHOICES),
+    "residence_status": lambda value: _choice(value, User.RESIDENCE_STATUS_CHOICES),
+    "blood_group": _blood_group,
+    "age": _age,
+    "date_of_birth": _date,
+    "valid_upto": _date,
+}
+MAX_LENGTHS = {
+    name: User._meta.get_field(name).max_length
+    for name in COLUMNS if name != "password" and User._meta.get_field(name).max_length
+}
+
+
+def clean_row(raw):
+    """Validated {field: value} for the non-blank cells of one row, or raise ValueError.
+
+    Blank cells are left out, so an update only touches the columns that have
+    a value in the file.
+    """
+    data, problems = {}, []
+    for name in COLUMNS:
+        value = raw.get(name)
+        if name not in ("date_of_birth", "valid_upto") or not isinstance(value, (date, datetime)):
+            value = _text(value)
+        if value == "":
+            continue
+        try:
+            if name in CLEANERS:
+                value = CLEANERS[name](value)
+            max_length = MAX_LENGTHS.get(name)
+            if max_length and len(value) > max_length:
+                raise ValueError(f"longer than {max_length} characters")
+        except ValueError as e:
+            problems.append(f"{name}: {e}")
+            continue
+        data[name] = value
+
+    email = data.get("email", "").lower()
+    try:
+        validate_email(email)
+    except ValidationError:
+        problems.insert(0, f"email: '{email}' is not a valid address" if email else "email is required")
+    data["email"] = email
+    if problems:
+        raise ValueError("; ".join(problems))
+    return data
+
+
+# =========================
+# UPSERT
+# =========================
+def update_rows(users, fields):
+    """Write fields of already-saved users with one executemany.
+
+    Does what QuerySet.bulk_update does, but bulk_update builds a CASE WHEN
+    expression for every cell, which for a 1000-row batch of a dozen columns
+    costs several seconds of Python before the query is even sent.
+    """
+    model_fields = [User._meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    sql = "UPDATE {} SET {} WHERE {} = %s".format(
+        quote(User._meta.db_table),
+        ", ".join(f"{quote(field.column)} = %s" for field in model_fields),
+        quote(User._meta.pk.column),
+    )
+    params = [
+        [field.get_db_prep_save(getattr(user, field.attname), connection) for field in model_fields] + [user.pk]
+        for user in users
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+class UserImporter:
+    """Upsert users by email from row dicts; see import_file()."""
+
+    def __init__(self, batch_size=BATCH_SIZE, workers=None, default_password=None, dry_run=False):
+        self.batch_size = batch_size
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.dry_run = dry_run
+        self.report = ImportReport()
+        # hashed once and shared by every row without a password; when unset this
+        # is an unusable password, which matches nothing
+        self.default_hash = make_password(default_password)
+        self.seen = set()   # emails already imported from this file
+        self.pool = None
+
+    def __enter__(self):
+        self.pool = ThreadPoolExecutor(self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        self.pool.shutdown()
+
+    def run(self, rows):
+        batch = []
+        try:
+            for number, raw in rows:
+                self.report.rows += 1
+                try:
+                    data = clean_row(raw)
+                except ValueError as e:
+                    self.report.errors.append((number, str(e)))
+                    continue
+                if data["email"] in self.seen:
+                    self.report.errors.append((number, f"{data['email']} appears earlier in the file"))
+                    continue
+                self.seen.add(data["email"])
+                batch.append((number, data))
+                if len(batch) >= self.batch_size:
+                    self.write(batch)
+                    batch = []
+        except ImportFormatError as e:
+            written = self.report.created + self.report.updated
+            if written and not self.dry_run:
+                raise ImportFormatError(f"{e} ({written} users before it were already imported)") from e
+            raise
+        if batch:
+            self.write(batch)
+        return self.report
+
+    def hash_passwords(self, items):
+        """Hash the given plain-text passwords in place, in the pool."""
+        plain = [data["password"] for _, data in items]
+        for (_, data), hashed in zip(items, self.pool.map(make_password, plain)):
+            data["password"] = hashed
+
+    def write(self, batch):
+        emails = [data["email"] for _, data in batch]
+        existing = {
+            user.email.lower(): user
+            for user in User.objects.alias(email_lower=Lower("email")).filter(email_lower__in=emails)
+        }
+        new = [(number, data) for number, data in batch if data["email"] not in existing]
+        wanted = {}   # username -> first row asking for it
+        for number, data in new:
+            wanted.setdefault(data.get("username") or data["email"], number)
+        taken = set(User.objects.filter(username__in=wanted).values_list("username", flat=True))
+
+        creates, updates, fields = [], [], set()
+        to_hash = [(number, data) for number, data in batch if "password" in data]
+        if to_hash and not self.dry_run:
+            self.hash_passwords(to_hash)
+
+        for number, data in batch:
+            user = existing.get(data["email"])
+            if user is None:
+                data.setdefault("username", data["email"])
+                if data["username"] in taken or wanted.get(data["username"]) != number:
+                    self.report.errors.append((number, f"username '{data['username']}' is already taken"))
+                    continue
+                data.setdefault("password", self.default_hash)
+                creates.append(User(**data))
+            else:
+                # the username is the stable login handle, so it is only set on create
+                data.pop("username", None)
+                data.pop("email")
+                for name, value in data.items():
+                    setattr(user, name, value)
+                fields.update(data)
+                updates.append(user)
+
+        if not self.dry_run:
+            with transaction.atomic():
+                User.objects.bulk_create(creates)
+                if updates and fields:
+                    update_rows(updates, sorted(fields))
+        self.report.created += len(creates)
+        self.report.updated += len(updates)
+
+
+def import_file(fileobj, filename, **options):
+    """Import users from an open CSV/XLSX file; returns an ImportReport.
+
+    options are UserImporter's: batch_size, workers, default_password, dry_run.
+    Raises ImportFormatError if the file cannot be read (batches written before
+    a sheet turns out corrupt halfway stay written); bad rows are reported in
+    the result and skipped.
+    """
+    with UserImporter(**options) as importer:
+        return importer.run(read_rows(fileobj, filename))
@@ -0,0 +1,486 @@
+"""Database-backed export jobs.
+
+batch_export queues an ExportJob whose users are split into ExportChunk rows.
+Any number of `manage.py run_export_worker` processes (on one machine or many,
+sharing the database) lease chunks, render their cards into the job directory
+and release them. A lease that is not renewed expires, so the chunks of a
+crashed worker are picked up again; users already rendered are skipped, so a
+retry never starts the chunk from scratch. The worker that finishes the last
+chunk assembles the download under its own renewed lease, next to the job
+directory, which is then deleted; directories of cancelled or failed jobs are
+deleted once no worker writes into them any more.
+"""
+import os
+import re
+import shutil
+import socket
+import time
+import traceback
+import uuid
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from PIL import Image
+
+from . import rendering
+from .models import ExportChunk, ExportJob, User
+
+
+CHUNK_SIZE = getattr(settings, "EXPORT_CHUNK_SIZE", 50)
+LEASE_SECONDS = getattr(settings, "EXPORT_LEASE_SECONDS", 120)
+MAX_ATTEMPTS = getattr(settings, "EXPORT_MAX_ATTEMPTS", 3)
+
+ACTIVE_JOB_STATUSES = ("queued", "running")
+FINISHED_JOB_STATUSES = ("done", "failed", "cancelled")
+
+
+def export_root():
+    return Path(getattr(settings, "EXPORT_ROOT", Path(settings.BASE_DIR) / "exports"))
+
+
+def job_dir(job):
+    return export_root() / f"job-{job.id}"
+
+
+def make_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def _lease_deadline():
+    return timezone.now() + timedelta(seconds=LEASE_SECONDS)
+
+
+class LeaseLost(Exception):
+    """The chunk or job was cancelled or taken over by another worker."""
+
+
+class Heartbeat:
+    """Call while working under a lease; renews it every third of LEASE_SECONDS.
+
+    renew() returns False once the lease is lost, and the call raises LeaseLost.
+    """
+
+    def __init__(self, renew):
+        self.renew = renew
+        self.last = time.monotonic()
+
+    def __call__(self):
+        if time.monotonic() - self.last > LEASE_SECONDS / 3:
+            if not self.renew():
+                raise LeaseLost()
+            self.last = time.monotonic()
+
+
+# =========================
+# QUEUEING
+# =========================
+def create_export_job(template, user_ids, created_by=None, fmt="zip", include_back=True, dpi=300, version=None,
+                      layout=None):
+    """Queue an export of template (its current version, or the TemplateVersion given) and return the ExportJob.
+
+    layout is a rendering.SheetLayout to impose a PDF export N-up on printer sheets.
+    """
+    user_ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+    version = version or template.current_version
+    with transaction.atomic():
+        job = ExportJob.objects.create(
+            template=template,
+            template_version=version,
+            template_json=version.template_json if version else rendering.load_template_json(template.template_json),
+            fmt=fmt,
+            include_back=include_back,
+            dpi=dpi,
+            layout=layout.options() if layout else {},
+            total=len(user_ids),
+            created_by=created_by,
+        )
+        ExportChunk.objects.bulk_create([
+            ExportChunk(job=job, index=i, user_ids=user_ids[start:start + CHUNK_SIZE])
+            for i, start in enumerate(range(0, len(user_ids), CHUNK_SIZE))
+        ])
+        if not user_ids:
+            job.status = "done"
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "finished_at"])
+    return job
+
+
+def cancel_job(job):
+    """Stop handing out chunks; leased chunks notice at their next heartbeat."""
+    with transaction.atomic():
+        updated = ExportJob.objects.filter(id=job.id, status__in=ACTIVE_JOB_STATUSES).update(
+            status="cancelled", finished_at=timezone.now())
+        ExportChunk.objects.filter(job_id=job.id, status="queued").update(status="cancelled")
+    return bool(updated)
+
+
+def job_progress(job):
+    chunks = dict(job.chunks.order_by().values_list("status").annotate(n=Count("id")))
+    processed = job.rendered + job.failed
+    return {
+        "id": job.id,
+        "status": job.status,
+        "format": job.fmt,
+        "template_version": job.template_version.hash if job.template_version_id else None,
+        "layout": job.layout or None,
+        "total": job.total,
+        "rendered": job.rendered,
+        "failed": job.failed,
+        "percent": round(100 * processed / job.total, 1) if job.total else 100.0,
+        "chunks": chunks,
+        "error": job.error,
+        "ready": job.status == "done" and bool(job.output),
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+# =========================
+# LEASING
+# =========================
+def _claimable_chunks():
+    now = timezone.now()
+    return (
+        ExportChunk.objects
+        .filter(job__status__in=ACTIVE_JOB_STATUSES, attempts__lt=MAX_ATTEMPTS)
+        .filter(Q(status="queued") | Q(status="leased", lease_expires_at__lt=now))
+        .order_by("job_id", "index")
+    )
+
+
+def claim_chunk(worker_id):
+    """Lease the next available chunk for worker_id, or return None.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED where the database supports it and a
+    compare-and-set UPDATE otherwise (SQLite), so concurrent workers never get
+    the same chunk.
+    """
+    lease = dict(status="leased", lease_owner=worker_id, lease_expires_at=_lease_deadline(),
+                 attempts=F("attempts") + 1)
+    chunk_id = None
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            chunk_id = (_claimable_chunks().select_for_update(skip_locked=True, of=("self",))
+                        .values_list("id", flat=True).first())
+            if chunk_id is not None:
+                ExportChunk.objects.filter(id=chunk_id).update(**lease)
+    else:
+        for candidate in _claimable_chunks().values("id", "status", "lease_expires_at")[:10]:
+            won = ExportChunk.objects.filter(
+                id=candidate["id"], status=candidate["status"],
+                lease_expires_at=candidate["lease_expires_at"],
+            ).update(**lease)
+            if won:
+                chunk_id = candidate["id"]
+                break
+    if chunk_id is None:
+        return None
+
+    chunk = ExportChunk.objects.select_related("job").get(id=chunk_id)
+    ExportJob.objects.filter(id=chunk.job_id, status="queued").update(
+        status="running", started_at=timezone.now())
+    return chunk
+
+
+def renew_lease(chunk, worker_id):
+    """Extend the lease; returns False if it was lost or the job was cancelled."""
+    renewed = ExportChunk.objects.filter(
+        id=chunk.id, status="leased", lease_owner=worker_id,
+        job__status__in=ACTIVE_JOB_STATUSES,
+    ).update(lease_expires_at=_lease_deadline())
+    return bool(renewed)
+
+
+# =========================
+# RENDERING
+# =========================
+def card_path(job, user_id, side):
+    # PDF exports keep JPEGs so assembly can embed them without re-encoding
+    ext = "jpg" if job.fmt == "pdf" else "png"
+    return job_dir(job) / f"{user_id}_{side}.{ext}"
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def render_user_cards(job, user, compiled, content_hash):
+    """Render the job's sides for one user into the job directory.
+
+    compiled maps side -> CompiledSide (or None for an empty side). Sides
+    unchanged since an earlier run are copied from the rendered-card cache.
+    """
+    images = []
+
+    def load_images():
+        if not images:
+            images.append(rendering.load_user_images(user, rendering.merged_image_sizes(*compiled.values())))
+        return images[0]
+
+    wrote = False
+    for side, compiled_side in compiled.items():
+        path = card_path(job, user.id, side)
+        if path.exists():
+            wrote = True
+            continue
+        if compiled_side is None:
+            continue
+        fmt = "JPEG" if job.fmt == "pdf" else "PNG"
+        data, _ = rendering.render_side_encoded(compiled_side, content_hash, side, user, fmt, job.dpi, load_images)
+        _write_atomic(path, data)
+        wrote = True
+    return wrote
+
+
+def process_chunk(chunk, worker_id):
+    """Render every user of a leased chunk, renewing the lease as it goes."""
+    job = chunk.job
+    job_dir(job).mkdir(parents=True, exist_ok=True)
+    users = User.objects.only(*rendering.USER_FIELDS).in_bulk(chunk.user_ids)
+    content_hash = rendering.template_hash(job.template_json)
+    sides = rendering.SIDES if job.include_back else rendering.SIDES[:1]
+    compiled = {
+        side: rendering.compile_side(job.template_json, side, job.dpi, job.template_id, content_hash)
+        for side in sides
+    }
+    rendered = failed = 0
+    errors = []
+    heartbeat = Heartbeat(lambda: renew_lease(chunk, worker_id))
+
+    for user_id in chunk.user_ids:
+        try:
+            heartbeat()
+        except LeaseLost:
+            return False
+
+        user = users.get(user_id)
+        try:
+            if user is not None and render_user_cards(job, user, compiled, content_hash):
+                rendered += 1
+                continue
+            errors.append(f"user {user_id}: {'not found' if user is None else 'nothing to render'}")
+        except Exception as e:
+            errors.append(f"user {user_id}: {e}")
+        failed += 1
+
+    rendering.card_cache().flush_stats()
+    with transaction.atomic():
+        done = ExportChunk.objects.filter(
+            id=chunk.id, status="leased", lease_owner=worker_id, job__status__in=ACTIVE_JOB_STATUSES,
+        ).update(
+            status="done", rendered=rendered, failed=failed, error="\n".join(errors),
+            lease_owner="", lease_expires_at=None)
+        if not done:
+            return False
+        ExportJob.objects.filter(id=job.id).update(
+            rendered=F("rendered") + rendered, failed=F("failed") + failed)
+    return True
+
+
+def release_chunk(chunk, worker_id, error):
+    """Give a chunk back after an unexpected error; it fails after MAX_ATTEMPTS."""
+    status = "failed" if chunk.attempts >= MAX_ATTEMPTS else "queued"
+    ExportChunk.objects.filter(id=chunk.id, lease_owner=worker_id).update(
+        status=status, error=error, lease_owner="", lease_expires_at=None)
+    if status == "failed":
+        ExportJob.objects.filter(id=chunk.job_id).update(
+            failed=F("failed") + len(chunk.user_ids))
+
+
+def fail_exhausted_chunks():
+    """Chunks whose last allowed lease expired (worker died MAX_ATTEMPTS times) fail for good."""
+    stale = ExportChunk.objects.filter(
+        status="leased", lease_expires_at__lt=timezone.now(), attempts__gte=MAX_ATTEMPTS)
+    for chunk in stale:
+        if ExportChunk.objects.filter(id=chunk.id, status="leased").update(
+                status="failed", error="lease expired too many times"):
+            ExportJob.objects.filter(id=chunk.job_id).update(failed=F("failed") + len(chunk.user_ids))
+
+
+# =========================
+# ASSEMBLY
+# =========================
+def _claim_assembly(worker_id):
+    """Lease a job whose chunks are all finished (or whose assembler died)."""
+    now = timezone.now()
+    pending = ExportChunk.objects.filter(status__in=("queued", "leased"))
+    candidates = (
+        ExportJob.objects
+        .filter(Q(status="running") | Q(status="assembling", lease_expires_at__lt=now))
+        .exclude(id__in=pending.values("job_id"))
+        .values("id", "status", "lease_expires_at")[:5]
+    )
+    for candidate in candidates:
+        won = ExportJob.objects.filter(
+            id=candidate["id"], status=candidate["status"],
+            lease_expires_at=candidate["lease_expires_at"],
+        ).update(status="assembling", lease_owner=worker_id, lease_expires_at=_lease_deadline())
+        if won:
+            return ExportJob.objects.get(id=candidate["id"])
+    return None
+
+
+def renew_assembly_lease(job, worker_id):
+    renewed = ExportJob.objects.filter(id=job.id, status="assembling", lease_owner=worker_id).update(
+        lease_expires_at=_lease_deadline())
+    return bool(renewed)
+
+
+def output_path(job, ext):
+    # beside the job directory, which is deleted once the download is assembled
+    return export_root() / f"export-{job.id}.{ext}"
+
+
+def _temp_path(path, worker_id):
+    """Where worker_id writes path before renaming it; a worker whose lease expired has its own."""
+    worker = re.sub(r"[^\w.-]", "_", worker_id)
+    return path.with_name(f".{path.name}.{worker}.tmp")
+
+
+def _done_user_ids(job, heartbeat):
+    for chunk in job.chunks.filter(status="done").order_by("index"):
+        for user_id in chunk.user_ids:
+            heartbeat()
+            yield user_id
+
+
+def assemble_zip(job, tmp, heartbeat):
+    """Pack the rendered cards into one archive at tmp."""
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as archive:
+        for user_id in _done_user_ids(job, heartbeat):
+            for side in rendering.SIDES:
+                path = card_path(job, user_id, side)
+                if path.exists():
+                    archive.write(path, path.name)
+
+
+def _jpeg_side(path):
+    if not path.exists():
+        return None
+    with Image.open(path) as img:
+        size = img.size
+    return path.read_bytes(), size[0], size[1]
+
+
+def assemble_pdf(job, tmp, heartbeat):
+    """Stream the rendered JPEGs into one PDF at tmp without holding the run in memory.
+
+    One page per user, or N-up sheets when the job has a layout.
+    """
+    def cards():
+        for user_id in _done_user_ids(job, heartbeat):
+            yield _jpeg_side(card_path(job, user_id, "front")), _jpeg_side(card_path(job, user_id, "back"))
+
+    title = f"ID card export {job.id}"
+    layout = rendering.SheetLayout.from_options(job.layout) if job.layout else None
+    if layout:
+        pages = rendering.stream_imposed_pdf(cards(), layout, title=title)
+    else:
+        pages = rendering.stream_cards_pdf(cards(), dpi=job.dpi, title=title)
+    with open(tmp, "wb") as fh:
+        for data in pages:
+            fh.write(data)
+
+
+ASSEMBLERS = {
+    "pdf": assemble_pdf,
+    "zip": assemble_zip,
+}
+
+
+def assemble_job(job, worker_id):
+    """Assemble a job leased by _claim_assembly, renewing the lease while it runs."""
+    output = output_path(job, job.fmt)
+    tmp = _temp_path(output, worker_id)
+    try:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        ASSEMBLERS[job.fmt](job, tmp, Heartbeat(lambda: renew_assembly_lease(job, worker_id)))
+        if not renew_assembly_lease(job, worker_id):
+            raise LeaseLost()   # don't replace the download of the worker that took over
+        os.replace(tmp, output)
+    except LeaseLost:
+        return   # the worker that took over finishes (and cleans up) the job
+    except Exception as e:
+        updated = ExportJob.objects.filter(id=job.id, lease_owner=worker_id).update(
+            status="failed", error=str(e), lease_owner="", lease_expires_at=None, finished_at=timezone.now())
+    else:
+        failed_chunks = job.chunks.filter(status="failed").count()
+        updated = ExportJob.objects.filter(id=job.id, lease_owner=worker_id).update(
+            status="failed" if failed_chunks else "done",
+            error=f"{failed_chunks} chunk(s) failed" if failed_chunks else "",
+            output=str(output), lease_owner="", lease_expires_at=None, finished_at=timezone.now())
+    finally:
+        tmp.unlink(missing_ok=True)
+    if updated:
+        remove_job_dir(job)
+
+
+# =========================
+# CLEANUP
+# =========================
+def remove_job_dir(job_or_id):
+    """Delete a job's rendered cards (its assembled download lives outside the directory)."""
+    job_id = getattr(job_or_id, "id", job_or_id)
+    shutil.rmtree(export_root() / f"job-{job_id}", ignore_errors=True)
+
+
+def remove_finished_job_dirs():
+    """Delete directories of cancelled, failed or deleted jobs that no live lease still writes into."""
+    root = export_root()
+    if not root.is_dir():
+        return 0
+    ids = {int(path.name[4:]) for path in root.glob("job-*") if path.name[4:].isdigit()}
+    if not ids:
+        return 0
+    busy = ExportChunk.objects.filter(job_id__in=ids, status="leased", lease_expires_at__gte=timezone.now())
+    keep = set(
+        ExportJob.objects.filter(id__in=ids)
+        .filter(Q(status__in=ACTIVE_JOB_STATUSES + ("assembling",)) | Q(id__in=busy.values("job_id")))
+        .values_list("id", flat=True)
+    )
+    for job_id in ids - keep:
+        remove_job_dir(job_id)
+    return len(ids - keep)
+
+
+# =========================
+# WORKER LOOP
+# =========================
+def work_once(worker_id):
+    """Do one unit of work. Returns False when there was nothing to do."""
+    chunk = claim_chunk(worker_id)
+    if chunk is not None:
+        try:
+            process_chunk(chunk, worker_id)
+        except Exception:
+            release_chunk(chunk, worker_id, traceback.format_exc())
+        return True
+
+    fail_exhausted_chunks()
+    job = _claim_assembly(worker_id)
+    if job is not None:
+        assemble_job(job, worker_id)
+        return True
+    remove_finished_job_dirs()
+    return False
+
+
+def run_worker(worker_id=None, poll_interval=2.0, stop=None, once=False):
+    """Process chunks until stop() returns True (or the queue is empty with once=True)."""
+    worker_id = worker_id or make_worker_id()
+    stop = stop or (lambda: False)
+    while not stop():
+        if work_once(worker_id):
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
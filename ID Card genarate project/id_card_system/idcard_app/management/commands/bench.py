@@ -0,0 +1,368 @@
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+
+SCHEMA = 1
+EXPORT_REPEAT = 3
+SLOWER = 1.10   # --compare flags p50s that got this much slower
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of sorted samples."""
+    return samples[max(0, min(len(samples) - 1, math.ceil(q * len(samples)) - 1))]
+
+
+def summarize(name, samples, items=1, **extra):
+    """JSON result for a benchmark from per-iteration seconds; throughput counts items per second."""
+    samples = sorted(samples)
+    total = sum(samples)
+    ms = lambda seconds: round(seconds * 1000, 3)  # noqa: E731
+    return {
+        "name": name,
+        "iterations": len(samples),
+        "items_per_iteration": items,
+        "throughput_per_s": round(len(samples) * items / total, 2) if total else None,
+        "mean_ms": ms(total / len(samples)),
+        "p50_ms": ms(percentile(samples, 0.50)),
+        "p95_ms": ms(percentile(samples, 0.95)),
+        "p99_ms": ms(percentile(samples, 0.99)),
+        "min_ms": ms(samples[0]),
+        "max_ms": ms(samples[-1]),
+        **extra,
+    }
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the hot paths on a synthetic organisation in a scratch database and media "
+        "directory: user list APIs, the Generate ID page, template fetches, card rendering per "
+        "element type and per template, PDF/ZIP exports and background removal. Prints JSON "
+        "with throughput and p50/p95/p99 per benchmark; --compare an earlier result to spot "
+        "regressions between commits on the same machine."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000, help="Synthetic users (default 2000).")
+        parser.add_argument("--departments", type=int, default=15, help="Departments they are spread over (default 15).")
+        parser.add_argument("--photos", type=int, default=200,
+                            help="Users given a generated photo and signature (default 200).")
+        parser.add_argument("--repeat", type=int, default=30, help="Timed iterations per benchmark (default 30).")
+        parser.add_argument("--export-users", type=int, default=100,
+                            help="Users per timed PDF/ZIP export (default 100).")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data (default 0).")
+        parser.add_argument("--only", default="", help="Comma-separated name prefixes of benchmarks to run.")
+        parser.add_argument("--output", help="Write the JSON here instead of stdout.")
+        parser.add_argument("--compare", help="An earlier --output file to compare p50s against.")
+
+    # =========================
+    # SETUP
+    # =========================
+    @contextmanager
+    def scratch_environment(self):
+        """A throwaway database, media root, caches and export directory for the run."""
+        scratch = Path(tempfile.mkdtemp(prefix="idcard-bench-"))
+        overrides = override_settings(
+            MEDIA_ROOT=scratch / "media",
+            RENDER_CACHE_DIR=scratch / "render",
+            EXPORT_ROOT=scratch / "exports",
+            METRICS_DIR=scratch / "metrics",
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        )
+        if connection.vendor == "sqlite":
+            # a file rather than the in-memory test database, so I/O is what production sees
+            connection.settings_dict.setdefault("TEST", {})["NAME"] = str(scratch / "bench.sqlite3")
+        overrides.enable()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield scratch
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            overrides.disable()
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def build_org(self, options):
+        from idcard_app import synthetic
+        from idcard_app.models import User
+
+        begun = time.perf_counter()
+        departments = synthetic.department_names(options["departments"])
+        run_id = synthetic.create_users(options["users"], seed=options["seed"], departments=departments)
+        holders = list(User.objects.filter(username__startswith=f"syn-{run_id}-", roll_no__isnull=False)
+                       .order_by("username").values_list("id", flat=True))
+        attach_images = synthetic.attach_images(holders[:options["photos"]], seed=options["seed"])
+        templates = synthetic.create_templates(seed=options["seed"])
+        admin = User.objects.create_user(username="bench-admin", email="bench-admin@example.org",
+                                         password="bench", role="admin")
+        self.stderr.write(f"Synthetic org: {options['users']} users, {len(departments)} departments, "
+                          f"{attach_images} images, {len(templates)} templates "
+                          f"({time.perf_counter() - begun:.1f} s)")
+        return admin, holders, templates
+
+    # =========================
+    # TIMING
+    # =========================
+    def wanted(self, name):
+        return not self.only or any(name.startswith(prefix) for prefix in self.only)
+
+    def measure(self, name, fn, repeat=None, items=1, warmup=1, **extra):
+        """Time fn() repeat times after warmup calls and record the summary."""
+        if not self.wanted(name):
+            return
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(repeat or self.repeat):
+            begun = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - begun)
+        result = summarize(name, samples, items, **extra)
+        self.results.append(result)
+        self.stderr.write(f"{name:<40} p50 {result['p50_ms']:>9.2f} ms  p95 {result['p95_ms']:>9.2f} ms  "
+                          f"{result['throughput_per_s']:>9.1f}/s")
+
+    def skip(self, name, reason):
+        if self.wanted(name):
+            self.results.append({"name": name, "skipped": reason})
+            self.stderr.write(f"{name:<40} skipped: {reason}")
+
+    def get(self, client, url, status=200, **headers):
+        def fetch():
+            response = client.get(url, **headers)
+            if response.status_code != status:
+                raise CommandError(f"GET {url} answered {response.status_code}, expected {status}")
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            return response
+        return fetch
+
+    # =========================
+    # BENCHMARKS
+    # =========================
+    def bench_users(self, client):
+        url = reverse("get_users_json")
+        self.measure("users.api.first_page", self.get(client, url))
+        self.measure("users.api.first_page_no_total", self.get(client, url + "?total=0"))
+        self.measure("users.api.filtered", self.get(client, url + "?holders=1&department=Physics"))
+        self.measure("users.api.search", self.get(client, url + "?q=Sharma"))
+        cursor = None
+        for _ in range(5):   # a page well inside the list
+            page = json.loads(client.get(url, {"cursor": cursor} if cursor else {}).content)
+            cursor = page.get("next_cursor") or cursor
+        self.measure("users.api.deep_page", self.get(client, f"{url}?cursor={cursor}"))
+        self.measure("users.manage_page", self.get(client, reverse("manage_users")))
+
+    def bench_pages(self, client, template):
+        self.measure("generate_id.page", self.get(client, reverse("generate_id_card")))
+        self.measure("templates.list", self.get(client, reverse("get_id_templates")))
+        detail = reverse("get_id_template_detail", args=[template.id])
+        self.measure("templates.detail", self.get(client, detail))
+        etag = client.get(detail).get("ETag")
+        if etag:
+            self.measure("templates.detail.revalidated", self.get(client, detail, status=304, HTTP_IF_NONE_MATCH=etag))
+        self.measure("templates.bundle", self.get(client, reverse("get_render_bundle", args=[template.id])))
+        self.measure("templates.thumbnail", self.get(client, reverse("get_id_template_thumbnail", args=[template.id])))
+
+    def bench_elements(self, users, dpi=300):
+        """Drawing cost of each element type alone, on a copy of a blank card."""
+        from idcard_app import rendering, synthetic
+        from idcard_app.rendering.engine import BASE_DPI, RenderContext, draw_elements, new_canvas
+
+        width, height, bg = rendering.card_size({})
+        scale = dpi / BASE_DPI
+        blank = new_canvas(width, height, bg, scale)
+        for kind, el in synthetic.element_samples(self.seed).items():
+            sizes = {}
+            if kind in ("photo", "signature"):
+                sizes = {kind: (round(el["w"] * scale), round(el["h"] * scale))}
+            prepared = [(rendering.user_context(user), rendering.load_user_images(user, sizes) if sizes else {})
+                        for user in users]
+            state = {"i": 0}
+
+            def draw(el=el, prepared=prepared, state=state):
+                ctx, images = prepared[state["i"] % len(prepared)]
+                state["i"] += 1
+                draw_elements(blank.copy(), [el], RenderContext(width, height, scale, ctx, images))
+
+            self.measure(f"render.element.{kind}", draw, repeat=self.repeat * 3, dpi=dpi)
+
+    def bench_cards(self, templates, users, dpi=300):
+        """A whole side per user (draw and encode), with the card cache off."""
+        from idcard_app import rendering
+
+        for name, template in templates.items():
+            data = template.template_json
+            content_hash = rendering.template_hash(data)
+            compiled = rendering.compile_side(data, "front", dpi, template.id, content_hash)
+            for fmt in ("PNG", "JPEG"):
+                state = {"i": 0}
+
+                def render(compiled=compiled, content_hash=content_hash, fmt=fmt, state=state):
+                    user = users[state["i"] % len(users)]
+                    state["i"] += 1
+                    rendering.render_side_encoded(compiled, content_hash, "front", user, fmt, dpi)
+
+                with self.card_cache_off():
+                    self.measure(f"render.card.{name}.{fmt.lower()}", render, dpi=dpi)
+
+    def bench_exports(self, client, template, holders):
+        users = ",".join(str(i) for i in holders[:self.export_users])
+        count = min(len(holders), self.export_users)
+        # (name, view, parameters, whether finished sides come from the card cache)
+        exports = [
+            ("export.pdf.vector", "export_cards_pdf", {}, False),
+            ("export.pdf.a4_sheets", "export_cards_pdf", {"paper": "a4"}, False),
+            ("export.pdf.raster", "export_cards_pdf", {"render": "raster"}, True),
+            ("export.zip.png", "export_cards_zip", {"dpi": "300"}, True),
+        ]
+        for name, view, params, cached in exports:
+            url = reverse(view, args=[template.id])
+
+            def export(url=url, params=params):
+                response = client.post(url, {"users": users, **params})
+                if response.status_code != 200:
+                    raise CommandError(f"POST {url} answered {response.status_code}")
+                for _ in response.streaming_content:
+                    pass
+
+            if not cached:
+                self.measure(name, export, repeat=EXPORT_REPEAT, items=count, unit="users")
+                continue
+            # cold: every card rendered; warm: every side read back from the card cache
+            with self.card_cache_off():
+                self.measure(f"{name}.cold", export, repeat=EXPORT_REPEAT, warmup=0, items=count, unit="users")
+            self.measure(f"{name}.warm", export, repeat=EXPORT_REPEAT, items=count, unit="users")
+
+    def bench_background_removal(self, holders):
+        from idcard_app import imaging
+        from idcard_app.models import User
+
+        name = "imaging.background_removal"
+        try:
+            import rembg  # noqa: F401
+        except ImportError:
+            return self.skip(name, "rembg is not installed")
+        photos = [user.photo for user in User.objects.filter(id__in=holders[:5]).exclude(photo="")]
+        if not photos:
+            return self.skip(name, "no user has a photo (--photos 0)")
+        originals = []
+        for photo in photos:
+            with photo.open("rb") as fh:
+                originals.append(fh.read())
+        imaging.rembg_session()   # loading the model is a one-off per process
+        state = {"i": 0}
+
+        def remove():
+            imaging.remove_background(originals[state["i"] % len(originals)])
+            state["i"] += 1
+
+        self.measure(name, remove, repeat=max(3, self.repeat // 3))
+
+    @contextmanager
+    def card_cache_off(self):
+        from idcard_app import rendering
+
+        cache = rendering.card_cache()
+        budget, cache.max_bytes = cache.max_bytes, 0
+        try:
+            yield
+        finally:
+            cache.max_bytes = budget
+
+    # =========================
+    # REPORT
+    # =========================
+    def compare(self, path, report):
+        try:
+            earlier = json.loads(Path(path).read_text())
+            baseline = {r["name"]: r for r in earlier["results"]}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        for key in ("options", "machine"):
+            if earlier.get(key) != report[key]:
+                self.stderr.write(f"Warning: {key} differ from {path}; the numbers are not comparable")
+        self.stderr.write(f"\n{'benchmark':<40} {'base p50':>10} {'p50':>10} {'change':>8}")
+        for result in report["results"]:
+            base = baseline.get(result["name"])
+            if not base or "p50_ms" not in base or "p50_ms" not in result:
+                continue
+            ratio = result["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1
+            flag = "  slower" if ratio >= SLOWER else ""
+            self.stderr.write(f"{result['name']:<40} {base['p50_ms']:>10.2f} {result['p50_ms']:>10.2f} "
+                              f"{(ratio - 1) * 100:>+7.1f}%{flag}")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["repeat"] < 1 or options["export_users"] < 1:
+            raise CommandError("--users, --repeat and --export-users must be at least 1")
+        self.repeat = options["repeat"]
+        self.export_users = options["export_users"]
+        self.seed = options["seed"]
+        self.only = [p.strip() for p in options["only"].split(",") if p.strip()]
+        self.results = []
+
+        with self.scratch_environment():
+            from idcard_app.models import User
+
+            admin, holders, templates = self.build_org(options)
+            client = Client()
+            client.force_login(admin)
+            sample = list(User.objects.filter(id__in=holders[:max(options["photos"], 50)]))
+            full = templates["full"]
+
+            self.bench_users(client)
+            self.bench_pages(client, full)
+            self.bench_elements(sample)
+            self.bench_cards(templates, sample)
+            self.bench_exports(client, full, holders)
+            self.bench_background_removal(holders)
+            vendor = connection.vendor
+
+        report = {
+            "schema": SCHEMA,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "machine": {
+                "platform": platform.platform(),
+                "python": sys.version.split()[0],
+                "django": django.get_version(),
+                "cpus": os.cpu_count(),
+                "database": vendor,
+            },
+            "options": {key: options[key] for key in
+                        ("users", "departments", "photos", "repeat", "export_users", "seed", "only")},
+            "results": self.results,
+        }
+        text = json.dumps(report, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(text + "\n")
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+        if options["compare"]:
+            self.compare(options["compare"], report)
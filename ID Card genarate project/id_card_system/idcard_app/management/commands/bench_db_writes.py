@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+BENCH_ALIAS = "bench"
+USERS = 2000
+
+# SQLite as Django configures it out of the box: rollback journal, full fsync on
+# every commit, deferred transactions and the sqlite3 module's 5 s busy timeout
+SQLITE_STOCK_PRAGMAS = {"journal_mode": "DELETE", "synchronous": "FULL", "busy_timeout": 5000}
+
+
+def _register(alias, database):
+    databases = {"default": connections.settings["default"], alias: dict(database)}
+    connections.settings[alias] = connections.configure_settings(databases)[alias]
+
+
+def _worker(args):
+    """Save profiles as fast as possible between start and stop; returns (latencies, lock errors)."""
+    alias, database, pragmas, user_ids, start, stop, seed = args
+    # under the "spawn" start method the child starts without Django loaded
+    django.setup()
+    from django.db import OperationalError, close_old_connections, transaction
+    from idcard_app.models import User
+
+    settings.SQLITE_PRAGMAS = pragmas
+    _register(alias, database)
+    rng = random.Random(seed)
+    latencies, locked = [], 0
+    time.sleep(max(0, start - time.time()))
+    while time.time() < stop:
+        # what a request does: reuse or reopen the connection per CONN_MAX_AGE/pool, then read and save
+        close_old_connections()
+        begun = time.perf_counter()
+        try:
+            with transaction.atomic(using=alias):
+                user = User.objects.using(alias).get(pk=rng.choice(user_ids))
+                user.phone = f"9{rng.randint(100000000, 999999999)}"
+                user.address = f"{rng.randint(1, 999)} Hostel Road"
+                user.save(using=alias, update_fields=["phone", "address"])
+        except OperationalError as e:
+            if "locked" not in str(e) and "busy" not in str(e):
+                raise
+            locked += 1
+        else:
+            latencies.append(time.perf_counter() - begun)
+    close_old_connections()
+    connections.close_all()
+    return latencies, locked
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure profile-save throughput with N concurrent worker processes for each database "
+        "option: stock SQLite, tuned SQLite (WAL, settings.SQLITE_PRAGMAS) and the configured "
+        "default database (e.g. PostgreSQL from DB_ENGINE). SQLite runs use scratch files; the "
+        "default database gets temporary synthetic users that are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", default="1,2,4,8",
+                            help="Comma-separated worker counts to try (default 1,2,4,8).")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run (default 5).")
+        parser.add_argument("--modes", default="sqlite-stock,sqlite-wal,default",
+                            help="Comma-separated: sqlite-stock, sqlite-wal, default.")
+
+    def sqlite_database(self, path, tuned):
+        options = {}
+        default = settings.DATABASES["default"]
+        if tuned and default["ENGINE"].endswith("sqlite3"):
+            options = dict(default.get("OPTIONS", {}))
+        elif tuned and django.VERSION >= (5, 1):
+            options = {"transaction_mode": "IMMEDIATE"}
+        return {"ENGINE": "django.db.backends.sqlite3", "NAME": path, "OPTIONS": options}
+
+    def prepare(self, mode, scratch):
+        """(alias, database settings, pragmas, user ids, cleanup) for a mode."""
+        from idcard_app import synthetic
+        from idcard_app.models import User
+
+        if mode == "default":
+            run_id = synthetic.create_users(USERS)
+            ids = list(User.objects.filter(username__startswith=f"syn-{run_id}-").values_list("id", flat=True))
+            return "default", settings.DATABASES["default"], getattr(settings, "SQLITE_PRAGMAS", {}), ids, \
+                lambda: synthetic.delete_users(run_id)
+
+        tuned = mode == "sqlite-wal"
+        pragmas = getattr(settings, "SQLITE_PRAGMAS", {}) if tuned else SQLITE_STOCK_PRAGMAS
+        alias = f"{BENCH_ALIAS}_{mode.replace('-', '_')}"
+        database = self.sqlite_database(os.path.join(scratch, f"{mode}.sqlite3"), tuned)
+        settings.SQLITE_PRAGMAS = pragmas
+        _register(alias, database)
+        call_command("migrate", database=alias, verbosity=0)
+        User.objects.using(alias).bulk_create(synthetic.synthetic_users(USERS), batch_size=500)
+        ids = list(User.objects.using(alias).values_list("id", flat=True))
+        connections[alias].close()
+        return alias, database, pragmas, ids, lambda: None
+
+    def run(self, alias, database, pragmas, ids, workers, seconds):
+        # children must open their own database connections
+        connections.close_all()
+        start = time.time() + 1.0 + 0.2 * workers   # time for every worker to start up
+        stop = start + seconds
+        tasks = [(alias, database, pragmas, ids, start, stop, seed) for seed in range(workers)]
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_worker, tasks)
+        latencies = sorted(t for worker_latencies, _ in results for t in worker_latencies)
+        locked = sum(errors for _, errors in results)
+        return latencies, locked
+
+    def handle(self, *args, **options):
+        try:
+            worker_counts = [int(n) for n in options["workers"].split(",")]
+        except ValueError:
+            raise CommandError("--workers takes comma-separated integers")
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - {"sqlite-stock", "sqlite-wal", "default"}
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+        configured_pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+        scratch = tempfile.mkdtemp(prefix="bench_db_writes-")
+        self.stdout.write(f"{'mode':<18} {'workers':>7} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'locked':>7}")
+        try:
+            for mode in modes:
+                label = mode if mode != "default" else f"default ({connections['default'].vendor})"
+                alias, database, pragmas, ids, cleanup = self.prepare(mode, scratch)
+                try:
+                    for workers in worker_counts:
+                        latencies, locked = self.run(alias, database, pragmas, ids, workers, options["seconds"])
+                        p50 = statistics.median(latencies) * 1000 if latencies else 0
+                        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000 if latencies else 0
+                        self.stdout.write(
+                            f"{label:<18} {workers:>7} {len(latencies) / options['seconds']:>9.0f} "
+                            f"{p50:>8.1f} {p95:>8.1f} {locked:>7}"
+                        )
+                finally:
+                    settings.SQLITE_PRAGMAS = configured_pragmas
+                    cleanup()
+        finally:
+            connections.close_all()
+            shutil.rmtree(scratch, ignore_errors=True)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from idcard_app import imaging
+from idcard_app.models import User
+
+
+class Command(BaseCommand):
+    help = "Build card/preview/avatar derivatives for photos and signatures uploaded before they existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        force = options["force"]
+        has_upload = Q()
+        for field in imaging.IMAGE_FIELDS:
+            has_upload |= ~Q(**{field: ""}) & Q(**{f"{field}__isnull": False})
+
+        built = skipped = failed = 0
+        for user in User.objects.filter(has_upload).only("id", *imaging.IMAGE_FIELDS).iterator(chunk_size=200):
+            for field in imaging.IMAGE_FIELDS:
+                fieldfile = getattr(user, field)
+                if not fieldfile:
+                    continue
+                if not force and imaging.derivative_for(fieldfile, imaging.DERIVATIVE_SIZES[-1][0], fieldfile.storage):
+                    skipped += 1
+                    continue
+                if imaging.process_upload(user, field):
+                    built += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f"user {user.id}: could not read {field} {fieldfile.name}")
+
+        self.stdout.write(self.style.SUCCESS(f"Built {built}, skipped {skipped}, failed {failed}"))
@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.functions import Lower
+from django.http import QueryDict
+
+from idcard_app import synthetic, views
+from idcard_app.models import IDTemplate, TemplateDesign, User
+from idcard_app.pagination import after
+
+
+# the partial card-holder index, or the unique username index when the planner
+# decides filtering ~90% card holders in username order is cheaper
+HOLDER_INDEXES = ("user_card_holder_idx", "sqlite_autoindex_idcard_app_user_1", "idcard_app_user_username_key")
+
+
+def plan_checks():
+    """(name, queryset, acceptable indexes) for every list/lookup access path."""
+    keyset = views.USER_ORDERINGS["username"]
+    holders = views.card_holders()
+    middle = holders.order_by(*keyset).values_list(*keyset)[holders.count() // 2]
+    today = date.today()
+
+    def listing(params=""):
+        return views.filter_users(holders, QueryDict(params)).order_by(*keyset)
+
+    return [
+        ("manage_users first page", listing()[:51], HOLDER_INDEXES),
+        ("manage_users deep page", listing().filter(after(keyset, middle))[:51], HOLDER_INDEXES),
+        ("users api ?role=", views.filter_users(User.objects.all(), QueryDict("role=student"))
+            .order_by(*keyset)[:101], ("user_role_username_idx",)),
+        ("users api ?holders=1&department=", listing("department=Physics")[:101],
+            ("user_dept_username_idx",) + HOLDER_INDEXES),
+        ("users api ?holders=1&residence_status=", listing("residence_status=international")[:101],
+            ("user_residence_username_idx",) + HOLDER_INDEXES),
+        ("users api ?order=date_joined", User.objects.order_by(*views.USER_ORDERINGS["date_joined"])[:101],
+            ("user_date_joined_idx",)),
+        ("users api ?order=-date_joined", User.objects.order_by(*views.USER_ORDERINGS["-date_joined"])[:101],
+            ("user_date_joined_idx",)),
+        ("admin_dashboard recent users", User.objects.order_by("-date_joined")[:5], ("user_date_joined_idx",)),
+        ("admin_dashboard admin count", User.objects.filter(is_superuser=True).values("id"),
+            ("user_superuser_idx",)),
+        ("EmailBackend email lookup", User.objects.alias(email_lower=Lower("email"))
+            .filter(email_lower="someone@example.org")[:2], ("user_email_lower_idx",)),
+        ("roll_no lookup", User.objects.filter(roll_no="R000000001"), ("user_roll_no_idx",)),
+        ("expiring cards", User.objects.filter(valid_upto__isnull=False, valid_upto__lte=today + timedelta(days=30))
+            .order_by("valid_upto")[:100], ("user_valid_upto_idx",)),
+        ("streamed PDF export (all holders)", holders.order_by("username"), HOLDER_INDEXES),
+        ("list_designs", TemplateDesign.objects.order_by("-updated_at")[:50], ("design_updated_idx",)),
+        ("template catalog", IDTemplate.objects.order_by("-id").values("id", "name", "created_at"),
+            ("_pkey", f"SCAN {IDTemplate._meta.db_table}")),
+    ]
+
+
+def uses_index(plan, indexes):
+    """True if the plan reads through one of indexes without a full scan or a full sort."""
+    if "Seq Scan" in plan or "USE TEMP B-TREE FOR ORDER BY" in plan:
+        return False
+    return any(name in plan for name in indexes)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every user/template list query against a synthetic organisation and fail if any "
+        "of them is not answered by an index. Runs in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000, help="Synthetic users to add (default 100000).")
+        parser.add_argument("--templates", type=int, default=2_000, help="Synthetic templates/designs to add.")
+        parser.add_argument("--keep", action="store_true", help="Commit the synthetic rows instead of rolling back.")
+
+    def handle(self, *args, **options):
+        failed = []
+        with transaction.atomic():
+            self.stdout.write(f"Adding {options['users']} users and {options['templates']} templates...")
+            synthetic.create_users(options["users"])
+            IDTemplate.objects.bulk_create(
+                IDTemplate(name=f"syn-{i}", template_json={}) for i in range(options["templates"]))
+            TemplateDesign.objects.bulk_create(
+                TemplateDesign(name=f"syn-{i}", json_data="{}") for i in range(options["templates"]))
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            for name, queryset, indexes in plan_checks():
+                plan = queryset.explain()
+                ok = uses_index(plan, indexes)
+                if not ok:
+                    failed.append(name)
+                status = self.style.SUCCESS("index") if ok else self.style.ERROR("NO INDEX")
+                self.stdout.write(f"{status:>20}  {name}")
+                if not ok or options["verbosity"] > 1:
+                    self.stdout.write("    " + plan.replace("\n", "\n    "))
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+        if failed:
+            raise CommandError(f"{len(failed)} queries without an index: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"All queries use an index ({connection.vendor})"))
@@ -0,0 +1,65 @@
+import os
+import time
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from idcard_app import photo_import
+
+
+class Command(BaseCommand):
+    help = (
+        "Attach photos and signatures from a ZIP archive to users, matching file names to roll "
+        "numbers or emails. Files in a signatures/ folder or named <key>_sign.* are signatures. "
+        "Unmatched files are listed at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="A .zip archive.")
+        parser.add_argument("--field", choices=photo_import.FIELDS, default="auto",
+                            help="Treat every file as a photo or a signature instead of guessing from its name.")
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                            help="Image processing workers (default: one per CPU).")
+        parser.add_argument("--dry-run", action="store_true", help="Only match files to users; change nothing.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+
+        started = time.monotonic()
+
+        def progress(done, matched):
+            if done % 500 == 0:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{done}/{matched}+ images ({done / elapsed:.1f}/s)")
+
+        try:
+            with open(path, "rb") as fileobj:
+                report = photo_import.import_archive(
+                    fileobj, field=options["field"], processes=options["processes"],
+                    dry_run=options["dry_run"], progress=progress,
+                )
+        except zipfile.BadZipFile as e:
+            raise CommandError(f"{path}: {e}")
+        elapsed = time.monotonic() - started
+
+        for title, names in (("Unmatched", report.unmatched), ("Matches several users", report.ambiguous),
+                             ("Duplicate for the same user", report.duplicates), ("Not an image", report.skipped)):
+            if names:
+                self.stdout.write(f"{title} ({len(names)}):")
+                for name in names:
+                    self.stdout.write(f"  {name}")
+        for name, error in report.failed:
+            self.stderr.write(f"{name}: {error}")
+
+        if options["dry_run"]:
+            summary = f"{report.entries} files: {report.matched} matched, {len(report.unmatched)} unmatched (dry run)"
+        else:
+            summary = (
+                f"{report.entries} files in {elapsed:.1f}s: {report.imported['photo']} photos and "
+                f"{report.imported['signature']} signatures imported, {len(report.unmatched)} unmatched, "
+                f"{len(report.failed)} failed"
+            )
+        problems = report.failed or report.unmatched or report.ambiguous
+        self.stdout.write(self.style.WARNING(summary) if problems else self.style.SUCCESS(summary))
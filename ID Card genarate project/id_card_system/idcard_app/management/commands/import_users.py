@@ -0,0 +1,53 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from idcard_app import importing
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update users from a CSV or XLSX file, matched by email. The header row names "
+        "the columns (email is required; see idcard_app.importing.COLUMNS). Bad rows are reported "
+        "and skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="A .csv or .xlsx file.")
+        parser.add_argument("--batch-size", type=int, default=importing.BATCH_SIZE,
+                            help=f"Rows per transaction (default {importing.BATCH_SIZE}).")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="Password hashing threads (default: one per CPU, at most 8).")
+        parser.add_argument("--default-password",
+                            help="Password for new users whose row has none (default: unusable).")
+        parser.add_argument("--dry-run", action="store_true", help="Validate every row but save nothing.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if not os.path.isfile(path):
+            raise CommandError(f"No such file: {path}")
+
+        started = time.monotonic()
+        try:
+            with open(path, "rb") as fileobj:
+                report = importing.import_file(
+                    fileobj, path,
+                    batch_size=max(1, options["batch_size"]),
+                    workers=options["workers"],
+                    default_password=options["default_password"],
+                    dry_run=options["dry_run"],
+                )
+        except importing.ImportFormatError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+
+        for row, message in report.errors:
+            self.stderr.write(f"row {row}: {message}")
+        summary = (
+            f"{report.rows} rows in {elapsed:.1f}s: {report.created} created, "
+            f"{report.updated} updated, {report.failed} failed"
+        )
+        if options["dry_run"]:
+            summary += " (dry run, nothing saved)"
+        self.stdout.write(self.style.WARNING(summary) if report.failed else self.style.SUCCESS(summary))
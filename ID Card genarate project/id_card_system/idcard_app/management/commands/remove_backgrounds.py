@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def _init_worker():
+    # under the "spawn" start method the child starts without Django loaded,
+    # so app modules are only imported after setup()
+    django.setup()
+    from idcard_app import imaging
+
+    # load the model up front, once per worker process
+    imaging.rembg_session()
+
+
+def _cutout(task):
+    """Build one user's cutout in a pool worker. Returns (user_id, status, error)."""
+    from idcard_app import imaging
+    from idcard_app.models import User
+
+    user_id, force = task
+    user = User.objects.filter(id=user_id).only("id", "photo", "photo_hash").first()
+    if user is None or not user.photo:
+        return user_id, "skipped", ""
+    try:
+        if force:
+            imaging.discard_cutout(user.photo_hash, user.photo.storage)
+        elif imaging.cutout_for(user, create=False):
+            return user_id, "skipped", ""  # built by a web worker or another run meanwhile
+        imaging.cutout_for(user)
+    except Exception as e:
+        return user_id, "failed", str(e)
+    return user_id, "built", ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Build background-removed photos for every user that lacks an up-to-date one. "
+        "Safe to interrupt and re-run; finished cutouts are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count() or 1,
+            help="Worker processes, each with its own model session (default: one per CPU).",
+        )
+        parser.add_argument("--limit", type=int, default=0, help="Stop after this many users.")
+        parser.add_argument("--force", action="store_true", help="Rebuild cutouts that already exist.")
+
+    def pending(self, force):
+        """User ids whose photo has no cutout yet (users without a known hash are checked by the workers)."""
+        from idcard_app import imaging
+        from idcard_app.models import User
+
+        users = User.objects.exclude(photo="").exclude(photo__isnull=True).only("id", "photo", "photo_hash")
+        for user in users.order_by("id").iterator(chunk_size=500):
+            if force or not user.photo_hash or not user.photo.storage.exists(imaging.cutout_name(user.photo_hash)):
+                yield user.id
+
+    def handle(self, *args, **options):
+        try:
+            import rembg  # noqa: F401
+        except ImportError:
+            raise CommandError("rembg is not installed (pip install rembg)")
+
+        force = options["force"]
+        user_ids = list(self.pending(force))
+        if options["limit"]:
+            user_ids = user_ids[:options["limit"]]
+        total = len(user_ids)
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Every photo already has a cutout"))
+            return
+
+        processes = max(1, min(options["processes"], total))
+        self.stdout.write(f"Removing backgrounds for {total} users with {processes} processes")
+
+        # children must open their own database connections
+        connections.close_all()
+        counts = {"built": 0, "skipped": 0, "failed": 0}
+        started = time.monotonic()
+        report_every = max(1, min(100, total // 20))
+        with multiprocessing.Pool(processes, initializer=_init_worker) as pool:
+            tasks = ((user_id, force) for user_id in user_ids)
+            for done, (user_id, status, error) in enumerate(pool.imap_unordered(_cutout, tasks, chunksize=4), 1):
+                counts[status] += 1
+                if error:
+                    self.stderr.write(f"user {user_id}: {error}")
+                if done % report_every == 0 or done == total:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f"{done}/{total} ({done / elapsed:.1f} users/s, "
+                        f"{counts['built']} built, {counts['failed']} failed)"
+                    )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {counts['built']}, skipped {counts['skipped']}, failed {counts['failed']} "
+            f"in {elapsed:.1f}s ({counts['built'] / elapsed:.2f} cutouts/s)"
+        ))
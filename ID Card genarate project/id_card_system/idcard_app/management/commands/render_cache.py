@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from idcard_app.rendering import card_cache
+
+
+def _size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Show the rendered-card cache: entries and bytes on disk against the budget "
+        "(RENDER_CARD_CACHE_MAX_BYTES), and hit/miss counts summed over all processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sweep", action="store_true", help="Evict least recently used entries down to the budget.")
+        parser.add_argument("--clear", action="store_true", help="Delete every entry.")
+        parser.add_argument("--reset-stats", action="store_true", help="Zero the hit/miss counters.")
+
+    def handle(self, *args, **options):
+        cache = card_cache()
+        if options["clear"]:
+            self.stdout.write(f"Deleted {cache.clear()} entries")
+        elif options["sweep"]:
+            self.stdout.write(f"Evicted {cache.sweep()} entries")
+        if options["reset_stats"]:
+            cache.reset_stats()
+
+        entries, used = cache.scan()
+        stats = cache.shared_stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = f"{100 * stats['hits'] / lookups:.1f}%" if lookups else "-"
+        budget = _size(cache.max_bytes) if cache.enabled else "disabled"
+        self.stdout.write(f"Directory: {cache.directory}")
+        self.stdout.write(f"Entries:   {entries} ({_size(used)} of {budget})")
+        self.stdout.write(f"Hits:      {stats['hits']}  misses: {stats['misses']}  hit ratio: {ratio}")
+        self.stdout.write(f"Stores:    {stats['stores']}  evictions: {stats['evictions']}")
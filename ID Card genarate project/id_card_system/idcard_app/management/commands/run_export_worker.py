@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import signal
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(poll_interval, once):
+    # under the "spawn" start method the child starts without Django loaded
+    django.setup()
+    from idcard_app import jobs
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *args: stopping.append(True))
+    jobs.run_worker(poll_interval=poll_interval, stop=lambda: bool(stopping), once=once)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Process queued card export jobs. Run on as many nodes as needed; they share the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count() or 1,
+            help="Worker processes to start on this node (default: one per CPU).",
+        )
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--once", action="store_true", help="Exit when there is no work left.")
+
+    def handle(self, *args, **options):
+        processes = max(1, options["processes"])
+        poll, once = options["poll"], options["once"]
+
+        if processes == 1:
+            self.stdout.write("Export worker started (1 process)")
+            _worker_main(poll, once)
+            return
+
+        # children must open their own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_worker_main, args=(poll, once), daemon=False)
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Export worker started ({processes} processes)")
+
+        def forward(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    os.kill(worker.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, forward)
+        signal.signal(signal.SIGINT, forward)
+        for worker in workers:
+            worker.join()
@@ -0,0 +1,419 @@
+"""Prometheus metrics shared by every worker process on the host.
+
+Each process counts into its own memory and writes its totals to
+METRICS_DIR/<pid>.json (atomically, at most every FLUSH_SECONDS and at exit).
+The /metrics view adds up the files of every process, so counters and
+histograms stay correct across gunicorn workers, export workers and
+restarted processes, as with prometheus_client's multiprocess mode.
+
+The files of finished processes are folded into METRICS_DIR/finished.json
+and deleted, when a process starts and before each scrape: totals never go
+backwards when a new process gets the pid of a finished one, and a scrape
+reads one file per live process plus that one. Folding needs POSIX (flock,
+signal 0); elsewhere a process carries on from a file with its pid.
+
+Recorded here:
+
+    MetricsMiddleware   latency, response size, SQL query count and time
+                        per request, labelled with the URL name; for
+                        streamed responses once the stream is finished
+    record_query        every SQL statement (installed on each connection
+                        by signals.py)
+    the renderer        time per stage (compile, draw, encode) and card
+                        cache lookups
+    imaging             background removals and how long they took
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:   # Windows
+    fcntl = None
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+FLUSH_SECONDS = 1.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))   # 1 KB .. 1 GB
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+FINISHED_NAME = "finished.json"
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_local = threading.local()
+
+
+def metrics_dir():
+    return Path(getattr(settings, "METRICS_DIR", Path(settings.BASE_DIR) / "cache" / "metrics"))
+
+
+# =========================
+# METRICS
+# =========================
+REGISTRY = {}
+
+
+class Metric:
+    """A counter or histogram; its values live in the process store below."""
+
+    def __init__(self, kind, name, help, labels=(), buckets=None):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) if buckets else None
+        REGISTRY[name] = self
+
+    def _key(self, labels):
+        return self.name, tuple(str(labels[label]) for label in self.labels)
+
+    def inc(self, amount=1, **labels):
+        _store.add(self._key(labels), amount)
+
+    def observe(self, value, **labels):
+        _store.observe(self._key(labels), self.buckets, value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with block took, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+def counter(name, help, labels=()):
+    return Metric("counter", name, help, labels)
+
+
+def histogram(name, help, labels=(), buckets=LATENCY_BUCKETS):
+    return Metric("histogram", name, help, labels, buckets)
+
+
+HTTP_REQUESTS = counter(
+    "idcard_http_requests_total", "Requests answered, by URL name, method and status.",
+    ("view", "method", "status"))
+HTTP_LATENCY = histogram(
+    "idcard_http_request_duration_seconds", "Time to answer a request (streams: until sent), by URL name.",
+    ("view", "method"))
+HTTP_SIZE = histogram(
+    "idcard_http_response_size_bytes", "Response body size, by URL name.", ("view",), SIZE_BUCKETS)
+HTTP_EXCEPTIONS = counter(
+    "idcard_http_exceptions_total", "Exceptions raised out of a view, by URL name and type.", ("view", "exception"))
+REQUEST_QUERIES = histogram(
+    "idcard_http_request_queries", "SQL statements run for one request, by URL name.", ("view",), COUNT_BUCKETS)
+REQUEST_QUERY_TIME = histogram(
+    "idcard_http_request_query_seconds", "Time spent in SQL for one request, by URL name.", ("view",))
+QUERY_TIME = histogram(
+    "idcard_db_query_duration_seconds", "Time of one SQL statement, by kind.", ("operation",), QUERY_BUCKETS)
+RENDER_STAGE = histogram(
+    "idcard_render_stage_seconds", "Card rendering time by stage (compile, draw, encode).", ("stage",))
+CARD_CACHE = counter(
+    "idcard_card_cache_events_total", "Rendered-card cache hits, misses, stores and evictions.", ("event",))
+BACKGROUND_REMOVALS = counter(
+    "idcard_background_removals_total", "Photo background removals, by result.", ("result",))
+BACKGROUND_REMOVAL_TIME = histogram(
+    "idcard_background_removal_seconds", "Time to cut the background out of one photo.")
+
+
+# =========================
+# PROCESS STORE
+# =========================
+class _Store:
+    """This process's values, written to its own file in metrics_dir()."""
+
+    def __init__(self):
+        self.pid = None
+        self.values = {}   # (name, label values) -> total, or [bucket counts..., +Inf count, sum]
+        self.flushed_at = 0.0
+        self.dirty = False
+        self.closed = False
+
+    def _check_pid(self):
+        # a forked child (gunicorn --preload) must not report its parent's counts
+        pid = os.getpid()
+        if pid != self.pid:
+            self.pid = pid
+            self.values = {}
+            # a file with this pid was left by a finished process
+            if not fold_finished(own=True):
+                for name, labels, value in _read(metrics_dir() / f"{pid}.json"):
+                    self.values[name, tuple(labels)] = value
+
+    def add(self, key, amount):
+        with _lock:
+            self._check_pid()
+            self.values[key] = self.values.get(key, 0) + amount
+            self.dirty = True
+        self._maybe_flush()
+
+    def observe(self, key, buckets, value):
+        with _lock:
+            self._check_pid()
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(buckets) + 1) + [0.0]
+            counts[bisect_left(buckets, value)] += 1
+            counts[-1] += value
+            self.dirty = True
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self.flushed_at >= FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if not _flush_lock.acquire(blocking=False):
+            return   # another thread of this process is writing the file
+        try:
+            with _lock:
+                if not self.dirty or self.closed or self.pid != os.getpid():
+                    return
+                self.dirty = False
+                self.flushed_at = time.monotonic()
+                rows = [[name, list(labels), value if isinstance(value, (int, float)) else list(value)]
+                        for (name, labels), value in self.values.items()]
+            path = metrics_dir() / f"{self.pid}.json"
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                _write(path, rows)
+            except OSError:
+                self.dirty = True   # try again next time; metrics never fail a request
+        finally:
+            _flush_lock.release()
+
+
+_store = _Store()
+atexit.register(_store.flush)
+
+
+def flush():
+    """Write this process's values now (the /metrics view does before reading)."""
+    _store.flush()
+
+
+def close():
+    """Write this process's values a last time and stop writing them.
+
+    The test runner calls this, so the exit-time flush does not land in the
+    real METRICS_DIR once its scratch directory is gone.
+    """
+    _store.flush()
+    _store.closed = True
+
+
+def _read(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except (OSError, ValueError):
+        return []
+
+
+def _write(path, rows):
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(rows, separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True   # someone else's process
+    return True
+
+
+def fold_finished(own=False):
+    """Add the files of finished processes to FINISHED_NAME and delete them.
+
+    own counts this process's pid as finished: called as it starts, before it
+    has written anything. Returns False where folding is not supported.
+    """
+    if fcntl is None:
+        return False
+    directory = metrics_dir()
+    if not directory.is_dir():
+        return True
+    try:
+        with open(directory / ".lock", "a") as lock:
+            # one folder at a time, or two could add the same file twice
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            finished = [
+                path for path in directory.glob("*.json")
+                if path.stem.isdigit() and (int(path.stem) == os.getpid() if own else not _alive(int(path.stem)))
+            ]
+            if finished:
+                target = directory / FINISHED_NAME
+                totals = {}
+                for path in [target] + finished:
+                    _add_rows(totals, _read(path))
+                _write(target, [[name, list(labels), value] for (name, labels), value in totals.items()])
+                for path in finished:
+                    path.unlink(missing_ok=True)
+    except OSError:
+        pass   # metrics never fail a request; the next fold tries again
+    return True
+
+
+# =========================
+# EXPOSITION
+# =========================
+def _add_rows(totals, rows):
+    for name, labels, value in rows:
+        metric = REGISTRY.get(name)
+        if metric is None or len(labels) != len(metric.labels):
+            continue   # written by an older version of this module
+        key = name, tuple(labels)
+        if isinstance(value, list):
+            if len(value) != len(metric.buckets) + 2:
+                continue
+            prev = totals.get(key) or [0] * len(value)
+            totals[key] = [a + b for a, b in zip(prev, value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def collect():
+    """{(name, label values): value} summed over every process file."""
+    totals = {}
+    directory = metrics_dir()
+    if not directory.is_dir():
+        return totals
+    for path in directory.glob("*.json"):
+        _add_rows(totals, _read(path))
+    return totals
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def exposition():
+    """Every metric in the Prometheus text format (version 0.0.4)."""
+    flush()
+    fold_finished()
+    totals = collect()
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for (name, values), value in sorted(totals.items()):
+            if name != metric.name:
+                continue
+            if metric.kind == "counter":
+                lines.append(f"{name}{_labels(metric.labels, values)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{name}_bucket{_labels(metric.labels, values, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labels, values)} {_number(value[-1])}")
+            lines.append(f"{name}_count{_labels(metric.labels, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# =========================
+# SQL
+# =========================
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper timing each statement (and the current request's total)."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        operation = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "OTHER"
+        if operation not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+            operation = "OTHER"
+        QUERY_TIME.observe(elapsed, operation=operation)
+        request = getattr(_local, "request", None)
+        if request is not None:
+            request.queries += 1
+            request.query_seconds += elapsed
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+class _RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    return (match.url_name or match.view_name) if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Times each request and counts its SQL; put it first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = _local.request = _RequestStats()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            _local.request = None
+            raise
+        view = view_label(request)
+        length = response.get("Content-Length")
+        if response.streaming and length is None and not hasattr(response, "file_to_stream"):
+            # measured when the stream ends (or the client goes away)
+            response.streaming_content = self._measured(response.streaming_content, request, response, view, stats)
+        else:
+            size = int(length) if length is not None else len(response.content)
+            self._record(request, response, view, stats, size)
+        return response
+
+    def process_exception(self, request, exception):
+        HTTP_EXCEPTIONS.inc(view=view_label(request), exception=type(exception).__name__)
+
+    def _measured(self, content, request, response, view, stats):
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._record(request, response, view, stats, size)
+
+    def _record(self, request, response, view, stats, size):
+        if getattr(_local, "request", None) is stats:
+            _local.request = None
+        HTTP_REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        HTTP_LATENCY.observe(time.perf_counter() - stats.start, view=view, method=request.method)
+        HTTP_SIZE.observe(size, view=view)
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        REQUEST_QUERY_TIME.observe(stats.query_seconds, view=view)
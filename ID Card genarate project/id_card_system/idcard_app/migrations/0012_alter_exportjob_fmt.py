@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('idcard_app', '0011_exportjob_exportchunk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='fmt',
+            field=models.CharField(choices=[('pdf', 'PDF (Single File)'), ('zip', 'PNG (Zip Archive)')], default='zip', max_length=10),
+        ),
+    ]
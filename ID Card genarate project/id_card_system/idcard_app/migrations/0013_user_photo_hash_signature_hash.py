@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('idcard_app', '0012_alter_exportjob_fmt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='photo_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='signature_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:19
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('idcard_app', '0013_user_photo_hash_signature_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='templatedesign',
+            index=models.Index(fields=['-updated_at'], name='design_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(models.Q(('is_superuser', True), _negated=True), models.Q(('is_staff', True), _negated=True), models.Q(('role__in', ['admin', 'employee', 'staff']), _negated=True)), fields=['username', 'id'], name='user_card_holder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'username', 'id'], name='user_role_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['department', 'username', 'id'], name='user_dept_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['residence_status', 'username', 'id'], name='user_residence_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined', 'id'], name='user_date_joined_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['roll_no'], name='user_roll_no_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('valid_upto__isnull', False)), fields=['valid_upto'], name='user_valid_upto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(('is_superuser', True)), fields=['id'], name='user_superuser_idx'),
+        ),
+    ]
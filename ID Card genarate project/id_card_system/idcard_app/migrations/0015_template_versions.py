@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:56
+
+import hashlib
+import json
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_first_versions(apps, schema_editor):
+    """Version 1 of every existing template, hashed like rendering.template_hash()."""
+    IDTemplate = apps.get_model('idcard_app', 'IDTemplate')
+    TemplateVersion = apps.get_model('idcard_app', 'TemplateVersion')
+    for template in IDTemplate.objects.filter(current_version__isnull=True).iterator():
+        data = template.template_json
+        if not isinstance(data, dict):
+            try:
+                data = json.loads(str(data))
+            except (TypeError, ValueError):
+                data = {}
+            data = data if isinstance(data, dict) else {}
+        digest = hashlib.sha256(
+            json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+        version = TemplateVersion.objects.create(template=template, number=1, hash=digest, template_json=data)
+        IDTemplate.objects.filter(pk=template.pk).update(current_version=version)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('idcard_app', '0014_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TemplateVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('hash', models.CharField(max_length=64)),
+                ('template_json', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versions', to='idcard_app.idtemplate')),
+            ],
+            options={
+                'ordering': ['template', '-number'],
+            },
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='template_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='idcard_app.templateversion'),
+        ),
+        migrations.AddField(
+            model_name='idtemplate',
+            name='current_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='idcard_app.templateversion'),
+        ),
+        migrations.AddConstraint(
+            model_name='templateversion',
+            constraint=models.UniqueConstraint(fields=('template', 'number'), name='unique_template_version_number'),
+        ),
+        migrations.AddConstraint(
+            model_name='templateversion',
+            constraint=models.UniqueConstraint(fields=('template', 'hash'), name='unique_template_version_hash'),
+        ),
+        migrations.RunPython(create_first_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('idcard_app', '0015_template_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exportjob',
+            name='layout',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -1,5 +1,21 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Max
+from django.db.models.functions import Lower
+
+
+# Accounts that get ID cards (everyone but admins and staff). card_holders() and
+# the partial index below use this same Q, so the query planner can match the
+# index predicate against the query's WHERE clause.
+CARD_HOLDER = (
+    ~models.Q(is_superuser=True)
+    & ~models.Q(is_staff=True)
+    & ~models.Q(role__in=["admin", "employee", "staff"])
+)
+
 
 class User(AbstractUser):
     
@@ -38,9 +54,28 @@ class User(AbstractUser):
     valid_upto = models.DateField(null=True, blank=True)
     signature = models.ImageField(upload_to="signatures/", null=True, blank=True)
 
+    # sha256 of the uploaded originals, set when their derivatives are built (see imaging.py)
+    photo_hash = models.CharField(max_length=64, blank=True, default="")
+    signature_hash = models.CharField(max_length=64, blank=True, default="")
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
 
+    class Meta(AbstractUser.Meta):
+        # matched to the list/filter access paths; see manage.py check_query_plans
+        indexes = [
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+            models.Index(fields=["username", "id"], condition=CARD_HOLDER, name="user_card_holder_idx"),
+            models.Index(fields=["role", "username", "id"], name="user_role_username_idx"),
+            models.Index(fields=["department", "username", "id"], name="user_dept_username_idx"),
+            models.Index(fields=["residence_status", "username", "id"], name="user_residence_username_idx"),
+            models.Index(fields=["date_joined", "id"], name="user_date_joined_idx"),
+            models.Index(fields=["roll_no"], name="user_roll_no_idx"),
+            models.Index(fields=["valid_upto"], condition=models.Q(valid_upto__isnull=False),
+                         name="user_valid_upto_idx"),
+            models.Index(fields=["id"], condition=models.Q(is_superuser=True), name="user_superuser_idx"),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -60,9 +95,36 @@ class DashboardSettings(models.Model):
     show_role = models.BooleanField(default=True)
     show_residence_status = models.BooleanField(default=True)
 
+    # Read on every dashboard view but changed rarely: each process keeps the row
+    # and re-reads it only when the version stamp in the shared cache moves.
+    VERSION_KEY = "idcard:dashboard-settings:version"
+    _cached = (None, None)   # (version, row or None)
+
     def __str__(self):
         return "User Dashboard Settings"
 
+    @classmethod
+    def current(cls):
+        """The settings row (or None if none was saved yet); no DB query while unchanged.
+
+        The returned instance is shared by the process, so treat it as read-only.
+        """
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(cls.VERSION_KEY)
+        cached_version, row = cls._cached
+        if version is None or version != cached_version:
+            row = cls.objects.order_by("pk").first()
+            cls._cached = (version, row)
+        return row
+
+    @classmethod
+    def bump_version(cls):
+        """Make every process re-read the row on its next current() call."""
+        cache.set(cls.VERSION_KEY, uuid.uuid4().hex, None)
+        cls._cached = (None, None)
+
 
 class TemplateDesign(models.Model):
     """Stores a saved ID card design (front/back JSON from the designer)."""
@@ -72,16 +134,79 @@ class TemplateDesign(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["-updated_at"], name="design_updated_idx")]
+
     def __str__(self):
         return f"{self.name} ({self.id})"
 class IDTemplate(models.Model):
     name = models.CharField(max_length=200)
-    template_json = models.JSONField()   # stores full canvas data
+    template_json = models.JSONField()   # stores full canvas data (a copy of current_version's)
+    current_version = models.ForeignKey("TemplateVersion", null=True, blank=True,
+                                        on_delete=models.SET_NULL, related_name="+")
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.name
 
+    def save_version(self, template_json, created_by=None):
+        """Make template_json the current version (saving the template if new); returns the TemplateVersion.
+
+        JSON identical to an earlier version makes that version current again
+        rather than adding a new one.
+        """
+        from .rendering import load_template_json, template_hash
+
+        data = load_template_json(template_json)
+        digest = template_hash(data)
+        with transaction.atomic():
+            if self.pk is None:
+                self.template_json = data
+                self.save()
+            else:
+                # serialize concurrent saves of one template (version numbers)
+                IDTemplate.objects.select_for_update().only("pk").get(pk=self.pk)
+            version = self.versions.filter(hash=digest).first()
+            if version is None:
+                number = (self.versions.aggregate(n=Max("number"))["n"] or 0) + 1
+                version = TemplateVersion.objects.create(
+                    template=self, number=number, hash=digest, template_json=data, created_by=created_by)
+            if self.current_version_id != version.id:
+                self.current_version = version
+                self.template_json = data
+                self.save(update_fields=["current_version", "template_json"])
+        return version
+
+
+class TemplateVersion(models.Model):
+    """An immutable revision of an IDTemplate, addressed by the hash of its JSON.
+
+    Render and export URLs that name a version hash always produce the same
+    cards, so their responses can be cached forever, and an ExportJob records
+    the version it printed.
+    """
+    template = models.ForeignKey(IDTemplate, related_name="versions", on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()   # 1, 2, 3... per template
+    hash = models.CharField(max_length=64)   # rendering.template_hash(template_json)
+    template_json = models.JSONField()
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["template", "-number"]
+        constraints = [
+            models.UniqueConstraint(fields=["template", "number"], name="unique_template_version_number"),
+            models.UniqueConstraint(fields=["template", "hash"], name="unique_template_version_hash"),
+        ]
+
+    def __str__(self):
+        return f"{self.template_id} v{self.number} ({self.hash[:12]})"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Template versions are immutable; save a new version instead")
+        super().save(*args, **kwargs)
+
 
 from django.db import models
 from django.contrib.auth import get_user_model
@@ -110,3 +235,85 @@ class SavedTemplate(models.Model):
     def __str__(self):
         return self.name
 
+
+
+class ExportJob(models.Model):
+    """A server-side bulk card export, split into ExportChunk work items."""
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("assembling", "Assembling"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+        ("cancelled", "Cancelled"),
+    )
+
+    FORMAT_CHOICES = (
+        ("pdf", "PDF (Single File)"),
+        ("zip", "PNG (Zip Archive)"),
+    )
+
+    template = models.ForeignKey(IDTemplate, null=True, blank=True, on_delete=models.SET_NULL)
+    template_json = models.JSONField()   # snapshot taken when the job is queued
+    template_version = models.ForeignKey(TemplateVersion, null=True, blank=True, on_delete=models.SET_NULL)
+    fmt = models.CharField(max_length=10, choices=FORMAT_CHOICES, default="zip")
+    include_back = models.BooleanField(default=True)
+    dpi = models.PositiveIntegerField(default=300)
+    # rendering.SheetLayout options for N-up PDF sheets; empty for one card per page
+    layout = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    total = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    output = models.CharField(max_length=500, blank=True, default="")
+
+    # lease for the assembling step, so a crashed assembler is retried
+    lease_owner = models.CharField(max_length=100, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Export {self.id} ({self.status})"
+
+
+class ExportChunk(models.Model):
+    """A batch of users of an ExportJob, leased by one worker at a time."""
+
+    STATUS_CHOICES = (
+        ("queued", "Queued"),
+        ("leased", "Leased"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+        ("cancelled", "Cancelled"),
+    )
+
+    job = models.ForeignKey(ExportJob, related_name="chunks", on_delete=models.CASCADE)
+    index = models.PositiveIntegerField()
+    user_ids = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    lease_owner = models.CharField(max_length=100, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    rendered = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["job", "index"]
+        constraints = [
+            models.UniqueConstraint(fields=["job", "index"], name="unique_export_chunk_index"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "lease_expires_at"], name="export_chunk_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"Export {self.job_id} chunk {self.index} ({self.status})"
@@ -0,0 +1,286 @@
+"""Bulk photo and signature import from ZIP archives.
+
+Studios deliver one ZIP per batch with files named by roll number (or email):
+
+    R2024001.jpg                 -> photo of the user with roll_no R2024001
+    signatures/R2024001.png      -> their signature (or R2024001_sign.png)
+    asha.patil@college.edu.jpg   -> matched by email
+
+The archive's central directory is read up front, so every entry is matched
+against the users table in a few IN queries before any image is decoded.
+Matched entries are then read one at a time and handed to a process pool,
+which normalizes them (EXIF orientation applied, downscaled to MAX_EDGE) and
+stores the result with its derivatives. Web requests use a few threads of
+their own process instead (threads=): forking a pool per upload inside a
+gunicorn worker would start a process per core for every concurrent import.
+At most a few entries per worker are in flight, so memory does not grow with
+the archive. Finally all photo and
+signature columns are written in one transaction with a single executemany;
+like the CSV import this bypasses model signals, so the workers do what the
+post_save handler would (derivatives and content hash).
+"""
+import os
+import posixpath
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.db import connections, transaction
+from django.db.models.functions import Lower
+from PIL import Image, UnidentifiedImageError
+
+# app models are imported inside the functions that need them: pool workers
+# unpickle this module before django.setup() under the spawn/forkserver start methods
+from . import imaging
+
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+# longest edge of the stored original; several times the card derivative
+MAX_EDGE = {"photo": 1280, "signature": 800}
+# entries larger than this (uncompressed) are skipped rather than read into memory
+MAX_ENTRY_BYTES = 40 * 1024 * 1024
+# a directory with one of these names, or a "<key>_<hint>" file name, marks a signature
+SIGNATURE_HINTS = ("signature", "signatures", "sign", "sig")
+FIELDS = ("auto",) + imaging.IMAGE_FIELDS
+
+
+class PhotoImportReport:
+    def __init__(self):
+        self.entries = 0
+        self.matched = 0
+        self.imported = {field: 0 for field in imaging.IMAGE_FIELDS}
+        self.unmatched = []   # entry names with no user
+        self.ambiguous = []   # entry names matching several users
+        self.duplicates = []  # a second file for the same user and field
+        self.skipped = []     # not an image file
+        self.failed = []      # (entry name, error)
+
+    def as_dict(self, max_names=None):
+        def head(names):
+            return names if max_names is None else names[:max_names]
+
+        return {
+            "entries": self.entries,
+            "matched": self.matched,
+            "imported": self.imported,
+            "unmatched": head(self.unmatched),
+            "unmatched_count": len(self.unmatched),
+            "ambiguous": head(self.ambiguous),
+            "duplicates": head(self.duplicates),
+            "skipped": head(self.skipped),
+            "failed": [{"file": name, "error": error} for name, error in head(self.failed)],
+        }
+
+
+def entry_target(name, field="auto"):
+    """(match key, field) for an archive entry name, or None for non-image entries."""
+    path = name.replace("\\", "/")
+    stem, ext = posixpath.splitext(posixpath.basename(path))
+    if ext.lower() not in IMAGE_EXTS or not stem or stem.startswith(".") or "__MACOSX/" in path:
+        return None
+
+    target = "photo" if field == "auto" else field
+    folders = [part.lower() for part in path.split("/")[:-1]]
+    if any(folder in SIGNATURE_HINTS for folder in folders):
+        target = "signature" if field == "auto" else target
+    for sep in ("_", "-", " "):
+        key, _, hint = stem.rpartition(sep)
+        if key and hint.lower() in SIGNATURE_HINTS:
+            stem = key
+            target = "signature" if field == "auto" else target
+            break
+    return stem.strip(), target
+
+
+def match_users(keys, chunk_size=500):
+    """{key: [user ids]} for keys that are roll numbers or (any-case) emails."""
+    from .models import User
+
+    # several keys can name one value ("R001.jpg" and "batch/r001.jpg"), so each maps to a set of keys
+    emails, rolls = {}, {}
+    for key in keys:
+        if "@" in key:
+            emails.setdefault(key.lower(), set()).add(key)
+        else:
+            # roll numbers are matched as written or upper-cased ("r001.jpg" -> R001)
+            rolls.setdefault(key, set()).add(key)
+            rolls.setdefault(key.upper(), set()).add(key)
+
+    found = {}
+    email_list, roll_list = list(emails), list(rolls)
+    for i in range(0, len(email_list), chunk_size):
+        users = (User.objects.alias(email_lower=Lower("email"))
+                 .filter(email_lower__in=email_list[i:i + chunk_size]).values_list("id", "email"))
+        for user_id, email in users:
+            for key in emails[email.lower()]:
+                found.setdefault(key, set()).add(user_id)
+    for i in range(0, len(roll_list), chunk_size):
+        users = User.objects.filter(roll_no__in=roll_list[i:i + chunk_size]).values_list("id", "roll_no")
+        for user_id, roll_no in users:
+            for key in rolls[roll_no]:
+                found.setdefault(key, set()).add(user_id)
+    return {key: sorted(ids) for key, ids in found.items()}
+
+
+# =========================
+# POOL WORKERS
+# =========================
+def _init_worker():
+    # under the "spawn" start method the child starts without Django loaded
+    django.setup()
+
+
+def normalize(data, field):
+    """Decode, orient and downscale image bytes; returns (bytes, extension)."""
+    edge = MAX_EDGE[field]
+    img = imaging.decode_for_size(data, edge)
+    img.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=2.0)
+    ext = imaging._derivative_ext(img)
+    return imaging.encode(img, ext, quality=90), ext
+
+
+def _store(task):
+    """Normalize and store one entry in a pool worker.
+
+    Returns (entry name, user id, field, stored name, content hash, error).
+    """
+    from .models import User
+
+    entry, user_id, field, data = task
+    try:
+        data, ext = normalize(data, field)
+        model_field = User._meta.get_field(field)
+        digest = imaging.content_hash(data)
+        name = imaging._replace(model_field.storage, f"{model_field.upload_to}{user_id}-{digest[:16]}.{ext}", data)
+        imaging.build_derivatives(name, model_field.storage, data=data)
+    except UnidentifiedImageError:
+        return entry, user_id, field, None, None, "not a readable image"
+    except Exception as e:
+        return entry, user_id, field, None, None, str(e) or type(e).__name__
+    return entry, user_id, field, name, digest, ""
+
+
+# =========================
+# IMPORT
+# =========================
+def _tasks(archive, field, report):
+    """Yield (entry name, user id, field, ZipInfo) for every matched entry, recording the rest."""
+    entries = []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        report.entries += 1
+        target = entry_target(info.filename, field)
+        if target is None:
+            report.skipped.append(info.filename)
+        elif info.file_size > MAX_ENTRY_BYTES:
+            report.failed.append((info.filename, f"larger than {MAX_ENTRY_BYTES // (1024 * 1024)} MB"))
+        else:
+            entries.append((info, *target))
+
+    matches = match_users({key for _, key, _ in entries})
+    seen = set()
+    for info, key, target in entries:
+        user_ids = matches.get(key)
+        if not user_ids:
+            report.unmatched.append(info.filename)
+        elif len(user_ids) > 1:
+            report.ambiguous.append(info.filename)
+        elif (user_ids[0], target) in seen:
+            report.duplicates.append(info.filename)
+        else:
+            seen.add((user_ids[0], target))
+            report.matched += 1
+            yield info.filename, user_ids[0], target, info
+
+
+def _pool(processes, threads):
+    if threads:
+        # Pillow releases the GIL while decoding, resizing and encoding
+        return ThreadPoolExecutor(threads)
+    # children must open their own database connections
+    connections.close_all()
+    return ProcessPoolExecutor(processes, initializer=_init_worker)
+
+
+def _run_pool(archive, tasks, processes, threads=None):
+    """Yield _store results, keeping at most a few entries per worker in memory."""
+    window = (threads or processes) * 4
+    with _pool(processes, threads) as pool:
+        pending = set()
+        for entry, user_id, field, info in tasks:
+            pending.add(pool.submit(_store, (entry, user_id, field, archive.read(info))))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in wait(pending)[0]:
+            yield future.result()
+
+
+def save_images(stored):
+    """Point users at their new images ({(user id, field): (name, hash)}) in one UPDATE."""
+    from .importing import update_rows
+    from .models import User
+
+    if not stored:
+        return
+    fields = sorted({field for _, field in stored})
+    columns = [name for field in fields for name in (field, f"{field}_hash")]
+    users = User.objects.filter(id__in={user_id for user_id, _ in stored}).only("id", *columns)
+    replaced_photos = set()
+    changed = []
+    for user in users:
+        for field in fields:
+            if (user.id, field) not in stored:
+                continue
+            name, digest = stored[user.id, field]
+            if field == "photo" and user.photo_hash and user.photo_hash != digest:
+                replaced_photos.add(user.photo_hash)
+            getattr(user, field).name = name
+            setattr(user, f"{field}_hash", digest)
+        changed.append(user)
+
+    with transaction.atomic():
+        update_rows(changed, columns)
+
+    # cutouts of replaced photos nobody else uses any more
+    still_used = set(User.objects.filter(photo_hash__in=replaced_photos).values_list("photo_hash", flat=True))
+    storage = User._meta.get_field("photo").storage
+    for digest in replaced_photos - still_used:
+        imaging.discard_cutout(digest, storage)
+
+
+def import_archive(fileobj, field="auto", processes=None, threads=None, dry_run=False, progress=None):
+    """Import photos/signatures from an open ZIP file; returns a PhotoImportReport.
+
+    field forces every entry to "photo" or "signature" instead of guessing from
+    its name. processes sizes the process pool (default: one per CPU); threads,
+    if given, runs that many threads in this process instead. With dry_run
+    only the matching is done. progress, if given, is
+    called with (done, matched so far) as images finish. Raises
+    zipfile.BadZipFile for anything that is not a ZIP archive.
+    """
+    if field not in FIELDS:
+        raise ValueError(f"field must be one of {', '.join(FIELDS)}")
+    report = PhotoImportReport()
+    processes = max(1, processes or os.cpu_count() or 1)
+    with zipfile.ZipFile(fileobj) as archive:
+        tasks = _tasks(archive, field, report)
+        if dry_run:
+            for _ in tasks:
+                pass
+            return report
+
+        stored = {}
+        for done, (entry, user_id, target, name, digest, error) in enumerate(_run_pool(archive, tasks, processes, threads), 1):
+            if error:
+                report.failed.append((entry, error))
+            else:
+                stored[user_id, target] = (name, digest)
+                report.imported[target] += 1
+            if progress:
+                progress(done, report.matched)
+
+    save_images(stored)
+    return report
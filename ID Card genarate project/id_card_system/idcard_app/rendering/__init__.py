@@ -0,0 +1,59 @@
+"""Server-side ID card rendering.
+
+Draws IDTemplate sides for a User with Pillow, matching the browser renderer in
+generate_id.html so cards can be produced without an open admin tab.
+"""
+from .cache import CardCache, card_cache, card_key
+from .compiler import (
+    compile_side,
+    evict_template,
+    merged_image_sizes,
+    render_cards,
+    render_side,
+    render_side_encoded,
+    template_hash,
+)
+from .context import PLACEHOLDERS, USER_FIELDS, format_dmy, resolve_text, user_context
+from .engine import (
+    BASE_DPI,
+    SIDES,
+    card_size,
+    encode_image,
+    load_template_json,
+    load_user_images,
+    side_elements,
+)
+from .imposition import SheetLayout, stream_imposed_pdf
+from .pdf import PDFStreamWriter, stream_cards_pdf
+from .vector import VectorSide, vector_cards
+
+__all__ = [
+    "BASE_DPI",
+    "CardCache",
+    "PDFStreamWriter",
+    "PLACEHOLDERS",
+    "SIDES",
+    "SheetLayout",
+    "USER_FIELDS",
+    "VectorSide",
+    "card_cache",
+    "card_key",
+    "card_size",
+    "compile_side",
+    "encode_image",
+    "evict_template",
+    "format_dmy",
+    "load_template_json",
+    "load_user_images",
+    "merged_image_sizes",
+    "render_cards",
+    "render_side",
+    "render_side_encoded",
+    "resolve_text",
+    "side_elements",
+    "stream_cards_pdf",
+    "stream_imposed_pdf",
+    "template_hash",
+    "user_context",
+    "vector_cards",
+]
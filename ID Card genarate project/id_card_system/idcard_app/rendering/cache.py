@@ -0,0 +1,229 @@
+"""Content-addressed disk cache of finished (encoded) card sides.
+
+An entry's name is a hash of everything that decides its pixels: the
+template's content hash, side, DPI, output format, the user's placeholder
+values and the content hashes of their photo and signature. A reprint of
+unchanged cards is therefore a file read per side, and nothing ever has to be
+invalidated: editing a template or a user just produces new keys, and the
+entries nobody asks for any more age out.
+
+Entries live under RENDER_CACHE_DIR/cards/<2 hex>/<key>.<ext> and are shared
+by every process on the host. A read bumps the file's mtime, so mtime order
+is LRU order across processes. When a process's running total passes
+RENDER_CARD_CACHE_MAX_BYTES it sweeps the directory and deletes the least
+recently used entries down to LOW_WATER of the budget.
+
+Hit/miss counts are kept per process and added to the shared Django cache
+every FLUSH_EVERY lookups (and by flush_stats()), so `manage.py render_cache`
+can report them for all workers.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+from .. import imaging, metrics
+from .context import PLACEHOLDERS, user_context
+
+
+# bump when a drawing change alters the pixels of existing templates
+# (keys both finished cards and compiled sides)
+RENDERER_VERSION = 1
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+LOW_WATER = 0.9
+# a hit only rewrites the mtime of entries not used for this long
+TOUCH_AFTER_SECONDS = 300
+FLUSH_EVERY = 100
+STATS_KEY = "idcard:render-cache:stats:{}"
+COUNTERS = ("hits", "misses", "stores", "evictions")
+
+CONTEXT_KEYS = tuple(sorted(set(key for _, key in PLACEHOLDERS)))
+
+
+def _ext(fmt):
+    return "jpg" if fmt.upper() in ("JPG", "JPEG") else "png"
+
+
+def image_digest(user, field):
+    """Content hash of the user's photo/signature, "" for none, None if it cannot be read."""
+    if not getattr(user, field, None):
+        return ""
+    try:
+        return imaging.upload_hash(user, field)
+    except (OSError, ValueError):
+        return None
+
+
+def card_key(content_hash, side, dpi, fmt, user, quality=90):
+    """Cache key for one side of user's card, or None if the user cannot be keyed.
+
+    user must be a User row with the rendering fields loaded (USER_FIELDS).
+    """
+    digests = [image_digest(user, field) for field in imaging.IMAGE_FIELDS]
+    if None in digests:
+        return None   # a missing file renders as a placeholder; don't pin that
+    ctx = user_context(user)
+    fields = [str(ctx.get(key) or "") for key in CONTEXT_KEYS]
+    ext = _ext(fmt)
+    parts = [RENDERER_VERSION, content_hash, side, int(dpi), ext, quality if ext == "jpg" else "", *digests, *fields]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+class CardCache:
+    """Byte-budgeted LRU of encoded card sides in a directory; see the module docstring."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.usage = None   # bytes on disk, as far as this process knows; None until scanned
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.unflushed = dict.fromkeys(COUNTERS, 0)
+        self.lock = Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def path(self, key, fmt):
+        return self.directory / key[:2] / f"{key}.{_ext(fmt)}"
+
+    def _count(self, name, n=1):
+        metrics.CARD_CACHE.inc(n, event=name)
+        with self.lock:
+            self.counts[name] += n
+            self.unflushed[name] += n
+            due = self.unflushed["hits"] + self.unflushed["misses"] >= FLUSH_EVERY
+        if due:
+            self.flush_stats()
+
+    # =========================
+    # LOOKUP
+    # =========================
+    def get(self, key, fmt):
+        """Encoded bytes for key, or None (counted as a miss)."""
+        path = self.path(key, fmt)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+                used = os.fstat(fh.fileno()).st_mtime
+        except OSError:
+            self._count("misses")
+            return None
+        if time.time() - used > TOUCH_AFTER_SECONDS:
+            try:
+                os.utime(path)
+            except OSError:
+                pass   # swept by another process meanwhile
+        self._count("hits")
+        return data
+
+    def put(self, key, fmt, data):
+        path = self.path(key, fmt)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            return   # the cache is an optimisation only
+        self._count("stores")
+        with self.lock:
+            if self.usage is None:
+                self.usage = self.scan()[1]
+            else:
+                self.usage += len(data)
+            over = self.usage > self.max_bytes
+        if over:
+            self.sweep()
+
+    # =========================
+    # EVICTION
+    # =========================
+    def entries(self):
+        """(mtime, size, path) of every entry."""
+        found = []
+        if not self.directory.is_dir():
+            return found
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def scan(self):
+        """(entries, bytes) on disk."""
+        found = self.entries()
+        return len(found), sum(size for _, size, _ in found)
+
+    def sweep(self, target=None):
+        """Delete least recently used entries until the total is at most target bytes."""
+        target = self.max_bytes * LOW_WATER if target is None else target
+        found = sorted(self.entries())
+        total = sum(size for _, size, _ in found)
+        evicted = 0
+        for _, size, path in found:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self.lock:
+            self.usage = total
+        if evicted:
+            self._count("evictions", evicted)
+        return evicted
+
+    def clear(self):
+        return self.sweep(target=0)
+
+    # =========================
+    # STATS
+    # =========================
+    def flush_stats(self):
+        """Add this process's counts since the last flush to the shared totals."""
+        with self.lock:
+            pending, self.unflushed = self.unflushed, dict.fromkeys(COUNTERS, 0)
+        for name, n in pending.items():
+            if not n:
+                continue
+            key = STATS_KEY.format(name)
+            shared_cache.add(key, 0, None)
+            try:
+                shared_cache.incr(key, n)
+            except ValueError:
+                shared_cache.set(key, n, None)
+
+    def shared_stats(self):
+        """Counts summed over every process that has flushed."""
+        return {name: shared_cache.get(STATS_KEY.format(name), 0) for name in COUNTERS}
+
+    def reset_stats(self):
+        shared_cache.delete_many([STATS_KEY.format(name) for name in COUNTERS])
+
+
+_card_cache = None
+
+
+def card_cache():
+    """The process's CardCache, configured from settings."""
+    global _card_cache
+    if _card_cache is None:
+        root = getattr(settings, "RENDER_CACHE_DIR", Path(settings.BASE_DIR) / "cache" / "render")
+        _card_cache = CardCache(Path(root) / "cards",
+                                getattr(settings, "RENDER_CARD_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    return _card_cache
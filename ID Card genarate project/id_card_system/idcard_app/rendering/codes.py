@@ -0,0 +1,48 @@
+"""Barcode (Code 128-B) and QR code module matrices for the card renderer."""
+
+# Bar/space widths for Code 128 values 0-105; each pattern is 11 modules wide.
+CODE128_PATTERNS = (
+    "212222 222122 222221 121223 121322 131222 122213 122312 132212 221213 "
+    "221312 231212 112232 122132 122231 113222 123122 123221 223211 221132 "
+    "221231 213212 223112 312131 311222 321122 321221 312212 322112 322211 "
+    "212123 212321 232121 111323 131123 131321 112313 132113 132311 211313 "
+    "231113 231311 112133 112331 132131 113123 113321 133121 313121 211331 "
+    "231131 213113 213311 213131 311123 311321 331121 312113 312311 332111 "
+    "314111 221411 431111 111224 111422 121124 121421 141122 141221 112214 "
+    "112412 122114 122411 142112 142211 241211 221114 413111 241112 134111 "
+    "111242 121142 121241 114212 124112 124211 411212 421112 421211 212141 "
+    "214121 412121 111143 111341 131141 114113 114311 411113 411311 113141 "
+    "114131 311141 411131 211412 211214 211232"
+).split()
+CODE128_STOP = "2331112"
+CODE128_START_B = 104
+
+
+def code128_modules(data):
+    """Encode data as Code 128-B and return a list of (is_bar, width) runs.
+
+    Characters outside printable ASCII are replaced with '?'. Quiet zones are
+    left to the caller.
+    """
+    values = [ord(c) - 32 if 32 <= ord(c) < 127 else ord("?") - 32 for c in str(data)]
+    checksum = CODE128_START_B + sum(i * v for i, v in enumerate(values, start=1))
+    codes = [CODE128_START_B] + values + [checksum % 103]
+
+    runs = []
+    for pattern in [CODE128_PATTERNS[c] for c in codes] + [CODE128_STOP]:
+        for i, width in enumerate(pattern):
+            runs.append((i % 2 == 0, int(width)))
+    return runs
+
+
+def qr_matrix(data):
+    """Return the QR module matrix (list of rows of bools), or None if qrcode is missing."""
+    try:
+        import qrcode
+    except ImportError:
+        return None
+
+    qr = qrcode.QRCode(border=2, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(str(data))
+    qr.make(fit=True)
+    return qr.get_matrix()
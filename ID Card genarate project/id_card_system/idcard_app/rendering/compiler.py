@@ -0,0 +1,349 @@
+"""Template compilation: pre-rasterized static base layer + per-user ops.
+
+Most of a card (header bars, backgrounds, logos, fixed labels) is the same for
+every user. compile_side() draws those elements once into a base image and
+keeps only the elements that depend on the user (placeholder text, photo,
+signature, codes) as ops. Rendering a card is then one copy of the base plus a
+few draws.
+
+A static element is folded into the base only if it does not overlap any
+element that stays an op and sits below it; otherwise it stays an op too, so
+z-order is always preserved.
+
+Compiled sides are cached in memory (LRU) and on disk under
+settings.RENDER_CACHE_DIR, keyed by template id, renderer version, a hash of
+the template JSON, side and DPI. evict_template() drops them when a template is saved or deleted.
+Finished cards are cached too (see cache.py); render_side_encoded() and
+render_cards(fmt=...) go through that cache.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+from PIL import Image
+
+from .. import metrics
+from .cache import RENDERER_VERSION, card_cache, card_key
+from .context import has_placeholder, user_context
+from .engine import (
+    BASE_DPI,
+    LONG_PLACEHOLDERS,
+    RenderContext,
+    _num,
+    card_size,
+    draw_elements,
+    encode_image,
+    load_template_json,
+    load_user_images,
+    new_canvas,
+    side_elements,
+    wrap_lines,
+)
+from .fonts import get_font
+
+
+MEMORY_CACHE_SIZE = getattr(settings, "RENDER_COMPILED_CACHE_SIZE", 32)
+
+_memory = OrderedDict()
+_lock = Lock()
+
+
+def template_hash(template_json):
+    """Stable content hash of a template's JSON."""
+    data = json.dumps(load_template_json(template_json), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def cache_dir():
+    return Path(getattr(settings, "RENDER_CACHE_DIR", Path(settings.BASE_DIR) / "cache" / "render")) / "compiled"
+
+
+# =========================
+# CLASSIFICATION
+# =========================
+def is_dynamic(el):
+    """True if the element's pixels depend on the user being rendered."""
+    kind = el.get("type")
+    if kind in ("photo", "signature"):
+        return True
+    if kind == "text":
+        return has_placeholder(el.get("text"))
+    if kind in ("barcode", "qrcode"):
+        data = el.get("data") or el.get("value")
+        return not data or has_placeholder(data)
+    return False
+
+
+def element_bounds(el, card_width, card_height):
+    """Conservative (left, top, right, bottom) in template pixels for overlap tests."""
+    kind = el.get("type")
+    x, y = _num(el, "x", 0), _num(el, "y", 0)
+    if kind == "circle":
+        r = _num(el, "r", _num(el, "w", 100) / 2)
+        return x - r, y - r, x + r, y + r
+    if kind == "text":
+        size = _num(el, "size", 14)
+        align = el.get("align") or "center"
+        raw = el.get("text") or ""
+        max_width = _num(el, "maxWidth", 0) or (
+            card_width * 0.7 if any(t in raw for t in LONG_PLACEHOLDERS) else card_width)
+        if align == "left":
+            left, right = x, x + max_width
+        elif align == "right":
+            left, right = x - max_width, x
+        else:
+            left, right = x - max_width / 2, x + max_width / 2
+        if is_dynamic(el):
+            bottom = card_height  # wrapped user text can grow downwards
+        else:
+            font = get_font(el.get("font") or "Arial", size)
+            lines = wrap_lines(raw, font.getlength, max_width)
+            bottom = y + max(1, len(lines)) * size * 1.3
+        return left, y - size * 0.3, right, bottom
+
+    defaults = {"photo": (110, 140), "signature": (120, 50), "barcode": (150, 50),
+                "qrcode": (100, 100), "image": (80, 100)}.get(kind, (100, 100))
+    w, h = _num(el, "w", defaults[0]), _num(el, "h", defaults[1])
+    bottom = y + h / 2 + (16 if kind == "barcode" else 0)  # barcode label
+    return x - w / 2, y - h / 2, x + w / 2, bottom
+
+
+def op_image_sizes(ops, scale):
+    """{field: (width, height)} of the largest photo/signature box among ops, in output pixels."""
+    sizes = {}
+    for op in ops:
+        kind = op.get("type")
+        if kind in ("photo", "signature"):
+            default = (110, 140) if kind == "photo" else (120, 50)
+            w = _num(op, "w", default[0]) * scale
+            h = _num(op, "h", default[1]) * scale
+            prev = sizes.get(kind, (0, 0))
+            sizes[kind] = (max(prev[0], round(w)), max(prev[1], round(h)))
+    return sizes
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def split_layers(elements, card_width, card_height):
+    """Split elements into (static elements for the base, ops drawn per card)."""
+    base, ops, op_bounds = [], [], []
+    for el in elements:
+        if not isinstance(el, dict):
+            continue
+        bounds = element_bounds(el, card_width, card_height)
+        if not is_dynamic(el) and not any(_overlaps(bounds, b) for b in op_bounds):
+            base.append(el)
+        else:
+            ops.append(el)
+            op_bounds.append(bounds)
+    return base, ops
+
+
+# =========================
+# COMPILED SIDE
+# =========================
+class CompiledSide:
+    """Pre-rendered base image for one side plus the ops still to draw."""
+
+    def __init__(self, base, ops, width, height, scale):
+        self.base = base
+        self.ops = ops
+        self.width = width
+        self.height = height
+        self.scale = scale
+
+    @property
+    def needs_images(self):
+        return any(op.get("type") in ("photo", "signature") for op in self.ops)
+
+    def image_sizes(self):
+        """Largest photo/signature box in output pixels, to pick image derivatives."""
+        return op_image_sizes(self.ops, self.scale)
+
+    def render(self, ctx, images):
+        with metrics.RENDER_STAGE.time(stage="draw"):
+            canvas = self.base.copy()
+            if self.ops:
+                draw_elements(canvas, self.ops, RenderContext(self.width, self.height, self.scale, ctx, images))
+        return canvas
+
+
+def _build(template_json, side, dpi):
+    elements = side_elements(template_json, side)
+    if not elements:
+        return None
+    width, height, bg = card_size(template_json)
+    scale = dpi / BASE_DPI
+    static, ops = split_layers(elements, width, height)
+    base = new_canvas(width, height, bg, scale)
+    draw_elements(base, static, RenderContext(width, height, scale, {}, {}))
+    return CompiledSide(base, ops, width, height, scale)
+
+
+def _disk_paths(key):
+    stem = "-".join(str(part) for part in key)
+    directory = cache_dir()
+    return directory / f"{stem}.png", directory / f"{stem}.json"
+
+
+def _load_from_disk(key):
+    image_path, meta_path = _disk_paths(key)
+    try:
+        meta = json.loads(meta_path.read_text())
+        with Image.open(image_path) as img:
+            base = img.convert("RGB")
+    except (OSError, ValueError):
+        return None
+    return CompiledSide(base, meta["ops"], meta["width"], meta["height"], meta["scale"])
+
+
+def _save_to_disk(key, compiled):
+    image_path, meta_path = _disk_paths(key)
+    try:
+        image_path.parent.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        compiled.base.save(str(image_path) + suffix, format="PNG", compress_level=1)
+        Path(str(meta_path) + suffix).write_text(json.dumps({
+            "ops": compiled.ops, "width": compiled.width,
+            "height": compiled.height, "scale": compiled.scale,
+        }))
+        os.replace(str(image_path) + suffix, image_path)
+        os.replace(str(meta_path) + suffix, meta_path)
+    except OSError:
+        pass  # the disk cache is an optimisation only
+
+
+def compile_side(template_json, side, dpi=BASE_DPI, template_id=None, content_hash=None):
+    """Return the cached CompiledSide (or None for an empty side)."""
+    content_hash = content_hash or template_hash(template_json)
+    key = (template_id or 0, RENDERER_VERSION, content_hash[:16], side, int(dpi))
+
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+
+    compiled = _load_from_disk(key)
+    if compiled is None:
+        with metrics.RENDER_STAGE.time(stage="compile"):
+            compiled = _build(template_json, side, dpi)
+        if compiled is not None:
+            _save_to_disk(key, compiled)
+
+    with _lock:
+        _memory[key] = compiled
+        while len(_memory) > MEMORY_CACHE_SIZE:
+            _memory.popitem(last=False)
+    return compiled
+
+
+def evict_template(template_id):
+    """Forget every compiled side of a template (memory and disk)."""
+    with _lock:
+        for key in [k for k in _memory if k[0] == template_id]:
+            del _memory[key]
+    directory = cache_dir()
+    if directory.is_dir():
+        for path in directory.glob(f"{template_id}-*"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+# =========================
+# RENDERING
+# =========================
+def merged_image_sizes(*compiled_sides):
+    """image_sizes() across several sides, so one derivative serves all of them."""
+    sizes = {}
+    for compiled in compiled_sides:
+        for field, (w, h) in (compiled.image_sizes() if compiled else {}).items():
+            prev = sizes.get(field, (0, 0))
+            sizes[field] = (max(prev[0], w), max(prev[1], h))
+    return sizes
+
+
+def render_side(template_json, side, user, dpi=BASE_DPI, images=None, template_id=None, content_hash=None):
+    """Render one side of a card for user and return a PIL RGB image.
+
+    Returns None when the side has no elements (the JS skips such sides too).
+    images may supply pre-loaded {'photo': ..., 'signature': ...}.
+    """
+    compiled = compile_side(template_json, side, dpi, template_id=template_id, content_hash=content_hash)
+    if compiled is None:
+        return None
+    if images is None:
+        images = load_user_images(user, compiled.image_sizes()) if compiled.needs_images else {}
+    return compiled.render(user_context(user), images)
+
+
+def render_side_encoded(compiled, content_hash, side, user, fmt="PNG", dpi=BASE_DPI, load_images=None):
+    """Encoded bytes of a compiled side for a User, from the card cache when unchanged.
+
+    Returns (bytes, hit). On a miss load_images() supplies the photo and
+    signature (default: loaded at the sizes this side needs), so a hit never
+    touches the images.
+    """
+    cache = card_cache()
+    key = card_key(content_hash, side, dpi, fmt, user) if cache.enabled else None
+    if key:
+        data = cache.get(key, fmt)
+        if data is not None:
+            return data, True
+    if load_images is None:
+        images = load_user_images(user, compiled.image_sizes()) if compiled.needs_images else {}
+    else:
+        images = load_images()
+    img = compiled.render(user_context(user), images)
+    with metrics.RENDER_STAGE.time(stage="encode"):
+        data = encode_image(img, fmt, dpi=dpi)
+    if key:
+        cache.put(key, fmt, data)
+    return data, False
+
+
+def render_cards(template_json, users, include_back=True, dpi=BASE_DPI, template_id=None, fmt=None):
+    """Yield (front, back) for each user; back is None when not wanted or empty.
+
+    Sides are PIL images, or with fmt ("JPEG"/"PNG") (bytes, width, height)
+    tuples served through the card cache.
+    """
+    content_hash = template_hash(template_json)
+    front_side = compile_side(template_json, "front", dpi, template_id, content_hash)
+    back_side = compile_side(template_json, "back", dpi, template_id, content_hash) if include_back else None
+    needs_images = any(c is not None and c.needs_images for c in (front_side, back_side))
+    sizes = merged_image_sizes(front_side, back_side)
+
+    for user in users:
+        if fmt is None:
+            ctx = user_context(user)
+            images = load_user_images(user, sizes) if needs_images else {}
+            yield (
+                front_side.render(ctx, images) if front_side else None,
+                back_side.render(ctx, images) if back_side else None,
+            )
+            continue
+
+        loaded = []
+
+        def load_images(user=user):
+            # one load serves both sides, and only if one of them misses
+            if not loaded:
+                loaded.append(load_user_images(user, sizes) if needs_images else {})
+            return loaded[0]
+
+        pair = []
+        for side, compiled in (("front", front_side), ("back", back_side)):
+            if compiled is None:
+                pair.append(None)
+                continue
+            data, _ = render_side_encoded(compiled, content_hash, side, user, fmt, dpi, load_images)
+            pair.append((data, *compiled.base.size))
+        yield tuple(pair)
@@ -0,0 +1,85 @@
+"""Placeholder values for a user, matching renderTemplateOnCanvas in generate_id.html."""
+import re
+from datetime import date
+
+
+# Placeholder token -> context key. Order matches the replacements in the JS renderer.
+PLACEHOLDERS = (
+    ("{name}", "full_name"),
+    ("{email}", "email"),
+    ("{role}", "role"),
+    ("{dept}", "department"),
+    ("{phone}", "phone"),
+    ("{emergency}", "emergency_mobile"),
+    ("{blood}", "blood_group"),
+    ("{roll_no}", "roll_no"),
+    ("{id}", "id"),
+    ("{age}", "age"),
+    ("{dob}", "dob"),
+    ("{address}", "address"),
+    ("{residence}", "residence_status"),
+    ("{valid_upto}", "valid_upto"),
+    ("{valid_year}", "valid_year"),
+)
+
+PLACEHOLDER_RE = re.compile("|".join(re.escape(token) for token, _ in PLACEHOLDERS))
+
+USER_FIELDS = (
+    "id", "username", "email", "first_name", "last_name", "role", "department",
+    "phone", "emergency_mobile", "blood_group", "age", "roll_no", "address",
+    "residence_status", "date_of_birth", "valid_upto", "photo", "signature",
+    "photo_hash", "signature_hash",
+)
+
+
+def _get(user, key):
+    if isinstance(user, dict):
+        return user.get(key)
+    return getattr(user, key, None)
+
+
+def format_dmy(value):
+    """YYYY-MM-DD (or a date) -> DD-MM-YYYY, like formatDMY() in the JS renderer."""
+    if not value:
+        return ""
+    if isinstance(value, date):
+        return value.strftime("%d-%m-%Y")
+    parts = str(value).split("-")
+    if len(parts) == 3:
+        y, m, d = parts
+        return f"{d}-{m}-{y}"
+    return str(value)
+
+
+def user_context(user):
+    """Return the values substituted into text placeholders for a User row or dict."""
+    first_name = _get(user, "first_name") or ""
+    last_name = _get(user, "last_name") or _get(user, "username") or ""
+    valid_fmt = format_dmy(_get(user, "valid_upto"))
+
+    ctx = {key: _get(user, key) for key in USER_FIELDS}
+    ctx.update({
+        "full_name": f"{first_name} {last_name}".strip(),
+        "dob": format_dmy(_get(user, "date_of_birth")),
+        "valid_upto": valid_fmt,
+        "valid_year": valid_fmt[-4:] if valid_fmt else "",
+    })
+    return ctx
+
+
+def has_placeholder(text):
+    return bool(text) and PLACEHOLDER_RE.search(text) is not None
+
+
+def resolve_text(text, ctx):
+    """Replace every known placeholder; empty values leave the token in place (as in JS)."""
+    if not text:
+        return ""
+    lookup = dict(PLACEHOLDERS)
+
+    def repl(match):
+        token = match.group(0)
+        value = ctx.get(lookup[token])
+        return str(value) if value else token
+
+    return PLACEHOLDER_RE.sub(repl, text)
@@ -0,0 +1,463 @@
+"""Pillow implementation of renderTemplateOnCanvas (generate_id.html).
+
+Template coordinates are CSS pixels at 96 DPI with every element positioned by
+its centre (x, y); text is anchored at (x, y) and wraps downwards. Rendering at
+another DPI scales the whole card.
+"""
+import base64
+import io
+import json
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.storage import default_storage
+from PIL import Image, ImageColor, ImageDraw, ImageOps
+
+from .. import imaging
+from .codes import code128_modules, qr_matrix
+from .context import resolve_text
+from .fonts import get_font
+
+
+BASE_DPI = 96
+DEFAULT_WIDTH = 640
+DEFAULT_HEIGHT = 400
+DEFAULT_BG = "#ffffff"
+SIDES = ("front", "back")
+
+# Circles and rounded corners are drawn into a mask this many times larger and
+# downsampled, since ImageDraw does not anti-alias shapes.
+SUPERSAMPLE = 4
+
+LONG_PLACEHOLDERS = ("{address}", "{residence}")
+
+
+# =========================
+# TEMPLATE HELPERS
+# =========================
+def load_template_json(value):
+    """IDTemplate.template_json may hold a dict or a JSON string; always return a dict."""
+    if isinstance(value, dict):
+        return value
+    try:
+        data = json.loads(str(value))
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def side_elements(template_json, side):
+    elements = load_template_json(template_json).get(side)
+    return elements if isinstance(elements, list) else []
+
+
+def card_size(template_json):
+    """(width, height, bg) of the card in template pixels."""
+    data = load_template_json(template_json)
+    return (
+        int(_num(data, "width", DEFAULT_WIDTH)),
+        int(_num(data, "height", DEFAULT_HEIGHT)),
+        data.get("bg") or DEFAULT_BG,
+    )
+
+
+def _num(el, key, default):
+    """JS-style `el[key] || default` for numeric properties."""
+    value = el.get(key)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_color(value, default="#000000", opacity=1.0):
+    """CSS colour -> RGBA tuple, or None for 'transparent'."""
+    if value == "transparent":
+        return None
+    try:
+        rgba = ImageColor.getcolor(value or default, "RGBA")
+    except (ValueError, AttributeError):
+        rgba = ImageColor.getcolor(default, "RGBA")
+    return rgba[:3] + (int(round(rgba[3] * max(0.0, min(1.0, opacity)))),)
+
+
+def _opacity(el):
+    return _num(el, "opacity", 1.0)
+
+
+def _box(el, scale, default_w, default_h):
+    """Centre-positioned element -> integer (left, top, right, bottom) at output scale."""
+    x, y = _num(el, "x", 0), _num(el, "y", 0)
+    w, h = _num(el, "w", default_w), _num(el, "h", default_h)
+    left, top = round((x - w / 2) * scale), round((y - h / 2) * scale)
+    right, bottom = round((x + w / 2) * scale), round((y + h / 2) * scale)
+    return left, top, max(right, left + 1), max(bottom, top + 1)
+
+
+# =========================
+# IMAGE SOURCES
+# =========================
+def open_image(source, storage=None):
+    """Open a FieldFile or storage name as an upright RGBA image."""
+    if not source:
+        return None
+    storage = storage or getattr(source, "storage", None) or default_storage
+    try:
+        with storage.open(getattr(source, "name", source), "rb") as fh:
+            img = Image.open(fh)
+            img.load()
+    except (OSError, ValueError):
+        return None
+    return ImageOps.exif_transpose(img).convert("RGBA")
+
+
+@lru_cache(maxsize=32)
+def load_src_image(src):
+    """Resolve an image element's src (data URL, /static/ or /media/ path)."""
+    if not src or not isinstance(src, str):
+        return None
+    try:
+        if src.startswith("data:"):
+            payload = src.split(",", 1)[1]
+            img = Image.open(io.BytesIO(base64.b64decode(payload)))
+        elif src.startswith(settings.STATIC_URL):
+            path = finders.find(src[len(settings.STATIC_URL):])
+            if not path:
+                return None
+            img = Image.open(path)
+        elif src.startswith(settings.MEDIA_URL):
+            return open_image(src[len(settings.MEDIA_URL):])
+        else:
+            return None
+        img.load()
+    except (OSError, ValueError, IndexError):
+        return None
+    return ImageOps.exif_transpose(img).convert("RGBA")
+
+
+def load_user_images(user, sizes=None):
+    """Photo and signature for a User row (or a values() dict).
+
+    sizes maps field -> (width, height) in output pixels; the smallest stored
+    derivative covering it is decoded instead of the full-size upload.
+    """
+    get = user.get if isinstance(user, dict) else lambda k: getattr(user, k, None)
+    sizes = sizes or {}
+    images = {}
+    for field in imaging.IMAGE_FIELDS:
+        value = get(field)
+        storage = getattr(value, "storage", None)
+        images[field] = open_image(imaging.best_source(value, *sizes.get(field, (0, 0)), storage=storage),
+                                   storage=storage)
+    return images
+
+
+# =========================
+# DRAWING PRIMITIVES
+# =========================
+def _shape_mask(size, radius=0, ellipse=False):
+    """Anti-aliased 'L' mask for a rounded rectangle or ellipse of size (w, h)."""
+    w, h = size
+    big = Image.new("L", (w * SUPERSAMPLE, h * SUPERSAMPLE), 0)
+    draw = ImageDraw.Draw(big)
+    box = (0, 0, w * SUPERSAMPLE - 1, h * SUPERSAMPLE - 1)
+    if ellipse:
+        draw.ellipse(box, fill=255)
+    else:
+        draw.rounded_rectangle(box, radius=radius * SUPERSAMPLE, fill=255)
+    return big.resize((w, h), Image.LANCZOS)
+
+
+def _fill_mask(canvas, box, rgba, mask):
+    """Fill box with colour rgba through mask, honouring rgba's alpha."""
+    if rgba is None:
+        return
+    if rgba[3] < 255:
+        mask = mask.point(lambda v: v * rgba[3] // 255)
+    canvas.paste(rgba[:3], box, mask)
+
+
+def _paste_image(canvas, img, box, opacity=1.0, mask=None):
+    left, top, right, bottom = box
+    size = (right - left, bottom - top)
+    if img.size != size:
+        img = img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+    alpha = img.getchannel("A")
+    if mask is not None:
+        alpha = Image.composite(alpha, Image.new("L", size, 0), mask)
+    if opacity < 1:
+        alpha = alpha.point(lambda v: int(v * opacity))
+    canvas.paste(img.convert("RGB"), (left, top), alpha)
+
+
+def _dashed_rect(draw, box, color, scale, dash=4):
+    left, top, right, bottom = box
+    step = max(1, round(dash * scale))
+    width = max(1, round(scale))
+    for x in range(left, right, step * 2):
+        draw.line([(x, top), (min(x + step, right) - 1, top)], fill=color, width=width)
+        draw.line([(x, bottom - 1), (min(x + step, right) - 1, bottom - 1)], fill=color, width=width)
+    for y in range(top, bottom, step * 2):
+        draw.line([(left, y), (left, min(y + step, bottom) - 1)], fill=color, width=width)
+        draw.line([(right - 1, y), (right - 1, min(y + step, bottom) - 1)], fill=color, width=width)
+
+
+def _placeholder(draw, box, el, scale, border, text_color, label, size):
+    """Dashed outline + label drawn when a user has no photo/signature."""
+    _dashed_rect(draw, box, parse_color(el.get("borderColor"), border), scale)
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    draw.text((cx, cy), label, font=get_font("Arial", size * scale),
+              fill=parse_color(text_color), anchor="mm")
+
+
+def wrap_lines(text, measure, max_width):
+    """Port of wrapText(): break on spaces, split over-long words, never exceed max_width."""
+    words = re.sub(r",\s*", ", ", text or "").split()
+    lines, line = [], ""
+
+    def split_word(word):
+        chunks, current = [], word
+        while measure(current) > max_width and len(current) > 1:
+            cut = 1
+            while cut <= len(current) and measure(current[:cut]) <= max_width:
+                cut += 1
+            cut = max(1, cut - 1)
+            chunks.append(current[:cut])
+            current = current[cut:]
+        if current:
+            chunks.append(current)
+        return chunks
+
+    for word in words:
+        for piece in split_word(word):
+            test = f"{line} {piece}" if line else piece
+            if line and measure(test) > max_width:
+                lines.append(line)
+                line = piece
+            else:
+                line = test
+    if line:
+        lines.append(line)
+    return lines
+
+
+# =========================
+# ELEMENT DRAWERS
+# =========================
+def draw_rect(canvas, draw, el, r):
+    rgba = parse_color(el.get("fill"), "#000000", _opacity(el))
+    left, top, right, bottom = _box(el, r.scale, 100, 100)
+    if rgba:
+        draw.rectangle((left, top, right - 1, bottom - 1), fill=rgba)
+
+
+def draw_circle(canvas, draw, el, r):
+    radius = _num(el, "r", _num(el, "w", 100) / 2)
+    x, y = _num(el, "x", 0), _num(el, "y", 0)
+    box = (round((x - radius) * r.scale), round((y - radius) * r.scale),
+           round((x + radius) * r.scale), round((y + radius) * r.scale))
+    size = (max(1, box[2] - box[0]), max(1, box[3] - box[1]))
+    _fill_mask(canvas, box[:2], parse_color(el.get("fill"), "#000000", _opacity(el)),
+               _shape_mask(size, ellipse=True))
+
+
+def draw_photo(canvas, draw, el, r):
+    box = _box(el, r.scale, 110, 140)
+    size = (box[2] - box[0], box[3] - box[1])
+    radius = _num(el, "borderRadius", 0) * r.scale
+    mask = _shape_mask(size, radius=radius) if radius > 0 else None
+
+    bg = parse_color(el.get("bgColor"), "#ffffff") if el.get("bgColor") else None
+    if bg:
+        if mask is not None:
+            _fill_mask(canvas, box[:2], bg, mask)
+        else:
+            draw.rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=bg)
+
+    photo = r.images.get("photo")
+    if photo is not None:
+        _paste_image(canvas, photo, box, mask=mask)
+    else:
+        _placeholder(draw, box, el, r.scale, "#cbd5e1", "#94a3b8", "No Photo", 12)
+
+
+def draw_signature(canvas, draw, el, r):
+    box = _box(el, r.scale, 120, 50)
+    bg = parse_color(el.get("bgColor"), "#ffffff") if el.get("bgColor") else None
+    if bg:
+        draw.rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=bg)
+
+    signature = r.images.get("signature")
+    if signature is not None:
+        _paste_image(canvas, signature, box)
+    else:
+        _placeholder(draw, box, el, r.scale, "#fbbf24", "#f59e0b", "No Signature", 10)
+
+
+def text_max_width(el, card_width):
+    """Wrap width of a text element in template pixels, as wrapText() is called in JS."""
+    raw = el.get("text") or ""
+    align = el.get("align") or "center"
+    x = _num(el, "x", 0)
+    max_width = _num(el, "maxWidth", 0)
+    if not max_width:
+        long_text = any(token in raw for token in LONG_PLACEHOLDERS)
+        max_width = card_width * 0.7 if long_text else card_width
+    if align == "left":
+        available = max(40, card_width - x)
+    elif align == "right":
+        available = max(40, x)
+    else:
+        available = max(40, min(x, card_width - x) * 2)
+    return min(max_width, available)
+
+
+def draw_text(canvas, draw, el, r):
+    text = resolve_text(el.get("text") or "", r.ctx)
+    size = _num(el, "size", 14)
+    font = get_font(el.get("font") or "Arial", size * r.scale)
+    align = el.get("align") or "center"
+    x, y = _num(el, "x", 0), _num(el, "y", 0)
+    max_width = text_max_width(el, r.width)
+
+    def measure(s):
+        return font.getlength(s) / r.scale
+
+    fill = parse_color(el.get("color"), "#000000", _opacity(el))
+    if fill is None:
+        return
+    anchor = {"left": "la", "right": "ra"}.get(align, "ma")
+    line_height = size * 1.3
+    for idx, line in enumerate(wrap_lines(text, measure, max_width)):
+        draw.text((x * r.scale, (y + idx * line_height) * r.scale), line,
+                  font=font, fill=fill, anchor=anchor)
+
+
+def code_payload(el, ctx, default):
+    data = el.get("data") or el.get("value")
+    return resolve_text(data, ctx) if data else default
+
+
+def barcode_payload(el, ctx):
+    return code_payload(el, ctx, ctx.get("roll_no") or ctx.get("id") or "")
+
+
+def qr_payload(el, ctx):
+    default = "\n".join(str(v) for v in (ctx.get("full_name"), ctx.get("roll_no"), ctx.get("email")) if v)
+    return code_payload(el, ctx, default or str(ctx.get("id") or ""))
+
+
+def draw_barcode(canvas, draw, el, r):
+    box = _box(el, r.scale, 150, 50)
+    fill = parse_color(el.get("fill"), "#0f172a", _opacity(el))
+    payload = barcode_payload(el, r.ctx)
+    if not payload or fill is None:
+        return
+
+    runs = code128_modules(payload)
+    total = sum(width for _, width in runs)
+    module = (box[2] - box[0]) / total
+    pos = 0
+    for is_bar, width in runs:
+        if is_bar:
+            x0 = box[0] + round(pos * module)
+            x1 = box[0] + round((pos + width) * module)
+            draw.rectangle((x0, box[1], max(x0, x1 - 1), box[3] - 1), fill=fill)
+        pos += width
+
+    label_y = box[3] + 12 * r.scale
+    draw.text(((box[0] + box[2]) / 2, label_y), str(payload),
+              font=get_font("Arial", 10 * r.scale), fill=parse_color("#0f172a"), anchor="ms")
+
+
+def draw_qrcode(canvas, draw, el, r):
+    box = _box(el, r.scale, 100, 100)
+    fill = parse_color(el.get("fill"), "#0f172a", _opacity(el))
+    payload = qr_payload(el, r.ctx)
+    matrix = qr_matrix(payload) if payload else None
+
+    if matrix is None:
+        # qrcode not installed: same solid block the designer draws
+        draw.rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=fill)
+        draw.text(((box[0] + box[2]) / 2, (box[1] + box[3]) / 2), "QR",
+                  font=get_font("Arial", 10 * r.scale), fill=(255, 255, 255, 255), anchor="mm")
+        return
+
+    bg = parse_color(el.get("bgColor"), "#ffffff")
+    if bg:
+        draw.rectangle((box[0], box[1], box[2] - 1, box[3] - 1), fill=bg)
+    side = min(box[2] - box[0], box[3] - box[1])
+    n = len(matrix)
+    left = box[0] + (box[2] - box[0] - side) // 2
+    top = box[1] + (box[3] - box[1] - side) // 2
+    for row, cells in enumerate(matrix):
+        y0 = top + (row * side) // n
+        y1 = top + ((row + 1) * side) // n
+        for col, dark in enumerate(cells):
+            if dark:
+                x0 = left + (col * side) // n
+                x1 = left + ((col + 1) * side) // n
+                draw.rectangle((x0, y0, x1 - 1, y1 - 1), fill=fill)
+
+
+def draw_image(canvas, draw, el, r):
+    img = load_src_image(el.get("src"))
+    if img is not None:
+        _paste_image(canvas, img, _box(el, r.scale, 80, 100), opacity=_opacity(el))
+
+
+ELEMENT_DRAWERS = {
+    "rect": draw_rect,
+    "square": draw_rect,
+    "circle": draw_circle,
+    "photo": draw_photo,
+    "signature": draw_signature,
+    "text": draw_text,
+    "barcode": draw_barcode,
+    "qrcode": draw_qrcode,
+    "image": draw_image,
+}
+
+
+# =========================
+# RENDERER
+# =========================
+class RenderContext:
+    """Per-card state shared by the element drawers."""
+
+    def __init__(self, width, height, scale, ctx, images):
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.ctx = ctx
+        self.images = images or {}
+
+
+def new_canvas(width, height, bg, scale):
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return Image.new("RGB", size, parse_color(bg, DEFAULT_BG)[:3])
+
+
+def draw_elements(canvas, elements, r):
+    draw = ImageDraw.Draw(canvas, "RGBA")
+    for el in elements:
+        drawer = ELEMENT_DRAWERS.get(el.get("type")) if isinstance(el, dict) else None
+        if drawer:
+            drawer(canvas, draw, el, r)
+
+
+def encode_image(img, fmt="PNG", dpi=BASE_DPI, quality=90):
+    """Serialize a rendered card to PNG or JPEG bytes."""
+    buffer = io.BytesIO()
+    fmt = "JPEG" if fmt.upper() in ("JPG", "JPEG") else "PNG"
+    options = {"dpi": (dpi, dpi)}
+    if fmt == "JPEG":
+        options.update(quality=quality, optimize=False, subsampling=0 if quality >= 90 else 2)
+    else:
+        options.update(compress_level=6)
+    img.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
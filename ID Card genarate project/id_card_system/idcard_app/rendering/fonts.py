@@ -0,0 +1,62 @@
+"""Font lookup for the card renderer.
+
+Template elements name CSS families ("Poppins", "Arial"). We look for a matching
+TrueType file in settings.IDCARD_FONT_DIRS, the app's static/fonts folder and the
+usual system locations, and fall back to Pillow's bundled font.
+"""
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from PIL import ImageFont
+
+
+APP_FONT_DIR = Path(__file__).resolve().parent.parent / "static" / "fonts"
+
+SYSTEM_FONT_DIRS = (
+    Path("/usr/share/fonts"),
+    Path("/usr/local/share/fonts"),
+    Path.home() / ".fonts",
+    Path("/Library/Fonts"),
+    Path("C:/Windows/Fonts"),
+)
+
+# Metric-compatible stand-ins for families that are rarely installed on servers.
+FAMILY_FALLBACKS = {
+    "arial": ("Arial", "LiberationSans-Regular", "DejaVuSans"),
+    "poppins": ("Poppins-Regular", "Poppins", "DejaVuSans"),
+}
+
+
+def _font_dirs():
+    dirs = [Path(d) for d in getattr(settings, "IDCARD_FONT_DIRS", [])]
+    dirs.append(APP_FONT_DIR)
+    dirs.extend(SYSTEM_FONT_DIRS)
+    return [d for d in dirs if d.is_dir()]
+
+
+@lru_cache(maxsize=None)
+def find_font_file(family):
+    """Return the path of a .ttf/.otf file for a CSS family name, or None."""
+    family = (family or "Arial").split(",")[0].strip().strip("'\"")
+    candidates = FAMILY_FALLBACKS.get(family.lower(), (family, family.replace(" ", "")))
+    wanted = {c.lower() for c in candidates}
+
+    for directory in _font_dirs():
+        for path in directory.rglob("*"):
+            if path.suffix.lower() in (".ttf", ".otf") and path.stem.lower() in wanted:
+                return str(path)
+    return None
+
+
+@lru_cache(maxsize=256)
+def get_font(family, size):
+    """Return a FreeType font for family at size pixels (size is already DPI-scaled)."""
+    size = max(1, int(round(size)))
+    path = find_font_file(family)
+    if path:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default(size=size)
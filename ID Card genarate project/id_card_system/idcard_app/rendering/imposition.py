@@ -0,0 +1,235 @@
+"""N-up imposition: many cards per printer sheet.
+
+A bulk run with one card per page wastes a sheet per card. SheetLayout packs
+CR80 cards (85.60 x 53.98 mm, the ISO/IEC 7810 ID-1 size) in a grid on A4, A3
+or Letter paper, in whichever sheet orientation fits more of them:
+
+    gutter   space between neighbouring cards (at least twice the bleed)
+    bleed    how far each side is drawn past its trim line, so a slightly
+             off cut leaves no white edge; sides are scaled up to cover it
+    marks    crop marks in the sheet margin at every cut line
+    duplex   how the printer turns the sheet over: "long-edge", "short-edge",
+             or "none" to print backs on their own sheets in front order
+
+Sides are stretched to the CR80 trim box (templates are drawn at 640x400,
+within 1% of its aspect). Each front sheet is followed by a sheet with the
+same cards' backs at mirrored positions, so after duplex printing every back
+lands behind its front and reads upright when the card is turned over left
+to right.
+
+Sides are embedded with pdf.add_side() as they arrive and only their object
+ids are kept until the sheet is full, so memory stays bounded by one sheet.
+"""
+from .pdf import MM_TO_PT, PDFStreamWriter, _num, add_side
+
+
+PAPER_SIZES_MM = {
+    "a4": (210.0, 297.0),
+    "a3": (297.0, 420.0),
+    "letter": (215.9, 279.4),
+}
+CR80_MM = (85.60, 53.98)
+DUPLEX_MODES = ("long-edge", "short-edge", "none")
+DEFAULT_GUTTER_MM = 3.0
+DEFAULT_MARGIN_MM = 8.0
+MAX_BLEED_MM = 3.0
+MAX_GUTTER_MM = 30.0
+MAX_MARGIN_MM = 40.0
+CROP_MARK_MM = 4.0          # length of a crop mark
+CROP_MARK_OFFSET_MM = 2.0   # gap between the bleed edge and a crop mark
+CROP_MARK_WIDTH_PT = 0.25
+
+
+def _mm(options, key, default, maximum):
+    value = options.get(key)
+    if value in (None, ""):
+        return default
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number of millimetres")
+    if not 0 <= value <= maximum:
+        raise ValueError(f"{key} must be between 0 and {_num(maximum)} mm")
+    return value
+
+
+def _flag(value, default):
+    if value in (None, ""):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() not in ("0", "false", "no", "off")
+
+
+class SheetGrid:
+    """Card positions on one sheet orientation, in points with the origin top-left."""
+
+    def __init__(self, layout, page_w, page_h, card_w, card_h):
+        self.page_w = page_w
+        self.page_h = page_h
+        self.card_w = card_w
+        self.card_h = card_h
+        self.bleed = layout.bleed_mm * MM_TO_PT
+        self.crop_marks = layout.crop_marks
+        gutter = layout.gutter_mm * MM_TO_PT
+        margin = layout.margin_mm * MM_TO_PT
+        self.pitch_x = card_w + gutter
+        self.pitch_y = card_h + gutter
+        self.cols = max(0, int((page_w - 2 * margin + gutter) // self.pitch_x))
+        self.rows = max(0, int((page_h - 2 * margin + gutter) // self.pitch_y))
+        # centred, so the mirrored back grid covers exactly the same area
+        self.left = (page_w - (self.cols * self.pitch_x - gutter)) / 2
+        self.top = (page_h - (self.rows * self.pitch_y - gutter)) / 2
+
+        landscape = page_w > page_h
+        if layout.duplex == "none":
+            self.mirror_cols = self.mirror_rows = False
+        else:
+            # portrait long-edge and landscape short-edge turn the sheet over sideways
+            sideways = (layout.duplex == "long-edge") != landscape
+            self.mirror_cols, self.mirror_rows = sideways, not sideways
+
+    @property
+    def per_sheet(self):
+        return self.cols * self.rows
+
+    def slot(self, index, back=False):
+        """(x, y, w, h, turned) of the index-th card's side, bleed included."""
+        row, col = divmod(index, self.cols)
+        turned = False
+        if back and self.mirror_cols:
+            col = self.cols - 1 - col
+        elif back and self.mirror_rows:
+            # turning the sheet top to bottom also turns its content upside down
+            row = self.rows - 1 - row
+            turned = True
+        return (self.left + col * self.pitch_x - self.bleed, self.top + row * self.pitch_y - self.bleed,
+                self.card_w + 2 * self.bleed, self.card_h + 2 * self.bleed, turned)
+
+    def marks(self):
+        """PDF operators drawing crop marks in the margin at every cut line."""
+        if not self.crop_marks:
+            return b""
+        offset, length = CROP_MARK_OFFSET_MM * MM_TO_PT, CROP_MARK_MM * MM_TO_PT
+        grid_top = self.top - self.bleed
+        grid_bottom = self.top + (self.rows - 1) * self.pitch_y + self.card_h + self.bleed
+        grid_left = self.left - self.bleed
+        grid_right = self.left + (self.cols - 1) * self.pitch_x + self.card_w + self.bleed
+
+        def line(x0, y0, x1, y1):
+            h = self.page_h
+            return f"{_num(x0)} {_num(h - y0)} m {_num(x1)} {_num(h - y1)} l"
+
+        ops = [f"q {_num(CROP_MARK_WIDTH_PT)} w 0 0 0 RG"]
+        cuts_x = sorted({self.left + col * self.pitch_x + dx for col in range(self.cols) for dx in (0, self.card_w)})
+        cuts_y = sorted({self.top + row * self.pitch_y + dy for row in range(self.rows) for dy in (0, self.card_h)})
+        for x in cuts_x:
+            ops.append(line(x, grid_top - offset - length, x, grid_top - offset))
+            ops.append(line(x, grid_bottom + offset, x, grid_bottom + offset + length))
+        for y in cuts_y:
+            ops.append(line(grid_left - offset - length, y, grid_left - offset, y))
+            ops.append(line(grid_right + offset, y, grid_right + offset + length, y))
+        ops.append("S Q")
+        return ("\n".join(ops) + "\n").encode()
+
+
+class SheetLayout:
+    """Imposition options; see the module docstring.
+
+    Raises ValueError for unknown options or when no card fits on the sheet.
+    """
+
+    def __init__(self, paper="a4", gutter_mm=DEFAULT_GUTTER_MM, bleed_mm=0.0, margin_mm=DEFAULT_MARGIN_MM,
+                 crop_marks=True, duplex="long-edge"):
+        if paper not in PAPER_SIZES_MM:
+            raise ValueError(f"paper must be one of {', '.join(PAPER_SIZES_MM)}")
+        if duplex not in DUPLEX_MODES:
+            raise ValueError(f"duplex must be one of {', '.join(DUPLEX_MODES)}")
+        self.paper = paper
+        self.bleed_mm = bleed_mm
+        self.gutter_mm = max(gutter_mm, 2 * bleed_mm)
+        self.crop_marks = crop_marks
+        self.margin_mm = max(margin_mm, bleed_mm + CROP_MARK_OFFSET_MM + CROP_MARK_MM) if crop_marks else margin_mm
+        self.duplex = duplex
+        self._grids = {}
+        for portrait_cards in (False, True):
+            self.grid(portrait_cards)
+
+    @classmethod
+    def from_options(cls, options):
+        """Layout from request parameters or ExportJob.layout; None when no paper is named."""
+        paper = str(options.get("paper") or "").lower()
+        if paper in ("", "card"):
+            return None
+        return cls(
+            paper=paper,
+            gutter_mm=_mm(options, "gutter", DEFAULT_GUTTER_MM, MAX_GUTTER_MM),
+            bleed_mm=_mm(options, "bleed", 0.0, MAX_BLEED_MM),
+            margin_mm=_mm(options, "margin", DEFAULT_MARGIN_MM, MAX_MARGIN_MM),
+            crop_marks=_flag(options.get("marks"), True),
+            duplex=str(options.get("duplex") or "long-edge").lower(),
+        )
+
+    def options(self):
+        """JSON-safe options, as stored on ExportJob.layout."""
+        return {"paper": self.paper, "gutter": self.gutter_mm, "bleed": self.bleed_mm,
+                "margin": self.margin_mm, "marks": self.crop_marks, "duplex": self.duplex}
+
+    def grid(self, portrait_cards=False):
+        """The SheetGrid fitting the most cards of this orientation."""
+        if portrait_cards not in self._grids:
+            card_w, card_h = (CR80_MM[1], CR80_MM[0]) if portrait_cards else CR80_MM
+            paper_w, paper_h = (side * MM_TO_PT for side in PAPER_SIZES_MM[self.paper])
+            grids = [SheetGrid(self, w, h, card_w * MM_TO_PT, card_h * MM_TO_PT)
+                     for w, h in ((paper_w, paper_h), (paper_h, paper_w))]
+            best = max(grids, key=lambda g: g.per_sheet)   # ties keep portrait paper
+            if not best.per_sheet:
+                raise ValueError("no card fits on the sheet with these margins and gutters")
+            self._grids[portrait_cards] = best
+        return self._grids[portrait_cards]
+
+
+def _side_size(side):
+    return tuple(side[1:3]) if isinstance(side, tuple) else side.size
+
+
+def _sheet_pages(writer, grid, placed):
+    """Front sheet and, if any card has one, its back sheet for placed [(front id, back id)]."""
+    fronts = [(front, *grid.slot(i)) for i, (front, _) in enumerate(placed) if front]
+    backs = [(back, *grid.slot(i, back=True)) for i, (_, back) in enumerate(placed) if back]
+    out = [writer.add_page(grid.page_w, grid.page_h, fronts, grid.marks())]
+    if backs:
+        out.append(writer.add_page(grid.page_w, grid.page_h, backs))
+    return b"".join(out)
+
+
+def stream_imposed_pdf(cards, layout, title=None):
+    """Yield a PDF of the (front, back) pairs from cards imposed N-up per layout.
+
+    The card orientation, and so the grid, is taken from the first card.
+    """
+    writer = PDFStreamWriter()
+    yield writer.begin()
+    grid = None
+    placed = []
+    for pair in cards:
+        if pair[0] is None and pair[1] is None:
+            continue
+        if grid is None:
+            width, height = _side_size(pair[0] if pair[0] is not None else pair[1])
+            grid = layout.grid(portrait_cards=height > width)
+        ids = []
+        for side in pair:
+            if side is None:
+                ids.append(None)
+                continue
+            obj_id, _, data = add_side(writer, side)
+            ids.append(obj_id)
+            yield data
+        placed.append(tuple(ids))
+        if len(placed) == grid.per_sheet:
+            yield _sheet_pages(writer, grid, placed)
+            placed = []
+    if placed:
+        yield _sheet_pages(writer, grid, placed)
+    yield writer.finish(title=title)
@@ -0,0 +1,234 @@
+"""Incremental PDF writer for bulk card exports.
+
+Every method returns the bytes it produced, so a whole document can be sent
+through a StreamingHttpResponse (or written to a file) one page at a time.
+Objects are written as soon as they are complete; only their byte offsets are
+kept, and the page tree, catalog, xref table and trailer go out at the end.
+Memory use is therefore bounded by the page being written, not the run.
+"""
+import io
+import zlib
+
+from PIL import Image
+
+from .engine import BASE_DPI, encode_image
+
+
+MM_TO_PT = 72 / 25.4
+PAGES_ID = 1
+CATALOG_ID = 2
+
+
+def px_to_pt(px, dpi=BASE_DPI):
+    return px * 72.0 / dpi
+
+
+def _num(value):
+    return f"{value:.3f}".rstrip("0").rstrip(".")
+
+
+def _jpeg_colorspace(data):
+    mode = Image.open(io.BytesIO(data)).mode
+    return {"L": b"/DeviceGray", "CMYK": b"/DeviceCMYK"}.get(mode, b"/DeviceRGB")
+
+
+class PDFStreamWriter:
+    """Writes a PDF incrementally; call begin(), add_* as needed, then finish()."""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = CATALOG_ID + 1
+        self.resources = {}
+        self.finishers = []
+
+    def _emit(self, data):
+        self.offset += len(data)
+        return data
+
+    def reserve(self):
+        """Allocate an object number, to be written later with write_object()."""
+        obj_id = self.next_id
+        self.next_id += 1
+        return obj_id
+
+    def write_object(self, obj_id, body, stream=None):
+        """Bytes of object obj_id with dictionary body and an optional (already encoded) stream."""
+        self.offsets[obj_id] = self.offset
+        parts = [f"{obj_id} 0 obj\n".encode(), body]
+        if stream is not None:
+            parts += [b"\nstream\n", stream, b"\nendstream"]
+        parts.append(b"\nendobj\n")
+        return self._emit(b"".join(parts))
+
+    def begin(self):
+        return self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def shared(self, key, factory):
+        """Document-wide state for key, made by factory(writer) on first use (e.g. a font set)."""
+        if key not in self.resources:
+            self.resources[key] = factory(self)
+        return self.resources[key]
+
+    def on_finish(self, callback):
+        """Call callback() in finish() for the bytes of objects that can only be written last."""
+        self.finishers.append(callback)
+
+    # =========================
+    # IMAGES
+    # =========================
+    def add_jpeg(self, data, width, height):
+        """Embed JPEG bytes as-is (DCTDecode). Returns (obj_id, bytes)."""
+        obj_id = self.reserve()
+        body = (b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s "
+                b"/BitsPerComponent 8 /Filter /DCTDecode /Length %d >>"
+                % (width, height, _jpeg_colorspace(data), len(data)))
+        return obj_id, self.write_object(obj_id, body, data)
+
+    def add_image(self, img, fmt="JPEG", quality=90):
+        """Embed a PIL image as JPEG (DCTDecode) or lossless Flate. Returns (obj_id, bytes)."""
+        if fmt.upper() in ("JPG", "JPEG") and img.mode in ("RGB", "L"):
+            return self.add_jpeg(encode_image(img, "JPEG", quality=quality), *img.size)
+
+        out = []
+        smask = None
+        if img.mode in ("RGBA", "LA"):
+            alpha = img.getchannel("A")
+            smask_id = self.reserve()
+            data = zlib.compress(alpha.tobytes(), 6)
+            out.append(self.write_object(smask_id, (
+                b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>"
+                % (img.width, img.height, len(data))), data))
+            smask = smask_id
+        base = img.convert("L" if img.mode in ("L", "LA") else "RGB")
+        colorspace = b"/DeviceGray" if base.mode == "L" else b"/DeviceRGB"
+        data = zlib.compress(base.tobytes(), 6)
+        obj_id = self.reserve()
+        extra = b" /SMask %d 0 R" % smask if smask else b""
+        out.append(self.write_object(obj_id, (
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace %s "
+            b"/BitsPerComponent 8 /Filter /FlateDecode%s /Length %d >>"
+            % (img.width, img.height, colorspace, extra, len(data))), data))
+        return obj_id, b"".join(out)
+
+    # =========================
+    # PAGES
+    # =========================
+    def add_page(self, width_pt, height_pt, images=(), content=b""):
+        """Add a page placing images [(obj_id, x, y, w, h) in points, origin top-left].
+
+        An image tuple may carry a sixth item, True to draw it turned by 180
+        degrees. content is extra page content (already in PDF user space)
+        drawn after the images.
+        """
+        ops = []
+        xobjects = []
+        for i, (obj_id, x, y, w, h, *turned) in enumerate(images):
+            name = f"Im{i}"
+            xobjects.append(f"/{name} {obj_id} 0 R")
+            bottom = height_pt - y - h
+            if turned and turned[0]:
+                ops.append(f"q {_num(-w)} 0 0 {_num(-h)} {_num(x + w)} {_num(bottom + h)} cm /{name} Do Q")
+            else:
+                ops.append(f"q {_num(w)} 0 0 {_num(h)} {_num(x)} {_num(bottom)} cm /{name} Do Q")
+        stream = zlib.compress(("\n".join(ops)).encode() + b"\n" + content, 6)
+
+        content_id = self.reserve()
+        page_id = self.reserve()
+        self.page_ids.append(page_id)
+        resources = f"<< /XObject << {' '.join(xobjects)} >> >>" if xobjects else "<< >>"
+        return b"".join([
+            self.write_object(content_id, b"<< /Filter /FlateDecode /Length %d >>" % len(stream), stream),
+            self.write_object(page_id, (
+                f"<< /Type /Page /Parent {PAGES_ID} 0 R /MediaBox [0 0 {_num(width_pt)} {_num(height_pt)}] "
+                f"/Resources {resources} /Contents {content_id} 0 R >>").encode()),
+        ])
+
+    def finish(self, title=None):
+        out = [callback() for callback in self.finishers]
+        kids = " ".join(f"{pid} 0 R" for pid in self.page_ids)
+        out += [
+            self.write_object(PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode()),
+            self.write_object(CATALOG_ID, f"<< /Type /Catalog /Pages {PAGES_ID} 0 R >>".encode()),
+        ]
+        info_ref = b""
+        if title:
+            info_id = self.reserve()
+            escaped = title.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            out.append(self.write_object(info_id, f"<< /Title ({escaped}) /Producer (idcard_app) >>".encode("latin-1", "replace")))
+            info_ref = b" /Info %d 0 R" % info_id
+
+        xref_offset = self.offset
+        lines = [b"xref\n0 %d\n" % self.next_id, b"0000000000 65535 f \n"]
+        for obj_id in range(1, self.next_id):
+            lines.append(b"%010d 00000 n \n" % self.offsets.get(obj_id, 0))
+        lines.append(b"trailer\n<< /Size %d /Root %d 0 R%s >>\nstartxref\n%d\n%%%%EOF\n"
+                     % (self.next_id, CATALOG_ID, info_ref, xref_offset))
+        out.append(self._emit(b"".join(lines)))
+        return b"".join(out)
+
+
+# =========================
+# CARD LAYOUT (addSidesToPDF)
+# =========================
+CARD_MARGIN_MM = 3
+CARD_GAP_MM = 4
+
+
+def add_side(writer, side):
+    """Embed one card side; returns (obj_id, (width, height) in pixels, bytes).
+
+    side is a PIL image, a (jpeg_bytes, width, height) tuple or a
+    vector.VectorSide (a form XObject drawn into the same unit square).
+    """
+    if hasattr(side, "embed"):
+        obj_id, data = side.embed(writer)
+        return obj_id, side.size, data
+    if isinstance(side, tuple):
+        obj_id, data = writer.add_jpeg(*side)
+        return obj_id, tuple(side[1:]), data
+    obj_id, data = writer.add_image(side)
+    return obj_id, side.size, data
+
+
+def add_card_page(writer, front, back, dpi=BASE_DPI):
+    """Front and back side by side on one page, like addSidesToPDF in generate_id.html.
+
+    front/back are PIL images, (jpeg_bytes, width, height) tuples or None.
+    """
+    sides = [side for side in (front, back) if side is not None]
+    if not sides:
+        return b""
+    out = []
+    placed = []
+    for side in sides:
+        obj_id, size, data = add_side(writer, side)
+        out.append(data)
+        placed.append((obj_id, size))
+
+    card_w = px_to_pt(placed[0][1][0], dpi)
+    card_h = px_to_pt(placed[0][1][1], dpi)
+    margin, gap = CARD_MARGIN_MM * MM_TO_PT, CARD_GAP_MM * MM_TO_PT
+    page_w = margin * 2 + card_w * 2 + gap
+    page_h = margin * 2 + card_h
+
+    images = []
+    if front is not None:
+        images.append((placed[0][0], margin, margin, card_w, card_h))
+    if back is not None:
+        images.append((placed[-1][0], margin + card_w + gap, margin, card_w, card_h))
+    out.append(writer.add_page(page_w, page_h, images))
+    return b"".join(out)
+
+
+def stream_cards_pdf(cards, dpi=BASE_DPI, title=None):
+    """Yield a PDF with one page per (front, back) pair from the iterable cards."""
+    writer = PDFStreamWriter()
+    yield writer.begin()
+    for front, back in cards:
+        page = add_card_page(writer, front, back, dpi=dpi)
+        if page:
+            yield page
+    yield writer.finish(title=title)
@@ -0,0 +1,219 @@
+"""Fonts for the vector PDF backend.
+
+A template's CSS family is resolved to a TrueType file the same way the raster
+renderer does (fonts.find_font_file). With fontTools installed that file is
+embedded as a CID font (Identity-H, two-byte glyph ids). When the document
+finishes, it is subsetted to the glyphs actually shown and given a ToUnicode
+map, so text stays searchable and copyable. Without fontTools, or for
+CFF-flavoured or embedding-restricted fonts, text is set in Helvetica, which
+every PDF reader provides, with WinAnsi encoding.
+"""
+import hashlib
+import io
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from .fonts import find_font_file
+from .pdf import _num
+
+
+# Helvetica advance widths (1/1000 em) for WinAnsi codes 32-126, from its AFM
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+HELVETICA_DEFAULT_WIDTH = 556
+# OS/2 fsType bit 1: the font's licence forbids embedding
+RESTRICTED_LICENSE = 0x0002
+BFCHAR_BLOCK = 100
+
+
+def _literal(data):
+    return "(" + data.decode("latin-1").replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+class StandardFont:
+    """Helvetica, not embedded; stands in for Arial (whose ascent and descent it borrows)."""
+
+    ascent = 0.905
+    descent = -0.212
+
+    def __init__(self, writer, name):
+        self.name = name
+        self.obj_id = writer.reserve()
+
+    def encode(self, text):
+        return text.encode("cp1252", "replace")
+
+    def width(self, text, size):
+        units = sum(HELVETICA_WIDTHS[b - 32] if 32 <= b < 127 else HELVETICA_DEFAULT_WIDTH
+                    for b in self.encode(text))
+        return units * size / 1000
+
+    def show(self, text):
+        """The string operand of a Tj showing text."""
+        return _literal(self.encode(text))
+
+    def finish(self, writer):
+        return writer.write_object(
+            self.obj_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+
+class FontMetrics:
+    """What the content streams need from a TrueType file, read once per process."""
+
+    def __init__(self, path, font):
+        self.path = path
+        head, hhea, hmtx = font["head"], font["hhea"], font["hmtx"]
+        self.upem = head.unitsPerEm
+        self.advances = [hmtx[name][0] for name in font.getGlyphOrder()]
+        self.cmap = {cp: font.getGlyphID(name) for cp, name in (font.getBestCmap() or {}).items()}
+        self.ascent = hhea.ascent / self.upem
+        self.descent = hhea.descent / self.upem
+        self.bbox = [round(v * 1000 / self.upem) for v in (head.xMin, head.yMin, head.xMax, head.yMax)]
+        self.italic_angle = font["post"].italicAngle if "post" in font else 0
+        os2 = font["OS/2"] if "OS/2" in font else None
+        cap_height = getattr(os2, "sCapHeight", 0) if os2 is not None else 0
+        self.cap_height = round((cap_height or hhea.ascent) * 1000 / self.upem)
+        name = font["name"].getDebugName(6) if "name" in font else None
+        self.ps_name = "".join(c for c in (name or Path(path).stem) if c.isalnum() or c in "-_") or "Font"
+
+
+@lru_cache(maxsize=16)
+def font_metrics(path):
+    """FontMetrics for an embeddable TrueType file, or None (no fontTools, CFF outlines, restricted)."""
+    try:
+        from fontTools.ttLib import TTFont, TTLibError
+    except ImportError:
+        return None
+    try:
+        font = TTFont(path, lazy=True)
+        if "glyf" not in font:
+            return None
+        if "OS/2" in font and font["OS/2"].fsType & RESTRICTED_LICENSE:
+            return None
+        return FontMetrics(path, font)
+    except (OSError, TTLibError, KeyError, AttributeError):
+        return None
+
+
+def subset_program(path, glyph_ids):
+    """The TrueType file at path reduced to glyph_ids, keeping every glyph's id."""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.retain_gids = True       # content streams already refer to the original ids
+    options.notdef_outline = True
+    options.layout_features = []     # text is laid out here, not by the reader
+    options.drop_tables += ["FFTM"]  # FontForge timestamp, which fontTools cannot subset
+    font = TTFont(path)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(gids=glyph_ids)
+    subsetter.subset(font)
+    buffer = io.BytesIO()
+    font.save(buffer)
+    return buffer.getvalue()
+
+
+class EmbeddedFont:
+    """A TrueType file embedded as a Type0/CIDFontType2 font, subsetted in finish()."""
+
+    def __init__(self, writer, name, metrics):
+        self.name = name
+        self.metrics = metrics
+        self.ascent = metrics.ascent
+        self.descent = metrics.descent
+        self.obj_id = writer.reserve()
+        self.used = {}   # glyph id -> the character it was shown for
+
+    def glyphs(self, text):
+        return [self.metrics.cmap.get(ord(c), 0) for c in text]
+
+    def width(self, text, size):
+        advances = self.metrics.advances
+        return sum(advances[gid] for gid in self.glyphs(text)) * size / self.metrics.upem
+
+    def show(self, text):
+        gids = self.glyphs(text)
+        for gid, char in zip(gids, text):
+            self.used.setdefault(gid, char)
+        return "<" + "".join(f"{gid:04x}" for gid in gids) + ">"
+
+    def _to_unicode(self):
+        pairs = [(gid, char) for gid, char in sorted(self.used.items()) if gid]
+        lines = [
+            "/CIDInit /ProcSet findresource begin", "12 dict begin", "begincmap",
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+            "/CMapName /Adobe-Identity-UCS def", "/CMapType 2 def",
+            "1 begincodespacerange", "<0000> <FFFF>", "endcodespacerange",
+        ]
+        for start in range(0, len(pairs), BFCHAR_BLOCK):
+            block = pairs[start:start + BFCHAR_BLOCK]
+            lines.append(f"{len(block)} beginbfchar")
+            lines += [f"<{gid:04x}> <{char.encode('utf-16-be').hex()}>" for gid, char in block]
+            lines.append("endbfchar")
+        lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+        return "\n".join(lines).encode("ascii")
+
+    def finish(self, writer):
+        metrics = self.metrics
+        glyph_ids = sorted(set(self.used) | {0})
+        program = subset_program(metrics.path, glyph_ids)
+        # subset fonts are named with a tag derived from their glyphs (ISO 32000 9.6.4)
+        digest = hashlib.sha256(repr(glyph_ids).encode()).digest()
+        base_font = "".join(chr(65 + b % 26) for b in digest[:6]) + "+" + metrics.ps_name
+        file_id, descriptor_id, cid_id, unicode_id = (writer.reserve() for _ in range(4))
+
+        data = zlib.compress(program, 6)
+        to_unicode = zlib.compress(self._to_unicode(), 6)
+        widths = " ".join(f"{gid} [{round(metrics.advances[gid] * 1000 / metrics.upem)}]" for gid in glyph_ids)
+        flags = 32 | (64 if metrics.italic_angle else 0)   # nonsymbolic, italic
+        return b"".join([
+            writer.write_object(file_id, b"<< /Length %d /Length1 %d /Filter /FlateDecode >>"
+                                % (len(data), len(program)), data),
+            writer.write_object(descriptor_id, (
+                f"<< /Type /FontDescriptor /FontName /{base_font} /Flags {flags} "
+                f"/FontBBox [{' '.join(str(v) for v in metrics.bbox)}] /ItalicAngle {_num(metrics.italic_angle)} "
+                f"/Ascent {round(metrics.ascent * 1000)} /Descent {round(metrics.descent * 1000)} "
+                f"/CapHeight {metrics.cap_height} /StemV 80 /FontFile2 {file_id} 0 R >>").encode()),
+            writer.write_object(cid_id, (
+                f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{base_font} "
+                f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+                f"/FontDescriptor {descriptor_id} 0 R /W [{widths}] /CIDToGIDMap /Identity >>").encode()),
+            writer.write_object(unicode_id, b"<< /Filter /FlateDecode /Length %d >>" % len(to_unicode), to_unicode),
+            writer.write_object(self.obj_id, (
+                f"<< /Type /Font /Subtype /Type0 /BaseFont /{base_font} /Encoding /Identity-H "
+                f"/DescendantFonts [{cid_id} 0 R] /ToUnicode {unicode_id} 0 R >>").encode()),
+        ])
+
+
+class FontSet:
+    """The fonts of one PDF document by CSS family; all are written when it finishes."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.by_file = {}     # font path (None for Helvetica) -> font
+        self.by_family = {}
+        writer.on_finish(self.finish)
+
+    def get(self, family):
+        family = family or "Arial"
+        if family not in self.by_family:
+            path = find_font_file(family)
+            metrics = font_metrics(path) if path else None
+            key = metrics.path if metrics else None
+            if key not in self.by_file:
+                name = f"F{len(self.by_file)}"
+                self.by_file[key] = (EmbeddedFont(self.writer, name, metrics) if metrics
+                                     else StandardFont(self.writer, name))
+            self.by_family[family] = self.by_file[key]
+        return self.by_family[family]
+
+    def finish(self):
+        return b"".join(font.finish(self.writer) for font in self.by_file.values())
@@ -0,0 +1,450 @@
+"""Vector PDF backend: card sides as PDF drawing operators instead of pixels.
+
+render_cards() rasterizes every side, so each page of a PDF carries its own
+copy of the header, background and logo pixels, and all text is bitmap.
+vector_cards() yields VectorSide objects instead. pdf.add_side() embeds them as
+form XObjects that draw the same elements as engine.py:
+
+    rect, circle, barcode, QR code   filled paths
+    text                             text in an embedded font (pdf_fonts.py)
+    image (logos, backgrounds)       one image XObject per document
+    photo, signature                 an image per user, at the export DPI
+
+Each side's static layer (compiler.split_layers) is a form written once per
+document and drawn by every card, so a card adds only its own text, codes and
+photos. A card's form maps the card to the unit square, as an image XObject
+does, so the page layouts in pdf.py and imposition.py place either kind.
+"""
+import zlib
+
+from PIL import Image
+
+from .. import metrics
+from .codes import code128_modules, qr_matrix
+from .compiler import op_image_sizes, split_layers, template_hash
+from .context import resolve_text, user_context
+from .engine import (
+    BASE_DPI,
+    DEFAULT_BG,
+    SIDES,
+    RenderContext,
+    _num,
+    _opacity,
+    barcode_payload,
+    card_size,
+    load_src_image,
+    load_user_images,
+    parse_color,
+    qr_payload,
+    side_elements,
+    text_max_width,
+    wrap_lines,
+)
+from .pdf import _num as _fmt
+from .pdf_fonts import FontSet
+
+
+# Bezier handle length for a quarter circle of radius 1
+KAPPA = 0.5523
+LINE_HEIGHT = 1.3
+
+
+# =========================
+# DOCUMENT RESOURCES
+# =========================
+class VectorDocument:
+    """Objects shared by every card of one PDF: fonts, alpha states, images, static layers.
+
+    Objects are written as soon as they are first needed; drain() hands their
+    bytes to the stream ahead of the form that uses them.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.fonts = writer.shared("fonts", FontSet)
+        self.states = {}
+        self.images = {}
+        self.forms = {}
+        self.pending = []
+
+    def drain(self):
+        data, self.pending = b"".join(self.pending), []
+        return data
+
+    def state(self, alpha):
+        """ExtGState object id for a fill/stroke alpha of 0-255."""
+        if alpha not in self.states:
+            obj_id = self.writer.reserve()
+            value = _fmt(alpha / 255)
+            self.pending.append(self.writer.write_object(
+                obj_id, f"<< /Type /ExtGState /ca {value} /CA {value} >>".encode()))
+            self.states[alpha] = obj_id
+        return self.states[alpha]
+
+    def image(self, key, img, size, lossy=False):
+        """Object id of img embedded at no more than size pixels; the same key is embedded once.
+
+        key None always embeds. Opaque images lose their alpha channel;
+        lossy ones (photos) are stored as JPEG, the rest losslessly.
+        """
+        if key is not None and key in self.images:
+            return self.images[key]
+        if img.width > size[0] or img.height > size[1]:
+            img = img.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        if img.mode == "RGBA" and img.getchannel("A").getextrema()[0] == 255:
+            img = img.convert("RGB")
+        obj_id, data = self.writer.add_image(img, fmt="JPEG" if lossy else "PNG")
+        self.pending.append(data)
+        if key is not None:
+            self.images[key] = obj_id
+        return obj_id
+
+    def base_form(self, template, side):
+        """Object id of the form drawing a side's background and static elements."""
+        key = (template.hash, side, template.scale)
+        if key not in self.forms:
+            canvas = FormCanvas(self, template.width, template.height)
+            canvas.fill(canvas.rect(0, 0, template.width, template.height), parse_color(template.bg, DEFAULT_BG))
+            r = VectorContext(template.width, template.height, template.scale, {}, {}, {})
+            for el in template.sides[side][0]:
+                canvas.draw(el, r)
+            obj_id = self.writer.reserve()
+            self.pending.append(canvas.write(self.writer, obj_id))
+            self.forms[key] = obj_id
+        return self.forms[key]
+
+
+# =========================
+# FORM CANVAS
+# =========================
+class FormCanvas:
+    """Operators and resources of one form XObject; coordinates are template pixels, origin top-left."""
+
+    def __init__(self, doc, width, height):
+        self.doc = doc
+        self.width = width
+        self.height = height
+        self.ops = []
+        self.xobjects = {}
+        self.fonts = {}
+        self.states = {}
+
+    # ---- paths (strings of path operators) ----
+    def rect(self, left, top, w, h):
+        return f"{_fmt(left)} {_fmt(self.height - top - h)} {_fmt(w)} {_fmt(h)} re"
+
+    def ellipse(self, cx, cy, rx, ry):
+        cy = self.height - cy
+        kx, ky = rx * KAPPA, ry * KAPPA
+        points = [
+            (cx + rx, cy, "m"),
+            (cx + rx, cy + ky, cx + kx, cy + ry, cx, cy + ry, "c"),
+            (cx - kx, cy + ry, cx - rx, cy + ky, cx - rx, cy, "c"),
+            (cx - rx, cy - ky, cx - kx, cy - ry, cx, cy - ry, "c"),
+            (cx + kx, cy - ry, cx + rx, cy - ky, cx + rx, cy, "c"),
+        ]
+        return " ".join(" ".join(_fmt(v) for v in p[:-1]) + " " + p[-1] for p in points) + " h"
+
+    def rounded_rect(self, left, top, w, h, radius):
+        radius = min(radius, w / 2, h / 2)
+        x0, x1 = left, left + w
+        y0, y1 = self.height - top - h, self.height - top
+        k = radius * (1 - KAPPA)
+        parts = [
+            (x0 + radius, y0, "m"), (x1 - radius, y0, "l"),
+            (x1 - k, y0, x1, y0 + k, x1, y0 + radius, "c"), (x1, y1 - radius, "l"),
+            (x1, y1 - k, x1 - k, y1, x1 - radius, y1, "c"), (x0 + radius, y1, "l"),
+            (x0 + k, y1, x0, y1 - k, x0, y1 - radius, "c"), (x0, y0 + radius, "l"),
+            (x0, y0 + k, x0 + k, y0, x0 + radius, y0, "c"),
+        ]
+        return " ".join(" ".join(_fmt(v) for v in p[:-1]) + " " + p[-1] for p in parts) + " h"
+
+    # ---- painting ----
+    def _alpha(self, alpha):
+        if alpha < 255:
+            name = f"A{alpha}"
+            self.states[name] = self.doc.state(alpha)
+            self.ops.append(f"/{name} gs")
+
+    @staticmethod
+    def _color(rgba):
+        return " ".join(_fmt(c / 255) for c in rgba[:3])
+
+    def fill(self, path, rgba):
+        if rgba is None or not rgba[3] or not path:
+            return
+        self.ops.append("q")
+        self._alpha(rgba[3])
+        self.ops.append(f"{self._color(rgba)} rg {path} f Q")
+
+    def stroke_dashed(self, left, top, w, h, rgba, dash=4):
+        if rgba is None or not rgba[3]:
+            return
+        self.ops.append("q")
+        self._alpha(rgba[3])
+        path = self.rect(left + 0.5, top + 0.5, w - 1, h - 1)
+        self.ops.append(f"{self._color(rgba)} RG 1 w [{dash} {dash}] 0 d {path} S Q")
+
+    def image(self, obj_id, left, top, w, h, clip=None, alpha=255):
+        name = f"I{obj_id}"
+        self.xobjects[name] = obj_id
+        self.ops.append("q")
+        if clip:
+            self.ops.append(f"{clip} W n")
+        self._alpha(alpha)
+        self.ops.append(f"{_fmt(w)} 0 0 {_fmt(h)} {_fmt(left)} {_fmt(self.height - top - h)} cm /{name} Do Q")
+
+    def form(self, obj_id):
+        name = f"X{obj_id}"
+        self.xobjects[name] = obj_id
+        self.ops.append(f"/{name} Do")
+
+    def text(self, font, size, x, baseline, text, rgba, align="left"):
+        """One line of text with its baseline at (x, baseline), anchored left/center/right at x."""
+        if not text or rgba is None or not rgba[3]:
+            return
+        if align == "right":
+            x -= font.width(text, size)
+        elif align != "left":
+            x -= font.width(text, size) / 2
+        self.fonts[font.name] = font.obj_id
+        self.ops.append("q")
+        self._alpha(rgba[3])
+        self.ops.append(f"{self._color(rgba)} rg BT /{font.name} {_fmt(size)} Tf "
+                        f"{_fmt(x)} {_fmt(self.height - baseline)} Td {font.show(text)} Tj ET Q")
+
+    def draw(self, el, r):
+        drawer = VECTOR_DRAWERS.get(el.get("type")) if isinstance(el, dict) else None
+        if drawer:
+            drawer(self, el, r)
+
+    # ---- output ----
+    def write(self, writer, obj_id, matrix=None):
+        """Bytes of this canvas as form object obj_id; matrix maps form space to user space."""
+        def names(entries):
+            return " ".join(f"/{name} {oid} 0 R" for name, oid in sorted(entries.items()))
+
+        resources = []
+        for kind, entries in (("XObject", self.xobjects), ("Font", self.fonts), ("ExtGState", self.states)):
+            if entries:
+                resources.append(f"/{kind} << {names(entries)} >>")
+        stream = zlib.compress("\n".join(self.ops).encode("latin-1"), 6)
+        # 1/width needs more than the three decimals coordinates get
+        matrix = f" /Matrix [{' '.join(f'{v:.10f}'.rstrip('0').rstrip('.') for v in matrix)}]" if matrix else ""
+        body = (f"<< /Type /XObject /Subtype /Form /BBox [0 0 {_fmt(self.width)} {_fmt(self.height)}]{matrix} "
+                f"/Resources << {' '.join(resources)} >> /Filter /FlateDecode /Length {len(stream)} >>")
+        return writer.write_object(obj_id, body.encode(), stream)
+
+
+# =========================
+# ELEMENT DRAWERS
+# =========================
+class VectorContext(RenderContext):
+    """RenderContext plus the content hashes of the user's images, to share repeated photos."""
+
+    def __init__(self, width, height, scale, ctx, images, digests):
+        super().__init__(width, height, scale, ctx, images)
+        self.digests = digests
+
+
+def _box(el, default_w, default_h):
+    """Centre-positioned element -> (left, top, width, height) in template pixels."""
+    w, h = _num(el, "w", default_w), _num(el, "h", default_h)
+    return _num(el, "x", 0) - w / 2, _num(el, "y", 0) - h / 2, w, h
+
+
+def _centered_text(c, font_size, box, label, color):
+    font = c.doc.fonts.get("Arial")
+    cx, cy = box[0] + box[2] / 2, box[1] + box[3] / 2
+    c.text(font, font_size, cx, cy + (font.ascent + font.descent) / 2 * font_size, label, color, "center")
+
+
+def _user_image(c, el, r, field, box, clip=None):
+    img = r.images.get(field)
+    size = (max(1, round(box[2] * r.scale)), max(1, round(box[3] * r.scale)))
+    digest = r.digests.get(field)
+    obj_id = c.doc.image((field, digest, size) if digest else None, img, size, lossy=field == "photo")
+    c.image(obj_id, *box, clip=clip)
+
+
+def _placeholder(c, el, box, border, text_color, label, size):
+    c.stroke_dashed(*box, parse_color(el.get("borderColor"), border))
+    _centered_text(c, size, box, label, parse_color(text_color))
+
+
+def draw_rect(c, el, r):
+    c.fill(c.rect(*_box(el, 100, 100)), parse_color(el.get("fill"), "#000000", _opacity(el)))
+
+
+def draw_circle(c, el, r):
+    radius = _num(el, "r", _num(el, "w", 100) / 2)
+    c.fill(c.ellipse(_num(el, "x", 0), _num(el, "y", 0), radius, radius),
+           parse_color(el.get("fill"), "#000000", _opacity(el)))
+
+
+def draw_photo(c, el, r):
+    box = _box(el, 110, 140)
+    radius = _num(el, "borderRadius", 0)
+    clip = c.rounded_rect(*box, radius) if radius > 0 else None
+    if el.get("bgColor"):
+        c.fill(clip or c.rect(*box), parse_color(el.get("bgColor"), "#ffffff"))
+    if r.images.get("photo") is not None:
+        _user_image(c, el, r, "photo", box, clip=clip)
+    else:
+        _placeholder(c, el, box, "#cbd5e1", "#94a3b8", "No Photo", 12)
+
+
+def draw_signature(c, el, r):
+    box = _box(el, 120, 50)
+    if el.get("bgColor"):
+        c.fill(c.rect(*box), parse_color(el.get("bgColor"), "#ffffff"))
+    if r.images.get("signature") is not None:
+        _user_image(c, el, r, "signature", box)
+    else:
+        _placeholder(c, el, box, "#fbbf24", "#f59e0b", "No Signature", 10)
+
+
+def draw_text(c, el, r):
+    fill = parse_color(el.get("color"), "#000000", _opacity(el))
+    if fill is None:
+        return
+    text = resolve_text(el.get("text") or "", r.ctx)
+    size = _num(el, "size", 14)
+    font = c.doc.fonts.get(el.get("font") or "Arial")
+    align = el.get("align") or "center"
+    x, y = _num(el, "x", 0), _num(el, "y", 0)
+    lines = wrap_lines(text, lambda s: font.width(s, size), text_max_width(el, r.width))
+    for idx, line in enumerate(lines):
+        # the raster renderer anchors each line at its ascender
+        c.text(font, size, x, y + idx * size * LINE_HEIGHT + font.ascent * size, line, fill, align)
+
+
+def draw_barcode(c, el, r):
+    left, top, w, h = _box(el, 150, 50)
+    fill = parse_color(el.get("fill"), "#0f172a", _opacity(el))
+    payload = barcode_payload(el, r.ctx)
+    if not payload or fill is None:
+        return
+    runs = code128_modules(payload)
+    module = w / sum(width for _, width in runs)
+    bars, pos = [], 0
+    for is_bar, width in runs:
+        if is_bar:
+            bars.append(c.rect(left + pos * module, top, width * module, h))
+        pos += width
+    c.fill(" ".join(bars), fill)
+    font = c.doc.fonts.get("Arial")
+    c.text(font, 10, left + w / 2, top + h + 12, str(payload), parse_color("#0f172a"), "center")
+
+
+def draw_qrcode(c, el, r):
+    box = _box(el, 100, 100)
+    fill = parse_color(el.get("fill"), "#0f172a", _opacity(el))
+    payload = qr_payload(el, r.ctx)
+    matrix = qr_matrix(payload) if payload else None
+    if matrix is None:
+        # qrcode not installed: same solid block the designer draws
+        c.fill(c.rect(*box), fill)
+        _centered_text(c, 10, box, "QR", (255, 255, 255, 255))
+        return
+
+    c.fill(c.rect(*box), parse_color(el.get("bgColor"), "#ffffff"))
+    side = min(box[2], box[3])
+    module = side / len(matrix)
+    left, top = box[0] + (box[2] - side) / 2, box[1] + (box[3] - side) / 2
+    cells = []
+    for row, dark in enumerate(matrix):
+        col = 0
+        while col < len(dark):
+            if not dark[col]:
+                col += 1
+                continue
+            start = col
+            while col < len(dark) and dark[col]:
+                col += 1
+            # one path for the whole symbol, so adjacent modules show no seams
+            cells.append(c.rect(left + start * module, top + row * module, (col - start) * module, module))
+    c.fill(" ".join(cells), fill)
+
+
+def draw_image(c, el, r):
+    src = el.get("src")
+    img = load_src_image(src)
+    if img is None:
+        return
+    box = _box(el, 80, 100)
+    size = (max(1, round(box[2] * r.scale)), max(1, round(box[3] * r.scale)))
+    alpha = round(255 * max(0.0, min(1.0, _opacity(el))))
+    c.image(c.doc.image(("src", src, size), img, size), *box, alpha=alpha)
+
+
+VECTOR_DRAWERS = {
+    "rect": draw_rect,
+    "square": draw_rect,
+    "circle": draw_circle,
+    "photo": draw_photo,
+    "signature": draw_signature,
+    "text": draw_text,
+    "barcode": draw_barcode,
+    "qrcode": draw_qrcode,
+    "image": draw_image,
+}
+
+
+# =========================
+# CARDS
+# =========================
+class VectorTemplate:
+    """A template's sides split into the static layer (drawn once per document) and per-card ops."""
+
+    def __init__(self, template_json, dpi=BASE_DPI, include_back=True):
+        self.width, self.height, self.bg = card_size(template_json)
+        self.scale = dpi / BASE_DPI
+        self.hash = template_hash(template_json)
+        self.sides = {}
+        for side in SIDES:
+            if side == "back" and not include_back:
+                continue
+            elements = [el for el in side_elements(template_json, side) if isinstance(el, dict)]
+            if elements:
+                self.sides[side] = split_layers(elements, self.width, self.height)
+
+    def image_sizes(self):
+        return op_image_sizes([op for _, ops in self.sides.values() for op in ops], self.scale)
+
+
+class VectorSide:
+    """One side of one user's card, embedded by pdf.add_side() as a form XObject."""
+
+    def __init__(self, template, side, r):
+        self.template = template
+        self.side = side
+        self.r = r
+        self.size = (max(1, round(template.width * template.scale)), max(1, round(template.height * template.scale)))
+
+    def embed(self, writer):
+        """(obj_id, bytes) of the card's form and any shared objects it needs first."""
+        doc = writer.shared("vector", VectorDocument)
+        template = self.template
+        canvas = FormCanvas(doc, template.width, template.height)
+        canvas.form(doc.base_form(template, self.side))
+        with metrics.RENDER_STAGE.time(stage="vector"):
+            for el in template.sides[self.side][1]:
+                canvas.draw(el, self.r)
+        obj_id = writer.reserve()
+        doc.pending.append(canvas.write(writer, obj_id, matrix=(1 / template.width, 0, 0, 1 / template.height, 0, 0)))
+        return obj_id, doc.drain()
+
+
+def vector_cards(template_json, users, include_back=True, dpi=BASE_DPI):
+    """Yield (front, back) VectorSides for each user, like render_cards(); None for a missing side.
+
+    dpi only sets the resolution of photos, signatures and template images.
+    """
+    template = VectorTemplate(template_json, dpi, include_back)
+    sizes = template.image_sizes()
+    for user in users:
+        images = load_user_images(user, sizes) if sizes else {}
+        digests = {field: getattr(user, f"{field}_hash", None) for field in sizes}
+        r = VectorContext(template.width, template.height, template.scale, user_context(user), images, digests)
+        yield tuple(VectorSide(template, side, r) if side in template.sides else None for side in SIDES)
@@ -0,0 +1,142 @@
+"""Serve files from disk after a Django permission check.
+
+With a front proxy the view only decides *whether* the file may be sent and
+hands the transfer back to the proxy (settings.SENDFILE_BACKEND):
+
+    "x-accel-redirect"  nginx; SENDFILE_URL_PREFIX must name an internal
+                        location aliased to the root directory, e.g.
+                            location /protected-media/ {
+                                internal;
+                                alias /srv/idcard/idcard_app/static/uploads/;
+                            }
+    "x-sendfile"        Apache mod_xsendfile, lighttpd, Caddy; the header
+                        carries the absolute path
+
+The proxy then does the I/O (sendfile, Range, keep-alive) and the Python
+worker is free as soon as the headers are written. Without a proxy ("") the
+file is sent by Django: a whole file as a FileResponse, which WSGI servers
+such as gunicorn pass to os.sendfile(), and a byte range as a stream of
+chunks. Both answer If-None-Match/If-Modified-Since with 304 and honour a
+single Range (with If-Range).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+BACKENDS = ("", "x-accel-redirect", "x-sendfile")
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def file_etag(stat):
+    """Validator built from size and mtime, as nginx builds its own; the file is never read."""
+    return quote_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single "bytes=" range, None to send the whole file.
+
+    Raises ValueError when the range cannot be satisfied. Multi-range requests
+    are answered with the whole file, which RFC 9110 allows.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range starts past the end of the file")
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        return value == etag
+    return parse_http_date_safe(value) == int(last_modified)
+
+
+def _chunks(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            data = fh.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _proxied(path, name, backend):
+    response = HttpResponse()
+    if backend == "x-accel-redirect":
+        prefix = getattr(settings, "SENDFILE_URL_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(name.lstrip("/"))
+    else:
+        response["X-Sendfile"] = os.fspath(path)
+    return response
+
+
+def serve_file(request, path, name=None, content_type=None, cache_seconds=None, backend=None):
+    """Response for GET/HEAD of the file at path, to be sent after permission checks.
+
+    name is the path relative to the root the proxy maps (required for
+    X-Accel-Redirect). Raises FileNotFoundError if the file does not exist.
+    Responses are private (per-user permissions): cached for cache_seconds,
+    then revalidated with the ETag.
+    """
+    backend = getattr(settings, "SENDFILE_BACKEND", "") if backend is None else backend
+    if backend not in BACKENDS:
+        raise ValueError(f"SENDFILE_BACKEND must be one of {BACKENDS}")
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+    content_type = content_type or mimetypes.guess_type(os.fspath(path))[0] or "application/octet-stream"
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None and backend:
+        # the proxy handles Range itself
+        response = _proxied(path, name or os.path.basename(path), backend)
+        response["Content-Type"] = content_type
+    elif response is None:
+        byte_range = None
+        if request.META.get("HTTP_RANGE") and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.META["HTTP_RANGE"], stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{stat.st_size}"
+                return response
+        if byte_range is None:
+            response = FileResponse(open(path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(_chunks(path, start, end - start + 1),
+                                             status=206, content_type=content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = str(end - start + 1)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if cache_seconds:
+        patch_cache_control(response, private=True, max_age=cache_seconds)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
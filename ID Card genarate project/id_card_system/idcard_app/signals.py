@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import imaging, metrics, rendering
+from .models import DashboardSettings, IDTemplate, User
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """WAL, synchronous=NORMAL, busy_timeout etc. (settings.SQLITE_PRAGMAS) for each new SQLite connection."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    """Count and time every statement for /metrics; the wrapper stays across reconnects."""
+    if metrics.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.record_query)
+
+
+@receiver(post_save, sender=IDTemplate)
+@receiver(post_delete, sender=IDTemplate)
+def evict_compiled_template(sender, instance, **kwargs):
+    """Saved or deleted templates must not be rendered from a stale compiled layer."""
+    rendering.evict_template(instance.id)
+
+
+@receiver(post_save, sender=DashboardSettings)
+@receiver(post_delete, sender=DashboardSettings)
+def bump_dashboard_settings_version(sender, **kwargs):
+    # after commit, so no worker re-reads the old row and caches it under the new stamp
+    transaction.on_commit(sender.bump_version)
+
+
+@receiver(pre_save, sender=User)
+def note_new_uploads(sender, instance, **kwargs):
+    # a newly assigned upload is uncommitted until the model is saved
+    instance._new_uploads = []
+    instance._replaced_photo_hash = ""
+    for field in imaging.IMAGE_FIELDS:
+        fieldfile = getattr(instance, field)
+        if fieldfile and fieldfile._committed:
+            continue
+        if field == "photo":
+            instance._replaced_photo_hash = instance.photo_hash
+        # cleared, or replaced: the new upload's hash is recorded once its derivatives are built
+        setattr(instance, f"{field}_hash", "")
+        if fieldfile:
+            instance._new_uploads.append(field)
+
+
+@receiver(post_save, sender=User)
+def build_upload_derivatives(sender, instance, **kwargs):
+    for field in getattr(instance, "_new_uploads", ()):
+        imaging.process_upload(instance, field)
+    instance._new_uploads = []
+
+    old_hash = getattr(instance, "_replaced_photo_hash", "")
+    if old_hash and old_hash != instance.photo_hash and not sender.objects.filter(photo_hash=old_hash).exists():
+        imaging.discard_cutout(old_hash, instance.photo.storage)
+    instance._replaced_photo_hash = ""
@@ -0,0 +1,53 @@
+// Small line chart drawn straight on the canvas (no charting library needed for one series)
+function drawLineChart(canvas, labels, values, color) {
+    // fill the card's width at the canvas element's aspect ratio, sharp on HiDPI screens
+    const ratio = window.devicePixelRatio || 1;
+    const box = getComputedStyle(canvas.parentElement);
+    const width = canvas.parentElement.clientWidth - parseFloat(box.paddingLeft) - parseFloat(box.paddingRight);
+    const height = Math.round(width * canvas.height / canvas.width);
+    canvas.style.width = width + "px";
+    canvas.style.height = height + "px";
+    canvas.width = width * ratio;
+    canvas.height = height * ratio;
+    const ctx = canvas.getContext("2d");
+    ctx.scale(ratio, ratio);
+
+    const pad = {left: 28, right: 10, top: 10, bottom: 22};
+    const plotW = width - pad.left - pad.right;
+    const plotH = height - pad.top - pad.bottom;
+    const max = Math.max(...values, 1);
+    const x = i => pad.left + (labels.length > 1 ? i * plotW / (labels.length - 1) : plotW / 2);
+    const y = v => pad.top + plotH - v / max * plotH;
+
+    ctx.font = "11px Poppins, sans-serif";
+    ctx.fillStyle = "#6b7280";
+    ctx.strokeStyle = "#e5e7eb";
+    ctx.lineWidth = 1;
+    ctx.textAlign = "right";
+    ctx.textBaseline = "middle";
+    for (let i = 0; i <= 4; i++) {
+        const v = max * i / 4;
+        ctx.beginPath();
+        ctx.moveTo(pad.left, y(v));
+        ctx.lineTo(width - pad.right, y(v));
+        ctx.stroke();
+        ctx.fillText(Math.round(v), pad.left - 6, y(v));
+    }
+    ctx.textAlign = "center";
+    ctx.textBaseline = "top";
+    labels.forEach((label, i) => ctx.fillText(label, x(i), height - pad.bottom + 6));
+
+    ctx.strokeStyle = color;
+    ctx.lineWidth = 3;
+    ctx.lineJoin = "round";
+    ctx.beginPath();
+    values.forEach((v, i) => (i ? ctx.lineTo(x(i), y(v)) : ctx.moveTo(x(i), y(v))));
+    ctx.stroke();
+}
+
+drawLineChart(
+    document.getElementById("myChart"),
+    ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+    [3, 7, 4, 9, 5, 10, 6],
+    "#36a2eb"
+);
@@ -0,0 +1,7 @@
+function previewImage(event){
+    const reader=new FileReader();
+    reader.onload=function(){
+        document.getElementById("avatarPreview").src=reader.result;
+    };
+    reader.readAsDataURL(event.target.files[0]);
+}
@@ -0,0 +1,54 @@
+    function previewPhoto(event) {
+        const file = event.target.files[0];
+        if (file) {
+            const reader = new FileReader();
+            reader.onload = function(e) {
+                let preview = document.getElementById('photoPreview');
+                if (!preview) {
+                    preview = document.createElement('img');
+                    preview.id = 'photoPreview';
+                    preview.className = 'photo-preview';
+                    document.querySelector('.photo-item:nth-child(1)').insertBefore(preview, document.querySelector('.photo-item:nth-child(1) .photo-item-title').nextElementSibling);
+                }
+                preview.src = e.target.result;
+            };
+            reader.readAsDataURL(file);
+        }
+    }
+
+    function previewSignature(event) {
+        const file = event.target.files[0];
+        if (file) {
+            const reader = new FileReader();
+            reader.onload = function(e) {
+                let preview = document.getElementById('signaturePreview');
+                if (!preview) {
+                    preview = document.createElement('img');
+                    preview.id = 'signaturePreview';
+                    preview.className = 'photo-preview';
+                    const items = document.querySelectorAll('.photo-item');
+                    if (items.length > 1) {
+                        items[1].insertBefore(preview, items[1].querySelector('.photo-item-title').nextElementSibling);
+                    }
+                }
+                preview.src = e.target.result;
+            };
+            reader.readAsDataURL(file);
+        }
+    }
+
+    document.getElementById('editForm').addEventListener('submit', function(e) {
+        const password = document.getElementById('password').value;
+        if (password && password.length < 8) {
+            e.preventDefault();
+            showStatus('Password must be at least 8 characters', 'error');
+            return false;
+        }
+    });
+
+    function showStatus(message, type) {
+        const msg = document.getElementById('statusMsg');
+        msg.textContent = message;
+        msg.className = `status-message ${type}`;
+        msg.style.display = 'flex';
+    }
@@ -0,0 +1,1026 @@
+// STATE VARIABLES
+let templates = [];
+let users = [];
+let selectedTemplate = null;
+let selectedUser = null;
+let selectedUsers = [];  // For multi-select
+let currentSide = 'front';
+let removePhotoBackground = true;  // Toggle for background removal
+
+// Users are loaded a page at a time from the cursor-paginated list API
+const USER_LIST_FIELDS = 'id,username,email,first_name,last_name,role';
+const USER_PAGE_SIZE = 50;
+let usersCursor = null;
+let usersExhausted = false;
+let usersQuery = '';
+let usersTotal = 0;
+let usersRequest = 0;
+let usersLoading = false;
+let allUsersSelected = false;  // "All" without a search: every card holder, resolved on the server
+const userDetails = new Map();  // id -> full user row, fetched when a user is previewed
+const templateDetails = new Map();  // id -> template JSON, fetched when a template is selected
+const cardUsers = new Map();  // id -> render-bundle user (resolved placeholders, card-size image URLs)
+
+function getCSRFToken() {
+    const name = 'csrftoken=';
+    const decoded = decodeURIComponent(document.cookie || '');
+    const parts = decoded.split(';');
+    for (let p of parts) {
+        p = p.trim();
+        if (p.startsWith(name)) return p.substring(name.length);
+    }
+    return '';
+}
+
+// INIT
+document.addEventListener('DOMContentLoaded', function() {
+    // Initialize UI; data is fetched on demand so the page stays small at any org size
+    setupEventListeners();
+    loadTemplates();
+    loadUsers();
+});
+
+// TEST API FUNCTION - CALL THIS IN BROWSER CONSOLE
+function testAPIs() {
+    console.log('Testing APIs...');
+
+    fetch('/admin/generate-id/api/templates/')
+        .then(r => {
+            console.log('Templates API status:', r.status);
+            return r.json();
+        })
+        .then(d => console.log('Templates response:', d))
+        .catch(e => console.error('Templates error:', e));
+
+    fetch('/admin/users/api/list/')
+        .then(r => {
+            console.log('Users API status:', r.status);
+            return r.json();
+        })
+        .then(d => console.log('Users response:', d))
+        .catch(e => console.error('Users error:', e));
+}
+
+// SETUP EVENTS
+function setupEventListeners() {
+    document.querySelectorAll('.side-btn').forEach(btn => {
+        btn.addEventListener('click', (e) => {
+            document.querySelectorAll('.side-btn').forEach(b => b.classList.remove('active'));
+            e.target.closest('.side-btn').classList.add('active');
+            currentSide = e.target.closest('.side-btn').dataset.side;
+            renderPreview();
+        });
+    });
+
+    // Background removal toggle
+    const bgToggle = document.getElementById('removeBgToggle');
+    if (bgToggle) {
+        bgToggle.addEventListener('change', () => {
+            if (selectedTemplate && selectedUser) {
+                showStatus('Reloading preview...', 'info');
+                renderPreview();
+            }
+        });
+    }
+
+    let searchTimer = null;
+    document.getElementById('userSearch').addEventListener('input', (e) => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => filterUsers(e.target.value), 250);
+    });
+
+    // Next page of users when the list is scrolled near its end
+    const userListEl = document.getElementById('userList');
+    userListEl.addEventListener('scroll', () => {
+        if (userListEl.scrollTop + userListEl.clientHeight >= userListEl.scrollHeight - 80) {
+            loadUsers(false);
+        }
+    });
+
+    // Select All button
+    document.getElementById('selectAllBtn').addEventListener('click', async () => {
+        if (!usersQuery) {
+            allUsersSelected = true;
+            selectedUsers = [];
+            displayUsers(users);
+            updateSelectedCount();
+            showStatus(`All ${usersTotal} users selected ✓`, 'success');
+            return;
+        }
+        try {
+            selectedUsers = await fetchAllUsers(usersQuery);
+            allUsersSelected = false;
+            displayUsers(users);
+            updateSelectedCount();
+            showStatus(`All ${selectedUsers.length} matching users selected ✓`, 'success');
+        } catch (e) {
+            showStatus('Error selecting users: ' + e.message, 'error');
+        }
+    });
+
+    // Clear All button
+    document.getElementById('clearAllBtn').addEventListener('click', () => {
+        selectedUsers = [];
+        allUsersSelected = false;
+        selectedUser = null;
+        displayUsers(users);
+        updateButtonState();
+        document.getElementById('previewCanvas').style.display = 'none';
+        document.getElementById('emptyState').style.display = 'flex';
+        updateSelectedCount();
+        showStatus('All selections cleared', 'info');
+    });
+
+    document.getElementById('downloadBtn').addEventListener('click', downloadPDF);
+    document.getElementById('generateAllBtn').addEventListener('click', openBulkModal);
+}
+
+// DISPLAY TEMPLATES IN UI
+function displayTemplates() {
+    const list = document.getElementById('templateList');
+    list.innerHTML = '';
+
+    if (!templates || templates.length === 0) {
+        list.innerHTML = '<div style="color: #6b7280; font-size: 12px; padding: 10px;">No templates found</div>';
+        return;
+    }
+
+    templates.forEach(t => {
+        const row = document.createElement('div');
+        row.className = 'template-row';
+
+        const btn = document.createElement('button');
+        btn.className = 'template-btn';
+        if (t.thumbnail) {
+            const thumb = document.createElement('img');
+            thumb.className = 'template-thumb';
+            thumb.loading = 'lazy';
+            thumb.alt = '';
+            thumb.src = t.thumbnail;
+            btn.appendChild(thumb);
+        }
+        btn.appendChild(document.createTextNode(t.name));
+        btn.onclick = function() {
+            selectTemplate(t.id, t.name, btn);
+        };
+
+        const del = document.createElement('button');
+        del.className = 'template-delete';
+        del.title = 'Delete template';
+        del.innerHTML = '<i class="fas fa-trash"></i>';
+        del.onclick = function(e) {
+            e.stopPropagation();
+            deleteTemplate(t.id);
+        };
+
+        row.appendChild(btn);
+        row.appendChild(del);
+        list.appendChild(row);
+    });
+}
+
+// POPULATE BULK MODAL WITH TEMPLATES
+function populateBulkTemplates() {
+    const select = document.getElementById('bulkTemplate');
+    select.innerHTML = '<option value="">-- Choose Template --</option>';
+
+    templates.forEach(t => {
+        const option = document.createElement('option');
+        option.value = t.id;
+        option.textContent = t.name;
+        select.appendChild(option);
+    });
+}
+
+// LOAD TEMPLATES FROM SERVER
+function loadTemplates() {
+    fetch('/admin/generate-id/api/templates/')
+        .then(r => r.json())
+        .then(data => {
+            templates = data.templates || [];
+            displayTemplates();
+            populateBulkTemplates();
+        })
+        .catch(e => console.error('Templates error:', e));
+}
+
+function deleteTemplate(id) {
+    if (!confirm('Delete this template?')) return;
+    fetch(`/admin/generate-id/api/templates/${id}/delete/`, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCSRFToken() }
+    })
+    .then(r => {
+        if (!r.ok) throw new Error('Delete failed');
+        return r.json();
+    })
+    .then(() => {
+        templates = templates.filter(t => t.id !== id);
+        templateDetails.delete(id);
+        if (selectedTemplate === id) {
+            selectedTemplate = null;
+            currentSide = 'front';
+            document.getElementById('previewCanvas').style.display = 'none';
+            document.getElementById('emptyState').style.display = 'flex';
+        }
+        displayTemplates();
+        populateBulkTemplates();
+        showStatus('Template deleted', 'success');
+    })
+    .catch(err => {
+        console.error(err);
+        showStatus('Error deleting template', 'error');
+    });
+}
+
+// LOAD USERS
+function userListParams(extra) {
+    // holders=1: only users that get ID cards (no staff/admin accounts)
+    const params = new URLSearchParams({holders: 1, fields: USER_LIST_FIELDS, ...extra});
+    if (usersQuery) params.set('q', usersQuery);
+    return params;
+}
+
+async function fetchAllUsers(query) {
+    // the list API is cursor-paginated; follow next_cursor until the last page
+    const all = [];
+    let cursor = '';
+    do {
+        const params = userListParams({limit: 1000, total: 0});
+        if (query) params.set('q', query);
+        if (cursor) params.set('cursor', cursor);
+        const data = await fetch(`/admin/users/api/list/?${params}`).then(r => r.json());
+        all.push(...(data.users || []));
+        cursor = data.next_cursor;
+    } while (cursor);
+    return all;
+}
+
+// Load the first page (reset) or the next page of users
+function loadUsers(reset = true) {
+    if (reset) {
+        users = [];
+        usersCursor = null;
+        usersExhausted = false;
+    } else if (usersExhausted || usersLoading) {
+        return;  // nothing left, or a page is already on its way
+    }
+    const request = ++usersRequest;
+    usersLoading = true;
+    const params = userListParams({limit: USER_PAGE_SIZE, total: reset ? 1 : 0});
+    if (usersCursor) params.set('cursor', usersCursor);
+
+    fetch(`/admin/users/api/list/?${params}`)
+        .then(r => r.json())
+        .then(data => {
+            if (request !== usersRequest) return;  // superseded by a newer search
+            users = users.concat(data.users || []);
+            usersCursor = data.next_cursor;
+            usersExhausted = !data.has_more;
+            if (data.total !== undefined) usersTotal = data.total;
+            displayUsers(users);
+        })
+        .catch(e => console.error('Users error:', e))
+        .finally(() => {
+            if (request === usersRequest) usersLoading = false;
+        });
+}
+
+// Full row for one user (list pages only carry the fields shown in the list)
+async function getUserDetails(user) {
+    if (!userDetails.has(user.id)) {
+        const data = await fetch(`/admin/users/api/list/?id=${user.id}&total=0`).then(r => r.json());
+        userDetails.set(user.id, (data.users || [])[0] || user);
+    }
+    return userDetails.get(user.id);
+}
+
+// Template JSON, fetched once per template; the catalog's versioned detail URL
+// is cached by the browser for good, so reloads do not fetch it again
+async function getTemplateDetails(templateId) {
+    if (!templateDetails.has(templateId)) {
+        const entry = (templates || []).find(t => t.id == templateId);
+        const url = (entry && entry.detail) || `/admin/generate-id/api/templates/${templateId}/`;
+        const response = await fetch(url, {
+            credentials: 'same-origin'
+        });
+        const data = await response.json();
+        if (data.error) throw new Error(data.error);
+        templateDetails.set(templateId, data.json);
+    }
+    return templateDetails.get(templateId);
+}
+
+// Template (unless already cached) plus ready-to-render users in one request
+async function getRenderBundle(templateId, userIds) {
+    const params = new URLSearchParams({users: userIds.join(',')});
+    if (templateDetails.has(templateId)) params.set('template', '0');
+    const response = await fetch(`/admin/generate-id/api/bundle/${templateId}/?${params}`, {
+        credentials: 'same-origin'
+    });
+    const data = await response.json();
+    if (data.error) throw new Error(data.error);
+    if (data.template) templateDetails.set(templateId, data.template.json);
+    return data.users || [];
+}
+
+// One user as the card renderer needs it; the first preview of a template fetches its JSON alongside
+async function getCardUser(templateId, user) {
+    if (!cardUsers.has(user.id) || !templateDetails.has(templateId)) {
+        const [cardUser] = await getRenderBundle(templateId, [user.id]);
+        if (!cardUser) throw new Error('User not found');
+        cardUsers.set(user.id, cardUser);
+    }
+    return cardUsers.get(user.id);
+}
+
+// DISPLAY USERS (with multi-select support)
+function displayUsers(userList) {
+    const userListEl = document.getElementById('userList');
+    userListEl.innerHTML = '';
+
+    if (!userList || userList.length === 0) {
+        userListEl.innerHTML = '<div style="color: #6b7280; font-size: 12px; padding: 10px;">No users found</div>';
+        return;
+    }
+
+    const selectedIds = new Set(selectedUsers.map(u => u.id));
+    userList.forEach(user => {
+        const item = document.createElement('div');
+        item.className = 'user-item';
+
+        const isSelected = allUsersSelected || selectedIds.has(user.id);
+        if (isSelected) item.classList.add('selected');
+
+        const fullName = `${user.first_name || ''} ${user.last_name || user.username}`.trim();
+
+        item.innerHTML = `
+            <div style="flex: 1;">
+                <div class="user-name">${fullName}</div>
+                <div style="font-size: 10px; color: #6b7280; margin-top: 2px;">${user.email}</div>
+            </div>
+            <div style="text-align: right;">
+                <div class="user-role">${user.role || 'User'}</div>
+            </div>
+            <div style="margin-left: 8px; font-size: 14px; color: #38bdf8;">
+                ${isSelected ? '<i class="fas fa-check-circle"></i>' : '<i class="fas fa-circle" style="opacity: 0.3;"></i>'}
+            </div>
+        `;
+        item.onclick = () => selectUser(user);
+        userListEl.appendChild(item);
+    });
+
+    updateSelectedCount();
+}
+
+// FILTER USERS (searched on the server, first page reloaded)
+function filterUsers(query) {
+    usersQuery = query.trim();
+    loadUsers(true);
+}
+
+// SELECT TEMPLATE
+async function selectTemplate(templateId, templateName, btnElement) {
+    selectedTemplate = templateId;
+
+    // Update UI - find the button that was clicked
+    const templateButtons = document.querySelectorAll('.template-btn');
+    templateButtons.forEach(btn => {
+        btn.classList.remove('active');
+    });
+
+    // Mark the selected button as active
+    if (btnElement) {
+        btnElement.classList.add('active');
+    } else {
+        // Try to find it by text content
+        templateButtons.forEach(btn => {
+            if (btn.textContent === templateName) {
+                btn.classList.add('active');
+            }
+        });
+    }
+
+    showStatus(`Template "${templateName}" selected ✓`, 'success');
+
+    try {
+        await getTemplateDetails(templateId);
+    } catch (e) {
+        showStatus('Error loading template: ' + e.message, 'error');
+        return;
+    }
+
+    // Render preview if user is selected
+    if (selectedUsers.length === 1 || selectedUser) {
+        await renderPreview();
+    }
+}
+
+// SELECT USER (multi-select mode)
+async function selectUser(user) {
+    if (allUsersSelected) {
+        // leave "all users" mode and start a selection with this user
+        allUsersSelected = false;
+        selectedUsers = [];
+    }
+    const index = selectedUsers.findIndex(u => u.id === user.id);
+    if (index > -1) {
+        // Remove from selection
+        selectedUsers.splice(index, 1);
+    } else {
+        // Add to selection
+        selectedUsers.push(user);
+    }
+
+    // Re-render to show selections
+    displayUsers(users);
+
+    // Update single preview if only 1 user selected
+    if (selectedUsers.length === 1) {
+        try {
+            selectedUser = await getUserDetails(selectedUsers[0]);
+        } catch (e) {
+            showStatus('Error loading user: ' + e.message, 'error');
+            return;
+        }
+        displayUserData(selectedUser);
+        if (selectedTemplate) {
+            renderPreview();
+        }
+        updateButtonState();
+    } else if (selectedUsers.length === 0) {
+        selectedUser = null;
+        document.getElementById('previewCanvas').style.display = 'none';
+        document.getElementById('emptyState').style.display = 'flex';
+        updateButtonState();
+    }
+
+    updateSelectedCount();
+}
+
+// UPDATE BUTTON STATE
+function updateButtonState() {
+    const downloadBtn = document.getElementById('downloadBtn');
+
+    if (selectedUsers.length === 1 && selectedTemplate) {
+        downloadBtn.disabled = false;
+    } else {
+        downloadBtn.disabled = true;
+    }
+}
+
+// UPDATE SELECTED COUNT
+function updateSelectedCount() {
+    const count = allUsersSelected ? usersTotal : selectedUsers.length;
+    document.getElementById('selectedCount').textContent = count;
+}
+
+// RENDER PREVIEW (now without extra call at end)
+//
+function displayUserData(user) {
+    const dataDisplay = document.getElementById('dataDisplay');
+    const fullName = `${user.first_name || ''} ${user.last_name || user.username}`.trim();
+
+    // Determine user status badge
+    let statusBadge = 'Regular User';
+    let statusColor = '#6b7280';
+    if (user.is_superuser) {
+        statusBadge = '✓ Superuser';
+        statusColor = '#0ea5e9';
+    } else if (user.is_staff) {
+        statusBadge = '✓ Staff';
+        statusColor = '#f59e0b';
+    }
+
+    dataDisplay.innerHTML = `
+        <div class="data-group"><label>Full Name</label><div class="data-value">${fullName || 'N/A'}</div></div>
+        <div class="data-group"><label>Email</label><div class="data-value">${user.email || 'N/A'}</div></div>
+        <div class="data-group"><label>Role</label><div class="data-value">${user.role || 'User'}</div></div>
+        <div class="data-group"><label>Status</label><div class="data-value" style="color:${statusColor};font-weight:600;">${statusBadge}</div></div>
+        <div class="data-group"><label>Department</label><div class="data-value">${user.department || 'N/A'}</div></div>
+        <div class="data-group"><label>Phone</label><div class="data-value">${user.phone || 'N/A'}</div></div>
+        <div class="data-group"><label>Emergency Phone</label><div class="data-value">${user.emergency_mobile || 'N/A'}</div></div>
+        <div class="data-group"><label>Blood Group</label><div class="data-value">${user.blood_group || 'N/A'}</div></div>
+        <div class="data-group"><label>DOB</label><div class="data-value">${user.date_of_birth || 'N/A'}</div></div>
+        <div class="data-group"><label>Age</label><div class="data-value">${user.age || 'N/A'}</div></div>
+        <div class="data-group"><label>Roll No</label><div class="data-value">${user.roll_no || 'N/A'}</div></div>
+        <div class="data-group"><label>Residence</label><div class="data-value">${user.residence_status || 'N/A'}</div></div>
+        <div class="data-group"><label>Address</label><div class="data-value">${user.address || 'N/A'}</div></div>
+        <div class="data-group"><label>Valid Upto</label><div class="data-value">${user.valid_upto || 'N/A'}</div></div>
+    `;
+}
+
+// RENDER PREVIEW
+async function renderPreview() {
+    if (!selectedTemplate || !selectedUser) {
+        document.getElementById('previewCanvas').style.display = 'none';
+        document.getElementById('emptyState').style.display = 'flex';
+        return;
+    }
+
+    try {
+        const cardUser = await getCardUser(selectedTemplate, selectedUser);
+        const templateData = await getTemplateDetails(selectedTemplate);
+        const sideData = currentSide === 'front' ? templateData.front : templateData.back;
+
+        if (!sideData || sideData.length === 0) {
+            showStatus('This side is empty', 'error');
+            return;
+        }
+
+        // Setup canvas
+        const canvas = document.getElementById('previewCanvas');
+        const ctx = canvas.getContext('2d');
+
+        canvas.width = templateData.width || 640;
+        canvas.height = templateData.height || 400;
+
+        // Set background
+        ctx.fillStyle = templateData.bg || '#ffffff';
+        ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+        // Render template with user data (async for images)
+        await renderTemplateOnCanvas(ctx, sideData, cardUser, canvas);
+
+        // Show canvas, hide empty state
+        document.getElementById('emptyState').style.display = 'none';
+        canvas.style.display = 'block';
+
+    } catch (error) {
+        showStatus('Error rendering preview: ' + error.message, 'error');
+        console.error(error);
+    }
+}
+
+// Helper to load an image and return a promise
+function loadImage(src) {
+    return new Promise((resolve, reject) => {
+        if (!src) {
+            resolve(null);
+            return;
+        }
+        const img = new Image();
+        img.crossOrigin = 'anonymous';
+        img.onload = () => resolve(img);
+        img.onerror = () => resolve(null); // Resolve null on error to continue rendering
+        img.src = src;
+    });
+}
+
+// Helper function for rounded rectangles
+function roundRect(ctx, x, y, width, height, radius) {
+    ctx.beginPath();
+    ctx.moveTo(x + radius, y);
+    ctx.lineTo(x + width - radius, y);
+    ctx.quadraticCurveTo(x + width, y, x + width, y + radius);
+    ctx.lineTo(x + width, y + height - radius);
+    ctx.quadraticCurveTo(x + width, y + height, x + width - radius, y + height);
+    ctx.lineTo(x + radius, y + height);
+    ctx.quadraticCurveTo(x, y + height, x, y + height - radius);
+    ctx.lineTo(x, y + radius);
+    ctx.quadraticCurveTo(x, y, x + radius, y);
+    ctx.closePath();
+}
+
+// RENDER TEMPLATE ON CANVAS (async to handle images)
+// cardUser comes from the render-bundle API, with placeholder values already resolved
+async function renderTemplateOnCanvas(ctx, elements, cardUser, canvas) {
+    const userData = {...cardUser.ctx, id: cardUser.id};
+    const fullName = userData.full_name || '';
+    const dobFmt = userData.dob || '';
+    const validFmt = userData.valid_upto || '';
+    const validYear = userData.valid_year || '';
+
+    function wrapText(text, maxWidth, lineHeight, align = 'left') {
+        // Professional text wrapping - text stays at position, wraps DOWNWARD
+        // Split on spaces and commas for natural breaks
+        const raw = (text || '').replace(/,\s*/g, ', ');
+        const words = raw.split(/\s+/).filter(Boolean);
+        const lines = [];
+        let line = '';
+
+        const measure = (str) => ctx.measureText(str).width;
+
+        // Breaks a single long word into smaller chunks that fit maxWidth
+        function splitWord(word) {
+            const chunks = [];
+            let current = word;
+            while (measure(current) > maxWidth && current.length > 1) {
+                let cut = 1;
+                while (cut <= current.length && measure(current.slice(0, cut)) <= maxWidth) {
+                    cut++;
+                }
+                cut = Math.max(1, cut - 1);
+                chunks.push(current.slice(0, cut));
+                current = current.slice(cut);
+            }
+            if (current) chunks.push(current);
+            return chunks;
+        }
+
+        words.forEach(word => {
+            const pieces = splitWord(word);
+            pieces.forEach((piece, idx) => {
+                const testLine = line ? line + ' ' + piece : piece;
+                if (measure(testLine) > maxWidth && line) {
+                    lines.push(line);
+                    line = piece;
+                } else {
+                    line = testLine;
+                }
+            });
+        });
+
+        if (line) lines.push(line);
+
+        // Set alignment - text draws from the element's X,Y position
+        // 'left' = text starts at X position and goes right
+        // 'center' = text is centered at X position
+        // 'right' = text ends at X position
+        ctx.textBaseline = 'top';
+
+        lines.forEach((ln, idx) => {
+            let xOffset = 0;
+            if (align === 'left') {
+                ctx.textAlign = 'left';
+                xOffset = 0; // Start exactly at element position
+            } else if (align === 'right') {
+                ctx.textAlign = 'right';
+                xOffset = 0; // End at element position
+            } else {
+                ctx.textAlign = 'center';
+                xOffset = 0; // Center at element position
+            }
+            // Each line appears BELOW the previous one
+            ctx.fillText(ln, xOffset, idx * lineHeight);
+        });
+    }
+
+    // Preload photo and signature images
+    // Check if background removal is enabled
+    const removeBg = document.getElementById('removeBgToggle')?.checked ?? true;
+
+    const photoUrl = (removeBg ? cardUser.photo_nobg_url : cardUser.photo_url) || null;
+    const signatureUrl = cardUser.signature_url || null;
+
+    const [photoImg, signatureImg] = await Promise.all([
+        loadImage(photoUrl),
+        loadImage(signatureUrl)
+    ]);
+
+    // Use for...of to allow async operations inside loop
+    for (const el of elements) {
+        ctx.save();
+
+        // Translate to element position
+        const x = el.x || 0;
+        const y = el.y || 0;
+        ctx.translate(x, y);
+
+        if (el.type === 'rect') {
+            ctx.fillStyle = el.fill || '#000000';
+            ctx.globalAlpha = el.opacity || 1;
+            const w = el.w || 100;
+            const h = el.h || 100;
+            ctx.fillRect(-w / 2, -h / 2, w, h);
+            ctx.globalAlpha = 1;
+        }
+        else if (el.type === 'circle') {
+            ctx.fillStyle = el.fill || '#000000';
+            ctx.globalAlpha = el.opacity || 1;
+            const r = el.r || (el.w ? el.w / 2 : 50);
+            ctx.beginPath();
+            ctx.arc(0, 0, r, 0, Math.PI * 2);
+            ctx.fill();
+            ctx.globalAlpha = 1;
+        }
+        else if (el.type === 'photo') {
+            // Render user photo with background color support
+            const w = el.w || 110;
+            const h = el.h || 140;
+            const radius = el.borderRadius || 0;
+
+            // Draw background color if set
+            if (el.bgColor && el.bgColor !== 'transparent') {
+                ctx.fillStyle = el.bgColor;
+                if (radius > 0) {
+                    roundRect(ctx, -w/2, -h/2, w, h, radius);
+                    ctx.fill();
+                } else {
+                    ctx.fillRect(-w/2, -h/2, w, h);
+                }
+            }
+
+            if (photoImg) {
+                // Clip to rounded rect if border radius is set
+                if (radius > 0) {
+                    ctx.save();
+                    roundRect(ctx, -w/2, -h/2, w, h, radius);
+                    ctx.clip();
+                    ctx.drawImage(photoImg, -w/2, -h/2, w, h);
+                    ctx.restore();
+                } else {
+                    ctx.drawImage(photoImg, -w/2, -h/2, w, h);
+                }
+            } else {
+                // Show placeholder if no photo
+                ctx.strokeStyle = el.borderColor || '#cbd5e1';
+                ctx.setLineDash([4, 4]);
+                ctx.strokeRect(-w/2, -h/2, w, h);
+                ctx.setLineDash([]);
+                ctx.fillStyle = '#94a3b8';
+                ctx.font = '12px Arial';
+                ctx.textAlign = 'center';
+                ctx.textBaseline = 'middle';
+                ctx.fillText('No Photo', 0, 0);
+            }
+        }
+        else if (el.type === 'signature') {
+            // Render user signature with background color support
+            const w = el.w || 120;
+            const h = el.h || 50;
+
+            // Draw background if set
+            if (el.bgColor && el.bgColor !== 'transparent') {
+                ctx.fillStyle = el.bgColor;
+                ctx.fillRect(-w/2, -h/2, w, h);
+            }
+
+            if (signatureImg) {
+                ctx.drawImage(signatureImg, -w/2, -h/2, w, h);
+            } else {
+                // Show placeholder if no signature
+                ctx.strokeStyle = el.borderColor || '#fbbf24';
+                ctx.setLineDash([4, 4]);
+                ctx.strokeRect(-w/2, -h/2, w, h);
+                ctx.setLineDash([]);
+                ctx.fillStyle = '#f59e0b';
+                ctx.font = '10px Arial';
+                ctx.textAlign = 'center';
+                ctx.textBaseline = 'middle';
+                ctx.fillText('No Signature', 0, 0);
+            }
+        }
+        else if (el.type === 'text') {
+            let text = el.text || '';
+
+            // Replace all placeholders with user data
+            text = text.replace(/{name}/g, fullName || '{name}');
+            text = text.replace(/{email}/g, userData.email || '{email}');
+            text = text.replace(/{role}/g, userData.role || '{role}');
+            text = text.replace(/{dept}/g, userData.department || '{dept}');
+            text = text.replace(/{phone}/g, userData.phone || '{phone}');
+            text = text.replace(/{emergency}/g, userData.emergency_mobile || '{emergency}');
+            text = text.replace(/{blood}/g, userData.blood_group || '{blood}');
+            text = text.replace(/{roll_no}/g, userData.roll_no || '{roll_no}');
+            text = text.replace(/{id}/g, userData.id || '{id}');
+            text = text.replace(/{age}/g, userData.age || '{age}');
+            text = text.replace(/{dob}/g, dobFmt || '{dob}');
+            text = text.replace(/{address}/g, userData.address || '{address}');
+            text = text.replace(/{residence}/g, userData.residence_status || '{residence}');
+            text = text.replace(/{valid_upto}/g, validFmt || '{valid_upto}');
+            text = text.replace(/{valid_year}/g, validYear || '{valid_year}');
+
+            ctx.fillStyle = el.color || '#000000';
+            ctx.globalAlpha = el.opacity || 1;
+            const fontSize = el.size || 14;
+            ctx.font = `${fontSize}px ${el.font || 'Arial'}`;
+
+            // Smart maxWidth: prefer element setting; otherwise choose based on content.
+            // Also clamp to available space so long addresses don't spill outside the card.
+            const align = el.align || 'center';
+            const xPos = el.x || 0;
+            let maxWidth = el.maxWidth;
+            if (!maxWidth) {
+                const hasLongPlaceholder = /{address}|{residence}/.test(el.text || '');
+                if (hasLongPlaceholder) {
+                    maxWidth = canvas.width * 0.7; // give room to wrap
+                } else {
+                    maxWidth = canvas.width; // titles/logos can span wide
+                }
+            }
+
+            // Clamp to available width based on alignment and position
+            const availableWidth = (() => {
+                if (align === 'left') return Math.max(40, canvas.width - xPos);
+                if (align === 'right') return Math.max(40, xPos);
+                const half = Math.min(xPos, canvas.width - xPos);
+                return Math.max(40, half * 2);
+            })();
+            maxWidth = Math.min(maxWidth, availableWidth);
+
+            const lineHeight = fontSize * 1.3; // Slightly more line spacing for readability
+            wrapText(text, maxWidth, lineHeight, align);
+            ctx.globalAlpha = 1;
+        }
+
+        ctx.restore();
+    }
+}
+
+// DOWNLOAD PDF FOR SINGLE USER (front + back on one page, rendered by the server)
+function downloadPDF() {
+    if (!selectedUser || !selectedTemplate) {
+        showStatus('Please select a template and user', 'error');
+        return;
+    }
+    const userName = `${selectedUser.first_name || ''} ${selectedUser.last_name || selectedUser.username}`.trim();
+    streamCardsPDF(selectedTemplate, [selectedUser.id], true, `${userName}_ID_Card.pdf`);
+    showStatus(`✓ PDF downloading: ${userName}_ID_Card.pdf`, 'success');
+}
+
+// The server renders and streams the PDF page by page, so the download
+// starts immediately and the browser never holds the whole document.
+function streamCardsPDF(templateId, userIds, includeBack, fileName, paper) {
+    const params = {
+        users: userIds.join(','),
+        back: includeBack ? '1' : '0',
+        filename: fileName,
+        csrfmiddlewaretoken: getCSRFToken()
+    };
+    // N-up imposition on printer sheets; backs follow each sheet mirrored for duplex
+    if (paper) params.paper = paper;
+    submitDownload(`/admin/generate-id/api/export/${templateId}/cards.pdf`, params);
+}
+
+// One image per card side in a ZIP with a manifest.csv, streamed while the
+// server renders; names come from a pattern of user fields like {roll_no}_{side}
+function streamCardsZip(templateId, userIds, includeBack, namePattern) {
+    const params = {
+        users: userIds.join(','),
+        back: includeBack ? '1' : '0',
+        format: 'png',
+        csrfmiddlewaretoken: getCSRFToken()
+    };
+    if (namePattern) params.name = namePattern;
+    submitDownload(`/admin/generate-id/api/export/${templateId}/cards.zip`, params);
+}
+
+function submitDownload(action, params) {
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = action;
+    Object.entries(params).forEach(([name, value]) => {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = name;
+        input.value = value;
+        form.appendChild(input);
+    });
+    document.body.appendChild(form);
+    form.submit();
+    form.remove();
+}
+
+// OPEN BULK MODAL
+function openBulkModal() {
+    document.getElementById('bulkModal').classList.add('active');
+}
+
+function closeBulkModal() {
+    document.getElementById('bulkModal').classList.remove('active');
+}
+
+// BULK GENERATION - Generate PDFs for selected users
+function handleBulkGeneration(e) {
+    e.preventDefault();
+    const templateId = document.getElementById('bulkTemplate').value;
+
+    if (!templateId) {
+        showStatus('Please select a template', 'error');
+        return;
+    }
+
+    // Use selected users, or every card holder (resolved on the server) if none selected
+    const everyone = allUsersSelected || selectedUsers.length === 0;
+    const usersToGenerate = everyone ? [] : selectedUsers;
+    const totalUsers = everyone ? usersTotal : usersToGenerate.length;
+
+    if (totalUsers === 0) {
+        showStatus('No users to generate', 'error');
+        return;
+    }
+
+    showStatus(`Generating ${totalUsers} ID card(s)...`, 'info');
+    closeBulkModal();
+
+    const includeBack = document.getElementById('includeBackSide').checked;
+    const format = document.getElementById('bulkFormat').value;
+
+    if (format === 'zip') {
+        const namePattern = document.getElementById('bulkFileNames').value.trim();
+        streamCardsZip(templateId, usersToGenerate.map(u => u.id), includeBack, namePattern);
+        showStatus(`✓ Streaming ID_Cards.zip (${totalUsers} card(s))`, 'success');
+        return;
+    }
+
+    // PNG archives are rendered by the server-side export workers
+    if (format === 'png' || format === 'both') {
+        startServerExport(templateId, usersToGenerate, includeBack, 'zip');
+        if (format === 'png') return;
+    }
+
+    const fileName = usersToGenerate.length === 1
+        ? `${usersToGenerate[0].first_name || ''} ${usersToGenerate[0].last_name || usersToGenerate[0].username}`.trim() + '_ID_Card.pdf'
+        : 'All_ID_Cards.pdf';
+    const paper = document.getElementById('bulkPaper').value;
+    streamCardsPDF(templateId, usersToGenerate.map(u => u.id), includeBack, fileName, paper);
+    showStatus(`✓ Streaming ${fileName} (${totalUsers} card(s))`, 'success');
+}
+
+// SERVER-SIDE EXPORT JOB: queue, poll progress, then download
+async function startServerExport(templateId, userList, includeBack, format) {
+    try {
+        const res = await fetch('/admin/templates/api/batch-export/', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCSRFToken() },
+            body: JSON.stringify({
+                template_id: templateId,
+                users: userList.map(u => u.id),
+                include_back: includeBack,
+                format: format
+            })
+        });
+        const data = await res.json();
+        if (!res.ok || data.error) throw new Error(data.error || 'Could not queue export');
+        showStatus(`Export #${data.job_id} queued (${data.queued} users)`, 'info');
+        pollExportJob(data.job_id);
+    } catch (err) {
+        console.error(err);
+        showStatus('Error queueing export: ' + err.message, 'error');
+    }
+}
+
+function pollExportJob(jobId) {
+    fetch(`/admin/templates/api/batch-export/${jobId}/`, { credentials: 'same-origin' })
+        .then(r => r.json())
+        .then(job => {
+            if (job.ready) {
+                showStatus(`✓ Export #${jobId} complete! Rendered: ${job.rendered}, Failed: ${job.failed}`, 'success');
+                window.location = `/admin/templates/api/batch-export/${jobId}/download/`;
+            } else if (job.status === 'failed' || job.status === 'cancelled') {
+                showStatus(`Export #${jobId} ${job.status}. ${job.error || ''}`, 'error');
+            } else {
+                showStatus(`Exporting... ${job.rendered + job.failed}/${job.total} (${job.percent}%)`, 'info');
+                setTimeout(() => pollExportJob(jobId), 2000);
+            }
+        })
+        .catch(err => showStatus('Error checking export: ' + err.message, 'error'));
+}
+
+// SHOW STATUS MESSAGE
+function showStatus(message, type) {
+    const msg = document.getElementById('statusMsg');
+    msg.textContent = message;
+    msg.className = `status-message ${type}`;
+    setTimeout(() => {
+        msg.className = 'status-message';
+    }, 5000);
+}
+
+// =====================================
+// API TEST FUNCTION
+// =====================================
+async function testAllAPIs() {
+    console.log('\n===== API TEST START =====\n');
+
+    // Test 1: Test endpoint (no auth required)
+    console.log('TEST 1: /api/test/');
+    try {
+        const res1 = await fetch('/api/test/');
+        const data1 = await res1.json();
+        console.log('Status:', res1.status, 'Data:', data1);
+    } catch (e) {
+        console.error('ERROR:', e.message);
+    }
+
+    // Test 2: Get templates
+    console.log('\nTEST 2: /admin/generate-id/api/templates/');
+    try {
+        const res2 = await fetch('/admin/generate-id/api/templates/', {credentials: 'same-origin'});
+        console.log('Status:', res2.status);
+        const text2 = await res2.text();
+        console.log('Response text:', text2.substring(0, 200));
+        const data2 = JSON.parse(text2);
+        console.log('Parsed data:', data2);
+    } catch (e) {
+        console.error('ERROR:', e.message);
+    }
+
+    // Test 3: Get users
+    console.log('\nTEST 3: /admin/users/api/list/');
+    try {
+        const res3 = await fetch('/admin/users/api/list/', {credentials: 'same-origin'});
+        console.log('Status:', res3.status);
+        const text3 = await res3.text();
+        console.log('Response text:', text3.substring(0, 200));
+        const data3 = JSON.parse(text3);
+        console.log('Parsed data:', data3);
+    } catch (e) {
+        console.error('ERROR:', e.message);
+    }
+
+    console.log('\n===== API TEST END =====\n');
+    alert('Check browser console (F12) for test results');
+}
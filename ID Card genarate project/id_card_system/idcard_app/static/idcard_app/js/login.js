@@ -0,0 +1,137 @@
+        // ══════════════════════════════════════════════════════════════
+        // ROLE TOGGLE
+        // ══════════════════════════════════════════════════════════════
+        const roleToggle = document.getElementById('roleToggle');
+        const roleBtns = roleToggle.querySelectorAll('.role-btn');
+        const roleInput = document.getElementById('roleInput');
+        const signupTab = document.querySelector('[data-tab="signup"]');
+        const formFooter = document.getElementById('formFooter');
+
+        roleBtns.forEach(btn => {
+            btn.addEventListener('click', () => {
+                roleBtns.forEach(b => b.classList.remove('active'));
+                btn.classList.add('active');
+
+                const role = btn.dataset.role;
+                roleInput.value = role;
+
+                if (role === 'admin') {
+                    signupTab.style.display = 'none';
+                    formFooter.style.display = 'none';
+                    switchToTab('login');
+                } else {
+                    signupTab.style.display = 'block';
+                    formFooter.style.display = 'block';
+                }
+            });
+        });
+
+        // ══════════════════════════════════════════════════════════════
+        // AUTH TABS
+        // ══════════════════════════════════════════════════════════════
+        const authTabs = document.querySelectorAll('.auth-tab');
+        const authForms = {
+            login: document.getElementById('loginForm'),
+            signup: document.getElementById('signupForm')
+        };
+
+        function switchToTab(tab) {
+            authTabs.forEach(t => t.classList.remove('active'));
+            document.querySelector(`[data-tab="${tab}"]`).classList.add('active');
+
+            Object.values(authForms).forEach(f => f.classList.remove('active'));
+            authForms[tab].classList.add('active');
+
+            const footerP = formFooter.querySelector('p');
+            if (tab === 'login') {
+                footerP.innerHTML = "Don't have an account? <a href='#' id='switchAuth'>Sign up for free</a>";
+            } else {
+                footerP.innerHTML = "Already have an account? <a href='#' id='switchAuth'>Sign in</a>";
+            }
+
+            document.getElementById('switchAuth').onclick = (e) => {
+                e.preventDefault();
+                switchToTab(tab === 'login' ? 'signup' : 'login');
+            };
+        }
+
+        authTabs.forEach(tab => {
+            tab.addEventListener('click', () => switchToTab(tab.dataset.tab));
+        });
+
+        document.getElementById('switchAuth').onclick = (e) => {
+            e.preventDefault();
+            switchToTab('signup');
+        };
+
+        // ══════════════════════════════════════════════════════════════
+        // PASSWORD TOGGLE
+        // ══════════════════════════════════════════════════════════════
+        function togglePassword(inputId, btn) {
+            const input = document.getElementById(inputId);
+            const icon = btn.querySelector('i');
+
+            if (input.type === 'password') {
+                input.type = 'text';
+                icon.classList.replace('fa-eye', 'fa-eye-slash');
+            } else {
+                input.type = 'password';
+                icon.classList.replace('fa-eye-slash', 'fa-eye');
+            }
+        }
+
+        // ══════════════════════════════════════════════════════════════
+        // PASSWORD STRENGTH
+        // ══════════════════════════════════════════════════════════════
+        const signupPassword = document.getElementById('signupPassword');
+        const bars = [
+            document.getElementById('bar1'),
+            document.getElementById('bar2'),
+            document.getElementById('bar3'),
+            document.getElementById('bar4')
+        ];
+        const strengthText = document.getElementById('strengthText');
+
+        signupPassword.addEventListener('input', function() {
+            const pwd = this.value;
+            let score = 0;
+
+            if (pwd.length >= 8) score++;
+            if (/[A-Z]/.test(pwd)) score++;
+            if (/[0-9]/.test(pwd)) score++;
+            if (/[^A-Za-z0-9]/.test(pwd)) score++;
+
+            bars.forEach(bar => bar.className = 'strength-bar');
+            strengthText.className = 'strength-text';
+
+            if (pwd.length === 0) {
+                strengthText.textContent = 'Use 8+ characters with letters, numbers & symbols';
+                return;
+            }
+
+            const levels = {
+                1: { cls: 'weak', text: 'Weak - Add more variety' },
+                2: { cls: 'medium', text: 'Fair - Getting better' },
+                3: { cls: 'medium', text: 'Good - Almost there' },
+                4: { cls: 'strong', text: 'Strong password!' }
+            };
+
+            const level = levels[score] || levels[1];
+
+            for (let i = 0; i < score; i++) {
+                bars[i].classList.add(level.cls);
+            }
+
+            strengthText.classList.add(level.cls);
+            strengthText.textContent = level.text;
+        });
+
+        // ══════════════════════════════════════════════════════════════
+        // FORM SUBMIT LOADING
+        // ══════════════════════════════════════════════════════════════
+        document.querySelectorAll('.auth-form').forEach(form => {
+            form.addEventListener('submit', function() {
+                const btn = this.querySelector('.submit-btn');
+                btn.classList.add('loading');
+            });
+        });
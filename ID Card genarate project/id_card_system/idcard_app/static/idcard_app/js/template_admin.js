@@ -0,0 +1,835 @@
+let canvas, ctx;
+let elements = { front: [], back: [] };
+let side = 'front';
+let selected = null;
+let bg = '#ffffff';
+let dragEl = null;
+let dragOffX = 0;
+let dragOffY = 0;
+let snapEnabled = false;
+let gridEnabled = false;
+const SNAP_SIZE = 8;
+let cpState = { h: 196, s: 0.7, v: 0.9 };
+
+// Replace ALL placeholder tokens with actual values
+function resolveText(text) {
+    if (!text) return '';
+    let t = text;
+
+    // Global replace function
+    const rep = (pattern, value) => { t = t.replace(new RegExp(pattern, 'gi'), value || ''); };
+
+    // === ALL PLACEHOLDERS ===
+
+    // ID
+    rep('\\{id\\}', studentData.id);
+    rep('\\{student_id\\}', studentData.id);
+
+    // Names
+    rep('\\{name\\}', studentData.name);
+    rep('\\{first_name\\}', studentData.first_name);
+    rep('\\{last_name\\}', studentData.last_name);
+    rep('\\{username\\}', studentData.username);
+
+    // Personal
+    rep('\\{age\\}', studentData.age);
+    rep('\\{dob\\}', studentData.date_of_birth);
+    rep('\\{date_of_birth\\}', studentData.date_of_birth);
+    rep('\\{blood\\}', studentData.blood_group);
+    rep('\\{blood_group\\}', studentData.blood_group);
+    rep('\\{address\\}', studentData.address);
+
+    // Contact - TWO phone numbers!
+        rep('\\{phone\\}', studentData.phone);
+        rep('\\{mobile\\}', studentData.phone);
+        rep('\\{emergency\\}', studentData.emergency_mobile);
+        rep('\\{emergency_mobile\\}', studentData.emergency_mobile);
+        rep('\\{emergency_phone\\}', studentData.emergency_mobile);
+
+    // Academic/Work
+    rep('\\{email\\}', studentData.email);
+    rep('\\{role\\}', studentData.role);
+    rep('\\{dept\\}', studentData.department);
+    rep('\\{department\\}', studentData.department);
+    rep('\\{roll\\}', studentData.roll_no);
+    rep('\\{roll_no\\}', studentData.roll_no);
+    rep('\\{rollno\\}', studentData.roll_no);
+    rep('\\{residence\\}', studentData.residence_status);
+    rep('\\{residence_status\\}', studentData.residence_status);
+    rep('\\{hostel\\}', studentData.residence_status);
+
+    // Valid Until
+    rep('\\{valid\\}', studentData.valid_upto);
+        rep('\\{emergency_mobile\\}', studentData.emergency_mobile);
+    rep('\\{valid_year\\}', studentData.valid_year);
+    rep('\\{expiry\\}', studentData.valid_upto);
+
+    return t;
+}
+
+function init() {
+    canvas = document.getElementById('canvas');
+    ctx = canvas.getContext('2d');
+    canvas.addEventListener('mousedown', onCanvasClick);
+    canvas.addEventListener('mousemove', onCanvasMove);
+    canvas.addEventListener('mouseup', onCanvasUp);
+    render();
+}
+
+function getCurrentElements() {
+    return elements[side];
+}
+
+function selectById(id) {
+    selected = getCurrentElements().find(el => el.id === id) || null;
+    render();
+}
+
+function onCanvasClick(e) {
+    const r = canvas.getBoundingClientRect();
+    const x = e.clientX - r.left;
+    const y = e.clientY - r.top;
+    const arr = [...getCurrentElements()].reverse();
+    dragEl = arr.find(el => Math.abs(x - el.x) < (el.w || 50) / 2 && Math.abs(y - el.y) < (el.h || 50) / 2);
+    if (dragEl) {
+        selected = dragEl;
+        dragOffX = x - dragEl.x;
+        dragOffY = y - dragEl.y;
+    }
+    render();
+}
+
+function onCanvasMove(e) {
+    if (!dragEl || dragEl.locked) return;
+    const r = canvas.getBoundingClientRect();
+    let nextX = e.clientX - r.left - dragOffX;
+    let nextY = e.clientY - r.top - dragOffY;
+    if (snapEnabled) {
+        nextX = Math.round(nextX / SNAP_SIZE) * SNAP_SIZE;
+        nextY = Math.round(nextY / SNAP_SIZE) * SNAP_SIZE;
+    }
+    dragEl.x = nextX;
+    dragEl.y = nextY;
+    render();
+}
+
+function onCanvasUp() { dragEl = null; }
+
+// Helper function for rounded rectangles
+function roundRect(ctx, x, y, width, height, radius) {
+    ctx.beginPath();
+    ctx.moveTo(x + radius, y);
+    ctx.lineTo(x + width - radius, y);
+    ctx.quadraticCurveTo(x + width, y, x + width, y + radius);
+    ctx.lineTo(x + width, y + height - radius);
+    ctx.quadraticCurveTo(x + width, y + height, x + width - radius, y + height);
+    ctx.lineTo(x + radius, y + height);
+    ctx.quadraticCurveTo(x, y + height, x, y + height - radius);
+    ctx.lineTo(x, y + radius);
+    ctx.quadraticCurveTo(x, y, x + radius, y);
+    ctx.closePath();
+}
+
+function render() {
+    ctx.fillStyle = bg;
+    ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+    getCurrentElements().forEach(el => {
+        ctx.save();
+        ctx.translate(el.x, el.y);
+
+        if (el.type === 'text') {
+            ctx.font = `${el.size || 18}px ${el.font || 'Poppins'}`;
+            ctx.fillStyle = el.color || '#0f172a';
+            ctx.textAlign = 'center';
+            const txt = resolveText(el.text);
+            ctx.fillText(txt || 'Text', 0, 0);
+        }
+
+        if (el.type === 'rect') {
+            ctx.fillStyle = el.fill || '#0ea5e9';
+            ctx.fillRect(-(el.w || 80) / 2, -(el.h || 50) / 2, el.w || 80, el.h || 50);
+        }
+
+        if (el.type === 'circle') {
+            ctx.fillStyle = el.fill || '#10b981';
+            ctx.beginPath();
+            ctx.arc(0, 0, (el.w || 60) / 2, 0, Math.PI * 2);
+            ctx.fill();
+        }
+
+        if (el.type === 'photo') {
+            const w = el.w || 110;
+            const h = el.h || 140;
+            const radius = el.borderRadius || 0;
+
+            // Draw background color
+            if (el.bgColor && el.bgColor !== 'transparent') {
+                ctx.fillStyle = el.bgColor;
+                if (radius > 0) {
+                    roundRect(ctx, -w/2, -h/2, w, h, radius);
+                    ctx.fill();
+                } else {
+                    ctx.fillRect(-w/2, -h/2, w, h);
+                }
+            }
+
+            // Draw border
+            ctx.strokeStyle = el.borderColor || '#0ea5e9';
+            ctx.lineWidth = el.borderWidth || 2;
+            ctx.setLineDash([6, 3]);
+            if (radius > 0) {
+                roundRect(ctx, -w/2, -h/2, w, h, radius);
+                ctx.stroke();
+            } else {
+                ctx.strokeRect(-w/2, -h/2, w, h);
+            }
+            ctx.setLineDash([]);
+            ctx.lineWidth = 1;
+
+            // Draw photo placeholder icon
+            ctx.fillStyle = el.borderColor || '#0ea5e9';
+            ctx.font = '12px Poppins';
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'middle';
+            ctx.fillText('📷 PHOTO', 0, 0);
+        }
+
+        if (el.type === 'signature') {
+            const w = el.w || 120;
+            const h = el.h || 50;
+
+            // Draw background if not transparent
+            if (el.bgColor && el.bgColor !== 'transparent') {
+                ctx.fillStyle = el.bgColor;
+                ctx.fillRect(-w/2, -h/2, w, h);
+            }
+
+            // Draw border
+            ctx.strokeStyle = el.borderColor || '#f59e0b';
+            ctx.setLineDash([6, 3]);
+            ctx.strokeRect(-w/2, -h/2, w, h);
+            ctx.setLineDash([]);
+
+            // Draw signature placeholder icon
+            ctx.fillStyle = el.borderColor || '#f59e0b';
+            ctx.font = '11px Poppins';
+            ctx.textAlign = 'center';
+            ctx.textBaseline = 'middle';
+            ctx.fillText('✍️ SIGNATURE', 0, 0);
+        }
+
+        if (el.type === 'qrcode') {
+            ctx.fillStyle = el.fill || '#0f172a';
+            ctx.fillRect(-(el.w || 100) / 2, -(el.h || 100) / 2, el.w || 100, el.h || 100);
+            ctx.fillStyle = '#fff';
+            ctx.font = '10px Poppins';
+            ctx.textAlign = 'center';
+            ctx.fillText('QR', 0, 0);
+        }
+
+        if (el.type === 'barcode') {
+            ctx.fillStyle = el.fill || '#0f172a';
+            for (let i = 0; i < 8; i++) {
+                ctx.fillRect(-(el.w || 150) / 2 + i * 20, -(el.h || 50) / 2, 8, el.h || 50);
+            }
+            ctx.fillStyle = '#0f172a';
+            ctx.font = '10px Poppins';
+            ctx.textAlign = 'center';
+            ctx.fillText('123456789', 0, (el.h || 50) / 2 + 12);
+        }
+
+        if (el.type === 'image' && el.img) {
+            ctx.globalAlpha = el.opacity || 1;
+            ctx.drawImage(el.img, -(el.w || 80) / 2, -(el.h || 100) / 2, el.w || 80, el.h || 100);
+            ctx.globalAlpha = 1;
+        }
+
+        ctx.restore();
+    });
+
+    updateLayers();
+    updateProps();
+    document.getElementById('canvasMeta').textContent = `Canvas: ${canvas.width}×${canvas.height} px`;
+    document.getElementById('sideBadge').textContent = side === 'front' ? 'Front Side' : 'Back Side';
+    document.getElementById('canvasShell').classList.toggle('grid-on', gridEnabled);
+    document.getElementById('gridToggle').classList.toggle('active', gridEnabled);
+    document.getElementById('snapToggle').classList.toggle('active', snapEnabled);
+}
+
+function addText() {
+    getCurrentElements().push({ id: Math.random(), type: 'text', x: canvas.width / 2, y: canvas.height / 2, text: 'Text', font: 'Poppins', size: 20, color: '#0f172a' });
+    render();
+}
+
+// Quick professional block with all key placeholders
+function addUserInfoBlock() {
+    const x = canvas.width / 2;
+    let y = canvas.height / 2 - 80;
+    const line = (text) => ({ id: Math.random(), type: 'text', x, y: y += 26, text, font: 'Poppins', size: 16, color: '#2563eb', align: 'left', maxWidth: canvas.width * 0.8 });
+
+    const block = [
+        { id: Math.random(), type: 'text', x, y: y, text: 'Name: {name}', font: 'Poppins', size: 18, color: '#1f2937', align: 'left', maxWidth: canvas.width * 0.8 },
+        line('Roll No: {roll_no}'),
+        line('Department: {dept}'),
+        line('DOB: {dob}'),
+        line('Phone: {phone}'),
+        line('Emergency: {emergency}'),
+        line('Blood Group: {blood}'),
+        line('Address: {address}'),
+        line('Valid Upto: {valid_year}')
+    ];
+
+    getCurrentElements().push(...block);
+    render();
+}
+
+function addRect() {
+    getCurrentElements().push({ id: Math.random(), type: 'rect', x: canvas.width / 2, y: canvas.height / 2, w: 140, h: 90, fill: '#0ea5e9' });
+    render();
+}
+
+function addCircle() {
+    getCurrentElements().push({ id: Math.random(), type: 'circle', x: canvas.width / 2, y: canvas.height / 2, w: 110, h: 110, fill: '#10b981' });
+    render();
+}
+
+function addPhoto() {
+    getCurrentElements().push({
+        id: Math.random(),
+        type: 'photo',
+        x: canvas.width / 2,
+        y: canvas.height / 2,
+        w: 110,
+        h: 140,
+        bgColor: '#ffffff',  // Background color for photo box
+        borderRadius: 0,     // Border radius
+        borderColor: '#0ea5e9',
+        borderWidth: 2
+    });
+    render();
+}
+
+function addSignature() {
+    getCurrentElements().push({
+        id: Math.random(),
+        type: 'signature',
+        x: canvas.width / 2,
+        y: canvas.height - 50,
+        w: 120,
+        h: 50,
+        bgColor: 'transparent'  // Background color for signature box
+    });
+    render();
+}
+
+function setColor(color) {
+    if (!selected) return alert('Select an element first!');
+    if (selected.type === 'text') selected.color = color; else selected.fill = color;
+    render();
+}
+
+function applyCustomColor() {
+    const picker = document.getElementById('customColor');
+    if (!picker) return;
+    setColor(picker.value || '#0ea5e9');
+}
+
+function applyPickerColor() {
+    const hex = hsvToHex(cpState.h, cpState.s, cpState.v);
+    setColor(hex);
+}
+
+function duplicateElement() {
+    if (!selected) return;
+    const copy = JSON.parse(JSON.stringify(selected));
+    copy.id = Math.random();
+    copy.x += 20; copy.y += 20;
+    getCurrentElements().push(copy);
+    selected = copy;
+    render();
+}
+
+function deleteElement() {
+    if (!selected) return;
+    const arr = getCurrentElements();
+    const i = arr.indexOf(selected);
+    if (i > -1) arr.splice(i, 1);
+    selected = null;
+    render();
+}
+
+function centerElement() {
+    if (!selected) return;
+    selected.x = canvas.width / 2;
+    selected.y = canvas.height / 2;
+    render();
+}
+
+function alignLeft() { if (selected) { selected.x = (selected.w || 80) / 2 + 16; render(); } }
+function alignRight() { if (selected) { selected.x = canvas.width - (selected.w || 80) / 2 - 16; render(); } }
+function alignTop() { if (selected) { selected.y = (selected.h || 80) / 2 + 16; render(); } }
+function alignBottom() { if (selected) { selected.y = canvas.height - (selected.h || 80) / 2 - 16; render(); } }
+function alignCenter() { centerElement(); }
+
+function bringForward() {
+    if (!selected) return;
+    const arr = getCurrentElements();
+    const i = arr.indexOf(selected);
+    if (i < arr.length - 1) { arr.splice(i, 1); arr.splice(i + 1, 0, selected); }
+    render();
+}
+
+function sendBackward() {
+    if (!selected) return;
+    const arr = getCurrentElements();
+    const i = arr.indexOf(selected);
+    if (i > 0) { arr.splice(i, 1); arr.splice(i - 1, 0, selected); }
+    render();
+}
+
+function lockElement() { if (selected) selected.locked = true; }
+function unlockElement() { if (selected) { selected.locked = false; render(); } }
+
+function setSide(s) {
+    side = s;
+    selected = null;
+    render();
+}
+
+function resetCanvas() {
+    if (confirm('Clear all elements?')) {
+        elements.front = [];
+        elements.back = [];
+        selected = null;
+        render();
+    }
+}
+
+function resizeCanvas(w, h) {
+    canvas.width = w;
+    canvas.height = h;
+    document.getElementById('customW').value = w;
+    document.getElementById('customH').value = h;
+    render();
+}
+
+function applyCustomSize() {
+    const w = parseInt(document.getElementById('customW').value) || 640;
+    const h = parseInt(document.getElementById('customH').value) || 400;
+    resizeCanvas(w, h);
+}
+
+function changeBg(color) { bg = color; render(); }
+
+function saveDesign() {
+    localStorage.setItem('design', JSON.stringify({ elements, bg }));
+    alert('✅ Saved!');
+}
+
+function loadDesign() {
+    const data = localStorage.getItem('design');
+    if (!data) return alert('No saved design');
+    const obj = JSON.parse(data);
+    elements = obj.elements;
+    bg = obj.bg;
+    document.getElementById('bgColor').value = bg;
+    render();
+    alert('✅ Loaded!');
+}
+
+function exportPNG() {
+    const link = document.createElement('a');
+    link.href = canvas.toDataURL();
+    link.download = 'id-card.png';
+    link.click();
+}
+
+function updateLayers() {
+    const list = document.getElementById('layers');
+    const arr = getCurrentElements();
+    if (!arr.length) { list.innerHTML = 'No elements'; return; }
+    list.innerHTML = '';
+    arr.forEach(el => {
+        const div = document.createElement('div');
+        div.className = 'list-item' + (el === selected ? ' active' : '');
+        div.innerHTML = `<span>${iconFor(el.type)} ${labelFor(el)}</span><small style="color:var(--muted)">${Math.round(el.x)}, ${Math.round(el.y)}</small>`;
+        div.onclick = () => selectById(el.id);
+        list.appendChild(div);
+    });
+}
+
+function iconFor(type) {
+    if (type === 'text') return '🅰️';
+    if (type === 'rect' || type === 'square') return '⬜';
+    if (type === 'circle') return '⭕';
+    if (type === 'photo' || type === 'image') return '�';
+    if (type === 'signature') return '✍️';
+    if (type === 'qrcode') return 'QR';
+    if (type === 'barcode') return '📊';
+    return '▫️';
+}
+
+function labelFor(el) {
+    if (el.type === 'text') return el.text || 'Text';
+    return el.type.charAt(0).toUpperCase() + el.type.slice(1);
+}
+
+function updateProps() {
+    const panel = document.getElementById('props');
+    if (!selected) { panel.innerHTML = 'Select an element to edit.'; return; }
+    let html = '';
+    if (selected.type === 'text') {
+        html += `<label>Text</label><input type="text" value="${selected.text}" onchange="selected.text=this.value; render()">`;
+        html += `<label>Font Size</label><input type="number" value="${selected.size}" onchange="selected.size=parseInt(this.value)||16; render()">`;
+        html += `<label>Color</label><input type="color" value="${selected.color}" onchange="selected.color=this.value; render()">`;
+    } else if (selected.type === 'image') {
+        html += `<label>Width</label><input type="range" min="30" max="360" value="${selected.w}" onchange="selected.w=parseInt(this.value); render()">`;
+        html += `<label>Height</label><input type="range" min="30" max="360" value="${selected.h}" onchange="selected.h=parseInt(this.value); render()">`;
+        html += `<label>Opacity</label><input type="range" min="0" max="1" step="0.1" value="${selected.opacity || 1}" onchange="selected.opacity=parseFloat(this.value); render()">`;
+    } else if (selected.type === 'photo') {
+        html += `<label>Width</label><input type="range" min="50" max="200" value="${selected.w || 110}" onchange="selected.w=parseInt(this.value); render()">`;
+        html += `<label>Height</label><input type="range" min="50" max="250" value="${selected.h || 140}" onchange="selected.h=parseInt(this.value); render()">`;
+        html += `<label>Background Color</label><input type="color" value="${selected.bgColor || '#ffffff'}" onchange="selected.bgColor=this.value; render()">`;
+        html += `<label>Border Color</label><input type="color" value="${selected.borderColor || '#0ea5e9'}" onchange="selected.borderColor=this.value; render()">`;
+        html += `<label>Border Width</label><input type="range" min="0" max="10" value="${selected.borderWidth || 2}" onchange="selected.borderWidth=parseInt(this.value); render()">`;
+        html += `<label>Border Radius</label><input type="range" min="0" max="50" value="${selected.borderRadius || 0}" onchange="selected.borderRadius=parseInt(this.value); render()">`;
+    } else if (selected.type === 'signature') {
+        html += `<label>Width</label><input type="range" min="60" max="200" value="${selected.w || 120}" onchange="selected.w=parseInt(this.value); render()">`;
+        html += `<label>Height</label><input type="range" min="30" max="100" value="${selected.h || 50}" onchange="selected.h=parseInt(this.value); render()">`;
+        html += `<label>Background</label><select onchange="selected.bgColor=this.value; render()">
+            <option value="transparent" ${(selected.bgColor === 'transparent' || !selected.bgColor) ? 'selected' : ''}>Transparent</option>
+            <option value="#ffffff" ${selected.bgColor === '#ffffff' ? 'selected' : ''}>White</option>
+            <option value="#f1f5f9" ${selected.bgColor === '#f1f5f9' ? 'selected' : ''}>Light Gray</option>
+        </select>`;
+        html += `<label>Border Color</label><input type="color" value="${selected.borderColor || '#f59e0b'}" onchange="selected.borderColor=this.value; render()">`;
+    } else {
+        html += `<label>Fill</label><input type="color" value="${selected.fill}" onchange="selected.fill=this.value; render()">`;
+        html += `<label>Width</label><input type="range" min="30" max="360" value="${selected.w}" onchange="selected.w=parseInt(this.value); render()">`;
+        html += `<label>Height</label><input type="range" min="30" max="360" value="${selected.h}" onchange="selected.h=parseInt(this.value); render()">`;
+    }
+    html += `<label>X Position</label><input type="number" value="${Math.round(selected.x)}" onchange="selected.x=parseInt(this.value)||0; render()">`;
+    html += `<label>Y Position</label><input type="number" value="${Math.round(selected.y)}" onchange="selected.y=parseInt(this.value)||0; render()">`;
+    panel.innerHTML = html;
+}
+
+function addQRCode() {
+    getCurrentElements().push({ id: Math.random(), type: 'qrcode', x: canvas.width / 2, y: canvas.height / 2, w: 110, h: 110, fill: '#0f172a' });
+    render();
+}
+
+function addBarcode() {
+    getCurrentElements().push({ id: Math.random(), type: 'barcode', x: canvas.width / 2, y: canvas.height / 2, w: 160, h: 60, fill: '#0f172a' });
+    render();
+}
+
+function addShapeByType() {
+    const type = document.getElementById('shapeType').value;
+    if (type === 'rectangle') addRect();
+    else if (type === 'circle') addCircle();
+    else if (type === 'square') {
+        getCurrentElements().push({ id: Math.random(), type: 'rect', x: canvas.width / 2, y: canvas.height / 2, w: 120, h: 120, fill: '#0ea5e9' });
+        render();
+    }
+}
+
+function loadTemplate(name) {
+    if (!confirm('Load this template? Current design will be replaced.')) return;
+    elements.front = [];
+    elements.back = [];
+    selected = null;
+
+    if (name === 'student') {
+        elements.front = [
+            {id:1,type:'rect',x:320,y:20,w:640,h:60,fill:'#0ea5e9'},
+            {id:2,type:'text',x:320,y:30,text:'STUDENT ID CARD',size:20,color:'#fff',font:'Poppins'},
+            {id:3,type:'rect',x:520,y:180,w:150,h:180,fill:'#e0f2fe'},
+            {id:4,type:'text',x:90,y:130,text:'{name}',size:16,color:'#0ea5e9',font:'Poppins'},
+            {id:5,type:'text',x:90,y:160,text:'Student Name',size:11,color:'#475569',font:'Poppins'},
+            {id:6,type:'text',x:90,y:190,text:'Roll No: {roll_no}',size:12,color:'#0f172a',font:'Poppins'},
+            {id:7,type:'text',x:90,y:220,text:'Department: {dept}',size:12,color:'#0f172a',font:'Poppins'},
+            {id:8,type:'text',x:90,y:250,text:'DOB: {dob}',size:11,color:'#475569',font:'Poppins'},
+            {id:9,type:'text',x:90,y:280,text:'Email: {email}',size:10,color:'#0f172a',font:'Poppins'},
+            {id:10,type:'text',x:90,y:310,text:'Phone: {phone}',size:10,color:'#0f172a',font:'Poppins'},
+            {id:11,type:'text',x:520,y:360,text:'ID: {student_id}',size:10,color:'#0f172a',font:'Poppins'},
+        ];
+    } else if (name === 'corporate') {
+        elements.front = [
+            {id:1,type:'rect',x:0,y:0,w:640,h:400,fill:'#ffffff'},
+            {id:2,type:'rect',x:320,y:30,w:620,h:80,fill:'#0ea5e9'},
+            {id:3,type:'text',x:320,y:50,text:'COMPANY NAME',size:22,color:'#fff',font:'Poppins'},
+            {id:4,type:'rect',x:500,y:180,w:120,h:140,fill:'#e0f2fe'},
+            {id:5,type:'text',x:100,y:140,text:'{name}',size:18,color:'#0ea5e9',font:'Poppins'},
+            {id:6,type:'text',x:100,y:170,text:'Position: {role}',size:13,color:'#0f172a',font:'Poppins'},
+            {id:7,type:'text',x:100,y:200,text:'Department: {dept}',size:12,color:'#0f172a',font:'Poppins'},
+            {id:8,type:'text',x:100,y:225,text:'Employee ID: {emp_id}',size:11,color:'#0f172a',font:'Poppins'},
+            {id:9,type:'text',x:100,y:250,text:'Email: {email}',size:10,color:'#475569',font:'Poppins'},
+            {id:10,type:'text',x:100,y:270,text:'Phone: {phone}',size:10,color:'#475569',font:'Poppins'},
+            {id:11,type:'text',x:500,y:330,text:'QR CODE',size:9,color:'#0f172a',font:'Poppins'},
+        ];
+    } else if (name === 'medical') {
+        elements.front = [
+            {id:1,type:'rect',x:0,y:0,w:640,h:400,fill:'#f8fafc'},
+            {id:2,type:'rect',x:320,y:30,w:620,h:70,fill:'#0f766e'},
+            {id:3,type:'text',x:320,y:50,text:'MEDICAL ID CARD',size:20,color:'#fff',font:'Poppins'},
+            {id:4,type:'rect',x:100,y:140,w:120,h:150,fill:'#d1fae5'},
+            {id:5,type:'text',x:350,y:130,text:'{name}',size:18,color:'#0f766e',font:'Poppins'},
+            {id:6,type:'text',x:350,y:160,text:'Specialization: {specialization}',size:12,color:'#0f172a',font:'Poppins'},
+            {id:7,type:'text',x:350,y:185,text:'License: {license_no}',size:11,color:'#0f172a',font:'Poppins'},
+            {id:8,type:'text',x:350,y:210,text:'Hospital: {hospital}',size:11,color:'#0f172a',font:'Poppins'},
+            {id:9,type:'text',x:350,y:235,text:'Dept: {dept}',size:11,color:'#0f172a',font:'Poppins'},
+            {id:10,type:'text',x:350,y:260,text:'Contact: {phone}',size:10,color:'#475569',font:'Poppins'},
+            {id:11,type:'text',x:500,y:320,text:'BARCODE',size:8,color:'#0f172a',font:'Poppins'},
+        ];
+    } else if (name === 'security') {
+        elements.front = [
+            {id:1,type:'rect',x:0,y:0,w:640,h:400,fill:'#0f172a'},
+            {id:2,type:'rect',x:320,y:30,w:620,h:70,fill:'#ef4444'},
+            {id:3,type:'text',x:320,y:50,text:'SECURITY PASS',size:20,color:'#fff',font:'Poppins'},
+            {id:4,type:'rect',x:100,y:140,w:110,h:140,fill:'#475569'},
+            {id:5,type:'text',x:360,y:130,text:'{name}',size:16,color:'#fff',font:'Poppins'},
+            {id:6,type:'text',x:360,y:160,text:'Position: {role}',size:12,color:'#fcd34d',font:'Poppins'},
+            {id:7,type:'text',x:360,y:185,text:'Level: {level}',size:12,color:'#fcd34d',font:'Poppins'},
+            {id:8,type:'text',x:360,y:210,text:'Department: {dept}',size:11,color:'#fff',font:'Poppins'},
+            {id:9,type:'text',x:360,y:235,text:'ID: {emp_id}',size:11,color:'#fff',font:'Poppins'},
+            {id:10,type:'text',x:360,y:260,text:'Valid Till: {valid_till}',size:10,color:'#fff',font:'Poppins'},
+            {id:11,type:'rect',x:100,y:310,w:100,h:50,fill:'#ef4444'},
+            {id:12,type:'text',x:100,y:335,text:'ID CHIP',size:10,color:'#fff',font:'Poppins'},
+        ];
+    } else if (name === 'modern') {
+        elements.front = [
+            {id:1,type:'rect',x:0,y:0,w:640,h:400,fill:'#ffffff'},
+            {id:2,type:'rect',x:320,y:0,w:640,h:100,fill:'#7c3aed'},
+            {id:3,type:'text',x:320,y:35,text:'PROFESSIONAL ID',size:22,color:'#fff',font:'Poppins'},
+            {id:4,type:'rect',x:100,y:150,w:130,h:160,fill:'#ede9fe'},
+            {id:5,type:'text',x:380,y:130,text:'{name}',size:16,color:'#7c3aed',font:'Poppins'},
+            {id:6,type:'text',x:380,y:160,text:'Professional Title: {role}',size:12,color:'#0f172a',font:'Poppins'},
+            {id:7,type:'text',x:380,y:185,text:'Department: {dept}',size:11,color:'#475569',font:'Poppins'},
+            {id:8,type:'text',x:380,y:210,text:'Employee ID: {emp_id}',size:11,color:'#0f172a',font:'Poppins'},
+            {id:9,type:'text',x:380,y:235,text:'Email: {email}',size:10,color:'#0f172a',font:'Poppins'},
+            {id:10,type:'text',x:380,y:260,text:'Phone: {phone}',size:10,color:'#0f172a',font:'Poppins'},
+            {id:11,type:'text',x:380,y:285,text:'Location: {location}',size:10,color:'#475569',font:'Poppins'},
+            {id:12,type:'rect',x:500,y:320,w:100,h:50,fill:'#7c3aed'},
+            {id:13,type:'text',x:500,y:345,text:'QR CODE',size:9,color:'#fff',font:'Poppins'},
+        ];
+    }
+    render();
+    alert('✅ Template loaded');
+}
+
+function uploadImage() {
+    const fileInput = document.getElementById('imageUpload');
+    if (!fileInput.files[0]) return alert('Please select an image first!');
+    const reader = new FileReader();
+    reader.onload = function(e) {
+        const img = new Image();
+        img.onload = function() {
+            // src is kept so the saved template can be rendered server-side
+            getCurrentElements().push({ id: Math.random(), type: 'image', x: canvas.width / 2, y: canvas.height / 2, w: 120, h: 140, img: img, src: e.target.result, opacity: 1 });
+            render();
+            alert('✅ Image added!');
+        };
+        img.src = e.target.result;
+    };
+    reader.readAsDataURL(fileInput.files[0]);
+}
+
+function saveTemplate() {
+    const payload = {
+        name: prompt('Enter template name') || 'Untitled',
+        template: { front: elements.front, back: elements.back, bg: bg, width: canvas.width, height: canvas.height }
+    };
+
+    fetch('/save-template/', {
+        method: 'POST',
+        credentials: 'same-origin',
+        headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCSRFToken() },
+        body: JSON.stringify(payload)
+    })
+    .then(r => r.json())
+    .then(res => {
+        if (res.error) throw new Error(res.error);
+        alert('Template saved successfully!');
+    })
+    .catch(err => { console.error(err); alert('Error saving template'); });
+}
+
+function getCSRFToken() {
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]*)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
+function toggleGrid() { gridEnabled = !gridEnabled; render(); }
+function toggleSnap() { snapEnabled = !snapEnabled; render(); }
+
+// Color picker utilities
+function hsvToRgb(h, s, v) {
+    const c = v * s;
+    const x = c * (1 - Math.abs((h / 60) % 2 - 1));
+    const m = v - c;
+    let r = 0, g = 0, b = 0;
+    if (h >= 0 && h < 60) { r = c; g = x; b = 0; }
+    else if (h < 120) { r = x; g = c; b = 0; }
+    else if (h < 180) { r = 0; g = c; b = x; }
+    else if (h < 240) { r = 0; g = x; b = c; }
+    else if (h < 300) { r = x; g = 0; b = c; }
+    else { r = c; g = 0; b = x; }
+    return {
+        r: Math.round((r + m) * 255),
+        g: Math.round((g + m) * 255),
+        b: Math.round((b + m) * 255)
+    };
+}
+
+function rgbToHex(r, g, b) {
+    return '#' + [r, g, b].map(v => v.toString(16).padStart(2, '0')).join('').toUpperCase();
+}
+
+function hsvToHex(h, s, v) {
+    const { r, g, b } = hsvToRgb(h, s, v);
+    return rgbToHex(r, g, b);
+}
+
+function hexToRgb(hex) {
+    const clean = hex.replace('#', '');
+    const num = parseInt(clean, 16);
+    return { r: (num >> 16) & 255, g: (num >> 8) & 255, b: num & 255 };
+}
+
+function adjustColor(hex, pct) {
+    const { r, g, b } = hexToRgb(hex);
+    const f = 1 + pct / 100;
+    const clamp = v => Math.min(255, Math.max(0, Math.round(v)));
+    return rgbToHex(clamp(r * f), clamp(g * f), clamp(b * f));
+}
+
+function initColorPicker() {
+    const sv = document.getElementById('svCanvas');
+    const hue = document.getElementById('hueCanvas');
+    if (!sv || !hue) return;
+    const svCtx = sv.getContext('2d');
+    const hCtx = hue.getContext('2d');
+    let draggingSV = false;
+    let draggingH = false;
+
+    function renderSV() {
+        const base = `hsl(${cpState.h}, 100%, 50%)`;
+        svCtx.fillStyle = base;
+        svCtx.fillRect(0, 0, sv.width, sv.height);
+        const whiteGrad = svCtx.createLinearGradient(0, 0, sv.width, 0);
+        whiteGrad.addColorStop(0, '#fff');
+        whiteGrad.addColorStop(1, 'rgba(255,255,255,0)');
+        svCtx.fillStyle = whiteGrad;
+        svCtx.fillRect(0, 0, sv.width, sv.height);
+        const blackGrad = svCtx.createLinearGradient(0, 0, 0, sv.height);
+        blackGrad.addColorStop(0, 'rgba(0,0,0,0)');
+        blackGrad.addColorStop(1, '#000');
+        svCtx.fillStyle = blackGrad;
+        svCtx.fillRect(0, 0, sv.width, sv.height);
+        const x = cpState.s * sv.width;
+        const y = (1 - cpState.v) * sv.height;
+        svCtx.strokeStyle = '#fff';
+        svCtx.lineWidth = 2;
+        svCtx.beginPath();
+        svCtx.arc(x, y, 6, 0, Math.PI * 2);
+        svCtx.stroke();
+        svCtx.strokeStyle = '#000';
+        svCtx.lineWidth = 1;
+        svCtx.beginPath();
+        svCtx.arc(x, y, 7, 0, Math.PI * 2);
+        svCtx.stroke();
+    }
+
+    function renderHue() {
+        const grad = hCtx.createLinearGradient(0, 0, 0, hue.height);
+        const stops = [
+            { stop: 0.0, color: 'rgb(255,0,0)' },
+            { stop: 0.17, color: 'rgb(255,255,0)' },
+            { stop: 0.34, color: 'rgb(0,255,0)' },
+            { stop: 0.51, color: 'rgb(0,255,255)' },
+            { stop: 0.68, color: 'rgb(0,0,255)' },
+            { stop: 0.85, color: 'rgb(255,0,255)' },
+            { stop: 1.0, color: 'rgb(255,0,0)' }
+        ];
+        stops.forEach(s => grad.addColorStop(s.stop, s.color));
+        hCtx.fillStyle = grad;
+        hCtx.fillRect(0, 0, hue.width, hue.height);
+        const y = (cpState.h / 360) * hue.height;
+        hCtx.strokeStyle = '#fff';
+        hCtx.lineWidth = 2;
+        hCtx.beginPath();
+        hCtx.moveTo(0, y);
+        hCtx.lineTo(hue.width, y);
+        hCtx.stroke();
+        hCtx.strokeStyle = '#000';
+        hCtx.lineWidth = 1;
+        hCtx.beginPath();
+        hCtx.moveTo(0, y + 1);
+        hCtx.lineTo(hue.width, y + 1);
+        hCtx.stroke();
+    }
+
+    function updateOutputs() {
+        const hex = hsvToHex(cpState.h, cpState.s, cpState.v);
+        const { r, g, b } = hsvToRgb(cpState.h, cpState.s, cpState.v);
+        const prev = document.getElementById('cpPreview');
+        const rgbBox = document.getElementById('cpRgb');
+        if (prev) { prev.textContent = hex; prev.style.background = hex; prev.style.color = '#0f172a'; }
+        if (rgbBox) { rgbBox.textContent = `rgb(${r}, ${g}, ${b})`; rgbBox.style.background = '#f8fafc'; }
+        renderPalette(hex);
+    }
+
+    function setSVFromEvent(e) {
+        const rect = sv.getBoundingClientRect();
+        const x = Math.max(0, Math.min(rect.width, (e.clientX || e.touches?.[0]?.clientX) - rect.left));
+        const y = Math.max(0, Math.min(rect.height, (e.clientY || e.touches?.[0]?.clientY) - rect.top));
+        cpState.s = x / rect.width;
+        cpState.v = 1 - y / rect.height;
+        renderSV();
+        renderHue();
+        updateOutputs();
+    }
+
+    function setHueFromEvent(e) {
+        const rect = hue.getBoundingClientRect();
+        const y = Math.max(0, Math.min(rect.height, (e.clientY || e.touches?.[0]?.clientY) - rect.top));
+        cpState.h = (y / rect.height) * 360;
+        renderSV();
+        renderHue();
+        updateOutputs();
+    }
+
+    sv.addEventListener('mousedown', e => { draggingSV = true; setSVFromEvent(e); });
+    sv.addEventListener('mousemove', e => { if (draggingSV) setSVFromEvent(e); });
+    window.addEventListener('mouseup', () => { draggingSV = false; });
+    hue.addEventListener('mousedown', e => { draggingH = true; setHueFromEvent(e); });
+    hue.addEventListener('mousemove', e => { if (draggingH) setHueFromEvent(e); });
+    window.addEventListener('mouseup', () => { draggingH = false; });
+    sv.addEventListener('touchstart', e => { draggingSV = true; setSVFromEvent(e); e.preventDefault(); }, { passive:false });
+    sv.addEventListener('touchmove', e => { if (draggingSV) setSVFromEvent(e); e.preventDefault(); }, { passive:false });
+    hue.addEventListener('touchstart', e => { draggingH = true; setHueFromEvent(e); e.preventDefault(); }, { passive:false });
+    hue.addEventListener('touchmove', e => { if (draggingH) setHueFromEvent(e); e.preventDefault(); }, { passive:false });
+    window.addEventListener('touchend', () => { draggingSV = false; draggingH = false; });
+
+    renderSV();
+    renderHue();
+    updateOutputs();
+}
+
+function renderPalette(hex) {
+    const holder = document.getElementById('genPalette');
+    if (!holder) return;
+    holder.innerHTML = '';
+    const variants = [adjustColor(hex, -30), adjustColor(hex, -15), hex, adjustColor(hex, 15), adjustColor(hex, 30)];
+    variants.forEach(c => {
+        const div = document.createElement('div');
+        div.className = 'gen-swatch';
+        div.style.background = c;
+        div.title = c;
+        div.onclick = () => setColor(c);
+        holder.appendChild(div);
+    });
+}
+
+init();
+initColorPicker();
@@ -0,0 +1,254 @@
+const API_BASE = '/admin/generate-id/api/templates/';
+const DEBUG_BASE = '/admin/generate-id/debug/';
+
+// Clear output
+function clearOutput(id) {
+    document.getElementById(id).innerHTML = '';
+}
+
+// Log to output
+function log(id, message, type = 'info') {
+    const output = document.getElementById(id);
+    const timestamp = new Date().toLocaleTimeString();
+    let color = 'white';
+    if (type === 'success') color = '#22c55e';
+    if (type === 'error') color = '#ef4444';
+    if (type === 'info') color = '#38bdf8';
+
+    output.innerHTML += `<span style="color: ${color};">[${timestamp}] ${message}</span>\n`;
+    output.scrollTop = output.scrollHeight;
+}
+
+// 1. Check Saved Templates (Debug endpoint)
+async function checkSavedTemplates() {
+    clearOutput('savedOutput');
+    log('savedOutput', 'Fetching saved templates...');
+
+    try {
+        const response = await fetch(DEBUG_BASE);
+        const data = await response.json();
+
+        if (response.ok) {
+            log('savedOutput', `✅ Found ${data.total_templates} template(s)`, 'success');
+            log('savedOutput', '');
+
+            if (data.total_templates === 0) {
+                log('savedOutput', '⚠️  No templates saved yet', 'error');
+                log('savedOutput', 'Create templates in the template editor first!');
+            } else {
+                data.templates.forEach((t, i) => {
+                    log('savedOutput', `Template ${i+1}:`, 'info');
+                    log('savedOutput', `  ID: ${t.id}`);
+                    log('savedOutput', `  Name: ${t.name}`);
+                    log('savedOutput', `  Created: ${t.created_at}`);
+                    log('savedOutput', `  Has Front: ${t.has_front}`);
+                    log('savedOutput', `  Has Back: ${t.has_back}`);
+                });
+            }
+        } else {
+            log('savedOutput', `❌ Error: ${data.error}`, 'error');
+        }
+    } catch (error) {
+        log('savedOutput', `❌ Fetch Error: ${error.message}`, 'error');
+    }
+}
+
+// 2. Load Templates for Generate Page
+async function loadGenerateTemplates() {
+    clearOutput('generateOutput');
+    log('generateOutput', 'Fetching templates from API...');
+
+    try {
+        const response = await fetch(API_BASE);
+        const data = await response.json();
+
+        if (response.ok) {
+            log('generateOutput', `✅ Loaded ${data.templates.length} template(s)`, 'success');
+            log('generateOutput', '');
+
+            data.templates.forEach((t, i) => {
+                log('generateOutput', `Template ${i+1}:`, 'info');
+                log('generateOutput', `  ID: ${t.id}`);
+                log('generateOutput', `  Name: ${t.name}`);
+                log('generateOutput', `  Created: ${t.created_at}`);
+            });
+        } else {
+            log('generateOutput', `❌ Error loading templates`, 'error');
+        }
+    } catch (error) {
+        log('generateOutput', `❌ Fetch Error: ${error.message}`, 'error');
+    }
+}
+
+// 3. Load Single Template
+async function loadSingleTemplate() {
+    const templateId = document.getElementById('templateId').value;
+
+    if (!templateId) {
+        alert('Please enter a template ID');
+        return;
+    }
+
+    clearOutput('singleOutput');
+    log('singleOutput', `Fetching template ${templateId}...`);
+
+    try {
+        const response = await fetch(`${API_BASE}${templateId}/`);
+        const data = await response.json();
+
+        if (response.ok) {
+            log('singleOutput', `✅ Template loaded successfully`, 'success');
+            log('singleOutput', `ID: ${data.id}`);
+            log('singleOutput', `Name: ${data.name}`);
+            log('singleOutput', `Created: ${data.created_at}`);
+            log('singleOutput', '');
+            log('singleOutput', 'Template JSON:');
+            log('singleOutput', JSON.stringify(data.json, null, 2));
+        } else {
+            log('singleOutput', `❌ Error: ${data.error}`, 'error');
+        }
+    } catch (error) {
+        log('singleOutput', `❌ Fetch Error: ${error.message}`, 'error');
+    }
+}
+
+// 4. Create Test Template
+async function createTestTemplate() {
+    const name = document.getElementById('templateName').value || 'Test Template';
+    clearOutput('createOutput');
+    log('createOutput', `Creating template: "${name}"...`);
+
+    const testTemplate = {
+        name: name,
+        template: {
+            front: [
+                {id: 1, type: 'rect', x: 320, y: 30, w: 640, h: 60, fill: '#2563eb'},
+                {id: 2, type: 'text', x: 320, y: 50, text: name.toUpperCase(), size: 20, color: '#fff', font: 'Arial'},
+                {id: 3, type: 'text', x: 100, y: 150, text: 'Name: {name}', size: 14, color: '#000'},
+                {id: 4, type: 'text', x: 100, y: 180, text: 'Email: {email}', size: 12, color: '#000'},
+                {id: 5, type: 'text', x: 100, y: 210, text: 'Role: {role}', size: 12, color: '#000'},
+            ],
+            back: [
+                {id: 1, type: 'rect', x: 320, y: 200, w: 640, h: 200, fill: '#e5e7eb'},
+                {id: 2, type: 'text', x: 320, y: 250, text: 'Back Side Content', size: 14, color: '#000'},
+            ],
+            bg: '#ffffff',
+            width: 640,
+            height: 400
+        }
+    };
+
+    try {
+        const response = await fetch('/save-template/', {
+            method: 'POST',
+            credentials: 'same-origin',
+            headers: {'Content-Type': 'application/json', 'X-CSRFToken': getCSRFToken()},
+            body: JSON.stringify(testTemplate)
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            log('createOutput', `✅ Template created successfully!`, 'success');
+            log('createOutput', `ID: ${data.id}`);
+            log('createOutput', 'You can now see it in the template list above ⬆️');
+        } else {
+            log('createOutput', `❌ Error: ${data.error || 'Unknown error'}`, 'error');
+        }
+    } catch (error) {
+        log('createOutput', `❌ Fetch Error: ${error.message}`, 'error');
+    }
+}
+
+// 5. List Templates in Table
+async function listTemplatesTable() {
+    const tableOutput = document.getElementById('tableOutput');
+    tableOutput.innerHTML = '<p>Loading...</p>';
+
+    try {
+        const response = await fetch(DEBUG_BASE);
+        const data = await response.json();
+
+        if (data.templates.length === 0) {
+            tableOutput.innerHTML = '<p style="color: #ef4444;">❌ No templates found</p>';
+            return;
+        }
+
+        let html = '<table><tr><th>ID</th><th>Name</th><th>Created</th><th>Has Front</th><th>Has Back</th><th>Actions</th></tr>';
+
+        data.templates.forEach(t => {
+            html += `<tr>
+                <td>${t.id}</td>
+                <td>${t.name}</td>
+                <td>${new Date(t.created_at).toLocaleString()}</td>
+                <td>${t.has_front ? '✅' : '❌'}</td>
+                <td>${t.has_back ? '✅' : '❌'}</td>
+                <td>
+                    <button class="btn btn-primary" style="padding: 5px 10px; font-size: 12px;"
+                            onclick="loadAndShowJson(${t.id})">View JSON</button>
+                </td>
+            </tr>`;
+        });
+
+        html += '</table>';
+        tableOutput.innerHTML = html;
+    } catch (error) {
+        tableOutput.innerHTML = `<p style="color: #ef4444;">❌ Error: ${error.message}</p>`;
+    }
+}
+
+// 6. View Template Content
+async function viewTemplateContent() {
+    const templateId = document.getElementById('viewTemplateId').value;
+
+    if (!templateId) {
+        alert('Please enter a template ID');
+        return;
+    }
+
+    loadAndShowJson(templateId);
+}
+
+function loadAndShowJson(templateId) {
+    const contentOutput = document.getElementById('contentOutput');
+    contentOutput.innerHTML = '<p>Loading...</p>';
+
+    fetch(`${API_BASE}${templateId}/`)
+        .then(r => r.json())
+        .then(data => {
+            if (data.error) {
+                contentOutput.innerHTML = `<p style="color: #ef4444;">❌ Error: ${data.error}</p>`;
+                return;
+            }
+
+            const jsonStr = JSON.stringify(data.json, null, 2);
+            contentOutput.innerHTML = `
+                <h3>Template: ${data.name} (ID: ${data.id})</h3>
+                <div class="json-display">${escapeHtml(jsonStr)}</div>
+            `;
+        })
+        .catch(err => {
+            contentOutput.innerHTML = `<p style="color: #ef4444;">❌ Error: ${err.message}</p>`;
+        });
+}
+
+function getCSRFToken() {
+    const match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]*)/);
+    return match ? decodeURIComponent(match[1]) : '';
+}
+
+function escapeHtml(text) {
+    const map = {
+        '&': '&amp;',
+        '<': '&lt;',
+        '>': '&gt;',
+        '"': '&quot;',
+        "'": '&#039;'
+    };
+    return text.replace(/[&<>"']/g, m => map[m]);
+}
+
+// Auto-load on page load
+window.addEventListener('load', () => {
+    log('savedOutput', '✅ Debug console ready. Click buttons to test.', 'success');
+});
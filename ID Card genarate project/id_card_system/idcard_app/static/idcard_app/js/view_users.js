@@ -0,0 +1,48 @@
+function summarizeUserImport(data, dryRun) {
+    const lines = [`${data.rows} rows: ${data.created} created, ${data.updated} updated, ${data.failed} failed` +
+                   (dryRun ? " (validation only, nothing saved)" : "")];
+    data.errors.forEach(err => lines.push(`Row ${err.row}: ${err.error}`));
+    if (data.errors_truncated) lines.push("...more errors not shown");
+    return lines;
+}
+
+function summarizePhotoImport(data, dryRun) {
+    const lines = [dryRun
+        ? `${data.entries} files: ${data.matched} matched, ${data.unmatched_count} unmatched (nothing saved)`
+        : `${data.entries} files: ${data.imported.photo} photos and ${data.imported.signature} signatures imported, ` +
+          `${data.unmatched_count} unmatched, ${data.failed.length} failed`];
+    if (data.unmatched.length) lines.push("Unmatched: " + data.unmatched.join(", ") +
+                                          (data.unmatched_count > data.unmatched.length ? ", ..." : ""));
+    if (data.ambiguous.length) lines.push("Matches several users: " + data.ambiguous.join(", "));
+    if (data.duplicates.length) lines.push("Duplicates: " + data.duplicates.join(", "));
+    data.failed.forEach(err => lines.push(`${err.file}: ${err.error}`));
+    return lines;
+}
+
+async function submitImport(e, summarize) {
+    e.preventDefault();
+    const out = document.getElementById("importResult");
+    const button = this.querySelector("button");
+    button.disabled = true;
+    out.textContent = "Importing...";
+    try {
+        const res = await fetch(this.action, {method: "POST", body: new FormData(this)});
+        const data = await res.json();
+        if (!res.ok) {
+            out.textContent = data.error || "Import failed";
+            return;
+        }
+        out.textContent = summarize(data, this.dry_run.checked).join("\n");
+    } catch (err) {
+        out.textContent = "Import failed: " + err;
+    } finally {
+        button.disabled = false;
+    }
+}
+
+document.getElementById("importForm").addEventListener("submit", function (e) {
+    return submitImport.call(this, e, summarizeUserImport);
+});
+document.getElementById("photoImportForm").addEventListener("submit", function (e) {
+    return submitImport.call(this, e, summarizePhotoImport);
+});
@@ -0,0 +1,8 @@
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseStaticFilesConfig
+
+
+class StaticFilesConfig(BaseStaticFilesConfig):
+    # MEDIA_ROOT lives under idcard_app/static/uploads; uploads are not static
+    # assets and must not be hashed, compressed and copied by collectstatic.
+    # Kept out of apps.py so IdcardAppConfig stays that module's only config.
+    ignore_patterns = BaseStaticFilesConfig.ignore_patterns + ["uploads"]
@@ -0,0 +1,226 @@
+"""Synthetic organisation data for query-plan checks and benchmarks.
+
+Rows are built in memory and inserted with bulk_create, bypassing signals and
+password hashing, so 100k users take seconds. Every generated account has an
+unusable password and an @example.org address tagged with a run id, so
+synthetic rows never collide with real ones and are easy to delete.
+
+attach_images() gives users generated photos and signatures through the
+photo import path (normalized, stored, derivatives built), and
+create_templates() saves a few IDTemplate designs of increasing richness.
+Everything is derived from the seed, so two runs build the same org.
+"""
+import base64
+import io
+import random
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFilter
+
+from .models import IDTemplate, User
+
+
+DEPARTMENTS = (
+    "Computer Science", "Mechanical", "Civil", "Electrical", "Electronics",
+    "Chemical", "Biotechnology", "Mathematics", "Physics", "Commerce",
+    "Management", "Law", "Architecture", "Pharmacy", "Design",
+)
+BLOOD_GROUPS = ("A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-")
+# weights roughly match a campus: mostly students, some staff and admins
+ROLES = (("student", 80), ("user", 12), ("staff", 5), ("employee", 2), ("admin", 1))
+RESIDENCE = ("resident", "non-resident", "temporary", "international")
+
+EMAIL_DOMAIN = "example.org"
+
+
+def department_names(count=len(DEPARTMENTS)):
+    """count department names, numbered ones after the built-in list runs out."""
+    return DEPARTMENTS[:count] + tuple(f"Department {i + 1}" for i in range(len(DEPARTMENTS), count))
+
+
+def synthetic_users(count, seed=0, run_id=None, departments=DEPARTMENTS):
+    """Yield unsaved User rows."""
+    rng = random.Random(seed)
+    run_id = run_id or uuid.uuid4().hex[:8]
+    roles, weights = zip(*ROLES)
+    password = make_password(None)  # unusable
+    now = timezone.now()
+    today = date.today()
+
+    for i in range(count):
+        role = rng.choices(roles, weights)[0]
+        dob = today - timedelta(days=rng.randint(17 * 365, 60 * 365))
+        yield User(
+            username=f"syn-{run_id}-{i:07d}",
+            email=f"syn-{run_id}-{i:07d}@{EMAIL_DOMAIN}",
+            password=password,
+            first_name=rng.choice(("Asha", "Ravi", "Meera", "Arjun", "Sara", "Kiran", "Neha", "Vikram")),
+            last_name=rng.choice(("Patil", "Sharma", "Iyer", "Khan", "Das", "Reddy", "Joshi", "Nair")),
+            role=role,
+            is_staff=role in ("staff", "admin") and rng.random() < 0.5,
+            is_superuser=role == "admin" and rng.random() < 0.2,
+            department=rng.choice(departments),
+            roll_no=f"R{seed:02d}{i:07d}" if role in ("student", "user") else None,
+            residence_status=rng.choice(RESIDENCE),
+            blood_group=rng.choice(BLOOD_GROUPS),
+            phone=f"9{rng.randint(100000000, 999999999)}",
+            emergency_mobile=f"8{rng.randint(100000000, 999999999)}",
+            address=f"{rng.randint(1, 999)} Campus Road, Block {rng.choice('ABCDEFG')}",
+            date_of_birth=dob,
+            age=(today - dob).days // 365,
+            valid_upto=today + timedelta(days=rng.randint(-60, 4 * 365)),
+            date_joined=now - timedelta(seconds=rng.randint(0, 5 * 365 * 86400)),
+        )
+
+
+def create_users(count, seed=0, batch_size=2000, run_id=None, departments=DEPARTMENTS):
+    """Insert count synthetic users; returns the run id used in their usernames."""
+    run_id = run_id or uuid.uuid4().hex[:8]
+    batch = []
+    for user in synthetic_users(count, seed=seed, run_id=run_id, departments=departments):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            User.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        User.objects.bulk_create(batch)
+    return run_id
+
+
+def delete_users(run_id=None):
+    """Delete synthetic users (of one run, or all of them)."""
+    prefix = f"syn-{run_id}-" if run_id else "syn-"
+    return User.objects.filter(username__startswith=prefix, email__endswith=f"@{EMAIL_DOMAIN}").delete()
+
+
+# =========================
+# PHOTOS AND SIGNATURES
+# =========================
+PHOTO_SIZE = (900, 1200)       # a phone portrait, cropped; imports scale it down
+SIGNATURE_SIZE = (800, 260)
+
+
+def photo_bytes(rng):
+    """A passport-style JPEG: backdrop, shoulders and head, with sensor-like noise."""
+    w, h = PHOTO_SIZE
+    backdrop = tuple(rng.randint(170, 235) for _ in range(3))
+    img = Image.new("RGB", PHOTO_SIZE, backdrop)
+    draw = ImageDraw.Draw(img)
+    shirt = tuple(rng.randint(20, 160) for _ in range(3))
+    skin = rng.choice(((241, 194, 125), (224, 172, 105), (198, 134, 66), (141, 85, 36), (255, 219, 172)))
+    hair = tuple(rng.randint(10, 70) for _ in range(3))
+    draw.ellipse((w * 0.08, h * 0.68, w * 0.92, h * 1.25), fill=shirt)
+    draw.rectangle((w * 0.42, h * 0.52, w * 0.58, h * 0.72), fill=skin)
+    draw.ellipse((w * 0.28, h * 0.14, w * 0.72, h * 0.62), fill=hair)
+    draw.ellipse((w * 0.31, h * 0.2, w * 0.69, h * 0.64), fill=skin)
+    img = img.filter(ImageFilter.GaussianBlur(3))
+    noise = Image.effect_noise(PHOTO_SIZE, rng.uniform(12, 24)).convert("RGB")
+    img = Image.blend(img, noise, 0.12)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=rng.randint(85, 95))
+    return buffer.getvalue()
+
+
+def signature_bytes(rng):
+    """A transparent PNG with a few pen strokes."""
+    w, h = SIGNATURE_SIZE
+    img = Image.new("RGBA", SIGNATURE_SIZE, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    ink = rng.choice(((15, 23, 42, 255), (30, 58, 138, 255)))
+    x, y = w * 0.08, h * 0.6
+    points = [(x, y)]
+    while x < w * 0.9:
+        x += rng.uniform(10, 40)
+        y = min(h * 0.9, max(h * 0.15, y + rng.uniform(-60, 60)))
+        points.append((x, y))
+    draw.line(points, fill=ink, width=rng.randint(4, 7), joint="curve")
+    draw.line([(w * 0.1, h * 0.8), (w * rng.uniform(0.5, 0.9), h * 0.75)], fill=ink, width=3)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def attach_images(user_ids, seed=0, signatures=True):
+    """Give each user a generated photo (and signature), stored as the photo import stores them."""
+    from . import photo_import
+
+    rng = random.Random(seed)
+    stored = {}
+    for user_id in user_ids:
+        images = [("photo", photo_bytes(rng))]
+        if signatures:
+            images.append(("signature", signature_bytes(rng)))
+        for field, data in images:
+            _, _, _, name, digest, error = photo_import._store((f"{user_id}-{field}", user_id, field, data))
+            if not error:
+                stored[user_id, field] = (name, digest)
+    photo_import.save_images(stored)
+    return len(stored)
+
+
+# =========================
+# TEMPLATES
+# =========================
+def _logo_uri(seed):
+    rng = random.Random(seed)
+    img = Image.new("RGBA", (200, 200), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((10, 10, 190, 190), fill=tuple(rng.randint(0, 200) for _ in range(3)) + (255,))
+    draw.polygon([(100, 35), (165, 150), (35, 150)], fill=(255, 255, 255, 230))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def element_samples(seed=0):
+    """One typical element of every type the renderers draw, keyed by type."""
+    return {
+        "rect": {"type": "rect", "x": 320, "y": 35, "w": 640, "h": 70, "fill": "#1e3a8a"},
+        "square": {"type": "square", "x": 590, "y": 50, "w": 60, "h": 60, "fill": "#f59e0b", "opacity": 0.8},
+        "circle": {"type": "circle", "x": 600, "y": 360, "r": 30, "fill": "#f59e0b", "opacity": 0.5},
+        "image": {"type": "image", "x": 45, "y": 35, "w": 56, "h": 56, "src": _logo_uri(seed)},
+        "text": {"type": "text", "x": 210, "y": 110, "text": "{name}", "size": 24, "align": "left"},
+        "photo": {"type": "photo", "x": 110, "y": 210, "w": 130, "h": 160, "borderRadius": 12, "bgColor": "#e2e8f0"},
+        "signature": {"type": "signature", "x": 520, "y": 250, "w": 140, "h": 50},
+        "barcode": {"type": "barcode", "x": 320, "y": 335, "w": 260, "h": 40},
+        "qrcode": {"type": "qrcode", "x": 320, "y": 170, "w": 160, "h": 160},
+    }
+
+
+def template_designs(seed=0):
+    """{name: template JSON} from a text-only card up to one using every element type on both sides."""
+    el = element_samples(seed)
+    header = [el["rect"], {"type": "text", "x": 340, "y": 18, "text": "Government College of Engineering",
+                           "size": 22, "color": "#ffffff"}]
+    details = [
+        el["text"],
+        {"type": "text", "x": 210, "y": 150, "text": "Roll No: {roll_no}", "size": 16, "align": "left"},
+        {"type": "text", "x": 210, "y": 180, "text": "Dept: {dept}  Blood: {blood}", "size": 16, "align": "left"},
+        {"type": "text", "x": 210, "y": 210, "text": "{address}", "size": 13, "align": "left", "maxWidth": 260},
+    ]
+    back = [
+        {"type": "rect", "x": 320, "y": 200, "w": 600, "h": 360, "fill": "#e0f2fe"},
+        {"type": "text", "x": 320, "y": 280, "text": "If found, return to the college office. Valid upto {valid_upto}",
+         "size": 14},
+    ]
+    card = {"width": 640, "height": 400, "bg": "#f8fafc"}
+    return {
+        "text-only": {**card, "front": header + details, "back": []},
+        "photo": {**card, "front": header + [el["image"], el["photo"]] + details, "back": back},
+        "codes": {**card, "front": header + details + [el["barcode"]], "back": back + [el["qrcode"]]},
+        "full": {**card, "front": header + [el["image"], el["circle"], el["square"], el["photo"]] + details
+                 + [el["signature"], el["barcode"]], "back": back + [el["qrcode"]]},
+    }
+
+
+def create_templates(seed=0, prefix="Synthetic"):
+    """Save every template_designs() design as an IDTemplate; returns {name: IDTemplate}."""
+    created = {}
+    for name, design in template_designs(seed).items():
+        template = IDTemplate(name=f"{prefix} {name}")
+        template.save_version(design)
+        created[name] = template
+    return created
@@ -0,0 +1,14 @@
+from django import template
+
+from .. import imaging
+
+register = template.Library()
+
+
+@register.filter
+def derivative_url(fieldfile, size="preview"):
+    """URL of a stored photo/signature derivative, e.g. {{ u.photo|derivative_url:"avatar" }}.
+
+    Falls back to the original upload when the derivative has not been built.
+    """
+    return imaging.derivative_url(fieldfile, size)
@@ -0,0 +1,29 @@
+"""Test runner writing metrics to a temporary directory for the whole run."""
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from .. import metrics
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner that points METRICS_DIR at a temporary directory.
+
+    ScratchFilesMixin gives each class its own, but tests outside it and the
+    flush at exit would otherwise write the test run's counts to the real one.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = Path(tempfile.mkdtemp(prefix="idcard-metrics-"))
+        self.metrics_settings = override_settings(METRICS_DIR=self.metrics_dir)
+        self.metrics_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        metrics.close()
+        self.metrics_settings.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,45 @@
+import weakref
+
+from django.apps import apps
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch.dispatcher import _make_id
+from django.test import SimpleTestCase
+
+from ..apps import IdcardAppConfig
+from ..models import DashboardSettings, IDTemplate, User
+
+
+def receivers(signal, sender=None):
+    """Names of the functions connected to signal for sender.
+
+    By name, so this module does not import signals.py itself and connect
+    them when ready() did not.
+    """
+    names = set()
+    for (_, sender_id), receiver, *_ in signal.receivers:
+        if sender_id != _make_id(sender):
+            continue
+        if isinstance(receiver, weakref.ReferenceType):
+            receiver = receiver()
+        if receiver is not None:
+            names.add(f"{receiver.__module__}.{receiver.__qualname__}")
+    return names
+
+
+class AppConfigTests(SimpleTestCase):
+    def test_app_uses_its_config(self):
+        self.assertIs(type(apps.get_app_config("idcard_app")), IdcardAppConfig)
+
+    def test_ready_connects_receivers(self):
+        self.assertLessEqual({"idcard_app.signals.tune_sqlite_connection", "idcard_app.signals.time_queries"},
+                             receivers(connection_created))
+        for signal in (post_save, post_delete):
+            self.assertIn("idcard_app.signals.evict_compiled_template", receivers(signal, IDTemplate))
+            self.assertIn("idcard_app.signals.bump_dashboard_settings_version",
+                          receivers(signal, DashboardSettings))
+        self.assertIn("idcard_app.signals.note_new_uploads", receivers(pre_save, User))
+        self.assertIn("idcard_app.signals.build_upload_derivatives", receivers(post_save, User))
+
+    def test_collectstatic_skips_uploads(self):
+        self.assertIn("uploads", apps.get_app_config("staticfiles").ignore_patterns)
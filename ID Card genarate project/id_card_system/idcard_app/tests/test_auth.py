@@ -0,0 +1,30 @@
+from django.contrib.auth import authenticate
+from django.test import TestCase
+
+from ..models import User
+from .utils import ScratchFilesMixin
+
+
+class EmailBackendTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.asha = User.objects.create_user(username="asha", email="Asha@example.org", password="asha-pass")
+
+    def login(self, email, password):
+        return authenticate(email=email, password=password)
+
+    def test_email_is_case_insensitive(self):
+        for email in ("Asha@example.org", "asha@example.org", "ASHA@EXAMPLE.ORG"):
+            with self.subTest(email=email):
+                self.assertEqual(self.login(email, "asha-pass"), self.asha)
+        self.assertIsNone(self.login("asha@example.org", "wrong"))
+        self.assertIsNone(self.login("ravi@example.org", "asha-pass"))
+
+    def test_case_variants_need_the_exact_spelling(self):
+        # created before case-insensitive lookups; both rows can log in, but only as spelled
+        other = User.objects.create_user(username="asha2", email="asha@example.org", password="other-pass")
+        self.assertEqual(self.login("Asha@example.org", "asha-pass"), self.asha)
+        self.assertEqual(self.login("asha@example.org", "other-pass"), other)
+        self.assertIsNone(self.login("asha@example.org", "asha-pass"))
+        self.assertIsNone(self.login("ASHA@example.org", "asha-pass"))
+        self.assertIsNone(self.login("ASHA@example.org", "other-pass"))
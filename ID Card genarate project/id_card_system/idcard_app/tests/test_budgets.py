@@ -0,0 +1,278 @@
+"""Query, size and latency budgets for every URL in idcard_app/urls.py.
+
+ROUTES gives each URL name one request (who sends it, with what) and its
+budget: exactly `queries` SQL statements, at most `max_bytes` of response
+body and at most `max_ms` of wall time. Each is measured on the second of two identical
+requests, so per-process caches (compiled templates, settings) are warm.
+The budgets must hold on a medium organisation (100 users) and a large one
+(10k users), and QueryScalingTests checks that growing the first into the
+second leaves every route's query count unchanged: no N+1, and no per-user
+work in requests that only show a page of users.
+
+A new URL fails RouteTableTests until it gets an entry here. Query budgets
+are exact counts, so a view that gains or loses a query fails until its
+budget is updated deliberately.
+Wall time budgets leave room for slow CI machines; BUDGET_TIME_FACTOR=3
+scales them further.
+"""
+import io
+import json
+import os
+import random
+import time
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import jobs, synthetic, urls
+from ..models import IDTemplate, SavedTemplate, TemplateDesign, User
+from .utils import ScratchFilesMixin
+
+
+TIME_FACTOR = float(os.environ.get("BUDGET_TIME_FACTOR", "1"))
+KB = 1024
+MB = 1024 * KB
+MEDIUM_ORG = 100
+LARGE_ORG = 10_000
+CARD_HOLDERS = 5          # users on every bundle, export and batch request
+BUDGET_TEMPLATE = "full"  # synthetic.template_designs(): every element type, both sides
+
+
+class Route:
+    """One request to a URL name and the budget it must stay within.
+
+    args (URL kwargs) and data are values or callables taking the test case,
+    so a request can name rows from setUpTestData or make fresh ones (a
+    template to delete, a job to cancel) before it is measured. as_user is
+    "admin", "student" or None for an anonymous request.
+    """
+
+    def __init__(self, method="get", as_user="admin", args=None, data=None, json_body=False,
+                 status=200, queries=0, max_bytes=16 * KB, max_ms=250):
+        self.method = method
+        self.as_user = as_user
+        self.args = args
+        self.data = data
+        self.json_body = json_body
+        self.status = status if isinstance(status, tuple) else (status,)
+        self.queries = queries
+        self.max_bytes = max_bytes
+        self.max_ms = max_ms
+
+
+def _value(value, test):
+    return value(test) if callable(value) else value
+
+
+def _users_csv(test):
+    rows = "email,first_name,last_name,role,roll_no\nbudget-import@example.org,Budget,Import,student,RBUDGET1\n"
+    return {"file": SimpleUploadedFile("users.csv", rows.encode(), "text/csv"), "dry_run": "1"}
+
+
+def _photos_zip(test):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr(f"{test.student.roll_no}.jpg", synthetic.photo_bytes(random.Random(0)))
+    return {"file": SimpleUploadedFile("photos.zip", buffer.getvalue(), "application/zip"), "dry_run": "1"}
+
+
+def _queued_job(test):
+    return {"job_id": jobs.create_export_job(test.template, test.holders, created_by=test.admin).id}
+
+
+def _throwaway_template(test):
+    template = IDTemplate(name="Budget throwaway")
+    template.save_version(test.template.template_json)
+    return {"template_id": template.id}
+
+
+def _template(test):
+    return {"template_id": test.template.id}
+
+
+def _version(test):
+    return {"template_id": test.template.id, "version": test.template.current_version.hash}
+
+
+def _card(test):
+    return {"template_id": test.template.id, "user_id": test.student.id, "side": "front"}
+
+
+def _version_card(test):
+    return {**_version(test), "user_id": test.student.id, "side": "front"}
+
+
+def _holders(test):
+    return {"users": ",".join(str(uid) for uid in test.holders), "dpi": "150"}
+
+
+ROUTES = {
+    # accounts
+    "login": Route("post", None, data=lambda t: {"email": t.student.email, "password": "student-pass"},
+                   status=302, queries=9, max_bytes=0),
+    "logout": Route("post", "student", status=302, queries=4, max_bytes=0),
+    "signup": Route(as_user=None, status=302, max_bytes=0),
+    "forgot_password": Route(as_user=None, max_bytes=4 * KB),
+    "user_dashboard": Route(as_user="student", queries=2, max_bytes=32 * KB),
+
+    # admin pages
+    "admin_dashboard": Route(queries=4),
+    "admin_profile": Route(queries=2),
+    "manage_users": Route(queries=4, max_bytes=96 * KB),
+    "edit_user": Route(args=lambda t: {"user_id": t.student.id}, queries=3, max_bytes=32 * KB),
+    "template_admin": Route(queries=2, max_bytes=24 * KB),
+    "template_debug": Route(queries=2, max_bytes=8 * KB),
+    "generate_id_card": Route(queries=2, max_bytes=24 * KB),
+    "dashboard_settings": Route(queries=3),
+
+    # users
+    "get_users_json": Route(data={"limit": "100"}, queries=4, max_bytes=96 * KB),
+    "import_users": Route("post", data=_users_csv, queries=4, max_bytes=1 * KB),
+    "import_photos": Route("post", data=_photos_zip, queries=3, max_bytes=1 * KB),
+
+    # designer
+    "save_design": Route("post", data={"name": "Budget design", "json": {"front": [], "back": []}},
+                         json_body=True, queries=3, max_bytes=1 * KB),
+    "list_designs": Route(queries=3, max_bytes=4 * KB),
+    "load_design": Route(args=lambda t: {"design_id": t.design.id}, queries=3, max_bytes=1 * KB),
+    "save_template": Route("post", data=lambda t: {"id": t.template.id, "template": t.template.template_json},
+                           json_body=True, queries=7, max_bytes=1 * KB),
+    "load_templates": Route(as_user=None, queries=1, max_bytes=1 * KB),
+
+    # export jobs
+    "batch_export": Route("post", data=lambda t: {"template_id": t.template.id, "users": t.holders},
+                          json_body=True, queries=8, max_bytes=1 * KB),
+    "export_job_status": Route(args=lambda t: {"job_id": t.job.id}, queries=5, max_bytes=2 * KB),
+    "cancel_export_job": Route("post", args=_queued_job, queries=8, max_bytes=1 * KB),
+    "download_export_job": Route(args=lambda t: {"job_id": t.job.id}, status=409, queries=3, max_bytes=1 * KB),
+
+    # template catalog
+    "get_id_templates": Route(queries=3, max_bytes=4 * KB),
+    "get_id_template_detail": Route(args=_template, queries=3, max_bytes=8 * KB),
+    "get_id_template_version": Route(args=_version, queries=4, max_bytes=8 * KB),
+    "get_id_template_versions": Route(args=_template, queries=4, max_bytes=2 * KB),
+    "get_id_template_thumbnail": Route(args=_template, queries=3, max_bytes=8 * KB),
+    "get_id_template_version_thumbnail": Route(args=_version, queries=4, max_bytes=8 * KB),
+    "delete_id_template": Route("post", args=_throwaway_template, queries=9, max_bytes=1 * KB),
+    "api_template_debug": Route(queries=4, max_bytes=2 * KB),
+
+    # cards
+    "get_render_bundle": Route(args=_template, data=lambda t: {"users": ",".join(map(str, t.holders))},
+                               queries=4, max_bytes=24 * KB),
+    "render_card_side": Route(args=_card, queries=4, max_bytes=64 * KB),
+    "render_card_side_jpg": Route(args=_card, queries=4, max_bytes=96 * KB),
+    "render_card_side_version": Route(args=_version_card, queries=5, max_bytes=64 * KB),
+    "render_card_side_version_jpg": Route(args=_version_card, queries=5, max_bytes=96 * KB),
+    "export_cards_pdf": Route(args=_template, data=_holders, queries=4, max_bytes=192 * KB, max_ms=3000),
+    "export_cards_pdf_version": Route(args=_version, data=_holders, queries=5, max_bytes=192 * KB, max_ms=3000),
+    "export_cards_zip": Route(args=_template, data=_holders, queries=4, max_bytes=768 * KB, max_ms=1000),
+    "export_cards_zip_version": Route(args=_version, data=_holders, queries=5, max_bytes=768 * KB, max_ms=1000),
+
+    # media
+    "serve_media": Route(as_user="student", args=lambda t: {"name": t.student.photo.name}, queries=2,
+                         max_bytes=192 * KB),
+    # 500 where rembg is not installed; the cutout is cached once made
+    "remove_background_api": Route(args=lambda t: {"user_id": t.student.id}, status=(200, 500), queries=3,
+                                   max_bytes=512 * KB, max_ms=5000),
+
+    # operations
+    "metrics": Route(queries=2, max_bytes=512 * KB),
+    "test_api": Route(as_user=None, max_bytes=1 * KB),
+}
+
+
+class RouteTableTests(SimpleTestCase):
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(sorted(names - set(ROUTES)), [], "URL names without a budget in ROUTES")
+        self.assertEqual(sorted(set(ROUTES) - names), [], "budgets for URL names that no longer exist")
+
+
+class BudgetTestCase(ScratchFilesMixin, TestCase):
+    """A synthetic organisation of `users` users."""
+
+    users = MEDIUM_ORG
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="budget-admin", email="budget-admin@example.org",
+                                             password="admin-pass", role="admin")
+        cls.student = User.objects.create_user(username="budget-student", email="budget-student@example.org",
+                                               password="student-pass", role="student", roll_no="RBUDGET0",
+                                               first_name="Budget", last_name="Student", department="Physics")
+        run_id = synthetic.create_users(cls.users - 2, seed=1)
+        others = (User.objects.filter(username__startswith=f"syn-{run_id}-", roll_no__isnull=False)
+                  .order_by("username").values_list("id", flat=True)[:CARD_HOLDERS - 1])
+        cls.holders = [cls.student.id, *others]
+        synthetic.attach_images(cls.holders, seed=1)
+        cls.student.refresh_from_db()
+
+        cls.template = synthetic.create_templates(seed=1, prefix="Budget")[BUDGET_TEMPLATE]
+        cls.design = TemplateDesign.objects.create(name="Budget design", json_data="{}", created_by=cls.admin)
+        SavedTemplate.objects.create(name="Budget saved", json={"front": [], "back": []}, created_by=cls.admin)
+        cls.job = jobs.create_export_job(cls.template, cls.holders, created_by=cls.admin)
+
+    def request(self, name):
+        """Send a route's request; returns (response, queries, body bytes, milliseconds)."""
+        route = ROUTES[name]
+        client = Client()
+        if route.as_user:
+            client.force_login(self.admin if route.as_user == "admin" else self.student)
+        url = reverse(name, kwargs=_value(route.args, self))
+        data = _value(route.data, self)
+        if route.json_body:
+            data = {"data": json.dumps(data), "content_type": "application/json"}
+        else:
+            data = {"data": data} if data is not None else {}
+
+        with CaptureQueriesContext(connection) as queries:
+            begun = time.perf_counter()
+            response = getattr(client, route.method)(url, **data)
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            elapsed = (time.perf_counter() - begun) * 1000
+        response.close()
+        self.assertIn(response.status_code, route.status, f"{name} answered {response.status_code}")
+        return response, len(queries), size, elapsed
+
+    def measure(self, name):
+        """(queries, bytes, milliseconds) of the second of two requests to a route."""
+        self.request(name)
+        return self.request(name)[1:]
+
+
+class MediumOrgBudgetTests(BudgetTestCase):
+    users = MEDIUM_ORG
+
+    def test_routes_within_budget(self):
+        for name, route in ROUTES.items():
+            with self.subTest(route=name, users=self.users):
+                queries, size, elapsed = self.measure(name)
+                self.assertEqual(queries, route.queries, f"{name}: {queries} queries")
+                self.assertLessEqual(size, route.max_bytes, f"{name}: {size} bytes")
+                self.assertLessEqual(elapsed, route.max_ms * TIME_FACTOR, f"{name}: {elapsed:.0f} ms")
+
+
+class LargeOrgBudgetTests(MediumOrgBudgetTests):
+    users = LARGE_ORG
+
+
+class QueryScalingTests(BudgetTestCase):
+    users = MEDIUM_ORG
+
+    def test_query_count_constant_as_users_grow(self):
+        before = {name: self.measure(name)[0] for name in ROUTES}
+        synthetic.create_users(LARGE_ORG - self.users, seed=2)
+        self.assertEqual(User.objects.count(), LARGE_ORG)
+        after = {name: self.measure(name)[0] for name in ROUTES}
+        for name in ROUTES:
+            with self.subTest(route=name):
+                self.assertEqual(after[name], before[name],
+                                 f"{name}: {before[name]} queries with {self.users} users, "
+                                 f"{after[name]} with {LARGE_ORG}")
@@ -0,0 +1,66 @@
+import io
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+from PIL import Image
+
+from .. import imaging
+from ..models import User
+from .utils import ScratchFilesMixin
+
+
+def upload(name, color, fmt="JPEG"):
+    data = io.BytesIO()
+    Image.new("RGB", (800, 1000), color).save(data, fmt)
+    return SimpleUploadedFile(name, data.getvalue())
+
+
+class DerivativeTests(ScratchFilesMixin, TestCase):
+    def user(self, username, photo):
+        user = User(username=username, email=f"{username}@example.org", photo=photo)
+        user.save()
+        return user
+
+    def card_color(self, user):
+        name = imaging.derivative_for(user.photo, "card", user.photo.storage)
+        with user.photo.storage.open(name) as fh, Image.open(fh) as img:
+            return img.convert("RGB").getpixel((10, 10))
+
+    def test_uploads_sharing_a_stem_keep_their_own_derivatives(self):
+        asha = self.user("asha", upload("a.jpg", (200, 0, 0)))
+        ravi = self.user("ravi", upload("a.png", (0, 0, 200), "PNG"))
+        # an upload named like another upload's derivative
+        kiran = self.user("kiran", upload("a.jpg__card.jpg", (0, 200, 0)))
+        self.assertEqual(imaging.derivative_for(asha.photo, "card"), f"derivatives/{asha.photo.name}__card.jpg")
+        for user, color in ((asha, (200, 0, 0)), (ravi, (0, 0, 200)), (kiran, (0, 200, 0))):
+            with self.subTest(user=user.username):
+                # JPEG drifts a shade or two
+                self.assertLess(max(abs(got - want) for got, want in zip(self.card_color(user), color)), 8)
+        with asha.photo.storage.open(kiran.photo.name) as fh, Image.open(fh) as img:
+            self.assertEqual(img.size, (800, 1000))   # still the original, not asha's card derivative
+
+        grants = {user.username: imaging.user_media_names(user) for user in (asha, ravi, kiran)}
+        self.assertFalse(grants["asha"] & grants["ravi"])
+        self.assertFalse(grants["asha"] & grants["kiran"])
+        self.assertIn(imaging.derivative_for(ravi.photo, "avatar"), grants["ravi"])
+
+    def test_best_source(self):
+        asha = self.user("asha", upload("a.jpg", (200, 0, 0)))
+        self.assertEqual(imaging.best_source(asha.photo, 90, 60), f"derivatives/{asha.photo.name}__avatar.jpg")
+        self.assertEqual(imaging.best_source(asha.photo, 400, 300), f"derivatives/{asha.photo.name}__card.jpg")
+        self.assertEqual(imaging.best_source(asha.photo, 2000, 100), asha.photo.name)
+
+
+class RemoveBackgroundViewTests(ScratchFilesMixin, TestCase):
+    def test_failure_is_logged_not_shown(self):
+        user = User.objects.create_user(username="asha", email="asha@example.org", password="x",
+                                        photo=upload("a.jpg", (200, 0, 0)))
+        self.client.force_login(user)
+        with mock.patch.object(imaging, "remove_background", side_effect=RuntimeError("/srv/models/u2net.onnx")), \
+                self.assertLogs("idcard_app.views", "ERROR") as logs:
+            response = self.client.get(reverse("remove_background_api", args=[user.id]))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {"error": "Background removal failed"})
+        self.assertIn("u2net.onnx", logs.output[0])
@@ -0,0 +1,191 @@
+import io
+import zipfile
+from datetime import date, datetime
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from openpyxl import Workbook
+
+from .. import importing
+from ..models import User
+from .utils import ScratchFilesMixin
+
+
+def csv_file(*lines):
+    return io.BytesIO("\n".join(lines).encode("utf-8-sig"))
+
+
+class CleanRowTests(SimpleTestCase):
+    def clean(self, **raw):
+        return importing.clean_row({"email": "asha@example.org", **raw})
+
+    def problems(self, **raw):
+        with self.assertRaises(ValueError) as caught:
+            self.clean(**raw)
+        return str(caught.exception)
+
+    def test_values_are_normalised(self):
+        data = self.clean(email=" Asha@Example.ORG ", role="Student", blood_group="b pos", age="19",
+                          date_of_birth="09/03/2004", valid_upto=datetime(2027, 6, 30), phone=9876543210.0,
+                          residence_status="Non-Resident", department="")
+        self.assertEqual(data, {
+            "email": "asha@example.org", "role": "student", "blood_group": "B+", "age": 19,
+            "date_of_birth": date(2004, 3, 9), "valid_upto": date(2027, 6, 30), "phone": "9876543210",
+            "residence_status": "non-resident",
+        })
+
+    def test_ages(self):
+        self.assertEqual(self.clean(age=" 42 ")["age"], 42)
+        self.assertEqual(self.clean(age=42.0)["age"], 42)   # an XLSX number cell
+        for age in ("inf", "-inf", "nan", "1e400", "25.5", "twenty"):
+            with self.subTest(age=age):
+                self.assertIn(f"age: '{age}' is not a whole number", self.problems(age=age))
+        for age in ("0", "150", "-3", "9" * 400):
+            with self.subTest(age=age):
+                self.assertIn("is out of range", self.problems(age=age))
+
+    def test_every_problem_is_reported(self):
+        message = self.problems(email="not-an-email", role="janitor", blood_group="C+",
+                                date_of_birth="31-02-2004", roll_no="R" * 200)
+        self.assertTrue(message.startswith("email: 'not-an-email' is not a valid address; "))
+        for field in ("role", "blood_group", "date_of_birth", "roll_no: longer than"):
+            self.assertIn(field, message)
+
+    def test_email_is_required(self):
+        with self.assertRaisesMessage(ValueError, "email is required"):
+            importing.clean_row({"first_name": "Asha"})
+
+    def test_header_aliases(self):
+        self.assertEqual(importing._header(["E-mail", "First Name", "Surname", "DOB", "Roll Number"]),
+                         ["email", "first_name", "last_name", "date_of_birth", "roll_no"])
+        with self.assertRaises(importing.ImportFormatError):
+            importing._header(["name", "phone"])
+        with self.assertRaises(importing.ImportFormatError):
+            importing.read_rows(io.BytesIO(b""), "users.txt")
+
+
+class ImportFileTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.existing = User.objects.create_user(username="ravi", email="Ravi@example.org", password="keep",
+                                                department="Physics")
+
+    def run_import(self, fileobj, filename="users.csv", **options):
+        return importing.import_file(fileobj, filename, workers=2, **options)
+
+    def test_creates_and_updates(self):
+        report = self.run_import(csv_file(
+            "Email,First Name,Dept,Age,Password",
+            "asha@example.org,Asha,Chemistry,19,secret-pass",
+            "RAVI@example.org,Ravi,,20,",
+            "",
+            "bad,Nobody,,inf,",
+        ))
+        self.assertEqual(report.as_dict(), {
+            "rows": 3, "created": 1, "updated": 1, "failed": 1, "errors_truncated": False,
+            "errors": [{"row": 5, "error": "email: 'bad' is not a valid address; age: 'inf' is not a whole number"}],
+        })
+        asha = User.objects.get(email="asha@example.org")
+        self.assertEqual((asha.username, asha.department, asha.age), ("asha@example.org", "Chemistry", 19))
+        self.assertTrue(asha.check_password("secret-pass"))
+        self.existing.refresh_from_db()
+        # blank cells leave the stored values alone, and so does the username
+        self.assertEqual((self.existing.first_name, self.existing.department, self.existing.age),
+                         ("Ravi", "Physics", 20))
+        self.assertEqual(self.existing.username, "ravi")
+        self.assertTrue(self.existing.check_password("keep"))
+
+    def test_duplicates_and_taken_usernames(self):
+        report = self.run_import(csv_file(
+            "email,username",
+            "asha@example.org,asha",
+            "ASHA@example.org,asha2",
+            "meena@example.org,ravi",
+            "kiran@example.org,kiran",
+            "kavya@example.org,kiran",
+        ))
+        self.assertEqual([(e["row"], e["error"]) for e in report.as_dict()["errors"]], [
+            (3, "asha@example.org appears earlier in the file"),
+            (4, "username 'ravi' is already taken"),
+            (6, "username 'kiran' is already taken"),
+        ])
+        self.assertEqual(report.created, 2)
+
+    def test_default_password_and_dry_run(self):
+        self.run_import(csv_file("email", "asha@example.org"), default_password="welcome")
+        self.assertTrue(User.objects.get(email="asha@example.org").check_password("welcome"))
+        report = self.run_import(csv_file("email", "kiran@example.org", "asha@example.org"), dry_run=True)
+        self.assertEqual((report.created, report.updated), (1, 1))
+        self.assertFalse(User.objects.filter(email="kiran@example.org").exists())
+
+    def test_small_batches(self):
+        lines = ["email,roll_no"] + [f"user{i}@example.org,R{i}" for i in range(7)]
+        report = self.run_import(csv_file(*lines), batch_size=3)
+        self.assertEqual(report.created, 7)
+        self.assertEqual(User.objects.filter(roll_no__startswith="R").count(), 7)
+
+    def test_sheet_corrupt_halfway(self):
+        workbook = Workbook()
+        for i in range(300):
+            workbook.active.append([f"user{i}@example.org"] if i else ["email"])
+        data = io.BytesIO()
+        workbook.save(data)
+        # cut the sheet XML short, past the rows of the first batch
+        corrupt = io.BytesIO()
+        with zipfile.ZipFile(data) as src, zipfile.ZipFile(corrupt, "w") as dst:
+            for name in src.namelist():
+                content = src.read(name)
+                dst.writestr(name, content[:len(content) * 2 // 3] if name.endswith("sheet1.xml") else content)
+        corrupt.seek(0)
+
+        with self.assertRaisesMessage(importing.ImportFormatError, "users before it were already imported"):
+            self.run_import(corrupt, "users.xlsx", batch_size=50)
+        self.assertTrue(User.objects.filter(email="user1@example.org").exists())
+
+    def test_xlsx(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Email", "Roll No", "Age", "Date of Birth"])
+        sheet.append(["asha@example.org", 1042.0, 19.0, datetime(2004, 3, 9)])
+        sheet.append([None, None, None, None])
+        sheet.append(["kiran@example.org", "R7", 25.5, None])
+        data = io.BytesIO()
+        workbook.save(data)
+        data.seek(0)
+
+        report = self.run_import(data, "users.xlsx")
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.as_dict()["errors"], [{"row": 4, "error": "age: '25.5' is not a whole number"}])
+        asha = User.objects.get(email="asha@example.org")
+        self.assertEqual((asha.roll_no, asha.age, asha.date_of_birth), ("1042", 19, date(2004, 3, 9)))
+
+
+class ImportViewTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+
+    def post(self, name, content):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse("import_users"), {"file": SimpleUploadedFile(name, content)})
+
+    def test_report(self):
+        response = self.post("users.csv", b"email,age\nasha@example.org,19\nkiran@example.org,1e400\n")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["created"], response.json()["failed"]), (1, 1))
+
+    def test_unreadable_file(self):
+        self.assertEqual(self.post("users.csv", b"name,age\nAsha,19\n").status_code, 400)
+        self.assertEqual(self.post("users.pdf", b"%PDF-").status_code, 400)
+        for name, content in (("users.xlsx", b"not a zip"), ("users.csv", b"email\n\x81\x8d@example.org\n")):
+            with self.subTest(name=name):
+                response = self.post(name, content)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+    def test_excel_csv(self):
+        # Excel's plain "CSV" is Windows-1252
+        response = self.post("users.csv", "email,first_name\nzoe@example.org,Zoë\n".encode("cp1252"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(email="zoe@example.org").first_name, "Zoë")
@@ -0,0 +1,252 @@
+import json
+import shutil
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import jobs
+from ..models import ExportChunk, ExportJob, IDTemplate, User
+from .utils import ScratchFilesMixin
+
+
+TEMPLATE = {
+    "front": [{"type": "rect", "x": 320, "y": 40, "w": 640, "h": 80, "fill": "#1e3a8a"},
+              {"type": "text", "x": 320, "y": 200, "text": "{name}", "size": 24}],
+    "back": [{"type": "text", "x": 320, "y": 200, "text": "Return to the office", "size": 16}],
+}
+
+
+class JobTestCase(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.template = IDTemplate(name="Jobs")
+        cls.template.save_version(TEMPLATE)
+        cls.users = [
+            User.objects.create(username=f"user{i}", email=f"user{i}@example.org", first_name=f"User{i}",
+                                roll_no=f"R{i}")
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        patcher = mock.patch.object(jobs, "CHUNK_SIZE", 2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # job ids are reused once a test's transaction rolls back
+        self.addCleanup(shutil.rmtree, jobs.export_root(), ignore_errors=True)
+
+    def make_job(self, fmt="zip", **options):
+        return jobs.create_export_job(self.template, [u.id for u in self.users], fmt=fmt, dpi=36, **options)
+
+    def expire(self, chunk):
+        ExportChunk.objects.filter(id=chunk.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+
+class QueueTests(JobTestCase):
+    def test_users_split_into_chunks(self):
+        job = self.make_job()
+        self.assertEqual(job.total, 5)
+        self.assertEqual([c.user_ids for c in job.chunks.order_by("index")],
+                         [[u.id for u in self.users[i:i + 2]] for i in (0, 2, 4)])
+
+    def test_no_users_is_done_at_once(self):
+        job = jobs.create_export_job(self.template, [])
+        self.assertEqual(job.status, "done")
+        self.assertIsNone(jobs.claim_chunk("w1"))
+
+
+class ClaimTests(JobTestCase):
+    """claim_chunk() with the compare-and-set UPDATE (SQLite) and with SKIP LOCKED."""
+
+    skip_locked = False
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(connection.features, "has_select_for_update_skip_locked", self.skip_locked)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_workers_get_different_chunks(self):
+        job = self.make_job()
+        claimed = [jobs.claim_chunk(f"w{i}") for i in range(4)]
+        self.assertEqual([c.index for c in claimed[:3]], [0, 1, 2])
+        self.assertIsNone(claimed[3])
+        for i, chunk in enumerate(claimed[:3]):
+            chunk.refresh_from_db()
+            self.assertEqual((chunk.status, chunk.lease_owner, chunk.attempts), ("leased", f"w{i}", 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "running")
+        self.assertIsNotNone(job.started_at)
+
+    def test_expired_lease_is_claimed_again(self):
+        self.make_job()
+        chunk = jobs.claim_chunk("w1")
+        self.assertTrue(jobs.renew_lease(chunk, "w1"))
+        self.expire(chunk)
+        again = jobs.claim_chunk("w2")
+        self.assertEqual((again.id, again.lease_owner, again.attempts), (chunk.id, "w2", 2))
+        # the first worker lost it: no renewal and its result is not recorded
+        self.assertFalse(jobs.renew_lease(chunk, "w1"))
+        self.assertFalse(jobs.process_chunk(chunk, "w1"))
+        self.assertTrue(jobs.process_chunk(again, "w2"))
+        again.refresh_from_db()
+        self.assertEqual((again.status, again.rendered), ("done", 2))
+
+    def test_exhausted_chunk_fails(self):
+        job = self.make_job()
+        chunk = jobs.claim_chunk("w1")
+        ExportChunk.objects.filter(id=chunk.id).update(attempts=jobs.MAX_ATTEMPTS)
+        self.expire(chunk)
+        claimed = {jobs.claim_chunk("w2").id, jobs.claim_chunk("w3").id}
+        self.assertNotIn(chunk.id, claimed)
+        self.assertIsNone(jobs.claim_chunk("w4"))
+
+        jobs.fail_exhausted_chunks()
+        chunk.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual((chunk.status, chunk.error), ("failed", "lease expired too many times"))
+        self.assertEqual(job.failed, 2)
+
+    def test_released_chunk_is_retried_until_attempts_run_out(self):
+        self.make_job()
+        chunk = jobs.claim_chunk("w1")
+        for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+            self.assertEqual(chunk.attempts, attempt)
+            jobs.release_chunk(chunk, chunk.lease_owner, "boom")
+            if attempt < jobs.MAX_ATTEMPTS:
+                chunk = jobs.claim_chunk(f"w{attempt + 1}")
+        chunk.refresh_from_db()
+        self.assertEqual((chunk.status, chunk.error), ("failed", "boom"))
+        self.assertEqual(ExportJob.objects.get(id=chunk.job_id).failed, 2)
+
+    def test_cancel(self):
+        job = self.make_job()
+        leased = jobs.claim_chunk("w1")
+        self.assertTrue(jobs.cancel_job(job))
+        self.assertFalse(jobs.cancel_job(job))
+        self.assertEqual(set(job.chunks.values_list("status", flat=True)), {"leased", "cancelled"})
+        self.assertIsNone(jobs.claim_chunk("w2"))
+        self.assertFalse(jobs.renew_lease(leased, "w1"))
+        self.assertFalse(jobs.process_chunk(leased, "w1"))
+        self.assertFalse(jobs.work_once("w2"))
+
+
+class SkipLockedClaimTests(ClaimTests):
+    # SQLite has no row locks, so this runs the SKIP LOCKED branch's queries without the lock clause
+    skip_locked = True
+
+
+class WorkerTests(JobTestCase):
+    def run_job(self, job):
+        jobs.run_worker("w1", once=True)
+        job.refresh_from_db()
+        return job
+
+    def test_zip_export(self):
+        job = self.run_job(self.make_job())
+        self.assertEqual((job.status, job.rendered, job.failed, job.error), ("done", 5, 0, ""))
+        with zipfile.ZipFile(job.output) as archive:
+            self.assertIsNone(archive.testzip())
+            names = archive.namelist()
+        self.assertEqual(names, [f"{u.id}_{side}.png" for u in self.users for side in ("front", "back")])
+        self.assertFalse(jobs.job_dir(job).exists())
+        self.assertEqual(list(jobs.export_root().glob(".*.tmp")), [])
+
+    def test_pdf_export(self):
+        job = self.run_job(self.make_job("pdf", include_back=False))
+        self.assertEqual(job.status, "done")
+        with open(job.output, "rb") as fh:
+            data = fh.read()
+        self.assertTrue(data.startswith(b"%PDF-"))
+        self.assertEqual(data.count(b"/Type /Page "), 5)
+        self.assertFalse(jobs.job_dir(job).exists())
+
+    def test_missing_user_fails_the_job(self):
+        job = jobs.create_export_job(self.template, [self.users[0].id, 999999], dpi=36)
+        job = self.run_job(job)
+        self.assertEqual((job.status, job.rendered, job.failed), ("done", 1, 1))
+        self.assertIn("user 999999: not found", job.chunks.get().error)
+
+    def test_assembly_stops_when_its_lease_is_taken_over(self):
+        job = self.make_job()
+        while jobs.claim_chunk("w1") is not None:
+            pass
+        for chunk in job.chunks.all():
+            jobs.process_chunk(chunk, "w1")
+        assembling = jobs._claim_assembly("w1")
+        # its lease expired and another worker took the job over
+        ExportJob.objects.filter(id=job.id).update(lease_owner="w2")
+        with mock.patch.object(jobs, "LEASE_SECONDS", 0):
+            jobs.assemble_job(assembling, "w1")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.lease_owner, job.output), ("assembling", "w2", ""))
+        self.assertFalse(jobs.output_path(job, "zip").exists())
+        self.assertEqual(list(jobs.export_root().glob(".*.tmp")), [])
+        self.assertTrue(jobs.job_dir(job).exists())   # still needed by w2
+
+    def test_heartbeat(self):
+        renew = mock.Mock(return_value=True)
+        heartbeat = jobs.Heartbeat(renew)
+        heartbeat()
+        renew.assert_not_called()
+        with mock.patch.object(jobs, "LEASE_SECONDS", 0):
+            heartbeat()
+            renew.return_value = False
+            with self.assertRaises(jobs.LeaseLost):
+                heartbeat()
+
+    def test_temp_files_are_per_worker(self):
+        output = jobs.output_path(ExportJob(id=3), "zip")
+        first, second = jobs._temp_path(output, "host-a:12:abc"), jobs._temp_path(output, "host-b:12:abc")
+        self.assertNotEqual(first, second)
+        self.assertEqual(first.parent, output.parent)
+        self.assertNotIn(":", first.name)
+
+    def test_finished_job_dirs_are_removed(self):
+        cancelled, running, busy = self.make_job(), self.make_job(), self.make_job()
+        jobs.cancel_job(cancelled)
+        leased = jobs.claim_chunk("w1")
+        self.assertEqual(leased.job_id, running.id)
+        jobs.cancel_job(running)   # a worker still renders a chunk of it
+        ExportJob.objects.filter(id=busy.id).update(status="running")
+        for job in (cancelled, running, busy):
+            jobs.job_dir(job).mkdir(parents=True)
+        (jobs.export_root() / "job-999999").mkdir()   # a deleted job
+
+        self.assertEqual(jobs.remove_finished_job_dirs(), 2)
+        self.assertEqual(sorted(p.name for p in jobs.export_root().iterdir()),
+                         sorted([f"job-{running.id}", f"job-{busy.id}"]))
+        self.expire(leased)
+        self.assertEqual(jobs.remove_finished_job_dirs(), 1)
+        self.assertFalse(jobs.job_dir(running).exists())
+
+
+class BatchExportViewTests(JobTestCase):
+    def setUp(self):
+        super().setUp()
+        admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+        self.client.force_login(admin)
+
+    def post(self, payload):
+        return self.client.post(reverse("batch_export"), json.dumps(payload), content_type="application/json")
+
+    def test_queues_a_job(self):
+        response = self.post({"template_id": self.template.id, "users": [self.users[0].id],
+                              "include_back": False, "format": "pdf"})
+        self.assertEqual(response.status_code, 200)
+        job = ExportJob.objects.get(id=response.json()["job_id"])
+        self.assertEqual((job.fmt, job.include_back, job.total), ("pdf", False, 1))
+
+    def test_rejects_bad_payloads(self):
+        template_id = self.template.id
+        for payload in ([1, 2], "users", None, {"template_id": template_id, "include_back": "false"},
+                        {"template_id": template_id, "users": [{"id": "x"}]},
+                        {"template_id": template_id, "users": [{"id": None}]},
+                        {"template_id": template_id, "users": [{"name": "asha"}]}):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertFalse(ExportJob.objects.exists())
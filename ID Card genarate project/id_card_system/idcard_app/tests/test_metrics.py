@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .. import metrics
+from .utils import ScratchFilesMixin
+
+
+def finished_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@unittest.skipIf(metrics.fcntl is None, "folding needs POSIX")
+class FoldFinishedTests(ScratchFilesMixin, SimpleTestCase):
+    def setUp(self):
+        self.directory = metrics.metrics_dir()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob("*.json"):
+            path.unlink()
+
+    def write(self, pid, removals):
+        rows = [["idcard_background_removals_total", ["test"], removals]]
+        (self.directory / f"{pid}.json").write_text(json.dumps(rows))
+
+    def removals(self):
+        return metrics.collect().get(("idcard_background_removals_total", ("test",)), 0)
+
+    def test_finished_processes_are_folded(self):
+        gone = finished_pid()
+        self.write(gone, 3)
+        self.write(os.getppid(), 4)   # alive
+        metrics.fold_finished()
+        self.assertFalse((self.directory / f"{gone}.json").exists())
+        self.assertTrue((self.directory / f"{os.getppid()}.json").exists())
+        self.assertEqual(self.removals(), 7)
+
+        self.write(gone, 2)
+        self.assertIn('idcard_background_removals_total{result="test"} 9', metrics.exposition())
+        self.assertEqual(sorted(path.name for path in self.directory.glob("*.json")),
+                         sorted([f"{os.getppid()}.json", f"{os.getpid()}.json", metrics.FINISHED_NAME]))
+
+    def test_reused_pid_does_not_go_backwards(self):
+        # a new process with the pid of a finished one folds the old file before writing its own
+        self.write(os.getpid(), 5)
+        metrics.fold_finished(own=True)
+        self.write(os.getpid(), 1)
+        self.assertEqual(self.removals(), 6)
+
+
+class TestRunnerTests(SimpleTestCase):
+    def test_metrics_stay_out_of_the_real_directory(self):
+        self.assertNotEqual(str(settings.METRICS_DIR), str(settings.BASE_DIR / "cache" / "metrics"))
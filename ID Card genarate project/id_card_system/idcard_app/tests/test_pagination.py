@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import User
+from ..pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from .utils import ScratchFilesMixin
+
+
+ORDERINGS = [("username", "id"), ("date_joined", "id"), ("-date_joined", "-id")]
+
+
+class KeysetPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        joined = datetime(2024, 5, 1, 9, 30, 0, 123456, tzinfo=timezone.utc)
+        for i in range(7):
+            # pairs share a date_joined down to the microsecond, so pages break ties on id
+            User.objects.create(username=f"user{6 - i}", email=f"user{i}@example.org",
+                                date_joined=joined + timedelta(microseconds=i // 2))
+
+    def all_pages(self, ordering, limit):
+        ids, cursor = [], None
+        while True:
+            page = keyset_page(User.objects.all(), ordering, cursor, limit)
+            ids += [user.id for user in page.items]
+            if not page.has_more:
+                return ids
+            cursor = page.next_cursor
+
+    def test_pages_cover_the_ordering(self):
+        for ordering in ORDERINGS:
+            expected = list(User.objects.order_by(*ordering).values_list("id", flat=True))
+            for limit in (1, 2, 3, 7, 100):
+                with self.subTest(ordering=ordering, limit=limit):
+                    self.assertEqual(self.all_pages(ordering, limit), expected)
+
+    def test_values_queryset(self):
+        page = keyset_page(User.objects.values("id", "username"), ("username", "id"), limit=2)
+        self.assertEqual([row["username"] for row in page.items], ["user0", "user1"])
+        page = keyset_page(User.objects.values("id", "username"), ("username", "id"), page.next_cursor, 2)
+        self.assertEqual([row["username"] for row in page.items], ["user2", "user3"])
+
+    def test_cursor_round_trip(self):
+        joined = datetime(2024, 5, 1, 9, 30, 0, 123456, tzinfo=timezone.utc)
+        cursor = encode_cursor([joined, 42])
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor, 2), [joined.isoformat(), 42])
+
+    def test_invalid_cursors(self):
+        cursors = {
+            "not base64": "%%%",
+            "not json": "bm90IGpzb24",   # not json
+            "not a list": "e30",           # {}
+            "wrong length": encode_cursor(["user1"]),
+            "null": encode_cursor([None, 1]),
+            "nested": encode_cursor(["user1", [1]]),
+            "text for an id": encode_cursor(["user1", "x"]),
+            "number for a date": encode_cursor([5, 1]),
+            "bad date": encode_cursor(["2024-13-45", 1]),
+        }
+        for problem, cursor in cursors.items():
+            with self.subTest(problem=problem):
+                ordering = ("date_joined", "id") if "date" in problem else ("username", "id")
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(User.objects.all(), ordering, cursor)
+
+
+class UserListCursorTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+        for i in range(3):
+            User.objects.create(username=f"user{i}", email=f"user{i}@example.org")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_json_pages(self):
+        url = reverse("get_users_json")
+        first = self.client.get(url, {"limit": 2, "order": "date_joined"}).json()
+        second = self.client.get(url, {"limit": 2, "order": "date_joined", "cursor": first["next_cursor"]}).json()
+        self.assertEqual(len(first["users"] + second["users"]), 4)
+        self.assertFalse(second["has_more"])
+
+    def test_wrong_typed_cursor_is_bad_request(self):
+        response = self.client.get(reverse("get_users_json"),
+                                   {"order": "date_joined", "cursor": encode_cursor(["yesterday", 1])})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Cursor does not match the ordering")
+
+    def test_manage_users_starts_over(self):
+        response = self.client.get(reverse("manage_users"), {"cursor": encode_cursor(["user1", "x"])})
+        self.assertRedirects(response, reverse("manage_users"), fetch_redirect_response=False)
@@ -0,0 +1,219 @@
+import itertools
+import re
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from PIL import Image
+
+from .. import rendering
+from ..models import IDTemplate, User
+from .test_rendering import TEMPLATE, card_user
+from .utils import ScratchFilesMixin, pdf_pages, pdf_stream, read_pdf
+
+
+def card(color, size=(64, 40)):
+    return Image.new("RGB", size, color)
+
+
+def streamed(chunks):
+    return b"".join(chunks)
+
+
+class PDFStreamWriterTests(SimpleTestCase):
+    def test_offsets_and_xref(self):
+        writer = rendering.PDFStreamWriter()
+        data = [writer.begin()]
+        late = writer.reserve()   # written by a finisher, after the pages
+        writer.on_finish(lambda: writer.write_object(late, b"<< /Late true >>"))
+        for color in ("red", "blue"):
+            obj_id, image = writer.add_image(card(color))
+            data += [image, writer.add_page(200, 100, [(obj_id, 10, 10, 64, 40)])]
+        data.append(writer.finish(title="Cards (2024)"))
+        data = b"".join(data)
+
+        self.assertEqual(writer.offset, len(data))
+        objects = read_pdf(data)
+        self.assertEqual(objects[late], b"<< /Late true >>")
+        self.assertIn(b"/Title (Cards \\(2024\\))", data)
+        pages = pdf_pages(objects)
+        self.assertEqual(len(pages), 2)
+        self.assertIn(b"/MediaBox [0 0 200 100]", pages[0])
+        self.assertIn(b"/Count 2", objects[rendering.pdf.PAGES_ID])
+
+    def test_image_placement(self):
+        writer = rendering.PDFStreamWriter()
+        data = writer.begin()
+        obj_id, image = writer.add_image(Image.new("RGBA", (64, 40), (255, 0, 0, 128)), fmt="PNG")
+        data += image + writer.add_page(200, 100, [(obj_id, 10, 20, 64, 40)]) + writer.finish()
+        objects = read_pdf(data)
+        self.assertIn(b"/SMask", objects[obj_id])
+        content = int(pdf_pages(objects)[0].split(b"/Contents ")[1].split()[0])
+        # origin top-left in, PDF bottom-left out: 100 - 20 - 40 = 40
+        self.assertEqual(pdf_stream(objects[content]).split(b"\n")[0], b"q 64 0 0 40 10 40 cm /Im0 Do Q")
+
+    def test_empty_run(self):
+        data = streamed(rendering.stream_cards_pdf([]))
+        objects = read_pdf(data)
+        self.assertEqual(pdf_pages(objects), [])
+        self.assertIn(b"/Count 0", objects[rendering.pdf.PAGES_ID])
+
+    def test_card_pages(self):
+        cards = [(card("red"), card("blue")), (None, None), (card("green"), None)]
+        pages = pdf_pages(read_pdf(streamed(rendering.stream_cards_pdf(cards, dpi=72))))
+        # cards with no sides get no page; a front alone keeps the front-and-back page size
+        self.assertEqual(len(pages), 2)
+        self.assertIn(b"/Im1 ", pages[0])
+        self.assertNotIn(b"/Im1 ", pages[1])
+        self.assertEqual(pages[0].split(b"/Resources")[0], pages[1].split(b"/Resources")[0])
+
+
+class VectorPDFTests(ScratchFilesMixin, SimpleTestCase):
+    def export(self, names):
+        users = [card_user(id=i, first_name=name) for i, name in enumerate(names, 1)]
+        return read_pdf(streamed(rendering.stream_cards_pdf(rendering.vector_cards(TEMPLATE, users), dpi=300)))
+
+    def of_kind(self, objects, kind):
+        return {obj_id: obj for obj_id, obj in objects.items() if obj.startswith(b"<< /Type " + kind)}
+
+    def test_cards_share_the_static_layer_and_font(self):
+        objects = self.export(["Asha", "Ravi", "Kiran"])
+        pages = pdf_pages(objects)
+        self.assertEqual(len(pages), 3)   # the template has no back
+        forms = self.of_kind(objects, b"/XObject /Subtype /Form ")
+        fonts = self.of_kind(objects, b"/Font /Subtype /Type0 ")
+        self.assertEqual((len(forms), len(fonts)), (4, 1))
+
+        cards = [int(re.search(rb"/Im0 (\d+) 0 R", page).group(1)) for page in pages]
+        [base] = set(forms) - set(cards)
+        base_ops = pdf_stream(forms[base])
+        self.assertIn(b"0.863 0.149 0.149 rg 0 320 640 80 re f", base_ops)   # the header, flipped to PDF space
+        self.assertNotIn(b"BT", base_ops)
+        [font] = fonts
+        shown = set()
+        for obj_id in cards:
+            self.assertIn(b"/Matrix [0.0015625 0 0 0.0025 0 0]", forms[obj_id])
+            self.assertIn(b"/XObject << /X%d %d 0 R >> /Font << /F0 %d 0 R >>" % (base, base, font), forms[obj_id])
+            ops = pdf_stream(forms[obj_id]).split(b"\n")
+            self.assertEqual(ops[0], b"/X%d Do" % base)
+            shown.add(re.search(rb"<([0-9a-f]+)> Tj", ops[-1]).group(1))
+        self.assertEqual(len(shown), 3)
+
+    def test_font_subset_maps_back_to_text(self):
+        objects = self.export(["Asha", "Ravi"])
+        [font] = self.of_kind(objects, b"/Font /Subtype /Type0 ").values()
+        [descriptor] = self.of_kind(objects, b"/FontDescriptor ").values()
+        self.assertIn(b"/FontFile2 ", descriptor)
+        # text stays searchable and copyable: every character shown is in the ToUnicode map
+        cmap = pdf_stream(objects[int(re.search(rb"/ToUnicode (\d+) 0 R", font).group(1))])
+        for char in "AshRvi P":
+            self.assertIn(b"<%04x>" % ord(char), cmap)
+
+
+class CardExportTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+        cls.student = User.objects.create_user(username="asha", email="asha@example.org", password="x",
+                                               first_name="Asha", roll_no="R42")
+        cls.template = IDTemplate(name="Export")
+        cls.template.save_version({"front": [{"type": "text", "x": 320, "y": 200, "text": "{name}"}], "back": []})
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, name, **params):
+        return self.client.get(reverse(name, args=[self.template.id]), {"dpi": 72, **params})
+
+    def test_pdf(self):
+        for render in ("vector", "raster"):
+            with self.subTest(render=render):
+                response = self.export("export_cards_pdf", users=self.student.id, render=render)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(pdf_pages(read_pdf(streamed(response.streaming_content)))), 1)
+
+    def test_no_cards_is_not_found(self):
+        for name in ("export_cards_pdf", "export_cards_zip"):
+            with self.subTest(name=name):
+                self.assertEqual(self.export(name, users="999999").status_code, 404)
+                User.objects.filter(id=self.student.id).update(role="staff")
+                self.assertEqual(self.export(name).status_code, 404)
+                User.objects.filter(id=self.student.id).update(role="student")
+                self.assertEqual(self.export(name).status_code, 200)
+
+
+class ImpositionTests(SimpleTestCase):
+    def assertClose(self, first, second):
+        self.assertAlmostEqual(first, second, places=6)
+
+    def test_backs_land_behind_their_fronts(self):
+        """Turn each back sheet over the way the printer does and check it covers its front."""
+        for paper, duplex, portrait_cards, bleed in itertools.product(
+                rendering.imposition.PAPER_SIZES_MM, ("long-edge", "short-edge"), (False, True), (0, 2)):
+            grid = rendering.SheetLayout(paper=paper, duplex=duplex, bleed_mm=bleed).grid(portrait_cards)
+            # a long-edge turn flips about the paper's long edge, a short-edge turn about its short one
+            sideways = (duplex == "long-edge") == (grid.page_h > grid.page_w)
+            for index in range(grid.per_sheet):
+                with self.subTest(paper=paper, duplex=duplex, portrait_cards=portrait_cards, bleed=bleed,
+                                  index=index):
+                    x, y, w, h, turned = grid.slot(index)
+                    bx, by, bw, bh, back_turned = grid.slot(index, back=True)
+                    self.assertFalse(turned)
+                    self.assertEqual((bw, bh), (w, h))
+                    if sideways:
+                        self.assertClose(grid.page_w - (bx + bw), x)
+                        self.assertClose(by, y)
+                        self.assertFalse(back_turned)
+                    else:
+                        # turned top to bottom, so the back is drawn upside down to read upright
+                        self.assertClose(bx, x)
+                        self.assertClose(grid.page_h - (by + bh), y)
+                        self.assertTrue(back_turned)
+
+    def test_a4_grids(self):
+        # landscape cards fit 3x3 on a landscape sheet, where long-edge duplex turns the sheet top to bottom
+        grid = rendering.SheetLayout(paper="a4", duplex="long-edge").grid()
+        self.assertEqual((grid.cols, grid.rows), (3, 3))
+        self.assertGreater(grid.page_w, grid.page_h)
+        self.assertEqual(grid.slot(0, back=True)[:2], grid.slot(6)[:2])
+        self.assertTrue(grid.slot(0, back=True)[4])
+        # portrait cards fit 3x3 on a portrait sheet, where long-edge duplex turns it sideways
+        grid = rendering.SheetLayout(paper="a4", duplex="long-edge").grid(portrait_cards=True)
+        self.assertEqual((grid.cols, grid.rows), (3, 3))
+        self.assertLess(grid.page_w, grid.page_h)
+        self.assertEqual(grid.slot(0, back=True), grid.slot(2))
+
+    def test_no_duplex_keeps_positions(self):
+        grid = rendering.SheetLayout(paper="letter", duplex="none").grid(portrait_cards=True)
+        for index in range(grid.per_sheet):
+            self.assertEqual(grid.slot(index, back=True), grid.slot(index))
+
+    def test_imposed_pdf(self):
+        layout = rendering.SheetLayout(paper="a4", duplex="long-edge", crop_marks=False)
+        per_sheet = layout.grid().per_sheet
+        cards = [(card("red", (640, 400)), card("blue", (640, 400)))] * (per_sheet + 1)
+        objects = read_pdf(streamed(rendering.stream_imposed_pdf(cards, layout)))
+        pages = pdf_pages(objects)
+        self.assertEqual(len(pages), 4)   # a front and a back sheet for the full grid and for the last card
+
+        def draws(page):
+            content = int(page.split(b"/Contents ")[1].split()[0])
+            return [op for op in pdf_stream(objects[content]).split(b"\n") if op.endswith(b"Do Q")]
+
+        self.assertEqual([len(draws(page)) for page in pages], [per_sheet, per_sheet, 1, 1])
+        # backs are placed with a negated matrix, turned by 180 degrees
+        self.assertTrue(all(op.split()[1].startswith(b"-") for op in draws(pages[1])))
+        self.assertFalse(any(op.split()[1].startswith(b"-") for op in draws(pages[0])))
+
+    def test_options(self):
+        self.assertIsNone(rendering.SheetLayout.from_options({}))
+        layout = rendering.SheetLayout.from_options({"paper": "A3", "bleed": "2", "gutter": "1", "marks": "off",
+                                                      "duplex": "Short-Edge"})
+        self.assertEqual(layout.options(), {"paper": "a3", "gutter": 4.0, "bleed": 2.0, "margin": 8.0,
+                                            "marks": False, "duplex": "short-edge"})
+        for options in ({"paper": "a5"}, {"paper": "a4", "duplex": "sideways"}, {"paper": "a4", "bleed": "9"},
+                        {"paper": "a4", "gutter": "wide"}, {"paper": "a4", "margin": "41"}):
+            with self.subTest(options=options):
+                with self.assertRaises(ValueError):
+                    rendering.SheetLayout.from_options(options)
+        with self.assertRaisesMessage(ValueError, "no card fits"):
+            rendering.SheetLayout(paper="a4", margin_mm=100)
@@ -0,0 +1,154 @@
+import io
+import zipfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from PIL import Image
+
+from .. import photo_import
+from ..models import User
+from .utils import ScratchFilesMixin
+
+
+def image_bytes(size=(300, 400), fmt="JPEG", color=(200, 160, 120)):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, fmt)
+    return out.getvalue()
+
+
+def archive(entries):
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w") as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    out.seek(0)
+    return out
+
+
+class EntryTargetTests(SimpleTestCase):
+    def test_names(self):
+        cases = {
+            "R2024001.jpg": ("R2024001", "photo"),
+            "batch 3/R2024001.JPEG": ("R2024001", "photo"),
+            "signatures/R2024001.png": ("R2024001", "signature"),
+            "Batch/Sign/r7.png": ("r7", "signature"),
+            "R2024001_sign.png": ("R2024001", "signature"),
+            "R2024001-Signature.webp": ("R2024001", "signature"),
+            "R2024001 sig.png": ("R2024001", "signature"),
+            "asha.patil@college.edu.jpg": ("asha.patil@college.edu", "photo"),
+            "windows\\path\\R9.jpg": ("R9", "photo"),
+            "R_10.jpg": ("R_10", "photo"),   # a separator alone is not a hint
+        }
+        for name, expected in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(photo_import.entry_target(name), expected)
+
+    def test_forced_field(self):
+        self.assertEqual(photo_import.entry_target("signatures/R1_sign.png", "photo"), ("R1", "photo"))
+        self.assertEqual(photo_import.entry_target("R1.jpg", "signature"), ("R1", "signature"))
+
+    def test_not_images(self):
+        for name in ("notes.txt", "R1", ".jpg", "__MACOSX/._R1.jpg", "photos/.hidden.jpg"):
+            with self.subTest(name=name):
+                self.assertIsNone(photo_import.entry_target(name))
+
+
+class MatchUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.asha = User.objects.create(username="asha", email="Asha.Patil@College.edu", roll_no="R001")
+        cls.ravi = User.objects.create(username="ravi", email="ravi@college.edu", roll_no="R002")
+        User.objects.create(username="twin1", email="twin1@college.edu", roll_no="R003")
+        User.objects.create(username="twin2", email="twin2@college.edu", roll_no="R003")
+
+    def test_keys(self):
+        matches = photo_import.match_users(["R001", "r002", "asha.patil@college.edu", "R003", "R404",
+                                            "nobody@college.edu"])
+        self.assertEqual(matches["R001"], [self.asha.id])
+        self.assertEqual(matches["r002"], [self.ravi.id])
+        self.assertEqual(matches["asha.patil@college.edu"], [self.asha.id])
+        self.assertEqual(len(matches["R003"]), 2)
+        self.assertNotIn("R404", matches)
+        self.assertNotIn("nobody@college.edu", matches)
+
+    def test_keys_naming_the_same_user(self):
+        keys = ["r002", "R002", "RAVI@college.edu", "ravi@college.edu"]
+        for order in (keys, keys[::-1]):
+            with self.subTest(order=order):
+                self.assertEqual(photo_import.match_users(order), {key: [self.ravi.id] for key in keys})
+
+    def test_chunks(self):
+        keys = ["R001", "R002"] + [f"X{i}" for i in range(5)]
+        self.assertEqual(photo_import.match_users(keys, chunk_size=2),
+                         {"R001": [self.asha.id], "R002": [self.ravi.id]})
+
+
+class ImportArchiveTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.asha = User.objects.create(username="asha", email="asha@college.edu", roll_no="R001")
+        cls.ravi = User.objects.create(username="ravi", email="ravi@college.edu", roll_no="R002")
+        User.objects.create(username="twin1", email="twin1@college.edu", roll_no="R003")
+        User.objects.create(username="twin2", email="twin2@college.edu", roll_no="R003")
+
+    def entries(self):
+        return {
+            "R001.jpg": image_bytes((2000, 2600)),
+            "signatures/R001.png": image_bytes((600, 200), "PNG", (250, 250, 250)),
+            "batch/r001.jpg": image_bytes(),
+            "RAVI@college.edu.jpg": image_bytes(),
+            "R003.jpg": image_bytes(),
+            "R404.jpg": image_bytes(),
+            "readme.txt": b"from the studio",
+            "R002_sign.png": b"not an image",
+        }
+
+    def test_dry_run_only_matches(self):
+        report = photo_import.import_archive(archive(self.entries()), dry_run=True)
+        self.assertEqual(report.as_dict(), {
+            "entries": 8, "matched": 4, "imported": {"photo": 0, "signature": 0},
+            "unmatched": ["R404.jpg"], "unmatched_count": 1, "ambiguous": ["R003.jpg"],
+            "duplicates": ["batch/r001.jpg"], "skipped": ["readme.txt"], "failed": [],
+        })
+        self.asha.refresh_from_db()
+        self.assertFalse(self.asha.photo)
+
+    def test_import(self):
+        progress = []
+        report = photo_import.import_archive(archive(self.entries()), processes=1,
+                                             progress=lambda done, matched: progress.append(done))
+        self.assertEqual(report.imported, {"photo": 2, "signature": 1})
+        self.assertEqual(report.failed, [("R002_sign.png", "not a readable image")])
+        self.assertEqual(progress, [1, 2, 3, 4])
+
+        self.asha.refresh_from_db()
+        self.ravi.refresh_from_db()
+        self.assertTrue(self.asha.photo.name.startswith(f"{User._meta.get_field('photo').upload_to}{self.asha.id}-"))
+        self.assertEqual(self.asha.photo.name.split("-")[-1].split(".")[0], self.asha.photo_hash[:16])
+        with Image.open(self.asha.photo.path) as photo:
+            self.assertEqual(max(photo.size), photo_import.MAX_EDGE["photo"])
+        self.assertTrue(self.asha.signature_hash)
+        self.assertTrue(self.ravi.photo)
+        self.assertFalse(self.ravi.signature)
+
+    def test_view(self):
+        admin = User.objects.create_user(username="admin", email="admin@college.edu", password="x", role="admin")
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile("photos.zip", archive(self.entries()).getvalue())
+        response = self.client.post(reverse("import_photos"), {"file": upload, "dry_run": "1"})
+        self.assertEqual(response.json()["matched"], 4)
+        upload = SimpleUploadedFile("photos.zip", b"not a zip")
+        self.assertEqual(self.client.post(reverse("import_photos"), {"file": upload}).status_code, 400)
+
+    def test_view_imports_in_threads(self):
+        admin = User.objects.create_user(username="admin", email="admin@college.edu", password="x", role="admin")
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile("photos.zip", archive(self.entries()).getvalue())
+        # no process pool forked inside the web worker
+        with mock.patch.object(photo_import, "ProcessPoolExecutor", side_effect=AssertionError("forked")):
+            response = self.client.post(reverse("import_photos"), {"file": upload})
+        self.assertEqual(response.json()["imported"], {"photo": 2, "signature": 1})
+        self.asha.refresh_from_db()
+        self.assertTrue(self.asha.photo_hash)
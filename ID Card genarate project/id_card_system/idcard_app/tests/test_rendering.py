@@ -0,0 +1,161 @@
+import io
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from PIL import Image
+
+from .. import rendering
+from ..rendering import compiler
+from ..models import IDTemplate, User
+from .utils import ScratchFilesMixin
+
+
+RED = (220, 38, 38)
+BLUE = (37, 99, 235)
+TEMPLATE = {
+    "width": 640, "height": 400, "bg": "#ffffff",
+    "front": [
+        {"type": "rect", "x": 320, "y": 40, "w": 640, "h": 80, "fill": "#dc2626"},
+        {"type": "circle", "x": 560, "y": 300, "r": 40, "fill": "#2563eb"},
+        {"type": "text", "x": 40, "y": 200, "text": "{name}", "size": 32, "align": "left", "color": "#000000"},
+    ],
+    "back": [],
+}
+
+
+def card_user(**fields):
+    return User(**{"id": 7, "username": "asha", "first_name": "Asha", "last_name": "Patil", "roll_no": "R42",
+                   "email": "asha@example.org", **fields})
+
+
+def dark_pixels(img, box):
+    return sum(1 for pixel in img.crop(box).getdata() if sum(pixel) < 200)
+
+
+class RendererTests(ScratchFilesMixin, SimpleTestCase):
+    def test_known_template(self):
+        img = rendering.render_side(TEMPLATE, "front", card_user())
+        self.assertEqual(img.mode, "RGB")
+        self.assertEqual(img.size, (640, 400))
+        self.assertEqual(img.getpixel((320, 40)), RED)
+        self.assertEqual(img.getpixel((560, 300)), BLUE)
+        self.assertEqual(img.getpixel((320, 300)), (255, 255, 255))
+        # circles are anti-aliased: the edge blends into the background
+        edge = set(img.crop((520, 260, 600, 340)).getdata()) - {BLUE, (255, 255, 255)}
+        self.assertTrue(edge)
+        # the name is drawn from (40, 200) downwards
+        self.assertGreater(dark_pixels(img, (40, 200, 300, 245)), 100)
+        self.assertEqual(dark_pixels(img, (40, 260, 300, 300)), 0)
+
+    def test_dpi_scales_the_card(self):
+        img = rendering.render_side(TEMPLATE, "front", card_user(), dpi=rendering.BASE_DPI * 2)
+        self.assertEqual(img.size, (1280, 800))
+        self.assertEqual(img.getpixel((640, 80)), RED)
+        self.assertEqual(img.getpixel((1120, 600)), BLUE)
+
+    def test_same_card_renders_the_same(self):
+        first = rendering.render_side(TEMPLATE, "front", card_user())
+        again = rendering.render_side(TEMPLATE, "front", card_user())
+        self.assertEqual(first.tobytes(), again.tobytes())
+        other = rendering.render_side(TEMPLATE, "front", card_user(first_name="Ravi"))
+        self.assertNotEqual(first.tobytes(), other.tobytes())
+
+    def test_empty_side_is_none(self):
+        self.assertIsNone(rendering.render_side(TEMPLATE, "back", card_user()))
+        self.assertIsNone(rendering.render_side("not json", "front", card_user()))
+
+    def test_missing_photo_draws_placeholder(self):
+        template = {"front": [{"type": "photo", "x": 320, "y": 200, "w": 110, "h": 140, "bgColor": "#e2e8f0"}]}
+        img = rendering.render_side(template, "front", card_user())
+        self.assertEqual(img.getpixel((320, 150)), (226, 232, 240))
+
+    def test_encode_image(self):
+        img = rendering.render_side(TEMPLATE, "front", card_user())
+        for fmt, format_name in (("PNG", "PNG"), ("jpg", "JPEG")):
+            with Image.open(io.BytesIO(rendering.encode_image(img, fmt, dpi=300))) as decoded:
+                self.assertEqual(decoded.format, format_name)
+                self.assertEqual(decoded.size, (640, 400))
+                self.assertEqual(round(decoded.info["dpi"][0]), 300)
+
+
+class CompileCacheTests(ScratchFilesMixin, SimpleTestCase):
+    def setUp(self):
+        rendering.evict_template(7)
+
+    def compile(self):
+        compiler._memory.clear()
+        with mock.patch.object(compiler, "_build", wraps=compiler._build) as build:
+            compiled = rendering.compile_side(TEMPLATE, "front", template_id=7)
+        return compiled, build.call_count
+
+    def test_compiled_sides_are_kept_on_disk(self):
+        first, builds = self.compile()
+        self.assertEqual(builds, 1)
+        again, builds = self.compile()
+        self.assertEqual(builds, 0)
+        self.assertEqual(again.base.tobytes(), first.base.tobytes())
+
+    def test_new_renderer_version_compiles_again(self):
+        self.compile()
+        with mock.patch.object(compiler, "RENDERER_VERSION", compiler.RENDERER_VERSION + 1):
+            self.assertEqual(self.compile()[1], 1)
+            self.assertEqual(self.compile()[1], 0)
+
+    def test_evict_template(self):
+        self.compile()
+        rendering.evict_template(7)
+        self.assertEqual(list(compiler.cache_dir().glob("7-*")), [])
+        self.assertEqual(self.compile()[1], 1)
+
+
+class PlaceholderTests(SimpleTestCase):
+    def test_user_context(self):
+        ctx = rendering.user_context(card_user(date_of_birth=date(2004, 3, 9), valid_upto="2027-06-30"))
+        self.assertEqual(ctx["full_name"], "Asha Patil")
+        self.assertEqual(ctx["dob"], "09-03-2004")
+        self.assertEqual(ctx["valid_upto"], "30-06-2027")
+        self.assertEqual(ctx["valid_year"], "2027")
+
+    def test_resolve_text_leaves_empty_values(self):
+        ctx = rendering.user_context(card_user())
+        self.assertEqual(rendering.resolve_text("{name} ({roll_no}) {blood}", ctx), "Asha Patil (R42) {blood}")
+        self.assertEqual(rendering.resolve_text("", ctx), "")
+
+
+class RenderEndpointTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+        cls.student = User.objects.create_user(username="asha", email="asha@example.org", password="x",
+                                               first_name="Asha", last_name="Patil", roll_no="R42")
+        cls.template = IDTemplate(name="Known")
+        cls.template.save_version(TEMPLATE)
+
+    def get(self, side, **params):
+        self.client.force_login(self.admin)
+        return self.client.get(reverse("render_card_side", args=[self.template.id, self.student.id, side]), params)
+
+    def test_renders_png(self):
+        response = self.get("front", dpi=192)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        with Image.open(io.BytesIO(response.content)) as img:
+            self.assertEqual(img.size, (1280, 800))
+            self.assertEqual(img.convert("RGB").getpixel((640, 80)), RED)
+
+    def test_matches_render_side(self):
+        response = self.get("front")
+        with Image.open(io.BytesIO(response.content)) as img:
+            served = img.convert("RGB").tobytes()
+        self.assertEqual(served, rendering.render_side(TEMPLATE, "front", self.student).tobytes())
+
+    def test_empty_and_unknown_sides(self):
+        self.assertEqual(self.get("back").status_code, 404)
+        self.assertEqual(self.get("middle").status_code, 404)
+
+    def test_admin_only(self):
+        self.client.force_login(self.student)
+        url = reverse("render_card_side", args=[self.template.id, self.student.id, "front"])
+        self.assertEqual(self.client.get(url).status_code, 403)
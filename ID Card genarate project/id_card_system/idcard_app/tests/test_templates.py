@@ -0,0 +1,46 @@
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import IDTemplate, User
+from .utils import ScratchFilesMixin
+
+
+TEMPLATE = {"front": [{"type": "rect", "x": 320, "y": 40, "w": 640, "h": 80, "fill": "#dc2626"}], "back": []}
+
+
+class SaveTemplateTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.admin)
+
+    def save(self, payload, **headers):
+        return self.client.post(reverse("save_template"), json.dumps(payload), content_type="application/json",
+                                headers=headers)
+
+    def test_needs_the_csrf_token(self):
+        self.assertEqual(self.save({"name": "Forged", "template": TEMPLATE}).status_code, 403)
+        self.assertFalse(IDTemplate.objects.exists())
+
+    def test_debug_page_hands_out_the_token(self):
+        self.client.get(reverse("template_debug"))
+        response = self.save({"name": "Debug", "template": TEMPLATE},
+                             X_CSRFToken=self.client.cookies["csrftoken"].value)
+        self.assertEqual(response.status_code, 200)
+
+    def test_editor_page_hands_out_the_token(self):
+        self.client.get(reverse("template_admin"))
+        token = self.client.cookies["csrftoken"].value
+        response = self.save({"name": "Staff", "template": TEMPLATE}, X_CSRFToken=token)
+        self.assertEqual(response.status_code, 200)
+        template = IDTemplate.objects.get(id=response.json()["id"])
+        self.assertEqual((template.name, template.template_json), ("Staff", TEMPLATE))
+
+        response = self.save({"id": template.id, "template": {**TEMPLATE, "back": TEMPLATE["front"]}},
+                             X_CSRFToken=token)
+        self.assertEqual(response.json()["number"], 2)
@@ -0,0 +1,110 @@
+import csv
+import io
+import zipfile
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from PIL import Image
+
+from .. import zipstream
+from ..models import IDTemplate, User
+from .test_rendering import card_user
+from .utils import ScratchFilesMixin
+
+
+def open_zip(chunks):
+    """The archive a stream makes, after reading back every entry against its CRC."""
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    bad = archive.testzip()
+    if bad is not None:
+        raise AssertionError(f"{bad} does not match its CRC")
+    return archive
+
+
+def manifest(archive):
+    return list(csv.DictReader(io.TextIOWrapper(archive.open(zipstream.MANIFEST_NAME), encoding="utf-8")))
+
+
+class CardFileNamerTests(SimpleTestCase):
+    def test_patterns(self):
+        user = card_user(roll_no="", department="Computer Science")
+        namer = zipstream.CardFileNamer("{roll_no|id}_{department}_{side}", ext="jpg")
+        self.assertEqual(namer.name(user, "front", 1), "7_Computer_Science_front.jpg")
+        self.assertEqual(namer.name(user, "front", 1), "7_Computer_Science_front-2.jpg")
+        self.assertEqual(zipstream.CardFileNamer("{n}-{email}").name(user, "back", 3), "3-asha_example.org.png")
+        # nothing left of the pattern falls back to the id and side
+        self.assertEqual(zipstream.CardFileNamer("{phone}").name(user, "back", 1), "7_back.png")
+
+    def test_bad_patterns(self):
+        for pattern in ("cards", "{password}", "{roll_no|secret}"):
+            with self.subTest(pattern=pattern):
+                with self.assertRaises(ValueError):
+                    zipstream.CardFileNamer(pattern)
+
+
+class StreamCardsZipTests(SimpleTestCase):
+    def test_archive(self):
+        users = [card_user(id=1, roll_no="R1"), card_user(id=2, roll_no="R1", first_name="Ravi"),
+                 card_user(id=3, roll_no="R3")]
+        cards = [((b"front-1", 64, 40), (b"back-1", 64, 40)), ((b"front-2", 64, 40), None), (None, None)]
+        archive = open_zip(zipstream.stream_cards_zip(zip(users, cards), zipstream.CardFileNamer()))
+
+        self.assertEqual(archive.namelist(), ["R1_front.png", "R1_back.png", "R1_front-2.png", "manifest.csv"])
+        self.assertEqual(archive.read("R1_front-2.png"), b"front-2")
+        self.assertTrue(all(info.compress_type == zipfile.ZIP_STORED for info in archive.infolist()))
+        rows = manifest(archive)
+        self.assertEqual([(row["file"], row["side"], row["user_id"], row["bytes"]) for row in rows], [
+            ("R1_front.png", "front", "1", "7"), ("R1_back.png", "back", "1", "6"),
+            ("R1_front-2.png", "front", "2", "7"),
+        ])
+        self.assertEqual(rows[2]["first_name"], "Ravi")
+
+    def test_empty_run(self):
+        archive = open_zip(zipstream.stream_cards_zip([], zipstream.CardFileNamer()))
+        self.assertEqual(archive.namelist(), ["manifest.csv"])
+        self.assertEqual(manifest(archive), [])
+
+
+class ExportCardsZipTests(ScratchFilesMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username="admin", email="admin@example.org", password="x", role="admin")
+        cls.asha = User.objects.create_user(username="asha", email="asha@example.org", password="x",
+                                            first_name="Asha", roll_no="R42")
+        cls.ravi = User.objects.create_user(username="ravi", email="ravi@example.org", password="x",
+                                            first_name="Ravi")
+        cls.template = IDTemplate(name="Export")
+        cls.template.save_version({
+            "front": [{"type": "text", "x": 320, "y": 200, "text": "{name}"}],
+            "back": [{"type": "rect", "x": 320, "y": 40, "w": 640, "h": 80, "fill": "#dc2626"}],
+        })
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        return self.client.get(reverse("export_cards_zip", args=[self.template.id]), {"dpi": 72, **params})
+
+    def test_streamed_archive(self):
+        response = self.export(users=f"{self.ravi.id},{self.asha.id}", format="jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="ID_Cards.zip"')
+        archive = open_zip(response.streaming_content)
+
+        rows = manifest(archive)
+        self.assertEqual([(row["file"], row["username"]) for row in rows], [
+            (f"{self.ravi.id}_front.jpg", "ravi"), (f"{self.ravi.id}_back.jpg", "ravi"),
+            ("R42_front.jpg", "asha"), ("R42_back.jpg", "asha"),
+        ])
+        self.assertEqual(archive.namelist(), [row["file"] for row in rows] + ["manifest.csv"])
+        for row in rows:
+            data = archive.read(row["file"])
+            self.assertEqual(int(row["bytes"]), len(data))
+            with Image.open(io.BytesIO(data)) as img:
+                self.assertEqual((img.format, img.size), ("JPEG", (int(row["width"]), int(row["height"]))))
+
+    def test_options(self):
+        archive = open_zip(self.export(users=self.asha.id, back="0", name="{first_name}-{n}").streaming_content)
+        self.assertEqual(archive.namelist(), ["Asha-1.png", "manifest.csv"])
+        self.assertEqual(self.export(format="gif").status_code, 400)
+        self.assertEqual(self.export(name="{password}").status_code, 400)
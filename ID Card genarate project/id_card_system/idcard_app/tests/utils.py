@@ -0,0 +1,85 @@
+"""Fixtures shared by the test modules."""
+import re
+import shutil
+import tempfile
+import zlib
+from pathlib import Path
+
+from django.test.utils import override_settings
+
+
+class ScratchFilesMixin:
+    """Media, card cache, exports and metrics in a temporary directory per test class.
+
+    Also a local-memory cache, fast password hashing and plain static file
+    storage (pages name static files that have no collectstatic manifest).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scratch = Path(tempfile.mkdtemp(prefix="idcard-tests-"))
+        cls.addClassCleanup(shutil.rmtree, cls.scratch, ignore_errors=True)
+        overrides = override_settings(
+            MEDIA_ROOT=cls.scratch / "media",
+            RENDER_CACHE_DIR=cls.scratch / "render",
+            EXPORT_ROOT=cls.scratch / "exports",
+            METRICS_DIR=cls.scratch / "metrics",
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+            STORAGES={
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+        )
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+        super().setUpClass()
+
+
+def read_pdf(data):
+    """Objects of a PDF by number, checking the header, xref table and trailer on the way.
+
+    Every object's xref offset must point at its "N 0 obj" line and startxref
+    at the table, as a reader that does not repair files expects.
+    """
+    if not data.startswith(b"%PDF-"):
+        raise AssertionError("no %PDF- header")
+    tail = re.search(rb"startxref\n(\d+)\n%%EOF\n$", data)
+    if not tail:
+        raise AssertionError("no startxref at the end")
+    xref = int(tail.group(1))
+    table = re.match(rb"xref\n0 (\d+)\n", data[xref:])
+    if not table:
+        raise AssertionError(f"startxref {xref} does not point at the xref table")
+    size = int(table.group(1))
+    entries = data[xref + table.end():].split(b"trailer", 1)[0]
+    if len(entries) != size * 20:
+        raise AssertionError(f"{len(entries) // 20} xref entries for /Size {size}")
+    trailer = data[data.rindex(b"trailer"):]
+    if b"/Size %d " % size not in trailer:
+        raise AssertionError("trailer /Size differs from the xref table")
+
+    objects = {}
+    for obj_id in range(1, size):
+        entry = entries[obj_id * 20:(obj_id + 1) * 20]
+        offset = int(entry[:10])
+        header = b"%d 0 obj\n" % obj_id
+        if not entry.endswith(b" n \n") or not data.startswith(header, offset):
+            raise AssertionError(f"xref offset {offset} of object {obj_id} is wrong")
+        start = offset + len(header)
+        objects[obj_id] = data[start:data.index(b"\nendobj\n", start)]
+    return objects
+
+
+def pdf_stream(obj):
+    """Decoded stream of a PDF object (Flate or stored)."""
+    head, _, rest = obj.partition(b"\nstream\n")
+    stream = rest[:rest.rindex(b"\nendstream")]
+    return zlib.decompress(stream) if b"/FlateDecode" in head else stream
+
+
+def pdf_pages(objects):
+    """Page objects in page tree order."""
+    pages = next(obj for obj in objects.values() if obj.startswith(b"<< /Type /Pages "))
+    kids = [int(ref) for ref in re.findall(rb"(\d+) 0 R", pages.split(b"/Kids [", 1)[1].split(b"]", 1)[0])]
+    return [objects[kid] for kid in kids]
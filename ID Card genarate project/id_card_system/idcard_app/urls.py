@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from .views import save_template
@@ -15,6 +16,8 @@ urlpatterns = [
     path("admin/profile/", views.admin_profile, name="admin_profile"),
     path("admin/users/", views.manage_users, name="manage_users"),
     path("admin/users/api/list/", views.get_users_json, name="get_users_json"),
+    path("admin/users/api/import/", views.import_users, name="import_users"),
+    path("admin/users/api/import-photos/", views.import_photos, name="import_photos"),
     path("admin/users/edit/<int:user_id>/", views.edit_user, name="edit_user"),
     path("admin/templates/", views.template_admin, name="template_admin"),
     path("admin/templates/debug/", views.show_template_debug, name="template_debug"),
@@ -23,13 +26,31 @@ urlpatterns = [
     path("admin/templates/api/list/", views.list_designs, name="list_designs"),
     path("admin/templates/api/load/<int:design_id>/", views.load_design, name="load_design"),
     path("admin/templates/api/batch-export/", views.batch_export, name="batch_export"),
+    path("admin/templates/api/batch-export/<int:job_id>/", views.export_job_status, name="export_job_status"),
+    path("admin/templates/api/batch-export/<int:job_id>/cancel/", views.cancel_export_job, name="cancel_export_job"),
+    path("admin/templates/api/batch-export/<int:job_id>/download/", views.download_export_job, name="download_export_job"),
     path("admin/generate-id/", views.generate_id_card, name="generate_id_card"),
     path("admin/generate-id/api/templates/", views.get_id_templates, name="get_id_templates"),
     path("admin/generate-id/api/templates/<int:template_id>/", views.get_id_template_detail, name="get_id_template_detail"),
+    path("admin/generate-id/api/templates/<int:template_id>/thumbnail.png", views.get_id_template_thumbnail, name="get_id_template_thumbnail"),
+    path("admin/generate-id/api/templates/<int:template_id>/versions/", views.get_id_template_versions, name="get_id_template_versions"),
+    path("admin/generate-id/api/templates/<int:template_id>/v/<slug:version>/", views.get_id_template_detail, name="get_id_template_version"),
+    path("admin/generate-id/api/templates/<int:template_id>/v/<slug:version>/thumbnail.png", views.get_id_template_thumbnail, name="get_id_template_version_thumbnail"),
     path("admin/generate-id/api/templates/<int:template_id>/delete/", views.delete_id_template, name="delete_id_template"),
+    path("admin/generate-id/api/bundle/<int:template_id>/", views.get_render_bundle, name="get_render_bundle"),
+    path("admin/generate-id/api/render/<int:template_id>/<int:user_id>/<slug:side>.png", views.render_card_side, name="render_card_side"),
+    path("admin/generate-id/api/render/<int:template_id>/<int:user_id>/<slug:side>.jpg", views.render_card_side, {"fmt": "jpg"}, name="render_card_side_jpg"),
+    path("admin/generate-id/api/render/<int:template_id>/v/<slug:version>/<int:user_id>/<slug:side>.png", views.render_card_side, name="render_card_side_version"),
+    path("admin/generate-id/api/render/<int:template_id>/v/<slug:version>/<int:user_id>/<slug:side>.jpg", views.render_card_side, {"fmt": "jpg"}, name="render_card_side_version_jpg"),
+    path("admin/generate-id/api/export/<int:template_id>/cards.pdf", views.export_cards_pdf, name="export_cards_pdf"),
+    path("admin/generate-id/api/export/<int:template_id>/v/<slug:version>/cards.pdf", views.export_cards_pdf, name="export_cards_pdf_version"),
+    path("admin/generate-id/api/export/<int:template_id>/cards.zip", views.export_cards_zip, name="export_cards_zip"),
+    path("admin/generate-id/api/export/<int:template_id>/v/<slug:version>/cards.zip", views.export_cards_zip, name="export_cards_zip_version"),
     path("admin/generate-id/api/debug/", views.template_debug, name="api_template_debug"),
     path("api/test/", views.test_api, name="test_api"),  # Test endpoint for debugging
     path("api/photo/remove-bg/<int:user_id>/", views.remove_background_api, name="remove_background_api"),
+    path("metrics", views.metrics_view, name="metrics"),
+    path(settings.MEDIA_URL.lstrip("/") + "<path:name>", views.serve_media, name="serve_media"),
     path("admin/dashboard-settings/", views.dashboard_settings, name="dashboard_settings"),
     path("save-template/", save_template, name="save_template"),
     path("templates/list/", views.load_templates, name="load_templates"),
@@ -1,19 +1,34 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.hashers import make_password
-from django.http import HttpResponseForbidden
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from datetime import datetime
+import itertools
+import logging
+import os
+import zipfile
 
-from .models import User, DashboardSettings
-from .models import TemplateDesign
+from .models import CARD_HOLDER, User, DashboardSettings
+from .models import TemplateDesign, ExportJob
 from django.http import JsonResponse, HttpResponseBadRequest
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_safe
 import json
-from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.csrf import ensure_csrf_cookie
 from django.http import JsonResponse
 from .models import IDTemplate
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import quote_etag
+from django.db.models import Q
+from . import importing, imaging, jobs, metrics, photo_import, rendering, sendfile, zipstream
+from .pagination import InvalidCursor, keyset_page
+
+logger = logging.getLogger(__name__)
 
 
 # =========================
@@ -73,10 +88,7 @@ def logout_view(request):
 def user_dashboard(request):
     # Get user and dashboard settings
     user = request.user
-    try:
-        settings = DashboardSettings.objects.first()
-    except:
-        settings = None
+    dashboard_settings = DashboardSettings.current()
     
     def parse_date(value):
         if not value:
@@ -117,7 +129,7 @@ def user_dashboard(request):
     
     return render(request, "idcard_app/user_dashboard.html", {
         "user": user,
-        "settings": settings
+        "settings": dashboard_settings
     })
 
 
@@ -178,24 +190,95 @@ def admin_profile(request):
 # =========================
 # MANAGE USERS
 # =========================
+MANAGE_USERS_PAGE_SIZE = 50
+
+
 @login_required
 @admin_required
 def manage_users(request):
 
-    users = (
-        User.objects
-        .exclude(is_superuser=True)
-        .exclude(is_staff=True)
-        .exclude(role__in=["admin", "employee", "staff"])
-    )
+    users = filter_users(card_holders(), request.GET)
+    try:
+        page = keyset_page(users, USER_ORDERINGS['username'], request.GET.get('cursor'), MANAGE_USERS_PAGE_SIZE)
+    except InvalidCursor:
+        return redirect('manage_users')
+
+    # filters and search stay applied when following the page links
+    query = request.GET.copy()
+    query.pop('cursor', None)
+    first_page = query.urlencode() if 'cursor' in request.GET else None
+    if page.next_cursor:
+        query['cursor'] = page.next_cursor
 
     return render(
         request,
         "idcard_app/view_users.html",
-        {"users": users}
+        {
+            "users": page.items,
+            "next_page": query.urlencode() if page.next_cursor else None,
+            "first_page": first_page,
+            "filters": {name: request.GET.get(name, '') for name in USER_FILTERS},
+            "search": request.GET.get('q', ''),
+            "roles": User.ROLE_CHOICES,
+            "residence_statuses": User.RESIDENCE_STATUS_CHOICES,
+            "departments": (
+                card_holders().exclude(department__isnull=True).exclude(department='')
+                .order_by('department').values_list('department', flat=True).distinct()
+            ),
+        }
     )
 
 
+# =========================
+# IMPORT USERS
+# =========================
+IMPORT_MAX_ERRORS = 500
+# image workers per photo import, as threads of the web worker (manage.py import_photos uses processes)
+PHOTO_IMPORT_THREADS = 2
+
+
+@login_required
+@admin_required
+@require_POST
+def import_users(request):
+    """Create or update users from an uploaded CSV/XLSX file, matched by email"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No file uploaded'}, status=400)
+
+    try:
+        report = importing.import_file(
+            upload.file, upload.name,
+            dry_run=request.POST.get('dry_run') in ('1', 'true', 'on'),
+            default_password=request.POST.get('default_password') or None,
+        )
+    except importing.ImportFormatError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(report.as_dict(max_errors=IMPORT_MAX_ERRORS))
+
+
+@login_required
+@admin_required
+@require_POST
+def import_photos(request):
+    """Attach photos/signatures from an uploaded ZIP, matched to users by roll number or email"""
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'No file uploaded'}, status=400)
+    field = request.POST.get('field', 'auto')
+    if field not in photo_import.FIELDS:
+        return JsonResponse({'error': 'Unknown field'}, status=400)
+
+    try:
+        report = photo_import.import_archive(
+            upload.file, field=field, threads=PHOTO_IMPORT_THREADS,
+            dry_run=request.POST.get('dry_run') in ('1', 'true', 'on'),
+        )
+    except zipfile.BadZipFile:
+        return JsonResponse({'error': 'Upload a .zip archive'}, status=400)
+    return JsonResponse(report.as_dict(max_names=IMPORT_MAX_ERRORS))
+
+
 # =========================
 # EDIT USER
 # =========================
@@ -206,10 +289,7 @@ def edit_user(request, user_id):
     user = get_object_or_404(User, id=user_id)
     
     # Get dashboard settings to control field visibility
-    try:
-        settings = DashboardSettings.objects.first()
-    except:
-        settings = None
+    dashboard_settings = DashboardSettings.current()
 
     if request.method == "POST":
         # Basic Information
@@ -261,7 +341,7 @@ def edit_user(request, user_id):
         messages.success(request, f"✓ User '{user.username}' updated successfully!")
         return redirect("manage_users")
 
-    return render(request, "idcard_app/edit_form.html", {"user": user, "settings": settings})
+    return render(request, "idcard_app/edit_form.html", {"user": user, "settings": dashboard_settings})
 
 
 # =========================
@@ -269,6 +349,7 @@ def edit_user(request, user_id):
 # =========================
 @login_required
 @admin_required
+@ensure_csrf_cookie
 def template_admin(request, user_id=None):
     student = get_object_or_404(User, id=user_id) if user_id else request.user
     return render(request, "idcard_app/template_admin.html", {"student": student})
@@ -279,6 +360,7 @@ def template_admin(request, user_id=None):
 # =========================
 @login_required
 @admin_required
+@ensure_csrf_cookie
 def show_template_debug(request):
     return render(request, "idcard_app/template_debug.html")
 
@@ -337,16 +419,87 @@ def load_design(request, design_id):
 @admin_required
 @require_POST
 def batch_export(request):
-    # Placeholder server-side API: accept list of users and design id, queue export job.
+    """Queue a server-side export job for a template and a list of users"""
     try:
         payload = json.loads(request.body.decode('utf-8'))
     except Exception:
         return HttpResponseBadRequest('Invalid JSON')
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest('Expected a JSON object')
+    include_back = payload.get('include_back', True)
+    if not isinstance(include_back, bool):
+        return HttpResponseBadRequest('include_back must be true or false')
+
+    template_id = payload.get('template_id') or payload.get('design_id')
+    template = IDTemplate.objects.filter(id=template_id).first() if template_id else None
+    if template is None:
+        return JsonResponse({'error': 'Template not found'}, status=404)
+    # a version hash reprints cards exactly as that version drew them
+    version = None
+    if payload.get('version'):
+        version = template.versions.filter(hash=payload['version']).first()
+        if version is None:
+            return JsonResponse({'error': 'Unknown template version'}, status=404)
+
+    fmt = payload.get('format', 'zip')
+    if fmt not in dict(ExportJob.FORMAT_CHOICES):
+        return HttpResponseBadRequest('Unknown format')
+    # N-up printer sheets for PDF exports, e.g. {"paper": "a4", "bleed": 1, "duplex": "long-edge"}
+    layout_options = payload.get('layout') or {}
+    if not isinstance(layout_options, dict):
+        return HttpResponseBadRequest('Invalid layout')
+    try:
+        layout = rendering.SheetLayout.from_options(layout_options) if fmt == 'pdf' else None
+    except ValueError as e:
+        return HttpResponseBadRequest(f'Invalid layout: {e}')
+
+    try:
+        user_ids = [int(u['id'] if isinstance(u, dict) else u) for u in payload.get('users', [])]
+        dpi = max(RENDER_DPI_MIN, min(RENDER_DPI_MAX, int(payload.get('dpi', 300))))
+    except (KeyError, TypeError, ValueError):
+        return HttpResponseBadRequest('Invalid users or dpi')
+    if not user_ids:
+        # no selection means every card holder, like the streaming PDF export
+        user_ids = list(card_holders().order_by('username').values_list('id', flat=True))
+
+    job = jobs.create_export_job(
+        template, user_ids,
+        version=version,
+        created_by=request.user,
+        fmt=fmt,
+        include_back=include_back,
+        dpi=dpi,
+        layout=layout,
+    )
+    return JsonResponse({'ok': True, 'job_id': job.id, 'queued': job.total, 'status': job.status})
 
-    users = payload.get('users', [])
-    design_id = payload.get('design_id')
-    # In production, enqueue a background job to render each card server-side as PDF/PNG
-    return JsonResponse({'ok': True, 'queued': len(users), 'note': 'Batch export queued (implement background renderer)'})
+
+@login_required
+@admin_required
+def export_job_status(request, job_id):
+    """Status and progress of an export job"""
+    job = get_object_or_404(ExportJob, id=job_id)
+    return JsonResponse(jobs.job_progress(job))
+
+
+@login_required
+@admin_required
+@require_POST
+def cancel_export_job(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    cancelled = jobs.cancel_job(job)
+    job.refresh_from_db()
+    return JsonResponse({'ok': cancelled, 'status': job.status})
+
+
+@login_required
+@admin_required
+def download_export_job(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id)
+    if job.status not in ('done', 'failed') or not job.output or not os.path.exists(job.output):
+        return JsonResponse({'error': 'Export not ready', 'status': job.status}, status=409)
+    return FileResponse(open(job.output, 'rb'), as_attachment=True,
+                        filename=os.path.basename(job.output))
 
 
 # =========================
@@ -356,49 +509,10 @@ def batch_export(request):
 # =========================
 @login_required
 @admin_required
+@ensure_csrf_cookie
 def generate_id_card(request):
-    """Render generate ID card page with templates and users context"""
-    try:
-        # Get all templates
-        templates = IDTemplate.objects.all().order_by('-id')
-        templates_data = []
-        for t in templates:
-            try:
-                template_json = t.template_json if isinstance(t.template_json, dict) else json.loads(str(t.template_json))
-            except:
-                template_json = {}
-            templates_data.append({
-                'id': t.id,
-                'name': t.name,
-                'json': template_json
-            })
-        
-        # Get all users
-        users = User.objects.all().values(
-            'id', 'username', 'email', 'first_name', 'last_name',
-            'role', 'department', 'phone', 'emergency_mobile', 'blood_group',
-            'age', 'roll_no', 'photo', 'signature', 'address', 'residence_status',
-            'date_of_birth', 'valid_upto'
-        ).order_by('username')
-        
-        context = {
-            'templates': templates_data,
-            'users': list(users),
-            'templates_json': json.dumps(templates_data),
-            'users_json': json.dumps(list(users)),
-        }
-        return render(request, "idcard_app/generate_id.html", context)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        context = {
-            'templates': [],
-            'users': [],
-            'templates_json': '[]',
-            'users_json': '[]',
-            'error': str(e)
-        }
-        return render(request, "idcard_app/generate_id.html", context)
+    """Generate ID card page; templates and users are loaded by the page from the APIs"""
+    return render(request, "idcard_app/generate_id.html")
 
 
 # =========================
@@ -408,30 +522,31 @@ def generate_id_card(request):
 @admin_required
 def dashboard_settings(request):
 
-    settings, created = DashboardSettings.objects.get_or_create(id=1)
+    # a fresh instance (current() is shared and read-only); the same row readers see
+    current = DashboardSettings.objects.order_by('pk').first() or DashboardSettings(id=1)
 
     if request.method == "POST":
-        settings.show_age = "show_age" in request.POST
-        settings.show_department = "show_department" in request.POST
-        settings.show_photo = "show_photo" in request.POST
-        settings.show_phone = "show_phone" in request.POST
-        settings.show_blood_group = "show_blood_group" in request.POST
-        settings.show_roll_no = "show_roll_no" in request.POST
-        settings.show_date_of_birth = "show_date_of_birth" in request.POST
-        settings.show_emergency_mobile = "show_emergency_mobile" in request.POST
-        settings.show_valid_upto = "show_valid_upto" in request.POST
-        settings.show_signature = "show_signature" in request.POST
-        settings.show_address = "show_address" in request.POST
-        settings.show_role = "show_role" in request.POST
-        settings.show_residence_status = "show_residence_status" in request.POST
-        settings.save()
+        current.show_age = "show_age" in request.POST
+        current.show_department = "show_department" in request.POST
+        current.show_photo = "show_photo" in request.POST
+        current.show_phone = "show_phone" in request.POST
+        current.show_blood_group = "show_blood_group" in request.POST
+        current.show_roll_no = "show_roll_no" in request.POST
+        current.show_date_of_birth = "show_date_of_birth" in request.POST
+        current.show_emergency_mobile = "show_emergency_mobile" in request.POST
+        current.show_valid_upto = "show_valid_upto" in request.POST
+        current.show_signature = "show_signature" in request.POST
+        current.show_address = "show_address" in request.POST
+        current.show_role = "show_role" in request.POST
+        current.show_residence_status = "show_residence_status" in request.POST
+        current.save()
         messages.success(request, "✓ Settings updated successfully")
         return redirect("dashboard_settings")
 
     return render(
         request,
         "idcard_app/dashboard_settings.html",
-        {"settings": settings}
+        {"settings": current}
     )
 
 
@@ -506,8 +621,10 @@ def forgot_password(request):
 
 
 
-@csrf_exempt
+@login_required
+@admin_required
 def save_template(request):
+    """Save a new template, or (with "id") a new version of an existing one"""
     if request.method != "POST":
         return JsonResponse({"error": "POST required"}, status=400)
 
@@ -518,12 +635,18 @@ def save_template(request):
         name = data.get("name", "Untitled Template")
         template_json = data.get("template")
 
-        obj = IDTemplate.objects.create(
-            name=name,
-            template_json=template_json
-        )
+        if data.get("id"):
+            obj = IDTemplate.objects.filter(id=data["id"]).first()
+            if obj is None:
+                return JsonResponse({"error": "Template not found"}, status=404)
+            if data.get("name"):
+                obj.name = name
+                obj.save(update_fields=["name"])
+        else:
+            obj = IDTemplate(name=name)
+        version = obj.save_version(template_json, created_by=request.user)
 
-        return JsonResponse({"status": "ok", "id": obj.id})
+        return JsonResponse({"status": "ok", "id": obj.id, "version": version.hash, "number": version.number})
 
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=500)
@@ -540,89 +663,472 @@ def load_templates(request):
         data.append({
             "id": t.id,
             "name": t.name,
-            "side": t.side,
-            "data": t.data
+            "json": t.json
         })
 
     return JsonResponse(data, safe=False)
 
 
 # =========================
-# API: GET ALL USERS (JSON)
+# API: USERS (JSON, KEYSET PAGINATED)
 # =========================
-# API: GET ALL USERS (JSON)
-# =========================
-@csrf_exempt
+USER_API_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'role', 'department', 'phone', 'emergency_mobile', 'blood_group',
+    'age', 'roll_no', 'address', 'residence_status', 'date_of_birth',
+    'valid_upto', 'photo', 'signature', 'is_staff', 'is_superuser',
+    'date_joined',
+)
+USER_API_DEFAULT_FIELDS = USER_API_FIELDS[:-1]
+USER_ORDERINGS = {
+    'username': ('username', 'id'),
+    'date_joined': ('date_joined', 'id'),
+    '-date_joined': ('-date_joined', '-id'),
+}
+USER_FILTERS = ('role', 'department', 'residence_status')
+USER_PAGE_SIZE = 100
+USER_PAGE_SIZE_MAX = 1000
+
+
+def filter_users(queryset, params):
+    """Apply ?role=&department=&residence_status=&id= (repeatable) and ?q= search"""
+    ids = [v for v in params.getlist('id') if v.isdigit()]
+    if ids:
+        queryset = queryset.filter(id__in=ids)
+    for name in USER_FILTERS:
+        values = [v for v in params.getlist(name) if v]
+        if values:
+            queryset = queryset.filter(**{f'{name}__in': values})
+    q = params.get('q', '').strip()
+    if q:
+        queryset = queryset.filter(
+            Q(username__icontains=q) | Q(email__icontains=q) |
+            Q(first_name__icontains=q) | Q(last_name__icontains=q) | Q(roll_no__icontains=q)
+        )
+    return queryset
+
+
+def _int_param(params, name, default, low, high):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    return max(low, min(high, value))
+
+
+@login_required
+@admin_required
 def get_users_json(request):
-    """Returns all users as JSON for template generation page"""
+    """One page of users as JSON.
+
+    ?cursor= next_cursor of the previous page, ?limit= page size (max 1000),
+    ?order=username|date_joined|-date_joined, ?fields=id,email,... projection,
+    ?role=/?department=/?residence_status=/?id= filters, ?q= search,
+    ?holders=1 only users that get ID cards, ?total=0 skips the COUNT query.
+    """
+    params = request.GET
+    ordering = USER_ORDERINGS.get(params.get('order', 'username'))
+    if ordering is None:
+        return JsonResponse({'error': 'Unknown order', 'status': 'error'}, status=400)
+
+    fields = [f for f in params.get('fields', '').split(',') if f] or list(USER_API_DEFAULT_FIELDS)
+    unknown = sorted(set(fields) - set(USER_API_FIELDS))
+    if unknown:
+        return JsonResponse({'error': f'Unknown fields: {", ".join(unknown)}', 'status': 'error'}, status=400)
+    for name in ordering:
+        if name.lstrip('-') not in fields:
+            fields.append(name.lstrip('-'))
+
     try:
-        users = User.objects.all().values(
-            'id', 'username', 'email', 'first_name', 'last_name',
-            'role', 'department', 'phone', 'emergency_mobile', 'blood_group',
-            'age', 'roll_no', 'address', 'residence_status', 'date_of_birth',
-            'valid_upto', 'photo', 'signature', 'is_staff', 'is_superuser'
-        )
-        users_list = list(users)
-        
-        return JsonResponse({
-            'users': users_list,
-            'status': 'ok',
-            'count': len(users_list)
-        })
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+        limit = _int_param(params, 'limit', USER_PAGE_SIZE, 1, USER_PAGE_SIZE_MAX)
+    except ValueError as e:
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=400)
+
+    users = card_holders() if params.get('holders') == '1' else User.objects.all()
+    users = filter_users(users, params)
+    try:
+        page = keyset_page(users.values(*fields), ordering, params.get('cursor'), limit)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e), 'status': 'error'}, status=400)
+
+    data = {
+        'users': page.items,
+        'status': 'ok',
+        'count': len(page.items),
+        'next_cursor': page.next_cursor,
+        'has_more': page.has_more,
+    }
+    if params.get('total', '1') != '0':
+        data['total'] = users.count()
+    return JsonResponse(data)
+
+
+# =========================
+# TEMPLATE VERSIONS
+# =========================
+# URLs naming a version hash (.../v/<hash>/...) always return the same bytes,
+# so they are cached for a year without revalidation; the unversioned URLs
+# follow the current version and revalidate with an ETag.
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def template_at(template, version=None):
+    """(template JSON, content hash) of a template's current version, or of the version hash given"""
+    if version:
+        found = template.versions.filter(hash=version).values_list('template_json', 'hash').first()
+        if found is None:
+            raise Http404('Unknown template version')
+        return found
+    template_data = rendering.load_template_json(template.template_json)
+    return template_data, rendering.template_hash(template_data)
+
+
+def cache_forever(response):
+    patch_cache_control(response, private=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
+
+
+@login_required
+@admin_required
+def get_id_template_versions(request, template_id):
+    """Every saved version of a template, newest first"""
+    template = get_object_or_404(IDTemplate.objects.select_related('current_version'), id=template_id)
+    current = template.current_version.hash if template.current_version else None
+    versions = template.versions.values('number', 'hash', 'created_at', 'created_by__username')
+    data = [
+        {
+            'number': v['number'],
+            'hash': v['hash'],
+            'current': v['hash'] == current,
+            'created_at': v['created_at'].isoformat(),
+            'created_by': v['created_by__username'],
+            'detail': reverse('get_id_template_version', args=[template.id, v['hash']]),
+        }
+        for v in versions
+    ]
+    return JsonResponse({'id': template.id, 'name': template.name, 'versions': data})
 
 
 # =========================
-# API: GET ALL ID TEMPLATES (JSON)
+# API: ID TEMPLATE CATALOG (JSON)
 # =========================
-@csrf_exempt
+TEMPLATE_THUMBNAIL_DPI = 24   # 640x400 card -> 160x100 thumbnail
+
+
+@login_required
+@admin_required
 def get_id_templates(request):
-    """Returns all saved ID templates for generation page"""
-    try:
-        templates = IDTemplate.objects.all().order_by('-id')
-        
-        data = []
-        for t in templates:
-            try:
-                template_data = t.template_json if isinstance(t.template_json, dict) else json.loads(str(t.template_json))
-            except:
-                template_data = {}
-            
-            data.append({
-                'id': t.id,
-                'name': t.name,
-                'json': template_data,
-                'created_at': t.created_at.isoformat()
-            })
-        
-        return JsonResponse({'templates': data, 'status': 'ok', 'count': len(data)})
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JsonResponse({'error': str(e), 'status': 'error'}, status=500)
+    """Lightweight template catalog (id, name, version, thumbnail); full JSON comes from the detail API"""
+    templates = IDTemplate.objects.order_by('-id').values('id', 'name', 'created_at', 'current_version__hash')
+    data = []
+    for t in templates:
+        version = t['current_version__hash']
+        data.append({
+            'id': t['id'],
+            'name': t['name'],
+            'created_at': t['created_at'].isoformat(),
+            'version': version,
+            'detail': (reverse('get_id_template_version', args=[t['id'], version]) if version
+                       else reverse('get_id_template_detail', args=[t['id']])),
+            'thumbnail': (reverse('get_id_template_version_thumbnail', args=[t['id'], version]) if version
+                          else reverse('get_id_template_thumbnail', args=[t['id']])),
+        })
+    return JsonResponse({'templates': data, 'status': 'ok', 'count': len(data)})
+
+
+@login_required
+@admin_required
+def get_id_template_thumbnail(request, template_id, version=None):
+    """Small PNG of a template's first non-empty side, with placeholders left unfilled"""
+    template = get_object_or_404(IDTemplate, id=template_id)
+    template_data, content_hash = template_at(template, version)
+    etag = quote_etag(content_hash)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        image = None
+        for side in rendering.SIDES:
+            image = rendering.render_side(template_data, side, {}, dpi=TEMPLATE_THUMBNAIL_DPI,
+                                          images={}, template_id=template.id, content_hash=content_hash)
+            if image is not None:
+                break
+        if image is None:
+            return JsonResponse({'error': 'Template is empty'}, status=404)
+        response = HttpResponse(rendering.encode_image(image, 'png'), content_type='image/png')
+    response['ETag'] = etag
+    if version:
+        return cache_forever(response)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 # =========================
 # API: GET SINGLE ID TEMPLATE
 # =========================
-@csrf_exempt
-def get_id_template_detail(request, template_id):
-    """Returns single template for generation"""
-    try:
-        t = IDTemplate.objects.get(id=template_id)
-        template_data = t.template_json if isinstance(t.template_json, dict) else json.loads(str(t.template_json))
-        
-        return JsonResponse({
+@login_required
+@admin_required
+def get_id_template_detail(request, template_id, version=None):
+    """Returns single template for generation (ETag: repeat fetches of an unchanged template are 304s)"""
+    t = IDTemplate.objects.filter(id=template_id).first()
+    if t is None:
+        return JsonResponse({'error': 'Template not found'}, status=404)
+
+    template_data, content_hash = template_at(t, version)
+    etag = quote_etag(content_hash)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({
             'id': t.id,
             'name': t.name,
+            'hash': content_hash,
             'json': template_data,
             'created_at': t.created_at.isoformat()
         })
-    except IDTemplate.DoesNotExist:
-        return JsonResponse({'error': 'Template not found'}, status=404)
+    response['ETag'] = etag
+    if version:
+        return cache_forever(response)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# =========================
+# API: RENDER BUNDLE (TEMPLATE + RESOLVED USERS)
+# =========================
+RENDER_BUNDLE_MAX_USERS = 500
+PLACEHOLDER_KEYS = tuple(dict.fromkeys(key for _, key in rendering.PLACEHOLDERS))
+
+
+def bundle_user(user):
+    """Placeholder values and image URLs the browser renderer needs for one user"""
+    ctx = rendering.user_context(user)
+    return {
+        'id': user.id,
+        'ctx': {key: ctx[key] for key in PLACEHOLDER_KEYS if ctx.get(key) not in (None, '')},
+        'photo_url': imaging.derivative_url(user.photo, 'card'),
+        'photo_nobg_url': reverse('remove_background_api', args=[user.id]) if user.photo else '',
+        'signature_url': imaging.derivative_url(user.signature, 'card'),
+    }
+
+
+def card_urls(template_id, version, user):
+    """Server-rendered PNG URL of each side at a template version.
+
+    ?card= carries the card's content key, so the URL changes whenever the
+    card would and the response can be cached forever.
+    """
+    urls = {}
+    for side in rendering.SIDES:
+        url = reverse('render_card_side_version', args=[template_id, version, user.id, side])
+        key = rendering.card_key(version, side, rendering.BASE_DPI, 'png', user)
+        urls[side] = f'{url}?card={key}' if key else url
+    return urls
+
+
+@login_required
+@admin_required
+def get_render_bundle(request, template_id):
+    """One template plus ready-to-render users (?users=1,2,3) in a single response.
+
+    ?template=0 leaves the template out when the client already holds it.
+    """
+    template = get_object_or_404(IDTemplate, id=template_id)
+    try:
+        user_ids = [int(u) for u in request.GET.get('users', '').split(',') if u.strip()]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid users'}, status=400)
+    if len(user_ids) > RENDER_BUNDLE_MAX_USERS:
+        return JsonResponse({'error': f'At most {RENDER_BUNDLE_MAX_USERS} users per bundle'}, status=400)
+
+    users = User.objects.only(*rendering.USER_FIELDS).in_bulk(user_ids)
+    template_data, content_hash = template_at(template)
+    data = {'users': []}
+    for uid in user_ids:
+        if uid in users:
+            entry = bundle_user(users[uid])
+            if template.current_version_id:
+                entry['cards'] = card_urls(template.id, content_hash, users[uid])
+            data['users'].append(entry)
+    if request.GET.get('template', '1') != '0':
+        data['template'] = {
+            'id': template.id,
+            'name': template.name,
+            'hash': content_hash,
+            'json': template_data,
+        }
+    return JsonResponse(data)
+
+
+# =========================
+# API: RENDER CARD SIDE (PNG/JPEG)
+# =========================
+RENDER_DPI_MIN = 36
+RENDER_DPI_MAX = 600
+
+
+@login_required
+@admin_required
+def render_card_side(request, template_id, user_id, side, fmt="png", version=None):
+    """Render one side of a user's card on the server (?dpi=300 for print)
+
+    The ETag is the card's content key, so an unchanged card revalidates
+    without rendering. At a template version with a matching ?card= key (see
+    card_urls) the response is cached forever.
+    """
+    if side not in rendering.SIDES:
+        return JsonResponse({'error': 'Unknown side'}, status=404)
+
+    template = get_object_or_404(IDTemplate, id=template_id)
+    user = get_object_or_404(User.objects.only(*rendering.USER_FIELDS), id=user_id)
+
+    try:
+        dpi = int(request.GET.get('dpi', rendering.BASE_DPI))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid dpi')
+    dpi = max(RENDER_DPI_MIN, min(RENDER_DPI_MAX, dpi))
+
+    template_data, content_hash = template_at(template, version)
+    compiled = rendering.compile_side(template_data, side, dpi, template.id, content_hash)
+    if compiled is None:
+        return JsonResponse({'error': 'This side is empty'}, status=404)
+
+    key = rendering.card_key(content_hash, side, dpi, fmt, user)
+    etag = quote_etag(key) if key else None
+    response = get_conditional_response(request, etag=etag) if etag else None
+    if response is None:
+        # unchanged cards come straight from the rendered-card cache
+        data, hit = rendering.render_side_encoded(compiled, content_hash, side, user, fmt, dpi)
+        content_type = 'image/jpeg' if fmt == 'jpg' else 'image/png'
+        response = HttpResponse(data, content_type=content_type)
+        response['X-Render-Cache'] = 'hit' if hit else 'miss'
+    if etag:
+        response['ETag'] = etag
+    if version and key and request.GET.get('card') == key:
+        return cache_forever(response)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# =========================
+# API: STREAMING BULK PDF
+# =========================
+def card_holders():
+    """Users that get ID cards (same filter as Manage Users)"""
+    return User.objects.filter(CARD_HOLDER)
+
+
+def _users_in_order(user_ids, batch_size=500):
+    """Yield users for user_ids in the given order, loading them in batches"""
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        found = User.objects.in_bulk(batch)
+        for uid in batch:
+            if uid in found:
+                yield found[uid]
+
+
+def _non_empty(users):
+    """users as an iterator, or None when there are none (checked before a download starts)"""
+    users = iter(users)
+    first = next(users, None)
+    return None if first is None else itertools.chain([first], users)
+
+
+@login_required
+@admin_required
+def export_cards_pdf(request, template_id, version=None):
+    """Stream a PDF of every requested card; pages are rendered while the download runs
+
+    With a version hash in the URL the cards are drawn exactly as that
+    template version drew them, e.g. to reprint an old batch. With
+    paper=a4|a3|letter the cards are imposed N-up on printer sheets
+    (gutter, bleed and margin in mm, marks=0|1, duplex=long-edge|short-edge|none).
+    Cards are drawn as vector PDF (shapes, text, shared logos); render=raster
+    embeds one JPEG per side instead, as the card images and previews look.
+    """
+    template = get_object_or_404(IDTemplate, id=template_id)
+    template_data, _ = template_at(template, version)
+    params = request.POST if request.method == "POST" else request.GET
+
+    try:
+        user_ids = [int(u) for u in params.get('users', '').split(',') if u.strip()]
+        dpi = max(RENDER_DPI_MIN, min(RENDER_DPI_MAX, int(params.get('dpi', 150))))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid users or dpi')
+    include_back = params.get('back', '1') not in ('0', 'false', '')
+    try:
+        layout = rendering.SheetLayout.from_options(params)
+    except ValueError as e:
+        return HttpResponseBadRequest(f'Invalid layout: {e}')
+
+    if user_ids:
+        users = _users_in_order(user_ids)
+    else:
+        users = card_holders().order_by('username').iterator(chunk_size=200)
+    users = _non_empty(users)
+    if users is None:
+        return JsonResponse({'error': 'No cards to export'}, status=404)
+
+    if params.get('render') == 'raster':
+        # JPEG sides go into the PDF as-is, and unchanged ones come from the card cache
+        cards = rendering.render_cards(template_data, users, include_back=include_back,
+                                       dpi=dpi, template_id=template.id, fmt='JPEG')
+    else:
+        cards = rendering.vector_cards(template_data, users, include_back=include_back, dpi=dpi)
+    if layout:
+        pages = rendering.stream_imposed_pdf(cards, layout, title=template.name)
+    else:
+        pages = rendering.stream_cards_pdf(cards, dpi=dpi, title=template.name)
+    response = StreamingHttpResponse(pages, content_type='application/pdf')
+    filename = params.get('filename') or 'All_ID_Cards.pdf'
+    filename = os.path.basename(filename).replace('"', '')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@admin_required
+def export_cards_zip(request, template_id, version=None):
+    """Stream a ZIP with one image per card side and a manifest.csv, rendered while the download runs
+
+    format=png|jpg; name is a file name pattern of User fields, e.g.
+    {roll_no}_{side} (see zipstream.CardFileNamer). Images are stored
+    uncompressed in the archive and served from the card cache when unchanged.
+    """
+    template = get_object_or_404(IDTemplate, id=template_id)
+    template_data, _ = template_at(template, version)
+    params = request.POST if request.method == "POST" else request.GET
+
+    try:
+        user_ids = [int(u) for u in params.get('users', '').split(',') if u.strip()]
+        dpi = max(RENDER_DPI_MIN, min(RENDER_DPI_MAX, int(params.get('dpi', 300))))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid users or dpi')
+    include_back = params.get('back', '1') not in ('0', 'false', '')
+    fmt = (params.get('format') or 'png').lower()
+    if fmt not in ('png', 'jpg', 'jpeg'):
+        return HttpResponseBadRequest('format must be png or jpg')
+    try:
+        namer = zipstream.CardFileNamer(params.get('name'), ext='png' if fmt == 'png' else 'jpg')
+    except ValueError as e:
+        return HttpResponseBadRequest(f'Invalid file name pattern: {e}')
+
+    if user_ids:
+        users = _users_in_order(user_ids)
+    else:
+        users = card_holders().order_by('username').iterator(chunk_size=200)
+    users = _non_empty(users)
+    if users is None:
+        return JsonResponse({'error': 'No cards to export'}, status=404)
+
+    # zip() takes each user just before render_cards does, so tee buffers at most one
+    users, render_users = itertools.tee(users)
+    cards = rendering.render_cards(template_data, render_users, include_back=include_back, dpi=dpi,
+                                   template_id=template.id, fmt='PNG' if fmt == 'png' else 'JPEG')
+    response = StreamingHttpResponse(zipstream.stream_cards_zip(zip(users, cards), namer),
+                                     content_type='application/zip')
+    filename = params.get('filename') or 'ID_Cards.zip'
+    filename = os.path.basename(filename).replace('"', '')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 @login_required
@@ -643,34 +1149,29 @@ def delete_id_template(request, template_id):
 # =========================
 @login_required
 def template_debug(request):
-    """Debug endpoint to check saved templates"""
+    """Debug endpoint to check saved templates
+
+    Users are only counted: listing them made the response grow with the
+    user table (and showed every email to any logged-in account).
+    """
     try:
-        templates = IDTemplate.objects.all()
-        users = User.objects.all()
-        
-        debug_data = {
-            'templates_count': templates.count(),
-            'users_count': users.count(),
-            'templates': [
-                {
-                    'id': t.id, 
-                    'name': t.name,
-                    'created_at': t.created_at.isoformat() if hasattr(t, 'created_at') else 'N/A'
-                }
-                for t in templates
-            ],
-            'users': [
-                {
-                    'id': u.id,
-                    'username': u.username,
-                    'email': u.email,
-                    'role': u.role
-                }
-                for u in users
-            ]
-        }
-        
-        return JsonResponse(debug_data)
+        templates = IDTemplate.objects.order_by('id').values('id', 'name', 'created_at', 'template_json')
+        data = []
+        for t in templates:
+            template_data = rendering.load_template_json(t['template_json'])
+            data.append({
+                'id': t['id'],
+                'name': t['name'],
+                'created_at': t['created_at'].isoformat(),
+                'has_front': bool(rendering.side_elements(template_data, 'front')),
+                'has_back': bool(rendering.side_elements(template_data, 'back')),
+            })
+
+        return JsonResponse({
+            'total_templates': len(data),
+            'users_count': User.objects.count(),
+            'templates': data,
+        })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -689,42 +1190,70 @@ def test_api(request):
 
 
 # =========================
-# BACKGROUND REMOVAL API
+# MEDIA
 # =========================
-from django.http import HttpResponse
-import io
+@login_required
+@require_safe
+def serve_media(request, name):
+    """Serve an uploaded photo/signature (or a derivative or cutout of one).
+
+    Admins may fetch any file; everyone else only their own. The transfer
+    itself is handed to the front proxy when settings.SENDFILE_BACKEND is set.
+    """
+    if not is_admin(request.user) and name not in imaging.user_media_names(request.user):
+        # same answer as a missing file, so names of other users' files are not confirmed
+        raise Http404('No such file')
+    storage = User._meta.get_field('photo').storage
+    try:
+        path = storage.path(name)
+        return sendfile.serve_file(request, path, name,
+                                   cache_seconds=getattr(settings, 'MEDIA_CACHE_SECONDS', 0))
+    except (SuspiciousFileOperation, FileNotFoundError, IsADirectoryError):
+        raise Http404('No such file')
 
+
+# =========================
+# BACKGROUND REMOVAL API
+# =========================
+@login_required
 def remove_background_api(request, user_id):
-    """Remove background from user's photo and return PNG with transparency"""
+    """Return the user's photo with the background removed (PNG with transparency).
+
+    The cutout is built once per photo content hash and served from storage
+    afterwards, with ETag/Last-Modified so unchanged photos revalidate as 304s.
+    """
+    if not is_admin(request.user) and request.user.id != user_id:
+        return JsonResponse({'error': 'Not allowed'}, status=403)
+    user = get_object_or_404(User, id=user_id)
+
+    if not user.photo:
+        return JsonResponse({'error': 'No photo found'}, status=404)
+
     try:
-        from rembg import remove
-        from PIL import Image
-        
-        user = get_object_or_404(User, id=user_id)
-        
-        if not user.photo:
-            return JsonResponse({'error': 'No photo found'}, status=404)
-        
-        # Open the original photo
-        input_image = Image.open(user.photo.path)
-        
-        # Remove background
-        output_image = remove(input_image)
-        
-        # Save to bytes buffer as PNG (to preserve transparency)
-        buffer = io.BytesIO()
-        output_image.save(buffer, format='PNG')
-        buffer.seek(0)
-        
-        # Return as PNG image
-        return HttpResponse(buffer.getvalue(), content_type='image/png')
-        
+        name = imaging.cutout_for(user)
     except ImportError:
         return JsonResponse({'error': 'rembg not installed'}, status=500)
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JsonResponse({'error': str(e)}, status=500)
+    except Exception:
+        # remove_background() counts its failures in metrics.BACKGROUND_REMOVALS
+        logger.exception('Background removal failed for user %s', user.id)
+        return JsonResponse({'error': 'Background removal failed'}, status=500)
 
+    return sendfile.serve_file(request, user.photo.storage.path(name), name, content_type='image/png')
 
 
+# =========================
+# METRICS
+# =========================
+@require_safe
+def metrics_view(request):
+    """Prometheus metrics of every worker process (see metrics.py)
+
+    Admins only, or a scraper sending "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    scraper = token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (scraper or is_admin(request.user)):
+        return HttpResponseForbidden("Admin access only")
+    response = HttpResponse(metrics.exposition(), content_type=metrics.CONTENT_TYPE)
+    patch_cache_control(response, no_store=True)
+    return response
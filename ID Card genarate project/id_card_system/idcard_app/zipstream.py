@@ -0,0 +1,206 @@
+"""Streamed ZIP archives of card images, e.g. for print vendors.
+
+ZipStreamWriter works like rendering.PDFStreamWriter: every call returns (or
+yields) the bytes it produced, so an archive goes out through a
+StreamingHttpResponse while its entries are still being rendered, with no
+temporary file for the archive. Each entry is written whole, so local headers
+carry the real CRC and sizes and no data descriptors are needed; some readers
+(Java's ZipInputStream among them) cannot read stored entries followed by one.
+
+Card images are stored, since PNG and JPEG are compressed already. Zip64
+records are added once an archive has more than 65535 entries or grows past
+4 GiB. The central directory and the manifest are spooled to temporary files
+past a megabyte, so memory does not grow with the run; only the set of file
+names handed out (to keep them unique) does.
+"""
+import csv
+import io
+import re
+import struct
+import tempfile
+import time
+import zlib
+
+
+STORED = 0
+UTF8_NAMES = 0x0800
+VERSION = 20
+VERSION_ZIP64 = 45
+MAX_16 = 0xFFFF
+MAX_32 = 0xFFFFFFFF
+UNIX_FILE = 0o100644 << 16
+SPOOL_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+# User fields a file name pattern may use, besides {side} and {n}
+NAME_FIELDS = (
+    "id", "username", "roll_no", "first_name", "last_name", "email",
+    "department", "role", "blood_group", "phone",
+)
+DEFAULT_NAME_PATTERN = "{roll_no|id}_{side}"
+MAX_NAME_LENGTH = 150
+PLACEHOLDER_RE = re.compile(r"\{([^{}]*)\}")
+UNSAFE_RE = re.compile(r"[^\w.-]+")
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_FIELDS = ("file", "side", "user_id", "username", "roll_no", "first_name", "last_name",
+                   "department", "width", "height", "bytes")
+
+
+def dos_datetime(timestamp=None):
+    """(time, date) fields of a ZIP header for a Unix timestamp (default now)."""
+    t = time.localtime(timestamp)
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((max(1980, t.tm_year) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+# =========================
+# ARCHIVE
+# =========================
+class ZipStreamWriter:
+    """Writes a stored-entry ZIP archive incrementally: add() each entry, then finish()."""
+
+    def __init__(self, timestamp=None):
+        self.offset = 0
+        self.count = 0
+        self.directory = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.dos_time, self.dos_date = dos_datetime(timestamp)
+
+    def _local_header(self, name, crc, size):
+        if size > MAX_32:
+            raise ValueError(f"{name}: entries over 4 GiB are not supported")
+        encoded = name.encode("utf-8")
+        offset = self.offset
+        extra = b""
+        if offset >= MAX_32:
+            extra = struct.pack("<HHQ", 0x0001, 8, offset)
+            offset = MAX_32
+        version = VERSION_ZIP64 if extra else VERSION
+        self.directory.write(struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, UTF8_NAMES, STORED,
+            self.dos_time, self.dos_date, crc, size, size, len(encoded), len(extra), 0, 0, 0,
+            UNIX_FILE, offset) + encoded + extra)
+        self.count += 1
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, VERSION, UTF8_NAMES, STORED, self.dos_time, self.dos_date,
+            crc, size, size, len(encoded), 0) + encoded
+        self.offset += len(header) + size
+        return header
+
+    def add(self, name, data):
+        """Bytes of one stored entry holding data."""
+        return self._local_header(name, zlib.crc32(data), len(data)) + data
+
+    def add_file(self, name, fileobj):
+        """Yield one stored entry holding the rest of a seekable file, in chunks."""
+        start = fileobj.tell()
+        crc, size = 0, 0
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+        fileobj.seek(start)
+        yield self._local_header(name, crc, size)
+        yield from iter(lambda: fileobj.read(CHUNK_SIZE), b"")
+
+    def finish(self):
+        """Yield the central directory and end records, closing the archive."""
+        start, size, count = self.offset, self.directory.tell(), self.count
+        self.directory.seek(0)
+        yield from iter(lambda: self.directory.read(CHUNK_SIZE), b"")
+        self.directory.close()
+        end = b""
+        if count > MAX_16 or start >= MAX_32 or size >= MAX_32:
+            end = struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, (3 << 8) | VERSION_ZIP64, VERSION_ZIP64, 0, 0,
+                count, count, size, start)
+            end += struct.pack("<IIQI", 0x07064B50, 0, start + size, 1)
+        end += struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, min(count, MAX_16), min(count, MAX_16),
+                           min(size, MAX_32), min(start, MAX_32), 0)
+        self.offset += size + len(end)
+        yield end
+
+
+# =========================
+# CARD FILE NAMES
+# =========================
+class CardFileNamer:
+    """File names for card sides from a pattern of User fields.
+
+    "{roll_no}_{side}" gives "21CS042_front.png". A placeholder may list
+    fallbacks for empty fields, as in "{roll_no|id}"; {side} is front or back
+    and {n} counts users from 1. Anything but letters, digits, "-", "_" and
+    "." becomes "_", and a repeated name gets "-2", "-3", ... appended.
+    Raises ValueError for an unknown field or a pattern without any.
+    """
+
+    def __init__(self, pattern=DEFAULT_NAME_PATTERN, ext="png"):
+        self.pattern = pattern or DEFAULT_NAME_PATTERN
+        self.ext = ext
+        placeholders = PLACEHOLDER_RE.findall(self.pattern)
+        if not placeholders:
+            raise ValueError("the file name pattern needs at least one {field}")
+        for placeholder in placeholders:
+            for field in placeholder.split("|"):
+                if field not in NAME_FIELDS + ("side", "n"):
+                    raise ValueError(f"unknown field {{{field}}}; use one of {', '.join(NAME_FIELDS)}, side, n")
+        self.used = set()
+
+    def name(self, user, side, n):
+        def value(match):
+            for field in match.group(1).split("|"):
+                if field == "side":
+                    return side
+                if field == "n":
+                    return str(n)
+                raw = getattr(user, field, None)
+                if raw not in (None, ""):
+                    return str(raw)
+            return ""
+
+        stem = UNSAFE_RE.sub("_", PLACEHOLDER_RE.sub(value, self.pattern)).strip("._")[:MAX_NAME_LENGTH]
+        stem = stem or f"{user.id}_{side}"
+        name = f"{stem}.{self.ext}"
+        suffix = 1
+        while name in self.used:
+            suffix += 1
+            name = f"{stem}-{suffix}.{self.ext}"
+        self.used.add(name)
+        return name
+
+
+class _CSVSpool:
+    """CSV rows encoded as UTF-8 into a temporary file that stays in memory while small."""
+
+    def __init__(self, header):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.line = io.StringIO()
+        self.csv = csv.writer(self.line)
+        self.writerow(header)
+
+    def writerow(self, row):
+        self.csv.writerow(row)
+        self.file.write(self.line.getvalue().encode("utf-8"))
+        self.line.seek(0)
+        self.line.truncate()
+
+
+def stream_cards_zip(users_and_cards, namer):
+    """Yield a ZIP of card images with a manifest.csv (one row per file) last.
+
+    users_and_cards yields (user, (front, back)) with each side None or a
+    (bytes, width, height) tuple, as rendering.render_cards(fmt=...) makes them.
+    """
+    writer = ZipStreamWriter()
+    manifest = _CSVSpool(MANIFEST_FIELDS)
+    for n, (user, pair) in enumerate(users_and_cards, start=1):
+        for side, card in zip(("front", "back"), pair):
+            if card is None:
+                continue
+            data, width, height = card
+            name = namer.name(user, side, n)
+            manifest.writerow((name, side, user.id, user.username, user.roll_no or "", user.first_name,
+                               user.last_name, user.department or "", width, height, len(data)))
+            yield writer.add(name, data)
+    with manifest.file:
+        manifest.file.seek(0)
+        yield from writer.add_file(MANIFEST_NAME, manifest.file)
+    yield from writer.finish()